@@ -3,12 +3,13 @@ from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from decimal import Decimal
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..core.security import get_current_user
 from ..models.user import User
 from ..services.auction_service import AuctionService
 from ..services.order_service import OrderService
 from ..services.alipay_service import AlipayService
+from ..services.auction_result_service import auction_result_service
 
 router = APIRouter()
 auction_service = AuctionService()
@@ -57,9 +58,8 @@ async def create_winner_order(
 ):
     """拍卖获胜者创建订单（补充收货地址）"""
     try:
-        from ..models.product import Product, Bid
+        from ..models.product import Product
         from ..models.order import Order
-        from sqlalchemy import and_, desc
         
         # 验证用户是否为该商品的获胜者
         product = db.query(Product).filter(Product.id == product_id).first()
@@ -69,25 +69,13 @@ async def create_winner_order(
         if product.status != 3:  # 已结束
             raise HTTPException(status_code=400, detail="拍卖未结束")
         
-        # 查找获胜的出价
-        winning_bid = db.query(Bid).filter(
-            and_(
-                Bid.product_id == product_id,
-                Bid.bidder_id == current_user.id,
-                Bid.status == 1  # 获胜
-            )
-        ).first()
-        
-        if not winning_bid:
+        # 以结算写入的成交记录为准
+        result = auction_result_service.get_result(db, product_id)
+        if not result or result.winner_id != current_user.id:
             raise HTTPException(status_code=403, detail="您不是该拍卖的获胜者")
         
-        # 查找是否已有订单
-        existing_order = db.query(Order).filter(
-            and_(
-                Order.product_id == product_id,
-                Order.buyer_id == current_user.id
-            )
-        ).first()
+        # 成交订单
+        existing_order = db.get(Order, result.order_id) if result.order_id else None
         
         if existing_order:
             # 更新收货地址
@@ -159,55 +147,12 @@ async def pay_winner_order(
 async def get_my_winning_auctions(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """获取我中标的拍卖"""
     try:
-        from ..models.product import Product, Bid
-        from ..models.order import Order
-        from sqlalchemy import and_, desc
-        
-        # 查找我获胜的出价
-        winning_bids_query = db.query(Bid).filter(
-            and_(
-                Bid.bidder_id == current_user.id,
-                Bid.status == 1  # 获胜
-            )
-        ).order_by(desc(Bid.created_at))
-        
-        total = winning_bids_query.count()
-        winning_bids = winning_bids_query.offset((page - 1) * page_size).limit(page_size).all()
-        
-        results = []
-        for bid in winning_bids:
-            product = db.query(Product).filter(Product.id == bid.product_id).first()
-            order = db.query(Order).filter(
-                and_(
-                    Order.product_id == bid.product_id,
-                    Order.buyer_id == current_user.id
-                )
-            ).first()
-            
-            results.append({
-                "product_id": product.id,
-                "product_title": product.title,
-                "product_images": product.images,
-                "winning_amount": str(bid.bid_amount),
-                "bid_time": bid.created_at.isoformat(),
-                "order_id": order.id if order else None,
-                "order_no": order.order_no if order else None,
-                "payment_status": order.payment_status if order else None,
-                "order_status": order.order_status if order else None
-            })
-        
-        return {
-            "items": results,
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": (total + page_size - 1) // page_size
-        }
+        return await auction_result_service.get_winning_page(db, current_user.id, page, page_size)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail="获取中标记录失败")
@@ -5,6 +5,7 @@ from decimal import Decimal
 
 from ..core.database import get_db
 from ..core.security import get_current_user
+from ..core.serialization import TrustedJSONResponse
 from ..models.user import User
 from ..schemas.bid import BidCreate, BidResponse, BidListResponse, AutoBidCreate
 from ..services.bid_service import BidService
@@ -47,7 +48,7 @@ async def get_product_bids(
     db: Session = Depends(get_db)
 ):
     """获取商品的出价记录"""
-    return await bid_service.get_product_bids(db, product_id, page, page_size)
+    return TrustedJSONResponse(await bid_service.get_product_bids(db, product_id, page, page_size))
 
 @router.get("/my", response_model=BidListResponse)
 async def get_my_bids(
@@ -58,7 +59,7 @@ async def get_my_bids(
     current_user: User = Depends(get_current_user)
 ):
     """获取我的出价记录"""
-    return await bid_service.get_user_bids(db, current_user.id, page, page_size, status)
+    return TrustedJSONResponse(await bid_service.get_user_bids(db, current_user.id, page, page_size, status))
 
 @router.get("/winning", response_model=BidListResponse)
 async def get_winning_bids(
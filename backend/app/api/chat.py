@@ -4,8 +4,9 @@ from typing import List, Optional
 import json
 import asyncio
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..core.security import get_current_user, get_current_user_optional
+from ..core.serialization import TrustedJSONResponse
 from ..models.user import User
 from ..schemas.chat import (
     MessageCreate, MessageResponse, ConversationResponse, 
@@ -96,11 +97,11 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = D
 async def get_conversations(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """获取对话列表"""
-    return await chat_service.get_user_conversations(db, current_user.id, page, page_size)
+    return TrustedJSONResponse(await chat_service.get_user_conversations(db, current_user.id, page, page_size))
 
 @router.post("/conversations")
 async def create_conversation(
@@ -144,11 +145,11 @@ async def get_conversation_messages(
     conversation_id: int,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """获取对话消息列表"""
-    return await chat_service.get_conversation_messages(db, conversation_id, current_user.id, page, page_size)
+    return TrustedJSONResponse(await chat_service.get_conversation_messages(db, conversation_id, current_user.id, page, page_size))
 
 @router.post("/conversations/{conversation_id}/messages", response_model=MessageResponse)
 async def send_message(
@@ -261,7 +262,7 @@ async def delete_message(
 
 @router.get("/unread-count")
 async def get_unread_count(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """获取未读消息数量"""
@@ -289,7 +290,7 @@ async def search_messages(
     conversation_id: Optional[int] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """搜索消息"""
@@ -1,19 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import and_, case, func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from ..core.database import get_db
-from ..models.product import SpecialEvent, EventProduct, Product
+from ..core.database import get_read_db
+from ..core.http_cache import VersionStamp, conditional_get
+from ..core.serialization import TrustedJSONResponse
+from ..core.single_flight import flight_key, request_coalescer
+from ..models.product import SpecialEvent
+from ..services.event_catalog_service import event_catalog
 
 router = APIRouter()
 
-@router.get("/")
+
+def _special_events_version(db: Session) -> VersionStamp:
+    """专场活动列表的版本戳：活动数、最近更新时间和当前进行中的活动"""
+    now = datetime.now()
+    in_progress = and_(SpecialEvent.start_time <= now, SpecialEvent.end_time >= now)
+    count, last_updated, in_progress_ids = db.query(
+        func.count(SpecialEvent.id),
+        func.max(SpecialEvent.updated_at),
+        func.sum(case((in_progress, SpecialEvent.id), else_=0))
+    ).one()
+    return VersionStamp(tag=f"{count}:{last_updated}:{in_progress_ids}", last_modified=last_updated)
+
+
+def _special_event_version(db: Session, event_id: str) -> Optional[VersionStamp]:
+    """单个专场活动的版本戳"""
+    if not event_id.isdigit():
+        return None
+    row = db.query(SpecialEvent.updated_at).filter(SpecialEvent.id == int(event_id)).first()
+    return VersionStamp(tag=str(row.updated_at), last_modified=row.updated_at) if row else None
+
+
+@router.get("/", dependencies=[Depends(conditional_get(_special_events_version))])
 async def get_special_events(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     is_active: Optional[bool] = Query(True),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取专场活动列表"""
     try:
@@ -59,10 +85,10 @@ async def get_special_events(
     except Exception as e:
         raise HTTPException(status_code=500, detail="获取专场活动失败")
 
-@router.get("/{event_id}")
+@router.get("/{event_id}", dependencies=[Depends(conditional_get(_special_event_version))])
 async def get_special_event(
     event_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取专场活动详情"""
     try:
@@ -88,70 +114,23 @@ async def get_special_event(
 
 @router.get("/{event_id}/products")
 async def get_event_products(
+    request: Request,
     event_id: int,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取专场活动中的商品"""
     try:
-        # 验证专场活动是否存在
-        event = db.query(SpecialEvent).filter(SpecialEvent.id == event_id).first()
-        if not event:
+        # 物化的专场商品列表切片 + 商品卡片批量读取；专场上线时目录未预热，并发的相同请求只物化一次
+        flight = await request_coalescer.do(
+            flight_key(request, event_id=event_id, page=page, page_size=page_size),
+            event_catalog.get_page, db, event_id, page, page_size
+        )
+        result = flight.value
+        if result is None:
             raise HTTPException(status_code=404, detail="专场活动不存在")
-        
-        # 查询专场中的商品
-        query = db.query(Product).join(
-            EventProduct, Product.id == EventProduct.product_id
-        ).filter(EventProduct.event_id == event_id)
-        
-        total = query.count()
-        products = query.order_by(EventProduct.sort_order, Product.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
-        
-        # 转换为响应格式
-        product_list = []
-        for product in products:
-            product_dict = {
-                "id": product.id,
-                "seller_id": product.seller_id,  # 添加缺失的seller_id字段
-                "title": product.title,
-                "description": product.description,
-                "category_id": product.category_id,  # 添加缺失的category_id字段
-                "images": product.images or [],
-                "starting_price": str(product.starting_price) if product.starting_price else "0",
-                "current_price": str(product.current_price) if product.current_price else "0", 
-                "buy_now_price": str(product.buy_now_price) if product.buy_now_price else None,
-                "auction_type": product.auction_type,
-                "auction_start_time": product.auction_start_time.isoformat() if product.auction_start_time else None,
-                "auction_end_time": product.auction_end_time.isoformat() if product.auction_end_time else None,
-                "location": product.location,
-                "shipping_fee": str(product.shipping_fee) if product.shipping_fee else "0",
-                "is_free_shipping": product.is_free_shipping,
-                "condition_type": product.condition_type,
-                "stock_quantity": product.stock_quantity,
-                "view_count": product.view_count,
-                "bid_count": product.bid_count,
-                "favorite_count": product.favorite_count,
-                "status": product.status,
-                "is_featured": product.is_featured,
-                "created_at": product.created_at.isoformat() if product.created_at else None,
-                "updated_at": product.updated_at.isoformat() if product.updated_at else None,  # 添加updated_at字段
-            }
-            product_list.append(product_dict)
-        
-        return {
-            "items": product_list,
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": (total + page_size - 1) // page_size,
-            "event": {
-                "id": event.id,
-                "title": event.title,
-                "description": event.description,
-                "banner_image": event.banner_image,
-            }
-        }
+        return TrustedJSONResponse(result)
         
     except HTTPException:
         raise
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List, Optional
 from datetime import datetime
 
-from ..core.database import get_db
+from ..core.database import get_read_db
 from ..core.security import get_current_user_optional
+from ..core.serialization import TrustedJSONResponse
 from ..models.user import User
 from ..models.product import Product, Category, SpecialEvent
 from ..schemas.product import ProductResponse
 from ..schemas.home import HomeDataResponse, SpecialEventResponse, CategoryResponse
+from ..services.trending_service import trending_service
+from ..services.recommendation_service import recommendation_service
 
 router = APIRouter()
 
@@ -17,18 +19,30 @@ router = APIRouter()
 async def get_home_data(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """获取首页数据"""
     try:
-        # 获取热门商品
-        hot_products = db.query(Product).filter(
-            Product.status == 2,  # 拍卖中
-            Product.is_featured == True
-        ).order_by(
-            Product.view_count.desc(),
-            Product.bid_count.desc()
-        ).limit(10).all()
+        # 获取热门商品（预计算的热度榜单）
+        hot_ids = trending_service.top_ids(db, 10)
+        hot_by_id = {
+            product.id: product for product in db.query(Product).filter(
+                Product.id.in_(hot_ids),
+                Product.status == 2  # 拍卖中
+            ).all()
+        } if hot_ids else {}
+        hot_products = [hot_by_id[product_id] for product_id in hot_ids if product_id in hot_by_id]
+        
+        # 榜单为空时回退到推荐商品
+        if not hot_products:
+            hot_products = db.query(Product).filter(
+                Product.status == 2,  # 拍卖中
+                Product.is_featured == True
+            ).order_by(
+                Product.view_count.desc(),
+                Product.bid_count.desc()
+            ).limit(10).all()
         
         # 获取最新商品
         recent_products = db.query(Product).filter(
@@ -55,10 +69,27 @@ async def get_home_data(
             Category.id.asc()
         ).limit(10).all()
         
-        # 获取推荐商品（随机推荐）
-        recommended_products = db.query(Product).filter(
-            Product.status == 2
-        ).order_by(func.random()).limit(5).all()
+        # 获取推荐商品（基于出价/收藏的相似商品，无历史时取热度榜单中热门区之后的商品）
+        shown_ids = [product.id for product in hot_products]
+        recommended_ids = recommendation_service.recommend(
+            db, current_user.id if current_user else None, 10, exclude_ids=shown_ids
+        )
+        if len(recommended_ids) < 5:
+            recommended_ids += [
+                product_id for product_id in trending_service.top_ids(db, 10, offset=len(hot_products))
+                if product_id not in recommended_ids and product_id not in shown_ids
+            ]
+        recommended_by_id = {
+            product.id: product for product in db.query(Product).filter(
+                Product.id.in_(recommended_ids),
+                Product.status == 2
+            ).all()
+        } if recommended_ids else {}
+        recommended_products = [
+            recommended_by_id[product_id] for product_id in recommended_ids if product_id in recommended_by_id
+        ][:5]
+        if not recommended_products:
+            recommended_products = recent_products[:5]
         
         # 转换为响应格式，包含图片信息
         def _product_to_response(product):
@@ -78,8 +109,8 @@ async def get_home_data(
                 "current_price": product.current_price,
                 "buy_now_price": product.buy_now_price,
                 "auction_type": product.auction_type,
-                "auction_start_time": product.auction_start_time.isoformat() if product.auction_start_time else None,
-                "auction_end_time": product.auction_end_time.isoformat() if product.auction_end_time else None,
+                "auction_start_time": product.auction_start_time,
+                "auction_end_time": product.auction_end_time,
                 "location": product.location,
                 "shipping_fee": product.shipping_fee,
                 "is_free_shipping": product.is_free_shipping,
@@ -90,8 +121,8 @@ async def get_home_data(
                 "view_count": product.view_count,
                 "bid_count": product.bid_count,
                 "favorite_count": product.favorite_count,
-                "created_at": product.created_at.isoformat() if product.created_at else None,
-                "updated_at": product.updated_at.isoformat() if product.updated_at else None,
+                "created_at": product.created_at,
+                "updated_at": product.updated_at,
                 "images": [img.image_url for img in images]
             }
             return product_dict
@@ -107,29 +138,29 @@ async def get_home_data(
                 "title": event.title,
                 "description": event.description,
                 "banner_image": event.banner_image,
-                "start_time": event.start_time.isoformat() if event.start_time else None,
-                "end_time": event.end_time.isoformat() if event.end_time else None,
+                "start_time": event.start_time,
+                "end_time": event.end_time,
                 "is_active": event.is_active,
-                "created_at": event.created_at.isoformat() if event.created_at else None,
+                "created_at": event.created_at,
             }
             special_events_data.append(event_dict)
         
         categories_data = [CategoryResponse.from_orm(category) for category in categories]
         
-        return HomeDataResponse(
+        return TrustedJSONResponse(HomeDataResponse(
             hot_products=hot_products_data,
             recent_products=recent_products_data,
             recommended_products=recommended_products_data,
             special_events=special_events_data,
             categories=categories_data
-        )
+        ))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取首页数据失败: {str(e)}")
 
 @router.get("/banners")
 async def get_home_banners(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取首页轮播图"""
     try:
@@ -169,7 +200,7 @@ async def get_home_banners(
 
 @router.get("/stats")
 async def get_home_stats(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取首页统计数据"""
     try:
@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query,
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..core.security import get_current_user, get_current_user_optional
+from ..core.http_cache import conditional_get
 from ..models.user import User
 from ..schemas.local_service import (
     LocalServiceCreate, LocalServiceUpdate, LocalServiceResponse,
@@ -19,7 +20,11 @@ local_service_service = LocalServiceService()
 
 
 # 服务类型相关
-@router.get("/types", response_model=ServiceTypesResponse)
+@router.get(
+    "/types",
+    response_model=ServiceTypesResponse,
+    dependencies=[Depends(conditional_get(local_service_service.get_service_types_version))]
+)
 async def get_service_types():
     """获取服务类型列表"""
     return await local_service_service.get_service_types()
@@ -42,15 +47,22 @@ async def get_local_services(
     city: Optional[str] = Query(None, description="城市"),
     district: Optional[str] = Query(None, description="区县"),
     keyword: Optional[str] = Query(None, description="关键词搜索"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="纬度，传入后按距离排序"),
+    lng: Optional[float] = Query(None, ge=-180, le=180, description="经度，传入后按距离排序"),
+    radius: Optional[float] = Query(None, gt=0, le=100, description="搜索半径(公里)，默认10公里"),
+    nearest: Optional[int] = Query(None, ge=1, le=500, description="只返回距离最近的N个服务，未指定半径时不限距离"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """获取同城服务列表"""
+    if (lat is None) != (lng is None):
+        raise HTTPException(status_code=400, detail="经度和纬度需要同时提供")
+    
     user_id = current_user.id if current_user else None
     result = await local_service_service.get_local_services(
-        db, service_type, city, district, keyword, page, page_size, user_id
+        db, service_type, city, district, keyword, page, page_size, user_id, lat, lng, radius, nearest
     )
     return LocalServiceListResponse(**result)
 
@@ -115,7 +127,7 @@ async def get_local_service_comments(
     service_id: int,
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取同城服务评论列表"""
     return await local_service_service.get_local_service_comments(db, service_id, page, page_size)
@@ -150,7 +162,7 @@ async def get_pet_social_posts(
     keyword: Optional[str] = Query(None, description="关键词搜索"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """获取宠物交流帖子列表"""
@@ -214,7 +226,7 @@ async def get_hot_local_services(
     city: Optional[str] = Query(None, description="城市"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=50, description="每页数量"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """获取热门同城服务"""
@@ -233,7 +245,7 @@ async def get_services_by_type(
     district: Optional[str] = Query(None, description="区县"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """按服务类型获取服务列表"""
@@ -13,6 +13,9 @@ from ..schemas.order import (
     PaymentCreate, PaymentResponse, LogisticsResponse
 )
 from ..services.order_service import OrderService
+from ..services.order_response_service import parse_includes
+from ..services.order_stats_service import order_stats_service
+from ..services.store_stats_service import store_stats_service
 from ..services.payment_service import PaymentService
 from ..services.logistics_service import LogisticsService
 from ..services.alipay_service import AlipayService
@@ -56,12 +59,17 @@ async def get_orders(
     order_type: Optional[str] = Query(None, regex="^(buy|sell)$"),
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    include: Optional[str] = Query(None, description="额外加载的关联信息，逗号分隔: items,parties,payment,logistics"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """获取订单列表"""
+    try:
+        includes = parse_includes(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return await order_service.get_user_orders(
-        db, current_user.id, page, page_size, status, order_type, start_date, end_date
+        db, current_user.id, page, page_size, status, order_type, start_date, end_date, includes
     )
 
 @router.get("/{order_id}", response_model=OrderResponse)
@@ -262,7 +270,7 @@ async def update_logistics(
 
 @router.get("/statistics")
 async def get_order_statistics(
-    period: str = Query("month", regex="^(week|month|quarter|year)$"),
+    period: str = Query("month", regex="^(all|week|month|quarter|year)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -292,6 +300,9 @@ async def create_test_order(
         )
         
         db.add(order)
+        db.flush()
+        store_stats_service.record_order_created(db, order)
+        order_stats_service.record_order_created(db, order)
         db.commit()
         db.refresh(order)
         
@@ -407,6 +418,9 @@ async def create_test_order(
         )
         
         db.add(test_order)
+        db.flush()
+        store_stats_service.record_order_created(db, test_order)
+        order_stats_service.record_order_created(db, test_order)
         db.commit()
         db.refresh(test_order)
         
@@ -1,20 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import shutil
 import os
 from datetime import datetime
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..core.security import get_current_user, get_current_user_optional
 from ..models.user import User
 from ..models.product import Product, ProductImage, Category, ProductFavorite
 from ..schemas.product import (
     ProductCreate, ProductUpdate, ProductResponse, ProductListResponse,
-    CategoryResponse, ProductDetailResponse
+    CategoryResponse, ProductDetailResponse, ProductRelistRequest
 )
 from ..services.product_service import ProductService
 from ..core.config import settings
+from ..core.http_cache import conditional_get
+from ..core.read_replica import request_write_marker
+from ..core.serialization import TrustedJSONResponse
+from ..core.single_flight import flight_key, request_coalescer
 
 router = APIRouter()
 product_service = ProductService()
@@ -31,10 +35,10 @@ async def get_products(
     sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$"),
     status: Optional[str] = Query("active", regex="^(active|sold|ended|all)$"),
     auction_type: Optional[str] = Query(None, regex="^(auction|fixed_price|both)$"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取商品列表"""
-    return await product_service.get_products(
+    return TrustedJSONResponse(await product_service.get_products(
         db=db,
         page=page,
         page_size=page_size,
@@ -46,18 +50,29 @@ async def get_products(
         sort_order=sort_order,
         status=status,
         auction_type=auction_type
-    )
+    ))
 
 @router.get("/{product_id}", response_model=ProductDetailResponse)
 async def get_product(
+    request: Request,
     product_id: int,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """获取商品详情"""
-    product = await product_service.get_product_detail(db, product_id, current_user.id if current_user else None)
+    """获取商品详情（同一商品的并发请求合并为一次查询，收藏状态按用户单独查询）"""
+    # 合并计算使用独立会话（发起计算的请求断开时它的会话会被关闭），
+    # 浏览量在计算完成时按最终请求数一次累加，发起计算的请求断开也照常计入
+    flight = await request_coalescer.do(
+        flight_key(request, product_id=product_id), product_service.load_shared_product_detail,
+        product_id, request_write_marker(request), on_complete=product_service.record_detail_views
+    )
+    product = flight.value
     if not product:
         raise HTTPException(status_code=404, detail="商品不存在")
+    if current_user:
+        product = product.model_copy(update={
+            "is_favorited": product_service.is_favorited(db, product_id, current_user.id)
+        })
     return product
 
 @router.post("/", response_model=ProductResponse)
@@ -82,6 +97,24 @@ async def update_product(
         raise HTTPException(status_code=404, detail="商品不存在或无权限修改")
     return product
 
+@router.post("/{product_id}/relist", response_model=ProductResponse)
+async def relist_product(
+    product_id: int,
+    relist_data: ProductRelistRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """重新上架已结束的拍品（设置新的结束时间）"""
+    try:
+        product = await product_service.relist_auction(
+            db, product_id, current_user.id, relist_data.auction_end_time
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not product:
+        raise HTTPException(status_code=404, detail="商品不存在或无权限修改")
+    return product
+
 @router.delete("/{product_id}")
 async def delete_product(
     product_id: int,
@@ -149,10 +182,17 @@ async def toggle_product_favorite(
     result = await product_service.toggle_favorite(db, product_id, current_user.id)
     return {"message": "收藏成功" if result["is_favorited"] else "取消收藏成功", "is_favorited": result["is_favorited"]}
 
-@router.get("/categories/", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
+@router.get(
+    "/categories/",
+    response_model=List[CategoryResponse],
+    dependencies=[Depends(conditional_get(product_service.get_categories_version))]
+)
+async def get_categories(db: Session = Depends(get_read_db)):
     """获取商品分类"""
-    return await product_service.get_categories(db)
+    categories = await product_service.get_categories(db)
+    return TrustedJSONResponse(
+        [CategoryResponse.model_validate(category) for category in categories], List[CategoryResponse]
+    )
 
 @router.get("/user/{user_id}", response_model=ProductListResponse)
 async def get_user_products(
@@ -160,10 +200,10 @@ async def get_user_products(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     status: Optional[str] = Query(None, regex="^(active|sold|ended|all)$"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取用户发布的商品"""
-    return await product_service.get_user_products(db, user_id, page, page_size, status)
+    return TrustedJSONResponse(await product_service.get_user_products(db, user_id, page, page_size, status))
 
 @router.get("/favorites/my", response_model=ProductListResponse)
 async def get_my_favorites(
@@ -173,22 +213,23 @@ async def get_my_favorites(
     current_user: User = Depends(get_current_user)
 ):
     """获取我的收藏商品"""
-    return await product_service.get_user_favorites(db, current_user.id, page, page_size)
+    return TrustedJSONResponse(await product_service.get_user_favorites(db, current_user.id, page, page_size))
 
 @router.get("/trending/", response_model=ProductListResponse)
 async def get_trending_products(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    category_id: Optional[int] = Query(None),
+    db: Session = Depends(get_read_db)
 ):
     """获取热门商品"""
-    return await product_service.get_trending_products(db, page, page_size)
+    return TrustedJSONResponse(await product_service.get_trending_products(db, page, page_size, category_id))
 
 @router.get("/recent/", response_model=ProductListResponse)
 async def get_recent_products(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取最新商品"""
-    return await product_service.get_recent_products(db, page, page_size)
\ No newline at end of file
+    return TrustedJSONResponse(await product_service.get_recent_products(db, page, page_size))
\ No newline at end of file
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..core.security import get_current_user, get_current_user_optional
 from ..models.user import User
 from ..schemas.store import (
@@ -15,10 +15,25 @@ from ..services.store_service import StoreService
 router = APIRouter()
 store_service = StoreService()
 
+@router.get("/", response_model=StoreListResponse)
+async def get_stores(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    keyword: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """获取店铺列表"""
+    try:
+        user_id = current_user.id if current_user else None
+        return await store_service.get_stores(db, page, page_size, keyword, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/by-seller/{seller_id}", response_model=StoreResponse)
 async def get_store_by_seller(
     seller_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """通过卖家ID获取店铺信息"""
@@ -28,14 +43,10 @@ async def get_store_by_seller(
             raise HTTPException(status_code=400, detail="无效的卖家ID")
             
         user_id = current_user.id if current_user else None
-        store = await store_service.get_store_by_owner(db, seller_id)
+        store = await store_service.get_store_by_owner(db, seller_id, user_id)
         if not store:
             raise HTTPException(status_code=404, detail="店铺不存在")
         
-        # 如果有用户登录，检查关注状态
-        if user_id:
-            store = await store_service.get_store_by_id(db, store.id, user_id)
-        
         return store
     except HTTPException:
         raise
@@ -45,7 +56,7 @@ async def get_store_by_seller(
 @router.get("/{store_id}", response_model=StoreResponse)
 async def get_store(
     store_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """获取店铺详情"""
@@ -102,7 +113,7 @@ async def get_store_products(
     page_size: int = Query(20, ge=1, le=100),
     category_id: Optional[int] = None,
     status: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取店铺商品列表"""
     try:
@@ -175,7 +186,7 @@ async def get_store_reviews(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     rating_filter: Optional[int] = Query(None, ge=1, le=5),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取店铺评价列表"""
     try:
@@ -192,6 +203,27 @@ async def get_store_reviews(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/{store_id}/reviews")
+async def create_store_review(
+    store_id: int,
+    review_data: StoreReviewCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """评价店铺"""
+    try:
+        if store_id != review_data.store_id:
+            raise HTTPException(status_code=400, detail="店铺ID不匹配")
+            
+        review = await store_service.create_store_review(db, review_data, current_user.id)
+        return {"message": "评价成功", "data": review}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{store_id}/stats", response_model=StoreStatsResponse)
 async def get_store_stats(
     store_id: int,
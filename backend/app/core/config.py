@@ -9,6 +9,9 @@ class Settings:
     
     # 数据库配置
     DATABASE_URL: str = env_config.DATABASE_URL
+    DB_SCHEMA_MODE: str = env_config.DB_SCHEMA_MODE
+    DATABASE_REPLICA_URLS: List[str] = env_config.DATABASE_REPLICA_URLS
+    REPLICA_STICKY_SECONDS: float = env_config.REPLICA_STICKY_SECONDS
     
     # Redis配置
     REDIS_URL: str = env_config.REDIS_URL
@@ -21,6 +24,45 @@ class Settings:
     # CORS配置
     ALLOWED_HOSTS: List[str] = env_config.ALLOWED_HOSTS
     
+    # 监控配置
+    SLOW_QUERY_MS: int = env_config.SLOW_QUERY_MS
+    METRICS_RESPONSE_HEADERS: bool = env_config.METRICS_RESPONSE_HEADERS
+    
+    # 响应压缩配置
+    COMPRESS_MIN_SIZE: int = env_config.COMPRESS_MIN_SIZE
+    COMPRESS_LEVEL: int = env_config.COMPRESS_LEVEL
+    
+    # 消息搜索索引
+    MESSAGE_SEARCH_INDEX_PATH: str = env_config.MESSAGE_SEARCH_INDEX_PATH
+    
+    # 延时任务
+    JOB_RUNNER_ENABLED: bool = env_config.JOB_RUNNER_ENABLED
+    JOB_POLL_SECONDS: float = env_config.JOB_POLL_SECONDS
+    JOB_BATCH_SIZE: int = env_config.JOB_BATCH_SIZE
+    JOB_LEASE_SECONDS: int = env_config.JOB_LEASE_SECONDS
+    JOB_MAX_ATTEMPTS: int = env_config.JOB_MAX_ATTEMPTS
+    
+    # 后台循环与主进程选举
+    BACKGROUND_TASKS_ENABLED: bool = env_config.BACKGROUND_TASKS_ENABLED
+    LEADER_ELECTION_BACKEND: str = env_config.LEADER_ELECTION_BACKEND
+    LEADER_LEASE_SECONDS: float = env_config.LEADER_LEASE_SECONDS
+    AUCTION_CHECK_INTERVAL_MINUTES: float = env_config.AUCTION_CHECK_INTERVAL_MINUTES
+    ORDER_STATS_RECONCILE_HOURS: float = env_config.ORDER_STATS_RECONCILE_HOURS
+    
+    # 热点读请求合并
+    SINGLE_FLIGHT_ENABLED: bool = env_config.SINGLE_FLIGHT_ENABLED
+    
+    # 写请求幂等
+    IDEMPOTENCY_BACKEND: str = env_config.IDEMPOTENCY_BACKEND
+    IDEMPOTENCY_TTL_SECONDS: int = env_config.IDEMPOTENCY_TTL_SECONDS
+    IDEMPOTENCY_WAIT_SECONDS: float = env_config.IDEMPOTENCY_WAIT_SECONDS
+    IDEMPOTENCY_LOCK_SECONDS: int = env_config.IDEMPOTENCY_LOCK_SECONDS
+    
+    # 订单与保证金时限
+    ORDER_PAYMENT_TIMEOUT_MINUTES: int = env_config.ORDER_PAYMENT_TIMEOUT_MINUTES
+    ORDER_AUTO_CONFIRM_DAYS: int = env_config.ORDER_AUTO_CONFIRM_DAYS
+    DEPOSIT_REFUND_DELAY_MINUTES: int = env_config.DEPOSIT_REFUND_DELAY_MINUTES
+    
     # 文件上传配置
     UPLOAD_DIR: str = env_config.UPLOAD_DIR
     MAX_FILE_SIZE: int = env_config.MAX_FILE_SIZE
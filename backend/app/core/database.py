@@ -1,7 +1,10 @@
+from fastapi.requests import HTTPConnection
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine, metrics_registry
+from app.core.read_replica import RoutingSession, replica_router, request_write_marker
 
 # 创建数据库引擎
 engine = create_engine(
@@ -13,19 +16,43 @@ engine = create_engine(
     max_overflow=20
 )
 
+# 只读副本连接池（未配置时所有查询走主库）
+replica_engines = [
+    create_engine(
+        url,
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        pool_size=10,
+        max_overflow=20
+    )
+    for url in settings.DATABASE_REPLICA_URLS
+]
+replica_router.configure(replica_engines, settings.REPLICA_STICKY_SECONDS, settings.SECRET_KEY)
+
+# SQL计时与慢查询日志
+metrics_registry.slow_query_seconds = settings.SLOW_QUERY_MS / 1000
+for _engine in [engine, *replica_engines]:
+    instrument_engine(_engine)
+
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 # 创建基础模型类
 Base = declarative_base()
 
 # 依赖注入：获取数据库会话
-def get_db():
-    db = SessionLocal()
+def get_db(request: HTTPConnection):
+    db = SessionLocal(info={"write_marker": request_write_marker(request)})
     try:
         yield db
     finally:
         db.close()
 
-
-
+# 依赖注入：只读接口的数据库会话（配置了只读副本时查询发往副本）
+def get_read_db(request: HTTPConnection):
+    db = SessionLocal(info={"read_only": True, "write_marker": request_write_marker(request)})
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,235 @@
+"""
+条件请求与响应压缩
+- HTTPCacheMiddleware: GET 的 JSON 响应附带强 ETag（优先使用接口提供的实体版本戳，否则取响应内容摘要），
+  请求携带的 If-None-Match 匹配时返回 304；超过 COMPRESS_MIN_SIZE 的 JSON 响应按 Accept-Encoding
+  压缩（安装 brotli 时优先 br，否则 gzip）。
+- conditional_get: 路由依赖，由服务层提供的版本戳（如分类表的 max(updated_at)）计算 ETag，
+  命中 If-None-Match / If-Modified-Since 时在执行接口之前直接返回 304，省去查询和序列化。
+"""
+import gzip
+import hashlib
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from fastapi import Depends, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from app.core.database import get_read_db
+from app.core.read_replica import request_user_key
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只用 gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+class VersionStamp(NamedTuple):
+    """实体版本戳：tag 在数据变化时必须改变；last_modified 用于 Last-Modified 响应头"""
+    tag: str
+    last_modified: Optional[datetime] = None
+
+
+class NotModified(Exception):
+    """条件请求命中，由异常处理器返回 304"""
+
+    def __init__(self, etag: str, last_modified: Optional[datetime] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def make_etag(*parts: Any) -> str:
+    """由若干部分计算强 ETag"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return f'"{digest.hexdigest()}"'
+
+
+def _strip_etag(etag: str) -> str:
+    """去掉弱标记和压缩后缀，得到内容本身的标签"""
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for suffix in ENCODING_SUFFIXES:
+        if etag.endswith(f'{suffix}"'):
+            return etag[:-len(suffix) - 1] + '"'
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _strip_etag(etag)
+    return any(_strip_etag(candidate) == target for candidate in if_none_match.split(","))
+
+
+def http_date(value: datetime) -> str:
+    # 数据库中的时间为服务器本地时间
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified.astimezone(timezone.utc).replace(microsecond=0) <= since
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return Response(status_code=304, headers=headers)
+
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return not_modified_response(exc.etag, exc.last_modified)
+
+
+def conditional_get(version: Callable[..., Optional[VersionStamp]], vary_user: bool = False):
+    """条件请求依赖：version(db, **路径参数) 返回版本戳，返回 None 时退回按响应内容计算 ETag
+
+    ETag 由请求路径、查询参数和版本戳共同决定；响应内容与当前用户相关时传 vary_user=True。
+    """
+
+    async def dependency(request: Request, db: Session = Depends(get_read_db)):
+        stamp = version(db, **request.path_params)
+        if stamp is None:
+            return
+        parts = [request.url.path, request.url.query, stamp.tag]
+        if vary_user:
+            parts.append(request_user_key(request))
+        etag = make_etag(*parts)
+        request.state.etag = etag
+        request.state.last_modified = stamp.last_modified
+
+        if_none_match = request.headers.get("if-none-match")
+        if etag_matches(if_none_match, etag) or (
+            not if_none_match and not_modified_since(request.headers.get("if-modified-since"), stamp.last_modified)
+        ):
+            raise NotModified(etag, stamp.last_modified)
+
+    return dependency
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class HTTPCacheMiddleware:
+    """ASGI中间件：JSON 响应的 ETag / 304 与压缩"""
+
+    def __init__(self, app, minimum_size: int = 1024, compress_level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compress_level = compress_level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        is_get = scope["method"] == "GET"
+        encoding = _accepted_encoding(request_headers.get("accept-encoding", ""))
+        start_message = None
+        body_parts: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = {key.decode("latin-1").lower(): value for key, value in message.get("headers", [])}
+                content_type = headers.get("content-type", b"").decode("latin-1")
+                if (
+                    message["status"] != 200
+                    or not content_type.startswith("application/json")
+                    or "content-encoding" in headers
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                await self._send_response(scope, request_headers, is_get, encoding, start_message, b"".join(body_parts), send)
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_response(self, scope, request_headers, is_get, encoding, start_message, body, send):
+        headers = [
+            (key, value) for key, value in start_message.get("headers", [])
+            if key.lower() not in (b"content-length", b"etag")
+        ]
+        state = scope.get("state", {})
+
+        if is_get:
+            etag = state.get("etag") or make_etag(body)
+            last_modified = state.get("last_modified")
+            if_none_match = request_headers.get("if-none-match")
+            if etag_matches(if_none_match, etag) or (
+                not if_none_match and not_modified_since(request_headers.get("if-modified-since"), last_modified)
+            ):
+                response = not_modified_response(etag, last_modified)
+                await send({"type": "http.response.start", "status": 304, "headers": response.raw_headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if last_modified is not None:
+                headers.append((b"last-modified", http_date(last_modified).encode("latin-1")))
+            if not any(key.lower() == b"cache-control" for key, _ in headers):
+                headers.append((b"cache-control", b"no-cache"))
+        else:
+            etag = None
+
+        if encoding and len(body) >= self.minimum_size:
+            if encoding == "br":
+                body = brotli.compress(body, quality=min(self.compress_level, 11))
+            else:
+                body = gzip.compress(body, compresslevel=self.compress_level, mtime=0)
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            # 压缩后的表示使用不同的强 ETag，比较时去掉后缀
+            if etag:
+                etag = f'{etag[:-1]}-{encoding}"'
+        headers.append((b"vary", b"Accept-Encoding"))
+        if etag:
+            headers.append((b"etag", etag.encode("latin-1")))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+        await send({**start_message, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,465 @@
+"""
+写请求幂等
+客户端在弱网下重试出价、下单、支付保证金、充值等写请求时携带 Idempotency-Key 请求头，
+IdempotencyMiddleware 按“请求方 + 方法 + 路径 + 幂等键”登记首次请求，保存请求内容指纹和响应：
+- 重复请求直接返回保存的响应（附带 Idempotent-Replayed: true），不再执行校验和业务逻辑；
+- 首次请求仍在处理时，重复请求等待其完成后返回同一响应（最多 IDEMPOTENCY_WAIT_SECONDS 秒，超时返回 409）；
+- 同一幂等键的请求内容不同返回 422；
+- 首次请求返回 5xx 或异常时不保存，重试会重新执行。
+存储后端: database（idempotency_keys 表，多 worker 共享）/ redis（REDIS_URL）/ memory（仅单进程部署）。
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+MAX_KEY_LENGTH = 255
+# 超过该大小的响应（如文件流）不保存，重试会重新执行
+MAX_STORED_BODY = 1024 * 1024
+# 不保存的响应头：CORS 相关头由外层 CORSMiddleware 按每次请求的 Origin 生成，重放时不能沿用首次请求的值
+UNSTORED_HEADER_PREFIXES = ("access-control-", "vary")
+
+# 登记结果
+CLAIMED = "claimed"          # 首次请求，由当前请求执行
+REPLAY = "replay"            # 已有保存的响应
+IN_PROGRESS = "in_progress"  # 首次请求仍在处理
+MISMATCH = "mismatch"        # 同一幂等键的请求内容不同
+
+
+class StoredResponse(NamedTuple):
+    """保存的响应"""
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class MemoryIdempotencyStore:
+    """进程内存储（单进程部署和检查脚本使用），按写入顺序淘汰超出容量的记录"""
+
+    blocking = False
+
+    def __init__(self, maxsize: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        # key -> (指纹, 响应（处理中为 None）, 到期时间)
+        self._records: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, fingerprint: str, lock_seconds: float) -> Tuple[str, Optional[StoredResponse]]:
+        with self._lock:
+            now = self.clock()
+            record = self._records.get(key)
+            if record is not None and record[2] > now:
+                if record[0] != fingerprint:
+                    return MISMATCH, None
+                return (IN_PROGRESS, None) if record[1] is None else (REPLAY, record[1])
+            self._put(key, (fingerprint, None, now + lock_seconds))
+            return CLAIMED, None
+
+    def complete(self, key: str, fingerprint: str, response: StoredResponse, ttl: float):
+        with self._lock:
+            self._put(key, (fingerprint, response, self.clock() + ttl))
+
+    def release(self, key: str, fingerprint: str):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record[0] == fingerprint and record[1] is None:
+                del self._records[key]
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            now = self.clock()
+            expired = [key for key, record in self._records.items() if record[2] <= now]
+            for key in expired:
+                del self._records[key]
+            return len(expired)
+
+    def _put(self, key: str, record: tuple):
+        self._records[key] = record
+        self._records.move_to_end(key)
+        while len(self._records) > self.maxsize:
+            self._records.popitem(last=False)
+
+
+class DatabaseIdempotencyStore:
+    """数据库存储：idempotency_keys 表每个幂等键一行，插入成功的请求执行，其余请求读取该行
+
+    处理中的行超过 locked_until 仍未完成（进程中途退出）或记录已过期时，按读到的 expires_at 做条件 UPDATE 接管，
+    并发重试时只有一个请求重新执行。过期记录由主进程定时清理（app.tasks.idempotency_purge）。
+    """
+
+    blocking = True
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+
+    def claim(self, key: str, fingerprint: str, lock_seconds: float) -> Tuple[str, Optional[StoredResponse]]:
+        from app.models.idempotency import IdempotencyKey
+
+        now = datetime.now()
+        locked_until = now + timedelta(seconds=lock_seconds)
+        db = self.session_factory()
+        try:
+            for _ in range(3):
+                row = db.query(IdempotencyKey).filter(IdempotencyKey.key == key).first()
+                if row is None:
+                    db.add(IdempotencyKey(
+                        key=key, fingerprint=fingerprint, locked_until=locked_until, expires_at=locked_until
+                    ))
+                    try:
+                        db.commit()
+                        return CLAIMED, None
+                    except IntegrityError:
+                        # 其他请求同时插入了同一幂等键
+                        db.rollback()
+                        continue
+
+                if row.expires_at <= now or (row.status_code is None and row.locked_until <= now):
+                    updated = db.query(IdempotencyKey).filter(
+                        and_(IdempotencyKey.key == key, IdempotencyKey.expires_at == row.expires_at)
+                    ).update({
+                        IdempotencyKey.fingerprint: fingerprint,
+                        IdempotencyKey.status_code: None,
+                        IdempotencyKey.response_headers: None,
+                        IdempotencyKey.response_body: None,
+                        IdempotencyKey.locked_until: locked_until,
+                        IdempotencyKey.expires_at: locked_until
+                    }, synchronize_session=False)
+                    db.commit()
+                    if updated:
+                        return CLAIMED, None
+                    db.expire_all()
+                    continue
+
+                if row.fingerprint != fingerprint:
+                    return MISMATCH, None
+                if row.status_code is None:
+                    return IN_PROGRESS, None
+                headers = [tuple(header) for header in row.response_headers or []]
+                return REPLAY, StoredResponse(row.status_code, headers, row.response_body or b"")
+            return IN_PROGRESS, None
+        finally:
+            db.close()
+
+    def complete(self, key: str, fingerprint: str, response: StoredResponse, ttl: float):
+        from app.models.idempotency import IdempotencyKey
+
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyKey).filter(
+                and_(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.fingerprint == fingerprint,
+                    IdempotencyKey.status_code.is_(None)
+                )
+            ).update({
+                IdempotencyKey.status_code: response.status,
+                IdempotencyKey.response_headers: [list(header) for header in response.headers],
+                IdempotencyKey.response_body: response.body,
+                IdempotencyKey.locked_until: None,
+                IdempotencyKey.expires_at: datetime.now() + timedelta(seconds=ttl)
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, key: str, fingerprint: str):
+        from app.models.idempotency import IdempotencyKey
+
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyKey).filter(
+                and_(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.fingerprint == fingerprint,
+                    IdempotencyKey.status_code.is_(None)
+                )
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        from app.models.idempotency import IdempotencyKey
+
+        db = self.session_factory()
+        try:
+            deleted = db.query(IdempotencyKey).filter(
+                IdempotencyKey.expires_at < datetime.now()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+class RedisIdempotencyStore:
+    """Redis 存储：SET NX PX 登记首次请求（处理中的记录在 lock_seconds 后自动过期），完成后覆盖为带 TTL 的响应"""
+
+    blocking = True
+
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, prefix: str = "petshop:idempotency:"):
+        import redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def claim(self, key: str, fingerprint: str, lock_seconds: float) -> Tuple[str, Optional[StoredResponse]]:
+        name = self.prefix + key
+        for _ in range(3):
+            if self.client.set(name, self._pending(fingerprint), nx=True, px=int(lock_seconds * 1000)):
+                return CLAIMED, None
+            value = self.client.get(name)
+            if value is None:
+                # 记录恰好过期，重新登记
+                continue
+            record = json.loads(value)
+            if record["f"] != fingerprint:
+                return MISMATCH, None
+            if record.get("s") is None:
+                return IN_PROGRESS, None
+            headers = [tuple(header) for header in record["h"]]
+            return REPLAY, StoredResponse(record["s"], headers, base64.b64decode(record["b"]))
+        return IN_PROGRESS, None
+
+    def complete(self, key: str, fingerprint: str, response: StoredResponse, ttl: float):
+        value = json.dumps({
+            "f": fingerprint,
+            "s": response.status,
+            "h": response.headers,
+            "b": base64.b64encode(response.body).decode("ascii")
+        })
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    def release(self, key: str, fingerprint: str):
+        self._release(keys=[self.prefix + key], args=[self._pending(fingerprint)])
+
+    def purge_expired(self) -> int:
+        # 由 Redis 按 TTL 自动清理
+        return 0
+
+    @staticmethod
+    def _pending(fingerprint: str) -> str:
+        return json.dumps({"f": fingerprint})
+
+
+def create_idempotency_store(kind: str):
+    """按配置创建幂等存储"""
+    if kind == "database":
+        return DatabaseIdempotencyStore()
+    if kind == "redis":
+        return RedisIdempotencyStore(settings.REDIS_URL)
+    if kind == "memory":
+        return MemoryIdempotencyStore()
+    raise ValueError(f"不支持的幂等存储后端: {kind}，可选值: database, redis, memory")
+
+
+def _digest(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _json_response(status: int, detail: str) -> StoredResponse:
+    body = json.dumps({"detail": detail, "status_code": status}, ensure_ascii=False).encode("utf-8")
+    return StoredResponse(status, [("content-type", "application/json"), ("content-length", str(len(body)))], body)
+
+
+class IdempotencyMiddleware:
+    """ASGI中间件：携带 Idempotency-Key 的写请求只执行一次
+
+    幂等键的作用域包含完整的 Authorization 请求头（未登录时为客户端地址），
+    其他用户即使使用相同的幂等键也不会拿到他人的响应。
+    同一进程内的重复请求等待首次请求完成的通知，跨进程的重复请求按 poll_interval 轮询存储。
+    存储不可用时记录错误并照常执行请求。
+    """
+
+    def __init__(
+        self,
+        app,
+        store,
+        ttl_seconds: float = 86400,
+        wait_seconds: float = 10,
+        lock_seconds: float = 60,
+        poll_interval: float = 0.05
+    ):
+        self.app = app
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        idempotency_key = request_headers.get("idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = idempotency_key.strip()
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await self._send(send, _json_response(400, f"Idempotency-Key 不能为空且不超过 {MAX_KEY_LENGTH} 个字符"))
+            return
+
+        body, receive = await self._buffer_body(receive)
+        client = scope.get("client")
+        principal = request_headers.get("authorization") or (f"client:{client[0]}" if client else "")
+        key = _digest(principal, scope["method"], scope["path"], idempotency_key)
+        fingerprint = _digest(
+            scope["method"], scope["path"], scope.get("query_string", b""), request_headers.get("content-type", ""), body
+        )
+
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            try:
+                state, stored = await self._call(self.store.claim, key, fingerprint, self.lock_seconds)
+            except Exception as e:
+                logger.error(f"幂等键登记失败，按普通请求处理: {e}")
+                await self.app(scope, receive, send)
+                return
+
+            if state == CLAIMED:
+                await self._execute(scope, receive, send, key, fingerprint)
+                return
+            if state == REPLAY:
+                await self._send(send, stored, replayed=True)
+                return
+            if state == MISMATCH:
+                await self._send(send, _json_response(422, "相同 Idempotency-Key 的请求内容不一致"))
+                return
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await self._send(send, _json_response(409, "相同 Idempotency-Key 的请求正在处理中，请稍后重试"))
+                return
+            event = self._inflight.get(key)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(self.poll_interval, remaining))
+
+    async def _execute(self, scope, receive, send, key: str, fingerprint: str):
+        event = self._inflight[key] = asyncio.Event()
+        start_message = None
+        body_parts: List[bytes] = []
+        body_size = 0
+        finished = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, body_size, finished
+            if message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body" and not finished:
+                body = message.get("body", b"")
+                body_size += len(body)
+                if body_size <= MAX_STORED_BODY:
+                    body_parts.append(body)
+                if not message.get("more_body", False):
+                    # 先保存再发出最后一段，等待中的重复请求被唤醒时即可读到响应
+                    finished = True
+                    await self._finish(key, fingerprint, start_message, b"".join(body_parts), body_size)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not finished:
+                await self._release(key, fingerprint)
+            event.set()
+            if self._inflight.get(key) is event:
+                del self._inflight[key]
+
+    async def _finish(self, key: str, fingerprint: str, start_message, body: bytes, body_size: int):
+        status = start_message["status"] if start_message else 500
+        if status >= 500 or body_size > MAX_STORED_BODY:
+            await self._release(key, fingerprint)
+            return
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1")) for name, value in start_message.get("headers", [])
+            if not name.decode("latin-1").lower().startswith(UNSTORED_HEADER_PREFIXES)
+        ]
+        try:
+            await self._call(self.store.complete, key, fingerprint, StoredResponse(status, headers, body), self.ttl_seconds)
+        except Exception as e:
+            logger.error(f"保存幂等响应失败: {e}")
+            await self._release(key, fingerprint)
+
+    async def _release(self, key: str, fingerprint: str):
+        try:
+            await self._call(self.store.release, key, fingerprint)
+        except Exception as e:
+            logger.error(f"释放幂等键失败（将在占用到期后自动释放）: {e}")
+
+    async def _call(self, func, *args):
+        # 数据库和 Redis 存储在线程中执行，不阻塞事件循环
+        if self.store.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    @staticmethod
+    async def _buffer_body(receive):
+        """读取完整请求体（用于计算指纹），返回可重放请求体的 receive"""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay_receive():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay_receive
+
+    @staticmethod
+    async def _send(send, response: StoredResponse, replayed: bool = False):
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response.headers]
+        if replayed:
+            headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
+
+
+idempotency_store = create_idempotency_store(settings.IDEMPOTENCY_BACKEND)
@@ -0,0 +1,260 @@
+"""
+请求级SQL统计与指标
+通过 SQLAlchemy 游标事件统计每个请求的查询次数、数据库耗时和获取连接耗时，
+汇总为按路由的延迟直方图，以 Prometheus 文本格式输出；超过阈值的SQL记录慢查询日志
+"""
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+# 延迟直方图分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """单个请求的数据库统计"""
+    __slots__ = ("query_count", "db_time", "pool_wait")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_db_stats", default=None)
+
+_NUMBER_RE = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|%\(\w+\)s|__\[POSTCOMPILE_\w+\]|:\w+)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL归一化：去掉字面量、折叠 IN 列表和空白，便于聚合同类语句"""
+    statement = _STRING_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    statement = _IN_LIST_RE.sub("IN (...)", statement)
+    return _WHITESPACE_RE.sub(" ", statement).strip()
+
+
+class _RouteMetrics:
+    __slots__ = ("buckets", "count", "latency_sum", "query_count", "db_time")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.query_count = 0
+        self.db_time = 0.0
+
+
+class MetricsRegistry:
+    """进程内指标汇总"""
+
+    def __init__(self, slow_query_seconds: float = 0.2):
+        self.slow_query_seconds = slow_query_seconds
+        self._routes: Dict[Tuple[str, str, str], _RouteMetrics] = {}
+        self._flights: Dict[Tuple[str, str], int] = {}
+        self._slow_queries = 0
+        self._total_queries = 0
+        self._failed_queries = 0
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float, stats: RequestStats):
+        """记录一次请求"""
+        key = (method, route, f"{status_code // 100}xx")
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = _RouteMetrics()
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    metrics.buckets[index] += 1
+            metrics.count += 1
+            metrics.latency_sum += duration
+            metrics.query_count += stats.query_count
+            metrics.db_time += stats.db_time
+
+    def observe_query(self, statement: str, duration: float, failed: bool = False):
+        """记录一条SQL（failed 为执行出错的语句，同样计入查询次数和耗时）"""
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.query_count += 1
+            stats.db_time += duration
+        with self._lock:
+            self._total_queries += 1
+            if failed:
+                self._failed_queries += 1
+            if duration >= self.slow_query_seconds:
+                self._slow_queries += 1
+        if duration >= self.slow_query_seconds:
+            slow_query_logger.warning(f"慢查询 {duration * 1000:.1f}ms: {normalize_sql(statement)}")
+
+    def observe_flight(self, route: str, leader: bool):
+        """记录一次读请求合并：leader 为执行计算的请求，否则为被合并的请求"""
+        key = (route, "leader" if leader else "follower")
+        with self._lock:
+            self._flights[key] = self._flights.get(key, 0) + 1
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        lines: List[str] = [
+            "# HELP http_request_duration_seconds 请求耗时",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            routes = sorted(self._routes.items())
+            flights = sorted(self._flights.items())
+            total_queries = self._total_queries
+            slow_queries = self._slow_queries
+            failed_queries = self._failed_queries
+
+        for (method, route, status), metrics in routes:
+            labels = f'method="{method}",route="{route}",status="{status}"'
+            for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {metrics.latency_sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+
+        lines += [
+            "# HELP http_request_db_queries_total 请求内执行的SQL条数",
+            "# TYPE http_request_db_queries_total counter",
+        ]
+        for (method, route, status), metrics in routes:
+            lines.append(
+                f'http_request_db_queries_total{{method="{method}",route="{route}",status="{status}"}} {metrics.query_count}'
+            )
+
+        lines += [
+            "# HELP http_request_db_seconds_total 请求内的数据库耗时",
+            "# TYPE http_request_db_seconds_total counter",
+        ]
+        for (method, route, status), metrics in routes:
+            lines.append(
+                f'http_request_db_seconds_total{{method="{method}",route="{route}",status="{status}"}} {metrics.db_time:.6f}'
+            )
+
+        lines += [
+            "# HELP single_flight_requests_total 启用合并的读请求数（follower 为共享其他请求结果的请求）",
+            "# TYPE single_flight_requests_total counter",
+        ]
+        for (route, role), count in flights:
+            lines.append(f'single_flight_requests_total{{route="{route}",role="{role}"}} {count}')
+
+        lines += [
+            "# HELP db_queries_total 执行的SQL总数",
+            "# TYPE db_queries_total counter",
+            f"db_queries_total {total_queries}",
+            "# HELP db_slow_queries_total 慢查询数",
+            "# TYPE db_slow_queries_total counter",
+            f"db_slow_queries_total {slow_queries}",
+            "# HELP db_failed_queries_total 执行出错的SQL数",
+            "# TYPE db_failed_queries_total counter",
+            f"db_failed_queries_total {failed_queries}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """清空指标"""
+        with self._lock:
+            self._routes.clear()
+            self._flights.clear()
+            self._slow_queries = 0
+            self._total_queries = 0
+            self._failed_queries = 0
+
+
+metrics_registry = MetricsRegistry()
+
+
+def instrument_engine(engine: Engine):
+    """为引擎挂载SQL计时事件，并统计获取连接的耗时"""
+    if getattr(engine, "_metrics_instrumented", False):
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        metrics_registry.observe_query(statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        # 语句执行出错时不会触发 after_cursor_execute，在这里弹出计时，避免长连接上的计时栈错位和堆积
+        # 没有执行上下文说明出错在语句执行之前（如取连接失败），没有对应的计时
+        if context.execution_context is None or context.connection is None:
+            return
+        timings = context.connection.info.get("query_start_time")
+        if not timings:
+            return
+        metrics_registry.observe_query(context.statement or "", time.perf_counter() - timings.pop(), failed=True)
+
+    # Connection 初始化时调用 engine.raw_connection() 从连接池取连接，包一层计时
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        finally:
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.pool_wait += time.perf_counter() - started
+
+    engine.raw_connection = timed_raw_connection
+    engine._metrics_instrumented = True
+
+
+class MetricsMiddleware:
+    """ASGI中间件：为每个请求建立统计上下文，结束时汇总到路由指标，可选写入响应头"""
+
+    def __init__(self, app, response_headers: bool = False):
+        self.app = app
+        self.response_headers = response_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.response_headers:
+                    headers = list(message.get("headers", []))
+                    headers += [
+                        (b"x-db-query-count", str(stats.query_count).encode()),
+                        (b"x-db-time-ms", f"{stats.db_time * 1000:.2f}".encode()),
+                        (b"x-db-pool-wait-ms", f"{stats.pool_wait * 1000:.2f}".encode()),
+                    ]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            metrics_registry.observe_request(
+                scope.get("method", ""), route_path, status_code, time.perf_counter() - started, stats
+            )
@@ -0,0 +1,197 @@
+"""
+读写分离
+配置 DATABASE_REPLICA_URLS 后，只读接口（get_read_db）的查询发往只读副本，其余会话不受影响。
+写入语句、会话内写入之后的读取、以及登录用户最近一次写入后的短时间窗口内（读己之写）仍走主库。
+
+写入时间不保存在进程内：登录用户的请求提交写入后，ReplicaStickyMiddleware 在响应中返回签名的写入时间
+（X-Last-Write 响应头和同名 Cookie），客户端之后的请求带回该值，任一 worker 都能据此判断是否处于粘滞窗口。
+按客户端地址区分的未登录会话不粘滞；浏览量等计数写入（语句带 execution_options(sticky=False)）不触发粘滞。
+"""
+import hashlib
+import hmac
+import itertools
+import logging
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+LAST_WRITE_HEADER = "x-last-write"
+LAST_WRITE_COOKIE = "last_write"
+WRITE_MARKER_SCOPE_KEY = "replica.write_marker"
+
+
+class ReplicaRouter:
+    """只读副本选择与写后粘滞窗口（写入时间由客户端携带，签名防篡改）"""
+
+    def __init__(self, sticky_seconds: float = 5.0, secret: str = ""):
+        self.sticky_seconds = sticky_seconds
+        self.secret = secret.encode()
+        self.replicas: List[Engine] = []
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def configure(self, replicas: List[Engine], sticky_seconds: Optional[float] = None, secret: Optional[str] = None):
+        self.replicas = list(replicas)
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        if sticky_seconds is not None:
+            self.sticky_seconds = sticky_seconds
+        if secret is not None:
+            self.secret = secret.encode()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def next_replica(self) -> Engine:
+        """轮询选择只读副本"""
+        with self._lock:
+            return next(self._cycle)
+
+    def issue(self, user_key: str, written_at: Optional[float] = None) -> str:
+        """签发写入时间令牌：毫秒时间戳.签名（签名绑定用户标识，不能转给其他用户使用）"""
+        stamp = str(int((written_at if written_at is not None else time.time()) * 1000))
+        return f"{stamp}.{self._sign(user_key, stamp)}"
+
+    def is_sticky(self, user_key: Optional[str], token: Optional[str]) -> bool:
+        """令牌有效且写入时间仍在粘滞窗口内"""
+        if not user_key or not token or "." not in token:
+            return False
+        stamp, signature = token.split(".", 1)
+        if not stamp.isdigit() or not hmac.compare_digest(signature, self._sign(user_key, stamp)):
+            return False
+        elapsed = time.time() - int(stamp) / 1000
+        return -1.0 <= elapsed < self.sticky_seconds
+
+    def _sign(self, user_key: str, stamp: str) -> str:
+        return hmac.new(self.secret, f"{user_key}:{stamp}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+class WriteMarker:
+    """请求级写入标记：请求开始时是否处于粘滞窗口，以及本次请求提交写入的时间"""
+    __slots__ = ("user_key", "sticky", "written_at")
+
+    def __init__(self, user_key: str, sticky: bool):
+        self.user_key = user_key
+        self.sticky = sticky
+        self.written_at: Optional[float] = None
+
+
+replica_router = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """按会话用途路由的会话
+
+    info["read_only"] 为真且配置了只读副本时，查询发往会话固定选中的一个副本；
+    出现写入（flush 或 UPDATE/DELETE/INSERT 语句）后整个会话改走主库。
+    info["write_marker"] 为请求级写入标记（仅登录用户），用于写后粘滞。
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+            if clause.get_execution_options().get("sticky", True):
+                self.info["sticky_write"] = True
+        if self._use_replica():
+            replica = self.info.get("replica")
+            if replica is None:
+                replica = self.info["replica"] = replica_router.next_replica()
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def _use_replica(self) -> bool:
+        marker = self.info.get("write_marker")
+        return (
+            self.info.get("read_only", False)
+            and replica_router.enabled
+            and not self.info.get("wrote", False)
+            and not self._flushing
+            and not (marker is not None and marker.sticky)
+        )
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _mark_session_write(session, flush_context, instances):
+    if session.new or session.dirty or session.deleted:
+        if session.info.get("replica") is not None and not session.info.get("wrote"):
+            logger.warning("只读会话中发生写入，已改走主库；该接口不应使用 get_read_db")
+        session.info["wrote"] = True
+        session.info["sticky_write"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_user_write(session):
+    if session.info.pop("sticky_write", False):
+        marker = session.info.get("write_marker")
+        if marker is not None:
+            marker.written_at = time.time()
+
+
+def request_user_key(request) -> Optional[str]:
+    """请求用户标识：登录用户取令牌中的用户ID，未登录取客户端地址（只用于路由，不做鉴权）"""
+    if request is None:
+        return None
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        from jose import jwt, JWTError
+        try:
+            subject = jwt.get_unverified_claims(authorization[7:]).get("sub")
+            if subject:
+                return f"user:{subject}"
+        except JWTError:
+            pass
+    return f"client:{request.client.host}" if request.client else None
+
+
+def request_write_marker(request) -> Optional[WriteMarker]:
+    """当前请求的写入标记（未配置副本、未登录或未经过 ReplicaStickyMiddleware 时为 None）"""
+    return request.scope.get(WRITE_MARKER_SCOPE_KEY) if request is not None else None
+
+
+class ReplicaStickyMiddleware:
+    """ASGI中间件：校验客户端带回的写入时间，登录用户本次请求提交写入后在响应中返回新的写入时间"""
+
+    def __init__(self, app, router: ReplicaRouter = replica_router):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.router.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        from starlette.requests import HTTPConnection
+        connection = HTTPConnection(scope)
+        user_key = request_user_key(connection)
+        if not user_key or not user_key.startswith("user:"):
+            await self.app(scope, receive, send)
+            return
+
+        token = connection.headers.get(LAST_WRITE_HEADER) or connection.cookies.get(LAST_WRITE_COOKIE)
+        marker = scope[WRITE_MARKER_SCOPE_KEY] = WriteMarker(user_key, self.router.is_sticky(user_key, token))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and marker.written_at is not None:
+                token = self.router.issue(user_key, marker.written_at)
+                cookie = SimpleCookie()
+                cookie[LAST_WRITE_COOKIE] = token
+                cookie[LAST_WRITE_COOKIE].update({
+                    "max-age": max(int(self.router.sticky_seconds), 1), "path": "/", "httponly": True, "samesite": "lax"
+                })
+                headers = list(message.get("headers", []))
+                headers += [
+                    (LAST_WRITE_HEADER.encode(), token.encode()),
+                    (b"set-cookie", cookie.output(header="").strip().encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
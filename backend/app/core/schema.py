@@ -0,0 +1,113 @@
+"""
+数据库表结构版本
+根据模型元数据（表、列、索引）计算结构指纹，记录在 schema_version 表中。
+DB_SCHEMA_MODE=check 时启动只读取一次版本号并与当前模型比对，不再每次执行 create_all；
+模型变更后执行 python -m app.core.schema upgrade 建表并记录新版本
+（create_all 只会新建表和索引，已有表的列变更需先手工迁移）。
+"""
+import hashlib
+import logging
+import sys
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+_version_metadata = MetaData()
+schema_version_table = Table(
+    SCHEMA_VERSION_TABLE,
+    _version_metadata,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class SchemaVersionError(RuntimeError):
+    """数据库表结构版本与当前模型不一致"""
+
+
+def schema_fingerprint(metadata: MetaData) -> str:
+    """由表、列、索引定义计算结构指纹"""
+    parts = []
+    for table in sorted(metadata.tables.values(), key=lambda item: item.name):
+        parts.append(f"table {table.name}")
+        for column in table.columns:
+            parts.append(
+                f"  column {column.name} {column.type.__class__.__name__}"
+                f"({getattr(column.type, 'length', '') or ''}) nullable={column.nullable} pk={column.primary_key}"
+            )
+        for index in sorted(table.indexes, key=lambda item: item.name or ""):
+            columns = ",".join(column.name for column in index.columns)
+            parts.append(f"  index {index.name} ({columns}) unique={bool(index.unique)}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def current_version(engine: Engine) -> Optional[str]:
+    """数据库中记录的最新版本，未记录时返回 None"""
+    if not inspect(engine).has_table(SCHEMA_VERSION_TABLE):
+        return None
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(schema_version_table.c.version)
+            .order_by(schema_version_table.c.applied_at.desc())
+            .limit(1)
+        ).first()
+    return row.version if row else None
+
+
+def upgrade(engine: Engine, metadata: MetaData) -> str:
+    """创建缺失的表和索引，并记录当前版本"""
+    metadata.create_all(bind=engine)
+    _version_metadata.create_all(bind=engine)
+    version = schema_fingerprint(metadata)
+    with engine.begin() as conn:
+        exists = conn.execute(
+            select(schema_version_table.c.version).where(schema_version_table.c.version == version)
+        ).first()
+        if exists is None:
+            conn.execute(schema_version_table.insert().values(version=version, applied_at=datetime.now()))
+    return version
+
+
+def check(engine: Engine, metadata: MetaData) -> str:
+    """校验数据库版本与当前模型一致，不一致时抛出 SchemaVersionError"""
+    expected = schema_fingerprint(metadata)
+    recorded = current_version(engine)
+    if recorded != expected:
+        raise SchemaVersionError(
+            f"数据库表结构版本不一致（数据库: {recorded or '未记录'}，模型: {expected}），"
+            f"请先执行 python -m app.core.schema upgrade"
+        )
+    return expected
+
+
+def ensure_schema(engine: Engine, metadata: MetaData, mode: str = "create") -> str:
+    """启动时的表结构处理：create 直接建表（开发环境），check 只校验版本"""
+    if mode == "check":
+        return check(engine, metadata)
+    if mode == "create":
+        return upgrade(engine, metadata)
+    raise ValueError(f"不支持的 DB_SCHEMA_MODE: {mode}")
+
+
+if __name__ == "__main__":
+    from app.core.database import Base, engine
+    import app.models  # noqa: F401 注册全部模型
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "upgrade":
+        print(f"✅ 表结构已更新，版本 {upgrade(engine, Base.metadata)}")
+    elif command == "check":
+        try:
+            print(f"✅ 表结构版本一致: {check(engine, Base.metadata)}")
+        except SchemaVersionError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    else:
+        print("用法: python -m app.core.schema [check|upgrade]")
+        sys.exit(2)
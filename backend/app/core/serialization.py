@@ -0,0 +1,74 @@
+"""
+JSON 序列化快速路径
+- FastJSONResponse: 用 orjson 代替标准库 json 渲染响应，作为应用默认响应类；
+- TrustedJSONResponse: 服务层已按响应模型构建好的数据（可信内部数据）直接用 Pydantic 预编译的
+  序列化器输出 JSON 字节，跳过 FastAPI 对 response_model 的再次校验和 jsonable_encoder 转换。
+  路由上的 response_model 仍保留，用于生成接口文档。
+输出格式与原先一致：Decimal 输出为字符串，datetime 输出为 ISO 8601。
+"""
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from starlette.background import BackgroundTask
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(response_type: Any) -> TypeAdapter:
+    """按类型缓存 TypeAdapter（构建序列化器开销较大，只做一次）"""
+    return TypeAdapter(response_type)
+
+
+def _orjson_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return get_type_adapter(type(value)).dump_python(value, mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"无法序列化类型 {type(value).__name__}")
+
+
+def dumps(content: Any, response_type: Any = None) -> bytes:
+    """序列化为 JSON 字节：指定类型或 Pydantic 模型用预编译的序列化器，其余数据用 orjson"""
+    if response_type is not None:
+        return get_type_adapter(response_type).dump_json(content)
+    if isinstance(content, BaseModel):
+        return get_type_adapter(type(content)).dump_json(content)
+    return orjson.dumps(content, default=_orjson_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson 渲染的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class TrustedJSONResponse(Response):
+    """可信内部数据的 JSON 响应，不再经过 response_model 校验
+
+    content 为 Pydantic 模型时直接序列化；为列表等复合数据时传入 response_type（如 List[CategoryResponse]），
+    其中元素需已是对应模型实例。
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        response_type: Any = None,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.response_type = response_type
+        super().__init__(content, status_code=status_code, headers=headers, background=background)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, self.response_type)
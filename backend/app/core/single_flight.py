@@ -0,0 +1,118 @@
+"""
+热点读请求合并
+商品或专场上线瞬间，大量相同的读请求同时到达，每个请求各自查询会耗尽连接池。
+SingleFlight 按“路由模板 + 校验后的参数 + 鉴权范围”合并同一进程内并发的相同请求：
+第一个请求在线程中执行计算，其余请求等待并共享同一结果（包括异常），计算完成后立即失效，不做缓存。
+路由逐个启用：在接口中调用 request_coalescer.do(flight_key(request, ...), func, *args)。
+需要按请求数记账的副作用（如浏览量）通过 on_complete 在计算任务内执行，不受发起计算的请求断开影响。
+合并情况计入 /metrics 的 single_flight_requests_total（role="leader" 为执行计算的请求，"follower" 为被合并的请求）。
+"""
+import asyncio
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.metrics import MetricsRegistry, metrics_registry
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_SCOPE = "public"
+
+
+class FlightResult(NamedTuple):
+    """合并请求的结果"""
+    value: Any
+    leader: bool    # 当前请求是否执行了计算
+    requests: int   # 共享这次计算的请求数（含执行计算的请求）
+
+
+class _Flight:
+    __slots__ = ("task", "requests")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.requests = 1
+
+
+def flight_key(request: Request, vary_user: bool = False, **params) -> tuple:
+    """合并键：路由模板 + 校验后的参数（按名称排序）+ 鉴权范围
+
+    传入校验后的参数而不是原始查询串，参数顺序、默认值和写法（如 page=01）不同的请求也能合并。
+    结果与当前用户相关时传 vary_user=True，按完整的 Authorization 请求头区分（伪造令牌无法共享他人的结果）。
+    """
+    route = request.scope.get("route")
+    scope = PUBLIC_SCOPE
+    if vary_user:
+        authorization = request.headers.get("authorization")
+        if authorization:
+            scope = hashlib.sha256(authorization.encode("latin-1")).hexdigest()
+        elif request.client:
+            scope = f"client:{request.client.host}"
+    return getattr(route, "path", request.url.path), tuple(sorted(params.items())), scope
+
+
+class SingleFlight:
+    """同一进程内并发相同计算的合并器（只在事件循环线程中调用）"""
+
+    def __init__(self, enabled: bool = True, registry: MetricsRegistry = metrics_registry):
+        self.enabled = enabled
+        self.registry = registry
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def do(
+        self, key: Hashable, func: Callable[..., Any], *args,
+        on_complete: Optional[Callable[[Any, int], None]] = None
+    ) -> FlightResult:
+        """执行同步函数 func(*args)，同一 key 已有计算在进行时等待其结果
+
+        计算在线程中执行，不阻塞事件循环；等待中的请求被取消不影响其他请求。
+        on_complete(value, requests) 在计算完成、不再接受新请求合并后执行一次，requests 为最终的合并请求数；
+        它属于计算任务的一部分，发起计算的请求断开也会执行，出错只记录日志，不影响返回结果。
+        """
+        if not self.enabled:
+            value = func(*args)
+            if on_complete is not None:
+                self._complete(on_complete, value, 1)
+            return FlightResult(value, True, 1)
+
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.get_running_loop().create_task(self._run(key, flight, func, args, on_complete))
+        else:
+            flight.requests += 1
+        self.registry.observe_flight(key[0] if isinstance(key, tuple) else str(key), leader)
+
+        value = await asyncio.shield(flight.task)
+        return FlightResult(value, leader, flight.requests)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def _run(self, key: Hashable, flight: _Flight, func: Callable[..., Any], args: tuple,
+                   on_complete: Optional[Callable[[Any, int], None]]):
+        try:
+            value = await asyncio.to_thread(func, *args)
+        finally:
+            # 计算完成后立即移除，之后到达的请求重新计算，读到最新数据
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        # 移除后不会再有请求加入，此时的请求数即最终值
+        if on_complete is not None:
+            await asyncio.to_thread(self._complete, on_complete, value, flight.requests)
+        return value
+
+    @staticmethod
+    def _complete(on_complete: Callable[[Any, int], None], value: Any, requests: int):
+        try:
+            on_complete(value, requests)
+        except Exception as e:
+            logger.warning(f"合并请求的完成回调失败: {e}")
+
+
+request_coalescer = SingleFlight(enabled=settings.SINGLE_FLIGHT_ENABLED)
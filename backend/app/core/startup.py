@@ -0,0 +1,79 @@
+"""
+启动耗时报告
+记录应用启动各阶段（核心模块、表结构检查、各路由模块导入）的耗时和之后的进程内存，
+每个 worker 进程各自一份，通过 /health/startup 查看，便于发现启动变慢和内存增长。
+"""
+import importlib
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes() -> Optional[int]:
+    """当前进程常驻内存（字节），不支持的平台返回 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # macOS 上 ru_maxrss 单位为字节，Linux 为KB；这里只作为峰值兜底
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class StartupReport:
+    """启动阶段计时"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[Dict[str, Any]] = []
+        self.total_seconds: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            rss = current_rss_bytes()
+            self.phases.append({
+                "name": name,
+                "seconds": round(time.perf_counter() - started, 4),
+                "rss_mb": round(rss / 1024 / 1024, 1) if rss else None,
+            })
+
+    def import_module(self, name: str) -> ModuleType:
+        """计时导入模块（已被其它模块导入过的只计查找耗时）"""
+        with self.phase(name):
+            return importlib.import_module(name)
+
+    def finish(self):
+        """启动完成，记录总耗时并写日志"""
+        self.total_seconds = round(time.perf_counter() - self.started_at, 4)
+        slowest = sorted(self.phases, key=lambda item: item["seconds"], reverse=True)[:5]
+        logger.info(
+            f"启动完成 pid={os.getpid()} 耗时 {self.total_seconds:.3f}s 内存 {self.as_dict()['rss_mb']}MB，"
+            f"最慢阶段: " + ", ".join(f"{item['name']} {item['seconds'] * 1000:.0f}ms" for item in slowest)
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        rss = current_rss_bytes()
+        return {
+            "pid": os.getpid(),
+            "total_seconds": self.total_seconds,
+            "rss_mb": round(rss / 1024 / 1024, 1) if rss else None,
+            "phases": self.phases,
+        }
+
+
+startup_report = StartupReport()
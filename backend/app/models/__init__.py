@@ -1,11 +1,13 @@
 from .user import User, UserFollow, UserAddress, UserCheckin, KeywordSubscription
-from .product import Category, Product, Bid, ProductFavorite, Shop, LocalService, SpecialEvent, EventProduct
-from .order import Order, SystemMessage
+from .product import Category, Product, Bid, AuctionResult, ProductFavorite, Shop, LocalService, SpecialEvent, EventProduct
+from .order import Order, SystemMessage, UserOrderStats
 from .message import Message, Conversation
 from .sms_code import SMSCode
 from .wallet import WalletTransaction
 from .deposit import Deposit, DepositLog
-from .store import Store, StoreFollow, StoreReview
+from .job import DelayedJob, LeaderLease
+from .idempotency import IdempotencyKey
+from .store import Store, StoreFollow, StoreReview, StoreDailyStats
 from .store_application import StoreApplication
 from .local_service import (
     LocalServicePost, LocalServiceComment, LocalServiceLike, LocalServiceFavorite,
@@ -14,9 +16,10 @@ from .local_service import (
 
 __all__ = [
     "User", "UserFollow", "UserAddress", "UserCheckin", "KeywordSubscription",
-    "Category", "Product", "Bid", "ProductFavorite", "Shop", "LocalService", "SpecialEvent", "EventProduct",
-    "Order", "SystemMessage", "Message", "Conversation", "SMSCode", "WalletTransaction", "Deposit", "DepositLog",
-    "Store", "StoreFollow", "StoreReview", "StoreApplication",
+    "Category", "Product", "Bid", "AuctionResult", "ProductFavorite", "Shop", "LocalService", "SpecialEvent", "EventProduct",
+    "Order", "SystemMessage", "UserOrderStats", "Message", "Conversation", "SMSCode", "WalletTransaction", "Deposit", "DepositLog",
+    "DelayedJob", "LeaderLease", "IdempotencyKey",
+    "Store", "StoreFollow", "StoreReview", "StoreDailyStats", "StoreApplication",
     "LocalServicePost", "LocalServiceComment", "LocalServiceLike", "LocalServiceFavorite",
     "PetSocialPost", "PetSocialComment"
 ]
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, LargeBinary, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """幂等键（客户端携带 Idempotency-Key 重试写请求时，直接返回首次请求的响应）"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True, comment="请求方、方法、路径与幂等键的摘要")
+    fingerprint = Column(String(64), nullable=False, comment="请求内容指纹，同一幂等键内容不同时拒绝")
+    status_code = Column(Integer, comment="响应状态码，为空表示首次请求仍在处理")
+    response_headers = Column(JSON, comment="响应头")
+    response_body = Column(LargeBinary(16 * 1024 * 1024), comment="响应内容")
+    locked_until = Column(DateTime, comment="处理中占用的到期时间，过期后重试请求可重新执行")
+    expires_at = Column(DateTime, nullable=False, comment="记录过期时间")
+    created_at = Column(DateTime, server_default=func.now())
+
+    # 索引
+    __table_args__ = (
+        Index('idx_idempotency_key_expires_at', 'expires_at'),
+    )
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class DelayedJob(Base):
+    """延时任务（订单支付超时、自动确认收货、拍卖结束后退还保证金等）"""
+    __tablename__ = "delayed_jobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    job_type = Column(String(50), nullable=False, comment="任务类型")
+    payload = Column(JSON, comment="任务参数")
+    dedupe_key = Column(String(100), unique=True, comment="去重键，同一业务对象的同类任务只登记一次")
+    run_at = Column(DateTime, nullable=False, comment="到期时间")
+    status = Column(Integer, default=1, nullable=False, comment="1:待执行,2:执行中,3:已完成,4:已失败")
+    attempts = Column(Integer, default=0, nullable=False, comment="已执行次数")
+    max_attempts = Column(Integer, default=5, nullable=False, comment="最多执行次数")
+    last_error = Column(Text, comment="最近一次失败原因")
+    locked_by = Column(String(64), comment="持有租约的执行进程")
+    locked_until = Column(DateTime, comment="租约到期时间，过期后其他进程可接管")
+    finished_at = Column(DateTime, comment="完成或最终失败时间")
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    # 索引
+    __table_args__ = (
+        Index('idx_delayed_job_status_run_at', 'status', 'run_at'),
+    )
+
+
+class LeaderLease(Base):
+    """主进程租约（多 worker 部署时，后台循环只在租约持有者上运行）"""
+    __tablename__ = "leader_leases"
+
+    name = Column(String(50), primary_key=True, comment="租约名称")
+    holder = Column(String(64), nullable=False, comment="持有者进程标识")
+    fencing_token = Column(Integer, default=1, nullable=False, comment="防护令牌，持有者变更时递增")
+    expires_at = Column(DateTime, nullable=False, comment="租约到期时间")
+    acquired_at = Column(DateTime, comment="当前持有者获得租约的时间")
+    renewed_at = Column(DateTime, comment="最近一次续约时间")
@@ -30,6 +30,7 @@ class Conversation(Base):
     # 索引
     __table_args__ = (
         Index('idx_conversation_users', 'user1_id', 'user2_id'),
+        Index('idx_conversation_user2_last_message_time', 'user2_id', 'last_message_time'),
         Index('idx_conversation_last_message_time', 'last_message_time'),
     )
 
@@ -58,6 +59,7 @@ class Message(Base):
     # 索引
     __table_args__ = (
         Index('idx_message_conversation', 'conversation_id'),
+        Index('idx_message_conversation_created_at', 'conversation_id', 'created_at'),
         Index('idx_message_sender', 'sender_id'),
         Index('idx_message_receiver', 'receiver_id'),
         Index('idx_message_created_at', 'created_at'),
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, DECIMAL, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, DECIMAL, JSON, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -23,6 +23,33 @@ class Order(Base):
     completed_at = Column(DateTime)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    # 索引
+    __table_args__ = (
+        Index('idx_order_buyer_created_at', 'buyer_id', 'created_at'),
+        Index('idx_order_seller_created_at', 'seller_id', 'created_at'),
+    )
+
+class UserOrderStats(Base):
+    """用户订单统计投影（每个用户每种角色一行，由订单创建和状态变更增量维护，定期对账）"""
+    __tablename__ = "user_order_stats"
+
+    user_id = Column(Integer, primary_key=True, comment="用户ID")
+    role = Column(String(10), primary_key=True, comment="buyer:买家, seller:卖家")
+    total_orders = Column(Integer, default=0, nullable=False, comment="订单总数")
+    total_amount = Column(DECIMAL(14, 2), default=0.00, nullable=False, comment="订单总金额")
+    completed_amount = Column(DECIMAL(14, 2), default=0.00, nullable=False, comment="已完成订单金额")
+
+    # 各状态订单数
+    pending_orders = Column(Integer, default=0, nullable=False, comment="待支付")
+    paid_orders = Column(Integer, default=0, nullable=False, comment="待发货")
+    shipped_orders = Column(Integer, default=0, nullable=False, comment="已发货")
+    delivered_orders = Column(Integer, default=0, nullable=False, comment="已收货")
+    completed_orders = Column(Integer, default=0, nullable=False, comment="已完成")
+    cancelled_orders = Column(Integer, default=0, nullable=False, comment="已取消")
+
+    reconciled_at = Column(DateTime, comment="最近一次对账时间")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, DECIMAL, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, DECIMAL, JSON, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -41,6 +41,13 @@ class Product(Base):
     is_featured = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    # 索引
+    __table_args__ = (
+        Index('idx_product_status_end_time', 'status', 'auction_end_time'),
+        Index('idx_product_status_created_at', 'status', 'created_at'),
+        Index('idx_product_seller_created_at', 'seller_id', 'created_at'),
+    )
 
 class Bid(Base):
     __tablename__ = "bids"
@@ -53,6 +60,32 @@ class Bid(Base):
     max_bid_amount = Column(DECIMAL(10, 2))
     status = Column(Integer, default=1, comment="1:有效,2:被超越,3:撤销")
     created_at = Column(DateTime, server_default=func.now())
+    
+    # 索引
+    __table_args__ = (
+        Index('idx_bid_product_amount', 'product_id', 'bid_amount'),
+        Index('idx_bid_product_created_at', 'product_id', 'created_at'),
+        Index('idx_bid_bidder_created_at', 'bidder_id', 'created_at'),
+    )
+
+class AuctionResult(Base):
+    """拍卖成交记录（结算时写入，每个成交拍品一行，按获胜者索引）"""
+    __tablename__ = "auction_results"
+
+    product_id = Column(Integer, primary_key=True, autoincrement=False, comment="拍品ID")
+    seller_id = Column(Integer, nullable=False, comment="卖家ID")
+    winner_id = Column(Integer, nullable=False, comment="获胜者ID")
+    winning_bid_id = Column(Integer, nullable=False, comment="获胜出价ID")
+    amount = Column(DECIMAL(10, 2), nullable=False, comment="成交价")
+    order_id = Column(Integer, comment="成交订单ID")
+    bid_at = Column(DateTime, comment="获胜出价时间")
+    settled_at = Column(DateTime, nullable=False, comment="结算时间")
+    created_at = Column(DateTime, server_default=func.now())
+
+    # 索引
+    __table_args__ = (
+        Index('idx_auction_result_winner_settled_at', 'winner_id', 'settled_at'),
+    )
 
 class ProductImage(Base):
     __tablename__ = "product_images"
@@ -62,6 +95,11 @@ class ProductImage(Base):
     image_url = Column(String(500), nullable=False)
     sort_order = Column(Integer, default=0)
     created_at = Column(DateTime, server_default=func.now())
+    
+    # 索引
+    __table_args__ = (
+        Index('idx_product_image_product_sort', 'product_id', 'sort_order'),
+    )
 
 class ProductFavorite(Base):
     __tablename__ = "product_favorites"
@@ -70,6 +108,11 @@ class ProductFavorite(Base):
     user_id = Column(Integer, nullable=False, index=True)
     product_id = Column(Integer, nullable=False, index=True)
     created_at = Column(DateTime, server_default=func.now())
+    
+    # 索引
+    __table_args__ = (
+        Index('idx_product_favorite_user_created_at', 'user_id', 'created_at'),
+    )
 
 class Shop(Base):
     __tablename__ = "shops"
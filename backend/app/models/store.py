@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, DECIMAL, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, DECIMAL, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -62,4 +62,32 @@ class StoreReview(Base):
     
     status = Column(Integer, default=1, comment="状态:1:正常,2:隐藏")
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class StoreDailyStats(Base):
+    """店铺每日统计汇总（由订单、评价、商品变更增量维护）"""
+    __tablename__ = "store_daily_stats"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    store_id = Column(Integer, nullable=False, index=True, comment="店铺ID")
+    stat_date = Column(Date, nullable=False, comment="统计日期")
+    
+    # 订单与评价
+    order_count = Column(Integer, default=0, comment="订单数")
+    order_revenue = Column(DECIMAL(12, 2), default=0.00, comment="订单金额")
+    review_count = Column(Integer, default=0, comment="评价数")
+    rating_sum = Column(Integer, default=0, comment="评分总和")
+    
+    # 商品状态净变化量（按天累加即为当前各状态商品数）
+    pending_products = Column(Integer, default=0, comment="待审核商品变化量")
+    active_products = Column(Integer, default=0, comment="拍卖中商品变化量")
+    ended_products = Column(Integer, default=0, comment="已结束商品变化量")
+    offline_products = Column(Integer, default=0, comment="已下架商品变化量")
+    
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('store_id', 'stat_date', name='uq_store_daily_stats'),
+    )
@@ -67,6 +67,9 @@ class LocalServiceResponse(LocalServiceBase):
     # 是否已点赞/收藏（需要登录用户）
     is_liked: Optional[bool] = None
     is_favorited: Optional[bool] = None
+    
+    # 距查询位置的距离（公里），按位置查询时返回
+    distance: Optional[float] = None
 
     class Config:
         from_attributes = True
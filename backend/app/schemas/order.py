@@ -22,6 +22,8 @@ class OrderUpdate(BaseModel):
 class OrderResponse(OrderBase):
     id: int
     order_number: str
+    payment_method: Optional[int] = None
+    shipping_address: Optional[Dict[str, Any]] = None
     buyer_id: int
     seller_id: int
     unit_price: Decimal
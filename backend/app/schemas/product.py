@@ -34,6 +34,9 @@ class ProductBase(BaseModel):
 class ProductCreate(ProductBase):
     images: Optional[List[str]] = []
 
+class ProductRelistRequest(BaseModel):
+    auction_end_time: datetime
+
 class ProductUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -108,4 +108,7 @@ class StoreStatsResponse(BaseModel):
     # 最近统计
     recent_orders: int  # 最近30天订单
     recent_revenue: Decimal  # 最近30天收入
-    recent_reviews: int  # 最近30天评价
\ No newline at end of file
+    recent_reviews: int  # 最近30天评价
+    recent_orders_7d: int = 0  # 最近7天订单
+    recent_revenue_7d: Decimal = Decimal("0.00")  # 最近7天收入
+    recent_reviews_7d: int = 0  # 最近7天评价
\ No newline at end of file
@@ -1,13 +1,5 @@
-from alipay.aop.api.DefaultAlipayClient import DefaultAlipayClient
-from alipay.aop.api.AlipayClientConfig import AlipayClientConfig
-from alipay.aop.api.request.AlipayTradeAppPayRequest import AlipayTradeAppPayRequest
-from alipay.aop.api.request.AlipayTradePagePayRequest import AlipayTradePagePayRequest
-from alipay.aop.api.request.AlipayTradeQueryRequest import AlipayTradeQueryRequest
-from alipay.aop.api.request.AlipayTradeCloseRequest import AlipayTradeCloseRequest
-from alipay.aop.api.request.AlipayTradeRefundRequest import AlipayTradeRefundRequest
-from alipay.aop.api.util.SignatureUtils import verify_with_rsa
 from sqlalchemy.orm import Session
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, TYPE_CHECKING
 from decimal import Decimal
 import uuid
 import json
@@ -17,9 +9,27 @@ from urllib.parse import parse_qs, unquote
 from ..core.config import settings
 from ..models.order import Order, Payment
 from ..schemas.order import PaymentCreate
+from .order_service import OrderService
+
+if TYPE_CHECKING:
+    from alipay.aop.api.DefaultAlipayClient import DefaultAlipayClient
 
 class AlipayService:
     def __init__(self):
+        # 支付宝SDK导入较慢，首次发起支付相关请求时再创建客户端
+        self._alipay_client: Optional["DefaultAlipayClient"] = None
+
+    @property
+    def alipay_client(self) -> "DefaultAlipayClient":
+        if self._alipay_client is None:
+            self._alipay_client = self._create_client()
+        return self._alipay_client
+
+    def _create_client(self) -> "DefaultAlipayClient":
+        """创建支付宝客户端"""
+        from alipay.aop.api.DefaultAlipayClient import DefaultAlipayClient
+        from alipay.aop.api.AlipayClientConfig import AlipayClientConfig
+
         # 创建支付宝客户端配置
         alipay_config = AlipayClientConfig()
         alipay_config.server_url = "https://openapi.alipay.com/gateway.do"  # 正式环境
@@ -31,7 +41,7 @@ class AlipayService:
         alipay_config.alipay_public_key = settings.ALIPAY_PUBLIC_KEY
         alipay_config.sign_type = "RSA2"
         
-        self.alipay_client = DefaultAlipayClient(alipay_config)
+        return DefaultAlipayClient(alipay_config)
 
     async def create_payment(
         self,
@@ -78,6 +88,7 @@ class AlipayService:
         db.refresh(payment)
         
         # 构建App支付请求
+        from alipay.aop.api.request.AlipayTradeAppPayRequest import AlipayTradeAppPayRequest
         request = AlipayTradeAppPayRequest()
         biz_content = {
             "out_trade_no": out_trade_no,
@@ -145,6 +156,7 @@ class AlipayService:
         db.refresh(payment)
         
         # 构建网页支付请求
+        from alipay.aop.api.request.AlipayTradePagePayRequest import AlipayTradePagePayRequest
         request = AlipayTradePagePayRequest()
         biz_content = {
             "out_trade_no": out_trade_no,
@@ -174,6 +186,7 @@ class AlipayService:
             verify_data = {k: v for k, v in notify_data.items() if k not in ["sign", "sign_type"]}
             
             # 验证签名
+            from alipay.aop.api.util.SignatureUtils import verify_with_rsa
             return verify_with_rsa(settings.ALIPAY_PUBLIC_KEY, verify_data, sign)
         except Exception as e:
             print(f"验证支付宝通知失败: {e}")
@@ -214,9 +227,7 @@ class AlipayService:
                 # 更新订单状态
                 order = db.query(Order).filter(Order.id == payment.order_id).first()
                 if order:
-                    order.payment_status = 2  # 已支付
-                    order.order_status = 2  # 待发货
-                    order.paid_at = datetime.now()
+                    await OrderService().mark_order_paid(db, order)
                 
                 db.commit()
                 return True
@@ -237,6 +248,7 @@ class AlipayService:
     async def query_payment(self, out_trade_no: str) -> Dict[str, Any]:
         """查询支付状态"""
         try:
+            from alipay.aop.api.request.AlipayTradeQueryRequest import AlipayTradeQueryRequest
             request = AlipayTradeQueryRequest()
             biz_content = {"out_trade_no": out_trade_no}
             request.biz_content = json.dumps(biz_content)
@@ -250,6 +262,7 @@ class AlipayService:
     async def close_payment(self, out_trade_no: str) -> bool:
         """关闭支付订单"""
         try:
+            from alipay.aop.api.request.AlipayTradeCloseRequest import AlipayTradeCloseRequest
             request = AlipayTradeCloseRequest()
             biz_content = {"out_trade_no": out_trade_no}
             request.biz_content = json.dumps(biz_content)
@@ -285,6 +298,7 @@ class AlipayService:
             out_refund_no = f"REFUND_{payment_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
             
             # 调用支付宝退款接口
+            from alipay.aop.api.request.AlipayTradeRefundRequest import AlipayTradeRefundRequest
             request = AlipayTradeRefundRequest()
             biz_content = {
                 "out_trade_no": payment.transaction_id,
@@ -342,6 +356,7 @@ class AlipayService:
         """创建钱包充值支付宝支付订单"""
         
         # 构建App支付请求
+        from alipay.aop.api.request.AlipayTradeAppPayRequest import AlipayTradeAppPayRequest
         request = AlipayTradeAppPayRequest()
         biz_content = {
             "out_trade_no": out_trade_no,
@@ -0,0 +1,156 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, desc, func
+from typing import Any, Dict, Optional
+from datetime import datetime
+import logging
+
+from ..models.product import AuctionResult, Bid, Product
+from ..models.order import Order
+
+logger = logging.getLogger(__name__)
+
+
+class AuctionResultService:
+    """拍卖成交记录服务
+
+    结算时为每个成交拍品写入一行 AuctionResult（拍品、获胜者、成交价、订单），
+    “我中标的拍卖”按 (winner_id, settled_at) 索引分页，一条 JOIN 查询取回拍品和订单信息，
+    大多数用户的中标记录不足一页，总数可由结果行数直接得出；
+    不再依赖含义不唯一的 Bid.status == 1（拍卖中表示领先，结束后表示获胜）。
+    """
+
+    def record_settlement(self, db: Session, product: Product, winning_bid: Bid, order: Optional[Order]):
+        """结算钩子：写入成交记录（只 flush，随结算事务一起提交）"""
+        result = db.get(AuctionResult, product.id)
+        if result is None:
+            result = AuctionResult(product_id=product.id)
+            db.add(result)
+        result.seller_id = product.seller_id
+        result.winner_id = winning_bid.bidder_id
+        result.winning_bid_id = winning_bid.id
+        result.amount = winning_bid.bid_amount
+        result.order_id = order.id if order else None
+        result.bid_at = winning_bid.created_at
+        result.settled_at = datetime.now()
+        db.flush()
+
+    def get_result(self, db: Session, product_id: int) -> Optional[AuctionResult]:
+        """按拍品获取成交记录"""
+        return db.get(AuctionResult, product_id)
+
+    async def get_winning_page(self, db: Session, user_id: int, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+        """获取用户中标的拍卖：一条按获胜者索引的 JOIN 查询取回一页，需要时再按同一索引计数"""
+        offset = (page - 1) * page_size
+        rows = db.query(
+            AuctionResult.product_id,
+            AuctionResult.amount,
+            AuctionResult.bid_at,
+            AuctionResult.order_id,
+            Product.title,
+            Product.images,
+            Order.order_no,
+            Order.payment_status,
+            Order.order_status
+        ).outerjoin(
+            Product, Product.id == AuctionResult.product_id
+        ).outerjoin(
+            Order, Order.id == AuctionResult.order_id
+        ).filter(
+            AuctionResult.winner_id == user_id
+        ).order_by(
+            desc(AuctionResult.settled_at), desc(AuctionResult.product_id)
+        ).offset(offset).limit(page_size).all()
+
+        if rows and len(rows) < page_size:
+            # 最后一页，总数可直接算出
+            total = offset + len(rows)
+        elif not rows and page == 1:
+            total = 0
+        else:
+            total = db.query(func.count(AuctionResult.product_id)).filter(
+                AuctionResult.winner_id == user_id
+            ).scalar()
+
+        return {
+            "items": [
+                {
+                    "product_id": row.product_id,
+                    "product_title": row.title,
+                    "product_images": row.images,
+                    "winning_amount": str(row.amount),
+                    "bid_time": row.bid_at.isoformat() if row.bid_at else None,
+                    "order_id": row.order_id,
+                    "order_no": row.order_no,
+                    "payment_status": row.payment_status,
+                    "order_status": row.order_status
+                }
+                for row in rows
+            ],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size
+        }
+
+    def backfill(self, db: Session, batch_size: int = 500) -> int:
+        """为已结束但没有成交记录的历史拍卖补写记录（按拍品ID分批提交），返回写入条数"""
+        created = 0
+        last_product_id = 0
+        while True:
+            products = db.query(
+                Product.id, Product.seller_id, Product.auction_end_time
+            ).outerjoin(
+                AuctionResult, AuctionResult.product_id == Product.id
+            ).filter(
+                and_(Product.status == 3, Product.id > last_product_id, AuctionResult.product_id.is_(None))
+            ).order_by(Product.id).limit(batch_size).all()
+            if not products:
+                break
+            product_ids = [product.id for product in products]
+
+            # 与结算相同：出价金额最高者获胜
+            row_number = func.row_number().over(
+                partition_by=Bid.product_id,
+                order_by=(desc(Bid.bid_amount), Bid.id)
+            ).label("row_number")
+            ranked = db.query(
+                Bid.id, Bid.product_id, Bid.bidder_id, Bid.bid_amount, Bid.created_at, row_number
+            ).filter(Bid.product_id.in_(product_ids)).subquery()
+            winning_bids = {
+                row.product_id: row for row in db.query(ranked).filter(ranked.c.row_number == 1)
+            }
+
+            # 获胜者的成交订单（同一拍品取最早的一笔）
+            orders = {}
+            for order in sorted(
+                db.query(Order.id, Order.product_id, Order.buyer_id, Order.created_at).filter(
+                    Order.product_id.in_(product_ids)
+                ),
+                key=lambda row: row.id
+            ):
+                orders.setdefault((order.product_id, order.buyer_id), order)
+
+            for product in products:
+                bid = winning_bids.get(product.id)
+                if bid is None:
+                    continue  # 流拍
+                order = orders.get((product.id, bid.bidder_id))
+                db.add(AuctionResult(
+                    product_id=product.id,
+                    seller_id=product.seller_id,
+                    winner_id=bid.bidder_id,
+                    winning_bid_id=bid.id,
+                    amount=bid.bid_amount,
+                    order_id=order.id if order else None,
+                    bid_at=bid.created_at,
+                    settled_at=(order.created_at if order else None) or product.auction_end_time or bid.created_at
+                ))
+                created += 1
+            db.commit()
+            last_product_id = product_ids[-1]
+
+        logger.info(f"拍卖成交记录回填完成，共写入 {created} 条")
+        return created
+
+
+auction_result_service = AuctionResultService()
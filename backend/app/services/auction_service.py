@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, desc, func
-from typing import List, Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
 import asyncio
@@ -10,7 +10,16 @@ from ..models.product import Product, Bid
 from ..models.order import Order, OrderItem
 from ..models.user import User
 from ..core.database import get_db
+from ..core.config import settings
 from .notification_service import NotificationService
+from .store_stats_service import store_stats_service
+from .order_stats_service import order_stats_service
+from .store_card_service import store_card_assembler
+from .product_card_service import product_card_cache
+from .auction_result_service import auction_result_service
+from .trending_service import trending_service
+from .proxy_bid_service import proxy_bid_resolver
+from .delayed_job_service import delayed_job_service, ORDER_PAYMENT_TIMEOUT, AUCTION_DEPOSIT_REFUND
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +29,12 @@ class AuctionService:
     def __init__(self):
         self.notification_service = NotificationService()
     
-    async def check_and_end_auctions(self, db: Session) -> List[Dict[str, Any]]:
-        """检查并结束已到期的拍卖"""
+    async def check_and_end_auctions(
+        self,
+        db: Session,
+        fence: Optional[Callable[[Session], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """检查并结束已到期的拍卖；fence 在结算每个拍卖前校验当前进程仍是主进程（失去主进程身份时抛出异常并停止）"""
         current_time = datetime.now()
         
         # 查找已到期但状态还是拍卖中的商品
@@ -35,6 +48,8 @@ class AuctionService:
         results = []
         
         for product in expired_auctions:
+            if fence is not None:
+                fence(db)
             try:
                 result = await self._process_auction_end(db, product)
                 results.append(result)
@@ -51,14 +66,15 @@ class AuctionService:
     async def _process_auction_end(self, db: Session, product: Product) -> Dict[str, Any]:
         """处理单个拍卖结束"""
         
-        # 查找最高出价
+        # 查找最高出价（重新上架前的出价已撤销，不参与本轮）
         winning_bid = db.query(Bid).filter(
-            Bid.product_id == product.id
+            Bid.product_id == product.id, Bid.status != 3
         ).order_by(desc(Bid.bid_amount)).first()
         
         if winning_bid:
             # 有人出价，创建获胜者订单
             order = await self._create_auction_winner_order(db, product, winning_bid)
+            auction_result_service.record_settlement(db, product, winning_bid, order)
             
             # 更新出价状态
             db.query(Bid).filter(
@@ -76,7 +92,9 @@ class AuctionService:
             ).update({"status": 2})  # 2: 被超越/失败
             
             # 更新商品状态为已结束
+            store_stats_service.record_product_status_change(db, product.seller_id, product.status, 3)
             product.status = 3  # 已结束
+            self._schedule_deposit_refund(db, product, winning_bid.bidder_id)
             
             # 发送通知给获胜者
             await self._send_auction_winner_notification(db, product, winning_bid, order)
@@ -85,6 +103,10 @@ class AuctionService:
             await self._send_auction_loser_notifications(db, product, winning_bid.bidder_id)
             
             db.commit()
+            store_card_assembler.invalidate_owner(product.seller_id)
+            product_card_cache.invalidate(product.id)
+            trending_service.remove_product(product.id)
+            proxy_bid_resolver.forget_product(product.id)
             
             return {
                 "product_id": product.id,
@@ -96,8 +118,14 @@ class AuctionService:
             }
         else:
             # 流拍，无人出价
+            store_stats_service.record_product_status_change(db, product.seller_id, product.status, 3)
             product.status = 3  # 已结束
+            self._schedule_deposit_refund(db, product, None)
             db.commit()
+            store_card_assembler.invalidate_owner(product.seller_id)
+            product_card_cache.invalidate(product.id)
+            trending_service.remove_product(product.id)
+            proxy_bid_resolver.forget_product(product.id)
             
             # 通知卖家流拍
             await self._send_auction_failed_notification(db, product)
@@ -153,8 +181,32 @@ class AuctionService:
         
         db.add(order_item)
         
+        store_stats_service.record_order_created(db, order)
+        order_stats_service.record_order_created(db, order)
+        
+        # 超时未支付自动取消
+        delayed_job_service.schedule(
+            db,
+            ORDER_PAYMENT_TIMEOUT,
+            datetime.now() + timedelta(minutes=settings.ORDER_PAYMENT_TIMEOUT_MINUTES),
+            {"order_id": order.id},
+            dedupe_key=f"{ORDER_PAYMENT_TIMEOUT}:{order.id}"
+        )
+        
         return order
     
+    def _schedule_deposit_refund(self, db: Session, product: Product, winner_id: Optional[int]):
+        """拍卖结束后登记保证金结算任务（未中标者退还，中标者冻结到付款或支付超时）"""
+        # 每一轮拍卖（重新上架后结束时间不同）各结算一次
+        round_key = product.auction_end_time.strftime("%Y%m%d%H%M%S") if product.auction_end_time else "0"
+        delayed_job_service.schedule(
+            db,
+            AUCTION_DEPOSIT_REFUND,
+            datetime.now() + timedelta(minutes=settings.DEPOSIT_REFUND_DELAY_MINUTES),
+            {"auction_id": product.id, "winner_id": winner_id},
+            dedupe_key=f"{AUCTION_DEPOSIT_REFUND}:{product.id}:{round_key}"
+        )
+    
     async def _send_auction_winner_notification(
         self, 
         db: Session, 
@@ -8,6 +8,11 @@ from ..models.product import Bid, AutoBid, Product
 from ..models.user import User
 from ..schemas.bid import BidCreate, BidResponse, BidListResponse, AutoBidCreate
 from ..core.config import settings
+from .store_card_service import store_card_assembler
+from .product_card_service import product_card_cache
+from .trending_service import trending_service
+from .recommendation_service import recommendation_service
+from .proxy_bid_service import proxy_bid_resolver
 
 class BidService:
     
@@ -75,64 +80,19 @@ class BidService:
         # 设置当前出价为领先状态
         bid.status = 1  # 1表示有效/领先
         
+        # 代理出价一步结算，产生的出价与本次出价一起提交
+        if proxy_bid_resolver.resolve(db, product, user_id):
+            bid.status = 2  # 被代理出价超越
+        
         db.commit()
         db.refresh(bid)
-        
-        # 暂时注释掉自动出价处理
-        # await self._handle_auto_bids(db, bid_data.product_id, bid_data.amount, user_id)
+        store_card_assembler.invalidate_owner(product.seller_id)
+        product_card_cache.record_bid(product)
+        trending_service.record_bid(product)
+        recommendation_service.record_interaction(user_id, product.id, "bid")
         
         return self._to_bid_response(bid, db)
     
-    async def _handle_auto_bids(
-        self, 
-        db: Session, 
-        product_id: int, 
-        current_amount: Decimal, 
-        exclude_user_id: int
-    ):
-        """处理自动出价"""
-        # 获取该商品的活跃自动出价
-        auto_bids = db.query(AutoBid).filter(
-            and_(
-                AutoBid.product_id == product_id,
-                AutoBid.user_id != exclude_user_id,
-                AutoBid.status == "active",
-                AutoBid.max_amount > current_amount
-            )
-        ).order_by(desc(AutoBid.increment_amount)).all()
-        
-        for auto_bid in auto_bids:
-            # 计算下一个出价金额
-            next_amount = current_amount + auto_bid.increment_amount
-            
-            if next_amount <= auto_bid.max_amount:
-                # 创建自动出价记录
-                bid = Bid(
-                    product_id=product_id,
-                    bidder_id=auto_bid.user_id,
-                    bid_amount=next_amount,
-                    is_auto_bid=True,
-                    status=1  # 1表示有效
-                )
-                db.add(bid)
-                
-                # 更新商品价格
-                product = db.query(Product).filter(Product.id == product_id).first()
-                product.current_price = next_amount
-                
-                # 更新之前的出价状态
-                db.query(Bid).filter(
-                    and_(
-                        Bid.product_id == product_id,
-                        Bid.id != bid.id,
-                        Bid.status == "winning"
-                    )
-                ).update({"status": "outbid"})
-                
-                db.commit()
-                current_amount = next_amount
-                break
-    
     async def get_product_bids(
         self, 
         db: Session, 
@@ -285,6 +245,8 @@ class BidService:
         db.add(auto_bid)
         db.commit()
         db.refresh(auto_bid)
+        proxy_bid_resolver.on_auto_bid_saved(auto_bid)
+        self._resolve_proxy_bids(db, product)
         
         return auto_bid
     
@@ -340,6 +302,7 @@ class BidService:
         
         auto_bid.status = "paused"
         db.commit()
+        proxy_bid_resolver.on_auto_bid_removed(auto_bid)
         return True
     
     async def resume_auto_bid(self, db: Session, auto_bid_id: int, user_id: int) -> bool:
@@ -353,6 +316,11 @@ class BidService:
         
         auto_bid.status = "active"
         db.commit()
+        proxy_bid_resolver.on_auto_bid_saved(auto_bid)
+        
+        product = db.query(Product).filter(Product.id == auto_bid.product_id).first()
+        if product:
+            self._resolve_proxy_bids(db, product)
         return True
     
     async def cancel_auto_bid(self, db: Session, auto_bid_id: int, user_id: int) -> bool:
@@ -366,8 +334,27 @@ class BidService:
         
         auto_bid.status = "cancelled"
         db.commit()
+        proxy_bid_resolver.on_auto_bid_removed(auto_bid)
         return True
     
+    def _resolve_proxy_bids(self, db: Session, product: Product):
+        """代理出价变化后立即结算（仅拍卖中的商品）"""
+        if product.status != 2:
+            return
+        if product.auction_end_time and product.auction_end_time <= datetime.now():
+            return
+        
+        leader = db.query(Bid.bidder_id).filter(
+            and_(Bid.product_id == product.id, Bid.status == 1)
+        ).order_by(desc(Bid.bid_amount)).first()
+        
+        new_bids = proxy_bid_resolver.resolve(db, product, leader.bidder_id if leader else None)
+        db.commit()
+        if new_bids:
+            store_card_assembler.invalidate_owner(product.seller_id)
+            product_card_cache.record_bid(product)
+            trending_service.record_bid(product)
+    
     async def get_user_bid_statistics(self, db: Session, user_id: int) -> Dict[str, Any]:
         """获取用户出价统计"""
         # 总出价次数
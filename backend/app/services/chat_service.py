@@ -12,6 +12,7 @@ from ..schemas.chat import (
     MessageCreate, MessageResponse, ConversationResponse, 
     ConversationListResponse, MessageListResponse, ProductConsultRequest
 )
+from .message_search_service import message_search_index
 
 
 class ChatService:
@@ -229,6 +230,7 @@ class ChatService:
         
         db.commit()
         db.refresh(message)
+        message_search_index.add_message(message, conversation)
         
         # 获取发送者信息
         sender = db.query(User).filter(User.id == sender_id).first()
@@ -434,6 +436,7 @@ class ChatService:
         
         message.is_deleted = True
         db.commit()
+        message_search_index.remove_message(message.id)
         return True
     
     async def search_messages(
@@ -445,30 +448,55 @@ class ChatService:
         page: int = 1, 
         page_size: int = 20
     ) -> MessageListResponse:
-        """搜索消息"""
-        query = db.query(Message).join(Conversation).filter(
-            and_(
-                or_(
-                    Conversation.user1_id == user_id,
-                    Conversation.user2_id == user_id
-                ),
-                Message.content.contains(keyword),
-                Message.is_deleted == False
+        """搜索消息（优先使用消息搜索索引，按消息ID批量加载）"""
+        offset = (page - 1) * page_size
+        hits = message_search_index.search(user_id, keyword, conversation_id, page_size, offset)
+        
+        if hits is not None:
+            message_ids, total = hits
+            messages_by_id = {
+                message.id: message for message in db.query(Message).filter(
+                    and_(Message.id.in_(message_ids), Message.is_deleted == False)
+                ).all()
+            } if message_ids else {}
+            messages = [messages_by_id[message_id] for message_id in message_ids if message_id in messages_by_id]
+            # 索引中残留的已删除消息（写入线程丢失的删除）：从总数中扣除并移出索引，之后的搜索不再命中
+            stale_ids = [message_id for message_id in message_ids if message_id not in messages_by_id]
+            if stale_ids:
+                total -= len(stale_ids)
+                for message_id in stale_ids:
+                    message_search_index.remove_message(message_id)
+        else:
+            # 索引未启用或尚未完成首次同步
+            query = db.query(Message).join(Conversation, Message.conversation_id == Conversation.id).filter(
+                and_(
+                    or_(
+                        Conversation.user1_id == user_id,
+                        Conversation.user2_id == user_id
+                    ),
+                    Message.content.contains(keyword),
+                    Message.is_deleted == False
+                )
             )
-        )
-        
-        if conversation_id:
-            query = query.filter(Message.conversation_id == conversation_id)
-        
-        query = query.order_by(desc(Message.created_at))
+            
+            if conversation_id:
+                query = query.filter(Message.conversation_id == conversation_id)
+            
+            query = query.order_by(desc(Message.created_at))
+            
+            total = query.count()
+            messages = query.offset(offset).limit(page_size).all()
         
-        total = query.count()
-        messages = query.offset((page - 1) * page_size).limit(page_size).all()
+        # 发送者信息一次查询
+        sender_ids = {message.sender_id for message in messages}
+        senders = {
+            row.id: row for row in db.query(User.id, User.nickname, User.avatar_url).filter(User.id.in_(sender_ids))
+        } if sender_ids else {}
         
         # 转换为响应格式
         message_list = []
         for message in messages:
-            sender = db.query(User).filter(User.id == message.sender_id).first()
+            sender = senders.get(message.sender_id)
             message_response = MessageResponse(
                 id=message.id,
                 conversation_id=message.conversation_id,
@@ -0,0 +1,372 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, event
+from sqlalchemy.exc import IntegrityError
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.read_replica import RoutingSession
+from ..models.job import DelayedJob
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_PENDING = 1
+JOB_RUNNING = 2
+JOB_DONE = 3
+JOB_FAILED = 4
+
+# 任务类型
+ORDER_PAYMENT_TIMEOUT = "order_payment_timeout"
+ORDER_AUTO_CONFIRM = "order_auto_confirm"
+AUCTION_DEPOSIT_REFUND = "auction_deposit_refund"
+
+# 失败重试间隔：30 秒起按次数翻倍，最长 1 小时
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# 每次从数据库装入定时堆的任务数上限（积压过多时分多轮装入）
+LOAD_LIMIT = 10000
+
+# 会话中已登记、待提交后通知定时堆的任务
+_SCHEDULED_KEY = "scheduled_jobs"
+
+JobHandler = Callable[[Session, Dict[str, Any]], Awaitable[Any]]
+
+
+class DelayedJobService:
+    """持久化延时任务调度
+
+    任务登记在 delayed_jobs 表（随业务事务一起提交，进程重启不丢失），按 (status, run_at) 索引取出
+    即将到期的任务装入进程内定时堆，到期时按批用一条条件 UPDATE 领取租约（待执行，或执行中但租约已过期），
+    多个进程同时运行时每个任务只会被一个进程领取；领取后逐个执行处理函数，成功的任务一次批量标记完成，
+    失败的按指数退避改回待执行，超过最多执行次数标记为失败。
+    处理函数需要幂等：进程在业务提交后、标记完成前退出时，租约过期后任务会被重新执行。
+    """
+
+    def __init__(self, batch_size: int = 100, lease_seconds: int = 300, poll_seconds: float = 30,
+                 max_attempts: int = 5):
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()[:32]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._heap: List[Tuple[datetime, int]] = []
+        self._queued: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._claims = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    # 任务类型注册
+    def handler(self, job_type: str):
+        """注册任务类型的处理函数（async def handler(db, payload)）"""
+        def decorator(func: JobHandler) -> JobHandler:
+            self._handlers[job_type] = func
+            return func
+        return decorator
+
+    # 登记
+    def schedule(
+        self,
+        db: Session,
+        job_type: str,
+        run_at: datetime,
+        payload: Optional[Dict[str, Any]] = None,
+        dedupe_key: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> Optional[DelayedJob]:
+        """登记延时任务（只 flush，随调用方事务提交，提交后通知本进程的定时堆）；去重键已存在时返回 None"""
+        if dedupe_key and db.query(DelayedJob.id).filter(DelayedJob.dedupe_key == dedupe_key).first():
+            return None
+        job = DelayedJob(
+            job_type=job_type,
+            payload=payload or {},
+            dedupe_key=dedupe_key,
+            run_at=run_at,
+            status=JOB_PENDING,
+            attempts=0,
+            max_attempts=max_attempts or self.max_attempts
+        )
+        try:
+            with db.begin_nested():
+                db.add(job)
+                db.flush()
+        except IntegrityError:
+            # 并发登记了同一去重键
+            return None
+        db.info.setdefault(_SCHEDULED_KEY, []).append((job.run_at, job.id))
+        return job
+
+    def cancel(self, db: Session, dedupe_key: str) -> int:
+        """取消尚未执行的任务（只 flush，随调用方事务提交），返回取消条数；已在执行的任务由处理函数按业务状态跳过"""
+        cancelled = db.query(DelayedJob).filter(
+            and_(DelayedJob.dedupe_key == dedupe_key, DelayedJob.status == JOB_PENDING)
+        ).update({
+            DelayedJob.status: JOB_DONE,
+            DelayedJob.last_error: "已取消",
+            DelayedJob.finished_at: datetime.now()
+        }, synchronize_session=False)
+        db.flush()
+        return cancelled
+
+    def notify(self, entries: Iterable[Tuple[datetime, int]]):
+        """把已提交的任务放入定时堆，比当前最早任务更早到期时唤醒执行循环
+
+        本进程没有运行执行循环时（如 JOB_RUNNER_ENABLED=false 的纯接口进程）直接忽略，
+        否则堆中的任务永远不会被取出；执行循环每轮都会从数据表重新装入到期任务，不会遗漏。
+        """
+        if not self._running:
+            return
+        with self._lock:
+            earliest = self._heap[0][0] if self._heap else None
+            for run_at, job_id in entries:
+                self._push(run_at, job_id)
+            wake = self._heap and (earliest is None or self._heap[0][0] < earliest)
+        if wake:
+            self._wake()
+
+    # 执行
+    def start(self):
+        """在当前事件循环中启动执行循环"""
+        if self._task is not None and not self._task.done():
+            return
+        self._running = True
+        self._task = asyncio.get_running_loop().create_task(self.run_forever())
+        logger.info(f"延时任务执行循环启动，进程标识: {self.worker_id}，已注册任务类型: {', '.join(sorted(self._handlers))}")
+
+    async def stop(self):
+        """停止执行循环（正在执行的一批任务执行完后退出）"""
+        self._running = False
+        self._wake()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        # 停止后不再有人取出堆中的任务，重新启动时会从数据表装入
+        with self._lock:
+            self._heap.clear()
+            self._queued.clear()
+        logger.info("延时任务执行循环已停止")
+
+    async def run_forever(self):
+        """执行循环：定期从数据库装入即将到期的任务，睡眠到堆顶任务到期后按批执行"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._running = True
+        next_load = 0.0
+        while self._running:
+            self._wakeup.clear()
+            try:
+                if self._loop.time() >= next_load:
+                    self._load_upcoming()
+                    next_load = self._loop.time() + self.poll_seconds
+                while self._running and await self.run_due() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"延时任务执行循环出错: {e}")
+            timeout = min(next_load - self._loop.time(), self._seconds_until_next())
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_pending(self) -> Dict[str, int]:
+        """执行一轮：装入已到期的任务并全部执行完（用于任务脚本和检查），返回完成、重试、失败数"""
+        totals = {"done": 0, "retried": 0, "failed": 0}
+        while True:
+            self._load_upcoming(horizon=datetime.now())
+            executed = 0
+            while True:
+                batch = await self._run_batch()
+                if batch is None:
+                    break
+                executed += sum(batch.values())
+                for key, value in batch.items():
+                    totals[key] += value
+            if not executed:
+                return totals
+
+    async def run_due(self) -> int:
+        """执行一批已到期的任务，返回处理的任务数"""
+        result = await self._run_batch()
+        return sum(result.values()) if result else 0
+
+    # 私有方法
+    async def _run_batch(self) -> Optional[Dict[str, int]]:
+        """从定时堆取出一批到期任务，领取租约后执行；堆中没有到期任务时返回 None"""
+        due_ids = self._pop_due(datetime.now(), self.batch_size)
+        if not due_ids:
+            return None
+
+        db = SessionLocal()
+        try:
+            jobs = self._claim(db, due_ids)
+            result = {"done": 0, "retried": 0, "failed": 0}
+            done_ids = []
+            for job in jobs:
+                handler = self._handlers.get(job.job_type)
+                try:
+                    if handler is None:
+                        raise LookupError(f"未注册的任务类型: {job.job_type}")
+                    await handler(db, dict(job.payload or {}))
+                    db.commit()
+                    done_ids.append(job.id)
+                except Exception as e:
+                    db.rollback()
+                    permanent = isinstance(e, LookupError) or job.attempts >= job.max_attempts
+                    self._record_failure(db, job, e, permanent)
+                    result["failed" if permanent else "retried"] += 1
+            if done_ids:
+                now = datetime.now()
+                db.query(DelayedJob).filter(
+                    and_(DelayedJob.id.in_(done_ids), DelayedJob.status == JOB_RUNNING)
+                ).update({
+                    DelayedJob.status: JOB_DONE,
+                    DelayedJob.finished_at: now,
+                    DelayedJob.locked_by: None,
+                    DelayedJob.locked_until: None,
+                    DelayedJob.last_error: None
+                }, synchronize_session=False)
+                db.commit()
+                result["done"] = len(done_ids)
+            return result
+        finally:
+            db.close()
+
+    def _claim(self, db: Session, job_ids: List[int]) -> List[DelayedJob]:
+        """一条条件 UPDATE 领取一批任务的租约，返回本进程领取成功的任务（按到期时间排序）"""
+        now = datetime.now()
+        token = f"{self.worker_id}/{next(self._claims)}"
+        claimed = db.query(DelayedJob).filter(
+            and_(
+                DelayedJob.id.in_(job_ids),
+                DelayedJob.run_at <= now,
+                or_(
+                    DelayedJob.status == JOB_PENDING,
+                    and_(DelayedJob.status == JOB_RUNNING, DelayedJob.locked_until < now)
+                )
+            )
+        ).update({
+            DelayedJob.status: JOB_RUNNING,
+            DelayedJob.locked_by: token,
+            DelayedJob.locked_until: now + timedelta(seconds=self.lease_seconds),
+            DelayedJob.attempts: DelayedJob.attempts + 1
+        }, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return []
+        jobs = db.query(DelayedJob).filter(
+            and_(DelayedJob.id.in_(job_ids), DelayedJob.locked_by == token)
+        ).all()
+        # 处理函数提交业务事务后仍可读取任务字段
+        for job in jobs:
+            db.expunge(job)
+        return sorted(jobs, key=lambda job: (job.run_at, job.id))
+
+    def _record_failure(self, db: Session, job: DelayedJob, error: Exception, permanent: bool):
+        """记录失败：可重试时按指数退避改回待执行并放回定时堆，否则标记为失败"""
+        now = datetime.now()
+        values = {
+            DelayedJob.last_error: f"{type(error).__name__}: {error}"[:2000],
+            DelayedJob.locked_by: None,
+            DelayedJob.locked_until: None,
+        }
+        if permanent:
+            values.update({DelayedJob.status: JOB_FAILED, DelayedJob.finished_at: now})
+            logger.error(f"延时任务失败，ID: {job.id}, 类型: {job.job_type}, 已执行 {job.attempts} 次: {error}")
+        else:
+            delay = min(RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), RETRY_MAX_SECONDS)
+            run_at = now + timedelta(seconds=delay)
+            values.update({DelayedJob.status: JOB_PENDING, DelayedJob.run_at: run_at})
+            logger.warning(f"延时任务执行出错，{delay} 秒后重试，ID: {job.id}, 类型: {job.job_type}: {error}")
+        db.query(DelayedJob).filter(DelayedJob.id == job.id).update(values, synchronize_session=False)
+        db.commit()
+        if not permanent:
+            with self._lock:
+                self._push(run_at, job.id)
+
+    def _load_upcoming(self, horizon: Optional[datetime] = None):
+        """把下次装入前将到期的待执行任务，以及租约已过期的执行中任务装入定时堆"""
+        now = datetime.now()
+        horizon = horizon or now + timedelta(seconds=self.poll_seconds)
+        db = SessionLocal()
+        try:
+            rows = db.query(DelayedJob.id, DelayedJob.run_at).filter(
+                and_(DelayedJob.status == JOB_PENDING, DelayedJob.run_at <= horizon)
+            ).order_by(DelayedJob.status, DelayedJob.run_at).limit(LOAD_LIMIT).all()
+            rows += db.query(DelayedJob.id, DelayedJob.run_at).filter(
+                and_(DelayedJob.status == JOB_RUNNING, DelayedJob.locked_until < now)
+            ).limit(LOAD_LIMIT).all()
+        finally:
+            db.close()
+        with self._lock:
+            for row in rows:
+                self._push(row.run_at, row.id)
+
+    def _push(self, run_at: datetime, job_id: int):
+        # 调用方持有锁；同一任务只保留最早的到期时间
+        queued = self._queued.get(job_id)
+        if queued is not None and queued <= run_at:
+            return
+        self._queued[job_id] = run_at
+        heapq.heappush(self._heap, (run_at, job_id))
+
+    def _pop_due(self, now: datetime, limit: int) -> List[int]:
+        job_ids = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(job_ids) < limit:
+                run_at, job_id = heapq.heappop(self._heap)
+                # 跳过已被更早到期时间替换的旧条目
+                if self._queued.get(job_id) == run_at:
+                    del self._queued[job_id]
+                    job_ids.append(job_id)
+        return job_ids
+
+    def _seconds_until_next(self) -> float:
+        with self._lock:
+            if not self._heap:
+                return float("inf")
+            return max((self._heap[0][0] - datetime.now()).total_seconds(), 0.0)
+
+    def _wake(self):
+        if self._loop is None or self._wakeup is None or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass
+
+
+delayed_job_service = DelayedJobService(
+    batch_size=settings.JOB_BATCH_SIZE,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    poll_seconds=settings.JOB_POLL_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS
+)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _notify_scheduled_jobs(session):
+    entries = session.info.pop(_SCHEDULED_KEY, None)
+    if entries:
+        delayed_job_service.notify(entries)
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _discard_scheduled_jobs(session, previous_transaction):
+    # 外层事务回滚时登记的任务一并作废（SAVEPOINT 回滚不影响已登记的任务；
+    # after_rollback 触发时外层事务尚未结束，无法用 in_transaction() 区分）
+    if previous_transaction.parent is None:
+        session.info.pop(_SCHEDULED_KEY, None)
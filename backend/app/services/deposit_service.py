@@ -1,16 +1,22 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import case
 from decimal import Decimal
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
 from ..models.user import User
 from ..models.deposit import Deposit, DepositLog
+from ..models.order import Order
 from ..models.wallet import WalletTransaction
 from ..schemas.deposit import (
     DepositResponse, DepositSummaryResponse, DepositListResponse,
     PayDepositRequest, RefundDepositRequest, DepositLogResponse
 )
 
+# 批量入账时每条 CASE 更新包含的用户数
+CREDIT_BATCH_SIZE = 500
+
+
 class DepositService:
     
     async def get_deposit_summary(self, user_id: int, db: Session) -> DepositSummaryResponse:
@@ -283,6 +289,85 @@ class DepositService:
         
         return True
     
+    async def settle_auction_deposits(
+        self,
+        db: Session,
+        auction_id: int,
+        winner_id: Optional[int] = None,
+        reason: str = "拍卖结束，退还未中标保证金"
+    ) -> Dict[str, Any]:
+        """拍卖结束批量结算保证金（不提交，随调用方事务提交）
+        
+        未中标者（流拍时为全部竞拍者）的活跃和冻结保证金退回余额；中标者的活跃保证金冻结，
+        付款后退还、支付超时没收（结算时中标订单已付款则直接退还）。
+        一次查询锁定该拍卖的全部保证金，按用户汇总后用一条 CASE 条件更新批量增加余额，
+        保证金状态各一条 UPDATE，DepositLog 和 WalletTransaction 批量插入，语句数与竞拍人数无关。
+        """
+        deposits = self._lock_auction_deposits(db, auction_id)
+        if winner_id is not None and self._winner_paid(db, auction_id, winner_id):
+            winner_id = None
+        
+        refunds = [row for row in deposits if row.user_id != winner_id]
+        holds = [row for row in deposits if row.user_id == winner_id and row.status == "active"]
+        
+        refunded, credits = self._refund_deposits(db, refunds, reason)
+        if holds:
+            db.query(Deposit).filter(Deposit.id.in_([row.id for row in holds])).update(
+                {Deposit.status: "frozen"}, synchronize_session=False
+            )
+            db.execute(DepositLog.__table__.insert(), [
+                {"deposit_id": row.id, "action": "freeze", "amount": row.amount, "reason": "拍卖中标，保证金冻结至付款完成"}
+                for row in holds
+            ])
+        
+        db.flush()
+        return {
+            "refunded": len(refunded),
+            "frozen": len(holds),
+            "users": len(credits),
+            "amount": sum(credits.values(), Decimal("0.00"))
+        }
+    
+    async def release_auction_deposits(
+        self,
+        db: Session,
+        auction_id: int,
+        user_id: int,
+        reason: str = "中标订单已付款，退还保证金"
+    ) -> int:
+        """退还用户在某拍卖的活跃和冻结保证金（中标订单付款后调用），返回退还笔数（不提交，随调用方事务提交）"""
+        deposits = self._lock_auction_deposits(db, auction_id, user_id)
+        refunded, _ = self._refund_deposits(db, deposits, reason)
+        db.flush()
+        return len(refunded)
+    
+    async def forfeit_auction_deposits(
+        self,
+        db: Session,
+        auction_id: int,
+        user_id: int,
+        reason: str = "中标后未按时付款，没收保证金"
+    ) -> int:
+        """没收用户在某拍卖的保证金，返回没收笔数（不提交，随调用方事务提交）"""
+        deposits = db.query(Deposit).filter(
+            Deposit.auction_id == auction_id,
+            Deposit.user_id == user_id,
+            Deposit.type == "auction",
+            Deposit.status.in_(["active", "frozen"])
+        ).all()
+        
+        for deposit in deposits:
+            deposit.status = "forfeited"
+            db.add(DepositLog(
+                deposit_id=deposit.id,
+                action="forfeit",
+                amount=deposit.amount,
+                reason=reason
+            ))
+        
+        db.flush()
+        return len(deposits)
+    
     async def get_deposit_logs(
         self, 
         deposit_id: int, 
@@ -305,4 +390,77 @@ class DepositService:
                 created_at=log.created_at
             ))
         
-        return log_list
\ No newline at end of file
+        return log_list
+
+    
+    def _lock_auction_deposits(self, db: Session, auction_id: int, user_id: Optional[int] = None) -> list:
+        """锁定拍卖的活跃和冻结保证金（可限定用户），只取结算需要的列"""
+        query = db.query(Deposit.id, Deposit.user_id, Deposit.amount, Deposit.status).filter(
+            Deposit.auction_id == auction_id,
+            Deposit.type == "auction",
+            Deposit.status.in_(["active", "frozen"])
+        )
+        if user_id is not None:
+            query = query.filter(Deposit.user_id == user_id)
+        return query.with_for_update().all()
+    
+    def _winner_paid(self, db: Session, auction_id: int, winner_id: int) -> bool:
+        return db.query(Order.id).filter(
+            Order.product_id == auction_id,
+            Order.buyer_id == winner_id,
+            Order.payment_status == 2
+        ).first() is not None
+    
+    def _refund_deposits(self, db: Session, deposits: list, reason: str) -> Tuple[list, Dict[int, Decimal]]:
+        """批量退还保证金：按用户汇总入账，保证金状态一条 UPDATE，日志和钱包流水批量插入
+        
+        返回实际退还的保证金行和每个用户的退还金额（用户不存在的保证金保持原状态）。
+        """
+        if not deposits:
+            return [], {}
+        now = datetime.now()
+        credits: Dict[int, Decimal] = {}
+        for row in deposits:
+            credits[row.user_id] = credits.get(row.user_id, Decimal("0.00")) + row.amount
+        balances = self._credit_balances(db, credits)
+        refunded = [row for row in deposits if row.user_id in balances]
+        credits = {user_id: amount for user_id, amount in credits.items() if user_id in balances}
+        if not refunded:
+            return [], {}
+        
+        db.query(Deposit).filter(Deposit.id.in_([row.id for row in refunded])).update(
+            {Deposit.status: "refunded", Deposit.refunded_at: now}, synchronize_session=False
+        )
+        db.execute(DepositLog.__table__.insert(), [
+            {"deposit_id": row.id, "action": "refund", "amount": row.amount, "reason": reason}
+            for row in refunded
+        ])
+        db.execute(WalletTransaction.__table__.insert(), [
+            {
+                "user_id": user_id,
+                "type": "recharge",
+                "amount": amount,
+                "balance_after": balances[user_id],
+                "description": f"退还保证金 {amount}元",
+                "status": "completed",
+                "completed_at": now
+            }
+            for user_id, amount in credits.items()
+        ])
+        return refunded, credits
+    
+    def _credit_balances(self, db: Session, credits: Dict[int, Decimal]) -> Dict[int, Decimal]:
+        """按用户批量增加余额（每批一条 CASE 条件更新），返回实际入账用户的最新余额"""
+        balances: Dict[int, Decimal] = {}
+        user_ids = sorted(credits)
+        for start in range(0, len(user_ids), CREDIT_BATCH_SIZE):
+            batch = user_ids[start:start + CREDIT_BATCH_SIZE]
+            db.query(User).filter(User.id.in_(batch)).update(
+                {User.balance: User.balance + case({user_id: credits[user_id] for user_id in batch}, value=User.id)},
+                synchronize_session=False
+            )
+            balances.update(db.query(User.id, User.balance).filter(User.id.in_(batch)).all())
+        return balances
+
+
+deposit_service = DepositService()
@@ -0,0 +1,137 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import desc, event, inspect
+from typing import Any, Dict, Optional, Set, Tuple
+from itertools import chain
+import threading
+
+from ..core.cache import TTLCache
+from ..core.read_replica import RoutingSession
+from ..models.product import SpecialEvent, EventProduct, Product
+from .product_card_service import product_card_cache
+
+# 会话中待提交的专场变更（提交后失效对应目录）
+_CHANGED_EVENTS_KEY = "event_catalog.changed_event_ids"
+
+
+class EventCatalog:
+    """专场商品目录
+
+    每个专场物化一份排好序的商品ID列表（按 sort_order、上架时间倒序）和专场基本信息，
+    分页只需对列表切片，再从共享的商品卡片缓存中批量取卡片，不再 JOIN、COUNT 和 OFFSET。
+    通过 ORM 写入专场或专场商品后，会话提交时自动调用 invalidate_event（批量 UPDATE/DELETE 语句需手动调用），
+    商品删除时自动失效包含它的专场，其他进程的目录由 TTL 兜底。
+    """
+
+    def __init__(self, ttl: float = 300.0, maxsize: int = 512):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # 商品ID -> 包含它的已物化专场；专场ID -> 物化时的商品ID（失效或过期时据此清理反向索引）
+        self._product_event_ids: Dict[int, Set[int]] = {}
+        self._event_product_ids: Dict[int, Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+
+    def get_page(self, db: Session, event_id: int, page: int = 1, page_size: int = 20) -> Optional[Dict[str, Any]]:
+        """获取专场商品分页，专场不存在时返回 None"""
+        catalog = self.cache.get(event_id)
+        if catalog is None:
+            catalog = self.materialize(db, event_id)
+            if catalog is None:
+                return None
+
+        product_ids = catalog["product_ids"]
+        page_ids = product_ids[(page - 1) * page_size:page * page_size]
+        cards = product_card_cache.get_cards(db, page_ids)
+        total = len(product_ids)
+        return {
+            "items": [cards[product_id] for product_id in page_ids if product_id in cards],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size,
+            "event": catalog["event"],
+        }
+
+    def materialize(self, db: Session, event_id: int) -> Optional[Dict[str, Any]]:
+        """重建专场的商品ID列表（专场上线前可调用预热）"""
+        event = db.query(
+            SpecialEvent.id, SpecialEvent.title, SpecialEvent.description, SpecialEvent.banner_image
+        ).filter(SpecialEvent.id == event_id).first()
+        if not event:
+            return None
+
+        rows = db.query(EventProduct.product_id).join(
+            Product, Product.id == EventProduct.product_id
+        ).filter(EventProduct.event_id == event_id).order_by(
+            EventProduct.sort_order, desc(Product.created_at)
+        ).all()
+        catalog = {
+            "product_ids": tuple(row.product_id for row in rows),
+            "event": {
+                "id": event.id,
+                "title": event.title,
+                "description": event.description,
+                "banner_image": event.banner_image,
+            },
+        }
+        self.cache.set(event_id, catalog)
+        with self._lock:
+            # 顺带清理已过期或被淘汰的专场
+            for stale_id in [key for key in self._event_product_ids if key != event_id and self.cache.get(key) is None]:
+                self._unindex(stale_id)
+            self._unindex(event_id)
+            self._event_product_ids[event_id] = catalog["product_ids"]
+            for product_id in catalog["product_ids"]:
+                self._product_event_ids.setdefault(product_id, set()).add(event_id)
+        return catalog
+
+    def invalidate_event(self, event_id: int):
+        """专场信息或专场商品变更时失效目录"""
+        self.cache.delete(event_id)
+        with self._lock:
+            self._unindex(event_id)
+
+    def remove_product(self, product_id: int):
+        """商品删除后失效包含它的专场目录和商品卡片"""
+        with self._lock:
+            event_ids = self._product_event_ids.pop(product_id, set())
+            for event_id in event_ids:
+                self.cache.delete(event_id)
+                self._unindex(event_id)
+        product_card_cache.invalidate(product_id)
+
+    def _unindex(self, event_id: int):
+        """从反向索引中移除专场（调用方持有锁）"""
+        for product_id in self._event_product_ids.pop(event_id, ()):
+            event_ids = self._product_event_ids.get(product_id)
+            if event_ids is not None:
+                event_ids.discard(event_id)
+                if not event_ids:
+                    del self._product_event_ids[product_id]
+
+
+event_catalog = EventCatalog()
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _collect_changed_events(session, flush_context, instances):
+    changed = session.info.setdefault(_CHANGED_EVENTS_KEY, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, EventProduct):
+            # 调整到其他专场时新旧专场都失效
+            changed.update(inspect(obj).attrs.event_id.history.deleted or ())
+            changed.add(obj.event_id)
+        elif isinstance(obj, SpecialEvent):
+            changed.add(obj.id)
+    changed.discard(None)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_changed_events(session):
+    for event_id in session.info.pop(_CHANGED_EVENTS_KEY, ()):
+        event_catalog.invalidate_event(event_id)
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _discard_changed_events(session, previous_transaction):
+    # 只在外层事务回滚时丢弃（SAVEPOINT 回滚不影响外层已 flush 的变更）
+    if previous_transaction.parent is None:
+        session.info.pop(_CHANGED_EVENTS_KEY, None)
@@ -0,0 +1,307 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import List, Optional, Dict, Tuple, Iterable
+from datetime import datetime, timedelta
+import heapq
+import logging
+import math
+import threading
+import time
+
+from ..core.database import SessionLocal
+from ..models.local_service import LocalServicePost
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """两点间球面距离（公里）"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGridIndex:
+    """经纬度网格索引
+
+    按固定大小的经纬度网格分桶，支持增量插入/删除、半径查询和K近邻查询。
+    半径查询只扫描外接矩形覆盖的网格；K近邻按网格环逐圈向外扩展，
+    直到第K个候选点的距离不超过已覆盖区域的最小半径为止。
+    """
+
+    def __init__(self, cell_degrees: float = 0.05):
+        self.cell_degrees = cell_degrees
+        # (行, 列) -> {id: (lat, lng, 分类)}
+        self._cells: Dict[Tuple[int, int], Dict[int, Tuple[float, float, Optional[str]]]] = {}
+        self._item_cells: Dict[int, Tuple[int, int]] = {}
+        # 出现过点的网格行列范围（只扩不缩，用于限定K近邻的扩展圈数）
+        self._bounds: Optional[List[int]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._item_cells)
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            self._cells.clear()
+            self._item_cells.clear()
+            self._bounds = None
+
+    def upsert(self, item_id: int, lat: float, lng: float, category: Optional[str] = None):
+        """插入或更新一个点"""
+        cell = self._cell_of(lat, lng)
+        with self._lock:
+            old_cell = self._item_cells.get(item_id)
+            if old_cell is not None and old_cell != cell:
+                self._cells[old_cell].pop(item_id, None)
+                if not self._cells[old_cell]:
+                    del self._cells[old_cell]
+            self._cells.setdefault(cell, {})[item_id] = (lat, lng, category)
+            self._item_cells[item_id] = cell
+            if self._bounds is None:
+                self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+            else:
+                self._bounds[0] = min(self._bounds[0], cell[0])
+                self._bounds[1] = max(self._bounds[1], cell[0])
+                self._bounds[2] = min(self._bounds[2], cell[1])
+                self._bounds[3] = max(self._bounds[3], cell[1])
+
+    def remove(self, item_id: int):
+        """删除一个点"""
+        with self._lock:
+            cell = self._item_cells.pop(item_id, None)
+            if cell is None:
+                return
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.pop(item_id, None)
+                if not bucket:
+                    del self._cells[cell]
+
+    def within_radius(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        categories: Optional[Iterable[str]] = None
+    ) -> List[Tuple[float, int]]:
+        """半径查询，返回按距离升序的 (距离公里, id) 列表"""
+        categories = set(categories) if categories else None
+        lat_span = radius_km / KM_PER_DEGREE
+        lng_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + lat_span, 89.9))), 1e-6))
+
+        min_row, min_col = self._cell_of(lat - lat_span, lng - lng_span)
+        max_row, max_col = self._cell_of(lat + lat_span, lng + lng_span)
+
+        results = []
+        with self._lock:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    bucket = self._cells.get((row, col))
+                    if not bucket:
+                        continue
+                    for item_id, (item_lat, item_lng, category) in bucket.items():
+                        if categories is not None and category not in categories:
+                            continue
+                        distance = haversine_km(lat, lng, item_lat, item_lng)
+                        if distance <= radius_km:
+                            results.append((distance, item_id))
+        results.sort()
+        return results
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        categories: Optional[Iterable[str]] = None,
+        max_radius_km: Optional[float] = None
+    ) -> List[Tuple[float, int]]:
+        """K近邻查询，返回按距离升序的 (距离公里, id) 列表"""
+        if k <= 0:
+            return []
+        categories = set(categories) if categories else None
+        center_row, center_col = self._cell_of(lat, lng)
+
+        with self._lock:
+            if not self._cells:
+                return []
+            min_row, max_row, min_col, max_col = self._bounds
+            max_ring = max(
+                abs(center_row - min_row), abs(center_row - max_row),
+                abs(center_col - min_col), abs(center_col - max_col)
+            )
+
+            # 最大堆保存当前最近的k个点（距离取负）
+            best: List[Tuple[float, int]] = []
+            ring = 0
+            while ring <= max_ring:
+                for cell in self._ring_cells(center_row, center_col, ring):
+                    bucket = self._cells.get(cell)
+                    if not bucket:
+                        continue
+                    for item_id, (item_lat, item_lng, category) in bucket.items():
+                        if categories is not None and category not in categories:
+                            continue
+                        distance = haversine_km(lat, lng, item_lat, item_lng)
+                        if max_radius_km is not None and distance > max_radius_km:
+                            continue
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance, item_id))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, item_id))
+
+                covered_km = self._covered_radius_km(lat, ring)
+                if len(best) >= k and -best[0][0] <= covered_km:
+                    break
+                if max_radius_km is not None and covered_km >= max_radius_km:
+                    break
+                ring += 1
+
+        return sorted((-neg_distance, item_id) for neg_distance, item_id in best)
+
+    def _cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def _ring_cells(self, center_row: int, center_col: int, ring: int):
+        """第ring圈上的网格"""
+        if ring == 0:
+            yield (center_row, center_col)
+            return
+        for col in range(center_col - ring, center_col + ring + 1):
+            yield (center_row - ring, col)
+            yield (center_row + ring, col)
+        for row in range(center_row - ring + 1, center_row + ring):
+            yield (row, center_col - ring)
+            yield (row, center_col + ring)
+
+    def _covered_radius_km(self, lat: float, ring: int) -> float:
+        """扫描完第ring圈后，以查询点为圆心一定已被完整覆盖的半径"""
+        span_degrees = ring * self.cell_degrees
+        lat_km = span_degrees * KM_PER_DEGREE
+        far_lat = min(abs(lat) + span_degrees + self.cell_degrees, 89.9)
+        lng_km = span_degrees * KM_PER_DEGREE * math.cos(math.radians(far_lat))
+        return min(lat_km, lng_km)
+
+
+class LocalServiceGeoIndex:
+    """同城服务地理索引
+
+    应用启动时在后台线程从数据库全量加载正常状态且有坐标的服务（加载完成前到达的附近查询等待同一次加载，
+    不在请求中重复加载），之后由创建、更新、删除钩子增量维护；同时按 updated_at 定期增量同步，以便感知其他进程的写入。
+    """
+
+    def __init__(self, cell_degrees: float = 0.05, sync_interval: float = 30.0):
+        self.index = GeoGridIndex(cell_degrees=cell_degrees)
+        self.sync_interval = sync_interval
+        self._loaded = False
+        self._last_sync_at: Optional[datetime] = None
+        self._last_sync_check = 0.0
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self, db: Session):
+        """确保索引已加载，并按间隔做增量同步"""
+        if self._loaded and time.monotonic() - self._last_sync_check < self.sync_interval:
+            return
+        with self._lock:
+            if not self._loaded:
+                self.rebuild(db)
+            elif time.monotonic() - self._last_sync_check >= self.sync_interval:
+                self._sync_since(db, self._last_sync_at)
+
+    def start_loading(self) -> bool:
+        """在后台线程加载索引（应用启动时调用），已加载时不重复加载"""
+        if self._loaded:
+            return False
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+        return True
+
+    def rebuild(self, db: Session):
+        """全量重建索引"""
+        started_at = datetime.now()
+        self.index.clear()
+        self._sync_since(db, None)
+        self._loaded = True
+        logger.info(f"同城服务地理索引已重建，共 {len(self.index)} 个点，耗时 {datetime.now() - started_at}")
+
+    def on_service_saved(self, service: LocalServicePost):
+        """服务创建/更新钩子"""
+        if not self._loaded:
+            return
+        if service.status == 1 and service.latitude is not None and service.longitude is not None:
+            self.index.upsert(service.id, float(service.latitude), float(service.longitude), service.service_type)
+        else:
+            self.index.remove(service.id)
+
+    def on_service_deleted(self, service_id: int):
+        """服务删除钩子"""
+        if self._loaded:
+            self.index.remove(service_id)
+
+    def search(
+        self,
+        db: Session,
+        lat: float,
+        lng: float,
+        radius_km: Optional[float] = None,
+        limit: Optional[int] = None,
+        service_type: Optional[str] = None
+    ) -> List[Tuple[float, int]]:
+        """查找附近服务，返回按距离升序的 (距离公里, 服务ID)"""
+        self.ensure_loaded(db)
+        categories = [service_type] if service_type else None
+        if limit is not None:
+            return self.index.nearest(lat, lng, limit, categories, max_radius_km=radius_km)
+        if radius_km is None:
+            raise ValueError("半径和数量至少需要指定一个")
+        return self.index.within_radius(lat, lng, radius_km, categories)
+
+    def _load_in_background(self):
+        db = SessionLocal()
+        try:
+            self.ensure_loaded(db)
+        except Exception as e:
+            logger.error(f"同城服务地理索引后台加载失败: {e}")
+        finally:
+            db.close()
+
+    def _sync_since(self, db: Session, since: Optional[datetime]):
+        """加载 since 之后变更过的服务（since 为空时全量加载）"""
+        sync_started_at = datetime.now()
+        query = db.query(
+            LocalServicePost.id,
+            LocalServicePost.latitude,
+            LocalServicePost.longitude,
+            LocalServicePost.service_type,
+            LocalServicePost.status
+        )
+        if since is None:
+            query = query.filter(
+                and_(
+                    LocalServicePost.status == 1,
+                    LocalServicePost.latitude.isnot(None),
+                    LocalServicePost.longitude.isnot(None)
+                )
+            )
+        else:
+            # 留出时钟误差余量，重复处理是幂等的
+            query = query.filter(LocalServicePost.updated_at >= since - timedelta(seconds=5))
+
+        for row in query.yield_per(10000):
+            if row.status == 1 and row.latitude is not None and row.longitude is not None:
+                self.index.upsert(row.id, float(row.latitude), float(row.longitude), row.service_type)
+            else:
+                self.index.remove(row.id)
+
+        self._last_sync_at = sync_started_at
+        self._last_sync_check = time.monotonic()
+
+
+local_service_geo_index = LocalServiceGeoIndex()
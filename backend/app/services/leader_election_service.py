@@ -0,0 +1,317 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.job import LeaderLease
+
+logger = logging.getLogger(__name__)
+
+TaskFactory = Callable[[], Awaitable[None]]
+
+
+class LeadershipLost(Exception):
+    """当前进程已不再持有租约（防护令牌校验失败）"""
+
+
+class MemoryLeaseBackend:
+    """进程内租约（单进程部署和检查脚本使用），clock 可替换为模拟时钟"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._leases: Dict[str, Tuple[str, int, float]] = {}
+        self._tokens: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, name: str, holder: str, ttl: float) -> Optional[int]:
+        with self._lock:
+            now = self.clock()
+            current = self._leases.get(name)
+            if current and current[0] != holder and current[2] > now:
+                return None
+            if current and current[0] == holder:
+                token = current[1]
+            else:
+                token = self._tokens[name] = self._tokens.get(name, 0) + 1
+            self._leases[name] = (holder, token, now + ttl)
+            return token
+
+    def release(self, name: str, holder: str, token: int):
+        with self._lock:
+            current = self._leases.get(name)
+            if current and current[:2] == (holder, token):
+                del self._leases[name]
+
+    def check(self, name: str, holder: str, token: int, db: Optional[Session] = None) -> bool:
+        with self._lock:
+            current = self._leases.get(name)
+            return bool(current) and current[:2] == (holder, token) and current[2] > self.clock()
+
+
+class DatabaseLeaseBackend:
+    """数据库租约：leader_leases 表每个租约一行，按读到的持有者和令牌做条件 UPDATE 抢占或续约
+
+    持有者变更时防护令牌加一；fence 校验时对租约行加行锁（SELECT ... FOR UPDATE），
+    锁持有到调用方事务提交，期间其他进程无法接管，保证旧主进程的写入不会与新主进程交错。
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+
+    def acquire(self, name: str, holder: str, ttl: float) -> Optional[int]:
+        now = datetime.now()
+        expires_at = now + timedelta(seconds=ttl)
+        db = self.session_factory()
+        try:
+            row = db.query(LeaderLease).filter(LeaderLease.name == name).first()
+            if row is None:
+                # 首次选举
+                db.add(LeaderLease(
+                    name=name, holder=holder, fencing_token=1, expires_at=expires_at, acquired_at=now, renewed_at=now
+                ))
+                db.commit()
+                return 1
+
+            if row.holder == holder:
+                token, values = row.fencing_token, {}
+            elif row.expires_at < now:
+                token, values = row.fencing_token + 1, {LeaderLease.holder: holder, LeaderLease.acquired_at: now}
+            else:
+                return None
+            values.update({
+                LeaderLease.fencing_token: token,
+                LeaderLease.expires_at: expires_at,
+                LeaderLease.renewed_at: now
+            })
+            # 以读到的持有者和令牌为条件更新，并发抢占时只有一个进程成功
+            updated = db.query(LeaderLease).filter(
+                and_(
+                    LeaderLease.name == name,
+                    LeaderLease.holder == row.holder,
+                    LeaderLease.fencing_token == row.fencing_token
+                )
+            ).update(values, synchronize_session=False)
+            db.commit()
+            return token if updated else None
+        except IntegrityError:
+            # 其他进程同时完成了首次选举
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def release(self, name: str, holder: str, token: int):
+        db = self.session_factory()
+        try:
+            # 保留持有者和令牌，下次由其他进程接管时令牌照常递增
+            db.query(LeaderLease).filter(
+                and_(LeaderLease.name == name, LeaderLease.holder == holder, LeaderLease.fencing_token == token)
+            ).update({LeaderLease.expires_at: datetime.now() - timedelta(seconds=1)}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def check(self, name: str, holder: str, token: int, db: Optional[Session] = None) -> bool:
+        if db is None:
+            db = self.session_factory()
+            try:
+                return self.check(name, holder, token, db)
+            finally:
+                db.close()
+        return db.query(LeaderLease.name).filter(
+            and_(
+                LeaderLease.name == name,
+                LeaderLease.holder == holder,
+                LeaderLease.fencing_token == token,
+                LeaderLease.expires_at > datetime.now()
+            )
+        ).with_for_update().first() is not None
+
+
+class RedisLeaseBackend:
+    """Redis 租约：SET NX PX 抢占，Lua 脚本比较持有者后续约/释放，令牌保存在独立的自增键"""
+
+    ACQUIRE_SCRIPT = """
+    local holder = redis.call('GET', KEYS[1])
+    if holder == ARGV[1] then
+        redis.call('PEXPIRE', KEYS[1], ARGV[2])
+        return tonumber(redis.call('GET', KEYS[2]))
+    elseif not holder then
+        redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+        return redis.call('INCR', KEYS[2])
+    end
+    return nil
+    """
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] and redis.call('GET', KEYS[2]) == ARGV[2] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, prefix: str = "petshop:leader:"):
+        import redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._acquire = self.client.register_script(self.ACQUIRE_SCRIPT)
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def acquire(self, name: str, holder: str, ttl: float) -> Optional[int]:
+        token = self._acquire(keys=self._keys(name), args=[holder, int(ttl * 1000)])
+        return int(token) if token is not None else None
+
+    def release(self, name: str, holder: str, token: int):
+        self._release(keys=self._keys(name), args=[holder, str(token)])
+
+    def check(self, name: str, holder: str, token: int, db: Optional[Session] = None) -> bool:
+        current_holder, current_token = self.client.mget(self._keys(name))
+        return current_holder == holder and current_token == str(token)
+
+    def _keys(self, name: str):
+        return [f"{self.prefix}{name}", f"{self.prefix}{name}:token"]
+
+
+class LeaderElector:
+    """基于租约的主进程选举
+
+    每个进程按 renew_seconds 间隔尝试抢占或续约同名租约，持有租约期间运行通过 add_task 注册的后台循环，
+    续约失败（被接管或租约已过本地有效期）时立即取消这些循环；主进程正常退出时释放租约，其他进程在下次尝试时接管，
+    异常退出时在租约到期（lease_seconds）后接管。
+    每次成为主进程都会得到递增的防护令牌，后台循环在写入前调用 fence(db) 校验令牌，过期的主进程写入会被拒绝。
+    """
+
+    def __init__(self, name: str, backend, lease_seconds: float = 10, renew_seconds: Optional[float] = None):
+        self.name = name
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds or lease_seconds / 3
+        self.holder_id = f"{socket.gethostname()[:32]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.token: Optional[int] = None
+        self._valid_until = 0.0
+        self._factories: Dict[str, TaskFactory] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._runner: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None and time.monotonic() < self._valid_until
+
+    def add_task(self, name: str, factory: TaskFactory):
+        """注册只在主进程上运行的后台循环（factory 返回协程）"""
+        self._factories[name] = factory
+
+    def fence(self, db: Session):
+        """校验当前进程仍是主进程且令牌未变（数据库后端会锁住租约行直到调用方事务结束），否则抛出 LeadershipLost"""
+        token = self.token
+        if token is None or not self.is_leader or not self.backend.check(self.name, self.holder_id, token, db):
+            raise LeadershipLost(f"{self.name} 租约已不属于当前进程（令牌 {token}）")
+
+    def start(self):
+        """在当前事件循环中启动选举循环"""
+        if self._runner is not None and not self._runner.done():
+            return
+        self._runner = asyncio.get_running_loop().create_task(self.run_forever())
+
+    async def stop(self):
+        """停止选举循环，取消后台循环并释放租约"""
+        if self._stopping is not None:
+            self._stopping.set()
+        if self._runner is not None:
+            await self._runner
+            self._runner = None
+
+    async def run_forever(self):
+        self._stopping = asyncio.Event()
+        try:
+            while not self._stopping.is_set():
+                await self._tick()
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.renew_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            token = self.token
+            await self._step_down("进程退出")
+            if token is not None:
+                try:
+                    await asyncio.to_thread(self.backend.release, self.name, self.holder_id, token)
+                except Exception as e:
+                    logger.warning(f"释放租约 {self.name} 失败: {e}")
+
+    # 私有方法
+    async def _tick(self):
+        started = time.monotonic()
+        try:
+            # 数据库后端可能等待行锁，放到线程中执行，不阻塞事件循环
+            token = await asyncio.to_thread(self.backend.acquire, self.name, self.holder_id, self.lease_seconds)
+        except Exception as e:
+            logger.error(f"租约 {self.name} 续约失败: {e}")
+            if self.token is not None and time.monotonic() >= self._valid_until:
+                await self._step_down("续约失败且租约已到期")
+            return
+
+        if token is None:
+            if self.token is not None:
+                await self._step_down("租约已被其他进程接管")
+            return
+        if self.token is not None and token != self.token:
+            await self._step_down("租约曾过期，令牌已变化")
+        # 本地有效期从发起请求时算起，略短于租约实际到期时间
+        self._valid_until = started + self.lease_seconds
+        if self.token is None:
+            self.token = token
+            logger.info(f"成为 {self.name} 主进程，令牌 {token}，进程标识 {self.holder_id}")
+        self._ensure_tasks()
+
+    def _ensure_tasks(self):
+        """启动未运行的后台循环（意外退出的循环在下次续约时重启）"""
+        loop = asyncio.get_running_loop()
+        for name, factory in self._factories.items():
+            task = self._tasks.get(name)
+            if task is None or task.done():
+                if task is not None and not task.cancelled() and task.exception() is not None:
+                    logger.error(f"后台循环 {name} 异常退出，已重启: {task.exception()}")
+                self._tasks[name] = loop.create_task(factory(), name=f"{self.name}:{name}")
+
+    async def _step_down(self, reason: str):
+        if self.token is None and not self._tasks:
+            return
+        if self.token is not None:
+            logger.warning(f"不再是 {self.name} 主进程（{reason}），停止后台循环")
+        self.token = None
+        self._valid_until = 0.0
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_lease_backend(kind: str):
+    """按配置创建租约后端"""
+    if kind == "redis":
+        return RedisLeaseBackend(settings.REDIS_URL)
+    if kind == "memory":
+        return MemoryLeaseBackend()
+    if kind == "database":
+        return DatabaseLeaseBackend()
+    raise ValueError(f"不支持的选举后端: {kind}，可选值: database, redis, memory")
+
+
+leader_elector = LeaderElector(
+    "background",
+    create_lease_backend(settings.LEADER_ELECTION_BACKEND),
+    lease_seconds=settings.LEADER_LEASE_SECONDS
+)
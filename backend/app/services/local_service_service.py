@@ -17,6 +17,61 @@ from ..schemas.local_service import (
     PetSocialCommentCreate, PetSocialCommentResponse,
     ServiceTypesResponse, ServiceType
 )
+from ..core.http_cache import VersionStamp, make_etag
+from .geo_service import local_service_geo_index
+from .membership_service import membership_service
+
+# 按距离查询时的默认半径（公里）
+DEFAULT_NEARBY_RADIUS_KM = 10.0
+
+# 服务类型（固定配置）
+SERVICE_TYPES = [
+    ServiceType(
+        key="pet_social",
+        name="宠物交流",
+        description="分享宠物心得，交流养宠经验"
+    ),
+    ServiceType(
+        key="local_store",
+        name="本地宠店",
+        description="发现附近优质宠物店"
+    ),
+    ServiceType(
+        key="aquarium_design",
+        name="鱼缸造景",
+        description="专业水族造景设计服务"
+    ),
+    ServiceType(
+        key="door_service",
+        name="上门服务",
+        description="专业宠物上门服务"
+    ),
+    ServiceType(
+        key="breeding",
+        name="宠物配种",
+        description="寻找理想的宠物伴侣"
+    ),
+    ServiceType(
+        key="pickup",
+        name="同城快取",
+        description="快速自取服务"
+    ),
+    ServiceType(
+        key="valuation",
+        name="宠物估价",
+        description="专业宠物估价服务"
+    ),
+    ServiceType(
+        key="nearby",
+        name="附近",
+        description="发现身边好物"
+    )
+]
+
+# 服务类型版本戳，由内容计算，配置变化时客户端缓存随之失效
+SERVICE_TYPES_VERSION = VersionStamp(
+    tag=make_etag(ServiceTypesResponse(items=SERVICE_TYPES).model_dump_json())
+)
 
 
 class LocalServiceService:
@@ -40,6 +95,7 @@ class LocalServiceService:
         db.add(db_service)
         db.commit()
         db.refresh(db_service)
+        local_service_geo_index.on_service_saved(db_service)
         
         return await self._format_local_service_response(db, db_service, user_id)
 
@@ -52,9 +108,19 @@ class LocalServiceService:
         keyword: Optional[str] = None,
         page: int = 1,
         page_size: int = 20,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        radius: Optional[float] = None,
+        nearest: Optional[int] = None
     ) -> Dict[str, Any]:
-        """获取同城服务列表"""
+        """获取同城服务列表，传入经纬度时按距离由近到远排序，nearest 为只取最近的N个服务"""
+        if lat is not None and lng is not None:
+            return await self._get_nearby_local_services(
+                db, lat, lng, radius, nearest,
+                service_type, city, district, keyword, page, page_size, user_id
+            )
+        
         query = db.query(LocalServicePost).filter(LocalServicePost.status == 1)
         
         if service_type:
@@ -79,10 +145,87 @@ class LocalServiceService:
         services = query.order_by(desc(LocalServicePost.created_at)).offset(offset).limit(page_size).all()
         
         # 格式化响应
-        items = []
-        for service in services:
-            formatted_service = await self._format_local_service_response(db, service, user_id)
-            items.append(formatted_service)
+        items = await self._format_local_service_responses(db, services, user_id)
+        
+        return {
+            "items": items,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size
+        }
+
+    async def _get_nearby_local_services(
+        self,
+        db: Session,
+        lat: float,
+        lng: float,
+        radius: Optional[float],
+        nearest: Optional[int],
+        service_type: Optional[str],
+        city: Optional[str],
+        district: Optional[str],
+        keyword: Optional[str],
+        page: int,
+        page_size: int,
+        user_id: Optional[int]
+    ) -> Dict[str, Any]:
+        """通过地理索引获取附近的同城服务
+
+        nearest 为空时返回半径内的全部服务（默认10公里）；指定 nearest 时返回最近的N个，
+        未指定半径则不限距离（有其他筛选条件时在默认半径内筛选后取前N个）。
+        """
+        filtered = bool(city or district or keyword)
+        if nearest and not filtered:
+            hits = local_service_geo_index.search(
+                db, lat, lng, radius_km=radius, limit=nearest, service_type=service_type
+            )
+        else:
+            hits = local_service_geo_index.search(
+                db, lat, lng, radius_km=radius or DEFAULT_NEARBY_RADIUS_KM, service_type=service_type
+            )
+        
+        # 其他筛选条件在候选集上由数据库过滤，保持距离顺序
+        if filtered:
+            matched_ids = set()
+            candidate_ids = [service_id for _, service_id in hits]
+            for start in range(0, len(candidate_ids), 1000):
+                query = db.query(LocalServicePost.id).filter(
+                    LocalServicePost.id.in_(candidate_ids[start:start + 1000]),
+                    LocalServicePost.status == 1
+                )
+                if city:
+                    query = query.filter(LocalServicePost.city == city)
+                if district:
+                    query = query.filter(LocalServicePost.district == district)
+                if keyword:
+                    query = query.filter(
+                        or_(
+                            LocalServicePost.title.contains(keyword),
+                            LocalServicePost.description.contains(keyword)
+                        )
+                    )
+                matched_ids.update(row.id for row in query.all())
+            hits = [hit for hit in hits if hit[1] in matched_ids]
+            if nearest:
+                hits = hits[:nearest]
+        
+        total = len(hits)
+        offset = (page - 1) * page_size
+        page_hits = hits[offset:offset + page_size]
+        
+        services = {
+            service.id: service for service in db.query(LocalServicePost).filter(
+                LocalServicePost.id.in_([service_id for _, service_id in page_hits]),
+                LocalServicePost.status == 1
+            ).all()
+        } if page_hits else {}
+        
+        page_services = [services[service_id] for _, service_id in page_hits if service_id in services]
+        distances = {service_id: distance for distance, service_id in page_hits}
+        items = await self._format_local_service_responses(db, page_services, user_id)
+        for item in items:
+            item.distance = round(distances[item.id], 3)
         
         return {
             "items": items,
@@ -121,9 +264,9 @@ class LocalServiceService:
         user_id: int
     ) -> Optional[LocalServiceResponse]:
         """更新同城服务"""
-        service = db.query(LocalService).filter(
-            LocalService.id == service_id,
-            LocalService.user_id == user_id
+        service = db.query(LocalServicePost).filter(
+            LocalServicePost.id == service_id,
+            LocalServicePost.user_id == user_id
         ).first()
         
         if not service:
@@ -135,14 +278,15 @@ class LocalServiceService:
         
         db.commit()
         db.refresh(service)
+        local_service_geo_index.on_service_saved(service)
         
         return await self._format_local_service_response(db, service, user_id)
 
     async def delete_local_service(self, db: Session, service_id: int, user_id: int) -> bool:
         """删除同城服务"""
-        service = db.query(LocalService).filter(
-            LocalService.id == service_id,
-            LocalService.user_id == user_id
+        service = db.query(LocalServicePost).filter(
+            LocalServicePost.id == service_id,
+            LocalServicePost.user_id == user_id
         ).first()
         
         if not service:
@@ -150,6 +294,7 @@ class LocalServiceService:
         
         service.status = 3  # 标记为删除
         db.commit()
+        local_service_geo_index.on_service_deleted(service.id)
         return True
 
     # 宠物交流相关方法
@@ -206,10 +351,7 @@ class LocalServiceService:
         ).offset(offset).limit(page_size).all()
         
         # 格式化响应
-        items = []
-        for post in posts:
-            formatted_post = await self._format_pet_social_post_response(db, post, user_id)
-            items.append(formatted_post)
+        items = await self._format_pet_social_post_responses(db, posts, user_id)
         
         return {
             "items": items,
@@ -250,7 +392,7 @@ class LocalServiceService:
     ) -> LocalServiceCommentResponse:
         """创建同城服务评论"""
         # 检查服务是否存在
-        service = db.query(LocalService).filter(LocalService.id == service_id).first()
+        service = db.query(LocalServicePost).filter(LocalServicePost.id == service_id).first()
         if not service:
             raise HTTPException(status_code=404, detail="服务不存在")
         
@@ -304,7 +446,7 @@ class LocalServiceService:
     # 点赞相关方法
     async def toggle_local_service_like(self, db: Session, service_id: int, user_id: int) -> Dict[str, Any]:
         """切换同城服务点赞状态"""
-        service = db.query(LocalService).filter(LocalService.id == service_id).first()
+        service = db.query(LocalServicePost).filter(LocalServicePost.id == service_id).first()
         if not service:
             raise HTTPException(status_code=404, detail="服务不存在")
         
@@ -365,115 +507,75 @@ class LocalServiceService:
     # 获取服务类型列表
     async def get_service_types(self) -> ServiceTypesResponse:
         """获取服务类型列表"""
-        service_types = [
-            ServiceType(
-                key="pet_social",
-                name="宠物交流",
-                description="分享宠物心得，交流养宠经验"
-            ),
-            ServiceType(
-                key="local_store",
-                name="本地宠店",
-                description="发现附近优质宠物店"
-            ),
-            ServiceType(
-                key="aquarium_design",
-                name="鱼缸造景",
-                description="专业水族造景设计服务"
-            ),
-            ServiceType(
-                key="door_service",
-                name="上门服务",
-                description="专业宠物上门服务"
-            ),
-            ServiceType(
-                key="breeding",
-                name="宠物配种",
-                description="寻找理想的宠物伴侣"
-            ),
-            ServiceType(
-                key="pickup",
-                name="同城快取",
-                description="快速自取服务"
-            ),
-            ServiceType(
-                key="valuation",
-                name="宠物估价",
-                description="专业宠物估价服务"
-            ),
-            ServiceType(
-                key="nearby",
-                name="附近",
-                description="发现身边好物"
-            )
-        ]
-        
-        return ServiceTypesResponse(items=service_types)
+        return ServiceTypesResponse(items=SERVICE_TYPES)
+
+    def get_service_types_version(self, db: Session) -> VersionStamp:
+        """服务类型列表的版本戳"""
+        return SERVICE_TYPES_VERSION
 
     # 私有方法：格式化响应
     async def _format_local_service_response(
         self, 
         db: Session, 
-        service: LocalService, 
+        service: LocalServicePost, 
         user_id: Optional[int] = None
     ) -> LocalServiceResponse:
         """格式化同城服务响应"""
-        # 获取用户信息
-        user_info = None
-        if service.user:
-            user_info = {
-                "id": service.user.id,
-                "nickname": service.user.nickname or service.user.username,
-                "avatar": service.user.avatar,
-                "phone": service.user.phone
-            }
+        items = await self._format_local_service_responses(db, [service], user_id)
+        return items[0]
+
+    async def _format_local_service_responses(
+        self,
+        db: Session,
+        services: List[LocalServicePost],
+        user_id: Optional[int] = None
+    ) -> List[LocalServiceResponse]:
+        """批量格式化同城服务响应，作者和点赞/收藏状态每类只查询一次"""
+        service_ids = [service.id for service in services]
+        authors = membership_service.load_authors(db, [service.user_id for service in services])
         
         # 检查是否已点赞/收藏（需要登录用户）
-        is_liked = None
-        is_favorited = None
+        liked_ids = set()
+        favorited_ids = set()
         if user_id:
-            is_liked = db.query(LocalServiceLike).filter(
-                LocalServiceLike.service_id == service.id,
-                LocalServiceLike.user_id == user_id
-            ).first() is not None
-            
-            is_favorited = db.query(LocalServiceFavorite).filter(
-                LocalServiceFavorite.service_id == service.id,
-                LocalServiceFavorite.user_id == user_id
-            ).first() is not None
-        
-        return LocalServiceResponse(
-            id=service.id,
-            user_id=service.user_id,
-            service_type=service.service_type,
-            title=service.title,
-            description=service.description,
-            content=service.content,
-            province=service.province,
-            city=service.city,
-            district=service.district,
-            address=service.address,
-            latitude=service.latitude,
-            longitude=service.longitude,
-            price=service.price,
-            price_unit=service.price_unit,
-            contact_name=service.contact_name,
-            contact_phone=service.contact_phone,
-            contact_wechat=service.contact_wechat,
-            extra_data=service.extra_data,
-            images=service.images,
-            tags=service.tags,
-            status=service.status,
-            is_featured=service.is_featured,
-            view_count=service.view_count,
-            like_count=service.like_count,
-            comment_count=service.comment_count,
-            created_at=service.created_at,
-            updated_at=service.updated_at,
-            user_info=user_info,
-            is_liked=is_liked,
-            is_favorited=is_favorited
-        )
+            liked_ids = membership_service.member_ids(db, "local_service_like", user_id, service_ids)
+            favorited_ids = membership_service.member_ids(db, "local_service_favorite", user_id, service_ids)
+        
+        return [
+            LocalServiceResponse(
+                id=service.id,
+                user_id=service.user_id,
+                service_type=service.service_type,
+                title=service.title,
+                description=service.description,
+                content=service.content,
+                province=service.province,
+                city=service.city,
+                district=service.district,
+                address=service.address,
+                latitude=service.latitude,
+                longitude=service.longitude,
+                price=service.price,
+                price_unit=service.price_unit,
+                contact_name=service.contact_name,
+                contact_phone=service.contact_phone,
+                contact_wechat=service.contact_wechat,
+                extra_data=service.extra_data,
+                images=service.images,
+                tags=service.tags,
+                status=service.status,
+                is_featured=service.is_featured,
+                view_count=service.view_count,
+                like_count=service.like_count,
+                comment_count=service.comment_count,
+                created_at=service.created_at,
+                updated_at=service.updated_at,
+                user_info=authors.get(service.user_id),
+                is_liked=service.id in liked_ids if user_id else None,
+                is_favorited=service.id in favorited_ids if user_id else None
+            )
+            for service in services
+        ]
 
     async def _format_pet_social_post_response(
         self,
@@ -482,47 +584,57 @@ class LocalServiceService:
         user_id: Optional[int] = None
     ) -> PetSocialPostResponse:
         """格式化宠物交流帖子响应"""
-        # 获取用户信息
-        user_info = None
-        if post.user:
-            user_info = {
-                "id": post.user.id,
-                "nickname": post.user.nickname or post.user.username,
-                "avatar": post.user.avatar
-            }
-        
-        # 检查是否已点赞
-        is_liked = None
-        if user_id:
-            # 这里需要创建对应的点赞表，暂时返回False
-            is_liked = False
+        items = await self._format_pet_social_post_responses(db, [post], user_id)
+        return items[0]
+
+    async def _format_pet_social_post_responses(
+        self,
+        db: Session,
+        posts: List[PetSocialPost],
+        user_id: Optional[int] = None
+    ) -> List[PetSocialPostResponse]:
+        """批量格式化宠物交流帖子响应，作者只查询一次"""
+        authors = membership_service.load_authors(db, [post.user_id for post in posts])
         
-        return PetSocialPostResponse(
-            id=post.id,
-            user_id=post.user_id,
-            title=post.title,
-            content=post.content,
-            images=post.images,
-            pet_type=post.pet_type,
-            pet_breed=post.pet_breed,
-            pet_age=post.pet_age,
-            pet_gender=post.pet_gender,
-            city=post.city,
-            district=post.district,
-            category=post.category,
-            tags=post.tags,
-            view_count=post.view_count,
-            like_count=post.like_count,
-            comment_count=post.comment_count,
-            share_count=post.share_count,
-            status=post.status,
-            is_top=post.is_top,
-            is_featured=post.is_featured,
-            created_at=post.created_at,
-            updated_at=post.updated_at,
-            user_info=user_info,
-            is_liked=is_liked
-        )
+        items = []
+        for post in posts:
+            author = authors.get(post.user_id)
+            user_info = {
+                "id": author["id"],
+                "nickname": author["nickname"],
+                "avatar": author["avatar"]
+            } if author else None
+            
+            # 帖子暂无点赞关系表，登录用户统一返回False
+            is_liked = False if user_id else None
+            
+            items.append(PetSocialPostResponse(
+                id=post.id,
+                user_id=post.user_id,
+                title=post.title,
+                content=post.content,
+                images=post.images,
+                pet_type=post.pet_type,
+                pet_breed=post.pet_breed,
+                pet_age=post.pet_age,
+                pet_gender=post.pet_gender,
+                city=post.city,
+                district=post.district,
+                category=post.category,
+                tags=post.tags,
+                view_count=post.view_count,
+                like_count=post.like_count,
+                comment_count=post.comment_count,
+                share_count=post.share_count,
+                status=post.status,
+                is_top=post.is_top,
+                is_featured=post.is_featured,
+                created_at=post.created_at,
+                updated_at=post.updated_at,
+                user_info=user_info,
+                is_liked=is_liked
+            ))
+        return items
 
     async def _format_local_service_comment_response(
         self,
@@ -537,7 +649,7 @@ class LocalServiceService:
             user_info = {
                 "id": comment.user.id,
                 "nickname": comment.user.nickname or comment.user.username,
-                "avatar": comment.user.avatar
+                "avatar": comment.user.avatar_url
             }
         
         # 获取回复
@@ -0,0 +1,67 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import Dict, Iterable, List, Optional, Set, Any
+
+from ..models.local_service import LocalServiceLike, LocalServiceFavorite
+from ..models.user import User
+
+# 单条 IN 查询的最大参数个数
+IN_CHUNK_SIZE = 1000
+
+# 关系名 -> (用户列, 目标列)
+RELATIONS = {
+    "local_service_like": (LocalServiceLike.user_id, LocalServiceLike.service_id),
+    "local_service_favorite": (LocalServiceFavorite.user_id, LocalServiceFavorite.service_id),
+}
+
+
+class MembershipService:
+    """列表页批量关系查询
+
+    为一页数据一次性查出当前用户点赞/收藏了其中哪些（每种关系一条 IN 查询），
+    并批量加载作者资料，替代逐条格式化时的单条查询和懒加载。
+    """
+
+    def member_ids(
+        self,
+        db: Session,
+        relation: str,
+        user_id: Optional[int],
+        target_ids: Iterable[int]
+    ) -> Set[int]:
+        """返回 target_ids 中与用户存在指定关系的ID集合"""
+        target_ids = list(set(target_ids))
+        if not user_id or not target_ids:
+            return set()
+
+        user_column, target_column = RELATIONS[relation]
+        result = set()
+        for start in range(0, len(target_ids), IN_CHUNK_SIZE):
+            rows = db.query(target_column).filter(
+                and_(user_column == user_id, target_column.in_(target_ids[start:start + IN_CHUNK_SIZE]))
+            ).all()
+            result.update(row[0] for row in rows)
+        return result
+
+    def load_authors(self, db: Session, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """批量加载作者资料"""
+        user_ids = list(set(user_id for user_id in user_ids if user_id))
+        if not user_ids:
+            return {}
+
+        authors = {}
+        for start in range(0, len(user_ids), IN_CHUNK_SIZE):
+            rows = db.query(
+                User.id, User.username, User.nickname, User.avatar_url, User.phone
+            ).filter(User.id.in_(user_ids[start:start + IN_CHUNK_SIZE])).all()
+            for row in rows:
+                authors[row.id] = {
+                    "id": row.id,
+                    "nickname": row.nickname or row.username,
+                    "avatar": row.avatar_url,
+                    "phone": row.phone
+                }
+        return authors
+
+
+membership_service = MembershipService()
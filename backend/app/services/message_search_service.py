@@ -0,0 +1,306 @@
+from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional, Tuple
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+
+from ..core.config import settings
+from ..models.message import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+# 中日韩文字和字母数字分别成段，每段切为重叠二元组（子串匹配，"phone" 可命中 "iphone"）
+_CJK = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_RE = re.compile(rf"([{_CJK}]+)|([^\W_{_CJK}]+)")
+
+# 分词方式版本，变化后已有索引需重建（sync_from_db 自动清空重建）
+TOKENIZER_VERSION = 2
+
+# 写入线程每个事务最多处理的变更数
+WRITE_BATCH_SIZE = 500
+
+# 同步已删除消息时向前回看的时间，覆盖提交顺序与更新时间不一致的情况
+DELETED_SYNC_LOOKBACK = timedelta(minutes=5)
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _segments(text: str) -> List[str]:
+    return [cjk or word for cjk, word in _TOKEN_RE.findall(_normalize(text))]
+
+
+def tokenize(text: str) -> List[str]:
+    """文档分词：每段切为重叠二元组，并追加末字单字（使单字查询可按前缀命中）"""
+    tokens = []
+    for segment in _segments(text):
+        if len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+            tokens.append(segment[-1])
+    return tokens
+
+
+def build_match_query(keyword: str) -> Optional[str]:
+    """把搜索关键词转换为 FTS5 查询，无可检索内容时返回 None
+
+    每段的相邻二元组组成短语（等价于子串匹配），单字按前缀匹配，多段之间取交集；
+    与 LIKE '%kw%' 的差别只在跨段（被空格、标点隔开）时不要求相邻。
+    """
+    phrases = []
+    for segment in _segments(keyword):
+        if len(segment) == 1:
+            phrases.append(f'"{segment}" *')
+        else:
+            phrases.append(f'"{" ".join(segment[i:i + 2] for i in range(len(segment) - 1))}"')
+    if not phrases:
+        return None
+    return " AND ".join(phrases)
+
+
+class MessageSearchIndex:
+    """按用户的消息全文索引
+
+    索引存放在本机 SQLite FTS5 旁路库中（MESSAGE_SEARCH_INDEX_PATH），每条消息一行，rowid 即消息ID，
+    tokens 列为二元组分词结果，owners 列为对话双方（u<用户ID>）和对话（c<对话ID>）标记，
+    查询时由 FTS 倒排表同时按用户和关键词求交，只返回消息ID，再由调用方一次批量加载消息。
+    发送、删除消息时把变更放入队列，由后台线程批量写入，不阻塞请求；
+    sync_from_db 按消息ID增量补齐新消息、按更新时间移除已删除的消息（首次建索引或补漏），
+    完成首次同步前（或分词方式变化后尚未重建时）搜索回退到数据库 LIKE 查询。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    # 变更（异步写入）
+    def add_message(self, message: Message, conversation: Conversation):
+        """新消息入队，由写入线程加入索引"""
+        if not self.enabled:
+            return
+        self._enqueue(("add", message.id, self._owners(conversation), " ".join(tokenize(message.content))))
+
+    def remove_message(self, message_id: int):
+        """消息删除后入队，由写入线程移出索引"""
+        if not self.enabled:
+            return
+        self._enqueue(("delete", message_id))
+
+    def flush(self):
+        """等待队列中的变更全部写入（用于任务和检查脚本）"""
+        if self._writer is not None:
+            self._queue.join()
+
+    # 查询
+    def search(
+        self,
+        user_id: int,
+        keyword: str,
+        conversation_id: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Optional[Tuple[List[int], int]]:
+        """返回 (按消息ID倒序的一页消息ID, 总数)；索引不可用或关键词无法检索时返回 None，由调用方回退"""
+        if not self.enabled or not self.is_ready():
+            return None
+        phrase = build_match_query(keyword)
+        if phrase is None:
+            return None
+
+        owners = f"owners:u{user_id}"
+        if conversation_id:
+            owners += f" AND owners:c{conversation_id}"
+        match = f"{owners} AND tokens:({phrase})"
+
+        conn = self._reader()
+        total = conn.execute("SELECT count(*) FROM message_index WHERE message_index MATCH ?", (match,)).fetchone()[0]
+        if not total or offset >= total:
+            return [], total
+        rows = conn.execute(
+            "SELECT rowid FROM message_index WHERE message_index MATCH ? ORDER BY rowid DESC LIMIT ? OFFSET ?",
+            (match, limit, offset)
+        ).fetchall()
+        return [row[0] for row in rows], total
+
+    def is_ready(self) -> bool:
+        """是否已完成首次同步"""
+        if not self._ready:
+            conn = self._reader()
+            self._ready = (
+                self._get_state(conn, "tokenizer_version") == TOKENIZER_VERSION
+                and self._get_synced_message_id(conn) > 0
+            )
+        return self._ready
+
+    # 同步与重建
+    def sync_from_db(self, db: Session, batch_size: int = 2000) -> int:
+        """把数据库中尚未同步的消息（ID 大于同步位点）按批写入索引，并移除已删除的消息，返回写入和移除条数"""
+        if not self.enabled:
+            return 0
+        conn = self._connect()
+        try:
+            if self._get_state(conn, "tokenizer_version") != TOKENIZER_VERSION:
+                # 分词方式变化，旧索引无法匹配新查询，清空后全量同步
+                with conn:
+                    conn.execute("DELETE FROM message_index")
+                    conn.execute("DELETE FROM index_state")
+                    conn.execute(
+                        "INSERT INTO index_state (key, value) VALUES ('tokenizer_version', ?)", (TOKENIZER_VERSION,)
+                    )
+                self._ready = False
+            synced_id = self._get_synced_message_id(conn)
+            written = 0
+            while True:
+                rows = db.query(
+                    Message.id, Message.content, Message.is_deleted,
+                    Message.conversation_id, Conversation.user1_id, Conversation.user2_id
+                ).join(
+                    Conversation, Conversation.id == Message.conversation_id
+                ).filter(Message.id > synced_id).order_by(Message.id).limit(batch_size).all()
+                if not rows:
+                    break
+                with conn:
+                    conn.executemany("DELETE FROM message_index WHERE rowid = ?", [(row.id,) for row in rows])
+                    conn.executemany(
+                        "INSERT INTO message_index (rowid, tokens, owners) VALUES (?, ?, ?)",
+                        [
+                            (row.id, " ".join(tokenize(row.content)),
+                             f"u{row.user1_id} u{row.user2_id} c{row.conversation_id}")
+                            for row in rows if not row.is_deleted
+                        ]
+                    )
+                    synced_id = rows[-1].id
+                    conn.execute(
+                        "INSERT OR REPLACE INTO index_state (key, value) VALUES ('synced_message_id', ?)", (synced_id,)
+                    )
+                written += len(rows)
+            removed = self._sync_deleted(conn, db, synced_id)
+            if written or removed:
+                logger.info(f"消息搜索索引同步完成，写入 {written} 条，移除已删除 {removed} 条，同步位点 {synced_id}")
+            return written + removed
+        finally:
+            conn.close()
+
+    def rebuild(self, db: Session, batch_size: int = 2000) -> int:
+        """清空索引后从数据库全量重建"""
+        if not self.enabled:
+            return 0
+        self.flush()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM message_index")
+                conn.execute("DELETE FROM index_state")
+        finally:
+            conn.close()
+        self._ready = False
+        return self.sync_from_db(db, batch_size)
+
+    # 私有方法
+    def _sync_deleted(self, conn: sqlite3.Connection, db: Session, synced_id: int) -> int:
+        """移除同步位点之前、上次检查后被删除的消息（补齐写入线程丢失的删除）
+
+        检查位点记录已处理的最大更新时间（数据库时钟），每次向前回看 DELETED_SYNC_LOOKBACK。
+        """
+        checked = conn.execute("SELECT value FROM index_state WHERE key = 'deleted_checked_at'").fetchone()
+        query = db.query(Message.id, Message.updated_at).filter(
+            Message.is_deleted == True, Message.id <= synced_id
+        )
+        if checked:
+            query = query.filter(Message.updated_at >= datetime.fromisoformat(checked[0]) - DELETED_SYNC_LOOKBACK)
+        rows = query.all()
+        if not rows:
+            return 0
+        latest = max((row.updated_at for row in rows if row.updated_at), default=None)
+        with conn:
+            conn.executemany("DELETE FROM message_index WHERE rowid = ?", [(row.id,) for row in rows])
+            if latest is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO index_state (key, value) VALUES ('deleted_checked_at', ?)",
+                    (latest.isoformat(),)
+                )
+        return len(rows)
+
+    def _owners(self, conversation: Conversation) -> str:
+        return f"u{conversation.user1_id} u{conversation.user2_id} c{conversation.id}"
+
+    def _enqueue(self, change: tuple):
+        self._ensure_writer()
+        self._queue.put(change)
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="message-search-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            changes = [self._queue.get()]
+            while len(changes) < WRITE_BATCH_SIZE:
+                try:
+                    changes.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._apply(conn, changes)
+            except Exception as e:
+                logger.error(f"消息搜索索引写入失败（{len(changes)} 条变更，等待下次同步补齐）: {e}")
+            finally:
+                for _ in changes:
+                    self._queue.task_done()
+
+    def _apply(self, conn: sqlite3.Connection, changes: Iterable[tuple]):
+        with conn:
+            for change in changes:
+                conn.execute("DELETE FROM message_index WHERE rowid = ?", (change[1],))
+                if change[0] == "add":
+                    conn.execute(
+                        "INSERT INTO message_index (rowid, tokens, owners) VALUES (?, ?, ?)",
+                        (change[1], change[3], change[2])
+                    )
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS message_index USING fts5(tokens, owners, tokenize='unicode61')")
+        conn.execute("CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, value INTEGER)")
+        return conn
+
+    def _get_synced_message_id(self, conn: sqlite3.Connection) -> int:
+        return self._get_state(conn, "synced_message_id") or 0
+
+    def _get_state(self, conn: sqlite3.Connection, key: str):
+        row = conn.execute("SELECT value FROM index_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+
+message_search_index = MessageSearchIndex(settings.MESSAGE_SEARCH_INDEX_PATH)
@@ -0,0 +1,161 @@
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models.order import Order, OrderItem, Payment, Logistics
+from ..models.user import User
+from ..schemas.order import OrderResponse
+
+# 订单状态：数据库中的 order_status 与接口中的状态名
+ORDER_STATUS_NAMES = {
+    1: "pending",
+    2: "paid",
+    3: "shipped",
+    4: "delivered",
+    5: "completed",
+    6: "cancelled",
+}
+ORDER_STATUS_CODES = {name: code for code, name in ORDER_STATUS_NAMES.items()}
+REFUNDED_PAYMENT_STATUS = 3
+
+# 可按需加载的订单子对象
+ORDER_INCLUDES = ("items", "parties", "payment", "logistics")
+# 订单列表默认只加载订单项和买卖双方，支付和物流信息需通过 include 指定
+DEFAULT_LIST_INCLUDES = ("items", "parties")
+
+
+def parse_includes(value: Optional[str], default: Iterable[str] = DEFAULT_LIST_INCLUDES) -> Tuple[str, ...]:
+    """解析 include 参数（逗号分隔），返回默认加载项加上额外请求的加载项"""
+    requested = [part.strip() for part in (value or "").split(",") if part.strip()]
+    unknown = [part for part in requested if part not in ORDER_INCLUDES]
+    if unknown:
+        raise ValueError(f"不支持的 include: {', '.join(unknown)}，可选值: {', '.join(ORDER_INCLUDES)}")
+    return tuple(name for name in ORDER_INCLUDES if name in default or name in requested)
+
+
+def order_status_name(order: Order) -> str:
+    if order.payment_status == REFUNDED_PAYMENT_STATUS:
+        return "refunded"
+    return ORDER_STATUS_NAMES.get(order.order_status, "pending")
+
+
+class OrderResponseAssembler:
+    """订单响应组装器
+
+    为一页订单按关联类型各执行一条 IN 查询（订单项、买卖双方用户、支付、物流），
+    查询条数与每页订单数无关；未在 includes 中的子对象不查询，对应字段为空。
+    """
+
+    def build_responses(
+        self,
+        db: Session,
+        orders: List[Order],
+        includes: Iterable[str] = ORDER_INCLUDES
+    ) -> List[OrderResponse]:
+        """批量组装订单响应，顺序与传入的 orders 一致"""
+        if not orders:
+            return []
+
+        includes = set(includes)
+        order_ids = [order.id for order in orders]
+
+        # IN 查询结果在内存中按 id 排序，避免数据库额外排序
+        items_by_order: Dict[int, List[OrderItem]] = {}
+        if "items" in includes:
+            items = db.query(OrderItem).filter(OrderItem.order_id.in_(order_ids)).all()
+            for item in sorted(items, key=lambda row: row.id):
+                items_by_order.setdefault(item.order_id, []).append(item)
+
+        users: Dict[int, User] = {}
+        if "parties" in includes:
+            user_ids = {order.buyer_id for order in orders} | {order.seller_id for order in orders}
+            users = {
+                row.id: row for row in db.query(User.id, User.username, User.nickname, User.avatar_url).filter(
+                    User.id.in_(user_ids)
+                )
+            }
+
+        # 每个订单取最早的一条支付记录
+        payments: Dict[int, Payment] = {}
+        if "payment" in includes:
+            rows = db.query(Payment).filter(Payment.order_id.in_(order_ids)).all()
+            for payment in sorted(rows, key=lambda row: row.id):
+                payments.setdefault(payment.order_id, payment)
+
+        logistics_by_order: Dict[int, Logistics] = {}
+        if "logistics" in includes:
+            rows = db.query(Logistics).filter(Logistics.order_id.in_(order_ids)).all()
+            for logistics in sorted(rows, key=lambda row: row.id):
+                logistics_by_order.setdefault(logistics.order_id, logistics)
+
+        return [
+            self._to_response(
+                order,
+                items_by_order.get(order.id, []),
+                users.get(order.buyer_id),
+                users.get(order.seller_id),
+                payments.get(order.id),
+                logistics_by_order.get(order.id)
+            )
+            for order in orders
+        ]
+
+    def build_response(self, db: Session, order: Order, includes: Iterable[str] = ORDER_INCLUDES) -> OrderResponse:
+        """组装单个订单响应"""
+        return self.build_responses(db, [order], includes)[0]
+
+    def _to_response(self, order, items, buyer, seller, payment, logistics) -> OrderResponse:
+        return OrderResponse(
+            id=order.id,
+            order_number=order.order_no,
+            buyer_id=order.buyer_id,
+            seller_id=order.seller_id,
+            product_id=order.product_id,
+            # 订单对应单个拍品
+            quantity=1,
+            unit_price=order.final_price,
+            total_amount=order.total_amount,
+            order_type="auction",
+            payment_method=order.payment_method,
+            status=order_status_name(order),
+            shipping_address=order.shipping_address,
+            created_at=order.created_at,
+            updated_at=order.updated_at,
+            shipped_at=order.shipped_at,
+            completed_at=order.completed_at,
+            items=[
+                {
+                    "product_id": item.product_id,
+                    "product_title": item.product_title,
+                    "product_image": item.product_image,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "total_price": item.total_price
+                }
+                for item in items
+            ],
+            buyer_info=self._user_info(buyer),
+            seller_info=self._user_info(seller),
+            payment_info={
+                "payment_id": payment.id,
+                "status": payment.status,
+                "transaction_id": payment.transaction_id
+            } if payment else None,
+            logistics_info={
+                "tracking_number": logistics.tracking_number,
+                "logistics_company": logistics.logistics_company,
+                "status": logistics.status
+            } if logistics else None
+        )
+
+    def _user_info(self, user) -> Optional[dict]:
+        if not user:
+            return None
+        return {
+            "id": user.id,
+            "username": user.username,
+            "nickname": user.nickname,
+            "avatar": user.avatar_url
+        }
+
+
+order_response_assembler = OrderResponseAssembler()
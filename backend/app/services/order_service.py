@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
-from typing import List, Optional, Dict, Any
+from sqlalchemy import and_, or_, desc, func, case
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 import uuid
@@ -10,6 +10,14 @@ from ..models.product import Product, Bid
 from ..models.user import User
 from ..schemas.order import OrderCreate, OrderResponse, OrderListResponse, OrderUpdate
 from ..core.config import settings
+from .store_stats_service import store_stats_service
+from .order_stats_service import order_stats_service, ORDER_STATUS_COLUMNS
+from .deposit_service import deposit_service
+from .delayed_job_service import delayed_job_service, ORDER_AUTO_CONFIRM, ORDER_PAYMENT_TIMEOUT
+from .order_response_service import (
+    order_response_assembler, ORDER_INCLUDES, DEFAULT_LIST_INCLUDES, ORDER_STATUS_CODES, ORDER_STATUS_NAMES,
+    REFUNDED_PAYMENT_STATUS
+)
 
 class OrderService:
     
@@ -97,6 +105,8 @@ class OrderService:
         
         db.add(order_item)
         
+        store_stats_service.record_order_created(db, order)
+        
         # 更新商品状态
         if order_data.order_type == "auction" or product.auction_type == "fixed_price":
             product.status = "sold"
@@ -115,9 +125,10 @@ class OrderService:
         status: Optional[str] = None,
         order_type: Optional[str] = None,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        includes: Tuple[str, ...] = DEFAULT_LIST_INCLUDES
     ) -> OrderListResponse:
-        """获取用户订单列表"""
+        """获取用户订单列表（关联信息按 includes 批量加载）"""
         # 根据order_type决定查询买家还是卖家订单
         if order_type == "buy":
             query = db.query(Order).filter(Order.buyer_id == user_id)
@@ -128,8 +139,10 @@ class OrderService:
             query = db.query(Order).filter(Order.buyer_id == user_id)
         
         # 状态筛选
-        if status:
-            query = query.filter(Order.status == status)
+        if status == "refunded":
+            query = query.filter(Order.payment_status == REFUNDED_PAYMENT_STATUS)
+        elif status:
+            query = query.filter(Order.order_status == ORDER_STATUS_CODES[status])
         
         # 时间范围筛选
         if start_date:
@@ -145,7 +158,7 @@ class OrderService:
         orders = query.offset(offset).limit(page_size).all()
         
         return OrderListResponse(
-            items=[self._to_order_response(order, db) for order in orders],
+            items=order_response_assembler.build_responses(db, orders, includes),
             total=total,
             page=page,
             page_size=page_size,
@@ -227,14 +240,20 @@ class OrderService:
             "shipped": ["delivered", "completed"],
             "delivered": ["completed"],
             "completed": [],
-            "cancelled": ["refunded"],
-            "refunded": []
+            "cancelled": []
         }
         
-        if status not in valid_transitions.get(order.status, []):
-            raise ValueError(f"不能从状态 {order.status} 转换到 {status}")
+        current_status = ORDER_STATUS_NAMES.get(order.order_status, "pending")
+        if status not in valid_transitions.get(current_status, []):
+            raise ValueError(f"不能从状态 {current_status} 转换到 {status}")
+        
+        if status == "paid":
+            await self.mark_order_paid(db, order)
+            db.commit()
+            return True
         
-        order.status = status
+        old_status = order.order_status
+        order.order_status = ORDER_STATUS_CODES[status]
         order.updated_at = datetime.now()
         
         # 状态相关的特殊处理
@@ -242,8 +261,13 @@ class OrderService:
             order.completed_at = datetime.now()
         elif status == "shipped":
             order.shipped_at = datetime.now()
+            self.schedule_auto_confirm(db, order)
+        elif status == "delivered":
+            order.received_at = datetime.now()
         elif status == "cancelled":
-            order.cancelled_at = datetime.now()
+            store_stats_service.record_order_cancelled(db, order)
+        
+        order_stats_service.record_status_change(db, order, old_status, order.order_status)
         
         db.commit()
         return True
@@ -267,20 +291,24 @@ class OrderService:
             return False
         
         # 只有待付款和已付款状态可以取消
-        if order.status not in ["pending", "paid"]:
+        if order.order_status not in [ORDER_STATUS_CODES["pending"], ORDER_STATUS_CODES["paid"]]:
             raise ValueError("该订单状态不允许取消")
         
-        order.status = "cancelled"
-        order.cancelled_at = datetime.now()
-        order.cancel_reason = reason
+        old_status = order.order_status
+        unpaid = order.payment_status == 1
+        order.order_status = ORDER_STATUS_CODES["cancelled"]
         order.updated_at = datetime.now()
         
-        # 恢复商品状态和库存
-        product = db.query(Product).filter(Product.id == order.product_id).first()
-        if product:
-            if order.order_type == "auction":
-                product.status = "active"  # 重新开放竞拍
-            product.stock += order.quantity
+        store_stats_service.record_order_cancelled(db, order)
+        order_stats_service.record_status_change(db, order, old_status, order.order_status)
+        
+        # 拍品保持已结束状态（结束时间已过，改回拍卖中会被再次结算），由卖家重新上架并设置新的结束时间；
+        # 未付款取消与支付超时相同，没收买家在该拍卖的保证金，并撤销支付超时任务
+        if unpaid:
+            await deposit_service.forfeit_auction_deposits(
+                db, order.product_id, order.buyer_id, reason="中标后取消订单，没收保证金"
+            )
+        delayed_job_service.cancel(db, f"{ORDER_PAYMENT_TIMEOUT}:{order.id}")
         
         db.commit()
         return True
@@ -302,23 +330,79 @@ class OrderService:
         if not order:
             return False
         
-        if order.status not in ["shipped", "delivered"]:
+        if order.order_status not in [ORDER_STATUS_CODES["shipped"], ORDER_STATUS_CODES["delivered"]]:
             raise ValueError("订单状态不允许确认收货")
         
-        order.status = "completed"
-        order.completed_at = datetime.now()
-        order.updated_at = datetime.now()
+        self._complete_order(db, order)
         
         db.commit()
         return True
     
+    def schedule_auto_confirm(self, db: Session, order: Order):
+        """发货后登记自动确认收货任务（随调用方事务提交）"""
+        delayed_job_service.schedule(
+            db,
+            ORDER_AUTO_CONFIRM,
+            datetime.now() + timedelta(days=settings.ORDER_AUTO_CONFIRM_DAYS),
+            {"order_id": order.id},
+            dedupe_key=f"{ORDER_AUTO_CONFIRM}:{order.id}"
+        )
+    
+    async def auto_confirm_order(self, db: Session, order_id: int) -> bool:
+        """自动确认收货（延时任务）：发货超过时限仍未确认的订单改为已完成，已处理过的订单直接跳过（不提交）"""
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order or order.order_status not in [ORDER_STATUS_CODES["shipped"], ORDER_STATUS_CODES["delivered"]]:
+            return False
+        
+        self._complete_order(db, order)
+        db.flush()
+        return True
+    
+    async def mark_order_paid(self, db: Session, order: Order):
+        """订单付款成功（支付回调和状态接口共用，不提交）
+
+        更新支付状态，待付款订单改为待发货，退还中标者的拍卖保证金，并撤销支付超时任务。
+        """
+        now = datetime.now()
+        old_status = order.order_status
+        order.payment_status = 2  # 已支付
+        order.paid_at = now
+        order.updated_at = now
+        if order.order_status == ORDER_STATUS_CODES["pending"]:
+            order.order_status = ORDER_STATUS_CODES["paid"]
+            order_stats_service.record_status_change(db, order, old_status, order.order_status)
+        
+        await deposit_service.release_auction_deposits(db, order.product_id, order.buyer_id)
+        delayed_job_service.cancel(db, f"{ORDER_PAYMENT_TIMEOUT}:{order.id}")
+    
+    async def expire_unpaid_order(self, db: Session, order_id: int) -> bool:
+        """支付超时（延时任务）：仍未支付的订单自动取消并没收买家在该拍卖的保证金，已支付或已取消的订单直接跳过（不提交）"""
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order or order.order_status != ORDER_STATUS_CODES["pending"] or order.payment_status != 1:
+            return False
+        
+        old_status = order.order_status
+        order.order_status = ORDER_STATUS_CODES["cancelled"]
+        order.updated_at = datetime.now()
+        
+        store_stats_service.record_order_cancelled(db, order)
+        order_stats_service.record_status_change(db, order, old_status, order.order_status)
+        
+        # 拍品保持已结束状态，由卖家决定是否重新上架
+        await deposit_service.forfeit_auction_deposits(db, order.product_id, order.buyer_id)
+        db.flush()
+        return True
+    
     async def get_user_order_statistics(
         self, 
         db: Session, 
         user_id: int, 
         period: str = "month"
     ) -> Dict[str, Any]:
-        """获取用户订单统计"""
+        """获取用户订单统计（默认近30天实时聚合；period=all 读取全部时间的统计投影）"""
+        if period == "all":
+            return self._statistics_from_projection(user_id, period, order_stats_service.get_user_stats(db, user_id))
+        
         # 计算时间范围
         if period == "week":
             start_date = datetime.now() - timedelta(weeks=1)
@@ -331,11 +415,13 @@ class OrderService:
         else:
             start_date = datetime.now() - timedelta(days=30)
         
+        completed = ORDER_STATUS_CODES["completed"]
+        
         # 买家统计
         buyer_stats = db.query(
             func.count(Order.id).label("total_orders"),
             func.sum(Order.total_amount).label("total_amount"),
-            func.count(func.case([(Order.status == "completed", 1)])).label("completed_orders")
+            func.count(case((Order.order_status == completed, 1))).label("completed_orders")
         ).filter(
             and_(
                 Order.buyer_id == user_id,
@@ -347,7 +433,7 @@ class OrderService:
         seller_stats = db.query(
             func.count(Order.id).label("total_sales"),
             func.sum(Order.total_amount).label("total_revenue"),
-            func.count(func.case([(Order.status == "completed", 1)])).label("completed_sales")
+            func.count(case((Order.order_status == completed, 1))).label("completed_sales")
         ).filter(
             and_(
                 Order.seller_id == user_id,
@@ -357,14 +443,14 @@ class OrderService:
         
         # 状态分布
         status_distribution = db.query(
-            Order.status,
+            Order.order_status,
             func.count(Order.id).label("count")
         ).filter(
             and_(
                 or_(Order.buyer_id == user_id, Order.seller_id == user_id),
                 Order.created_at >= start_date
             )
-        ).group_by(Order.status).all()
+        ).group_by(Order.order_status).all()
         
         return {
             "period": period,
@@ -381,8 +467,8 @@ class OrderService:
                 "completion_rate": (seller_stats.completed_sales or 0) / max(seller_stats.total_sales or 1, 1)
             },
             "status_distribution": [
-                {"status": status.status, "count": status.count}
-                for status in status_distribution
+                {"status": ORDER_STATUS_NAMES.get(row.order_status, "pending"), "count": row.count}
+                for row in status_distribution
             ]
         }
     
@@ -478,77 +564,55 @@ class OrderService:
         db.commit()
         print(f"订单 {order.order_number} 完成处理，卖家收到 {seller_amount} 元")
     
+    def _complete_order(self, db: Session, order: Order):
+        """订单改为已完成"""
+        old_status = order.order_status
+        order.order_status = ORDER_STATUS_CODES["completed"]
+        order.completed_at = datetime.now()
+        order.updated_at = datetime.now()
+        
+        order_stats_service.record_status_change(db, order, old_status, order.order_status)
+    
     def _generate_order_number(self) -> str:
         """生成订单号"""
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         random_suffix = str(uuid.uuid4().int)[:6]
         return f"PET{timestamp}{random_suffix}"
     
-    def _to_order_response(self, order: Order, db: Session) -> OrderResponse:
-        """转换为响应格式"""
-        # 获取订单项
-        order_items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-        
-        # 获取买家和卖家信息
-        buyer = db.query(User).filter(User.id == order.buyer_id).first()
-        seller = db.query(User).filter(User.id == order.seller_id).first()
+    def _statistics_from_projection(self, user_id: int, period: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """由统计投影行组装统计结果，格式与按时间窗口聚合时一致"""
+        buyer = stats.get("buyer")
+        seller = stats.get("seller")
+        buyer_total = buyer.total_orders if buyer else 0
+        buyer_completed = buyer.completed_orders if buyer else 0
+        seller_total = seller.total_orders if seller else 0
+        seller_completed = seller.completed_orders if seller else 0
+        
+        # 状态分布合并买家、卖家两行（自买自卖的订单会各计一次）
+        distribution = []
+        for code, name in ORDER_STATUS_NAMES.items():
+            column = ORDER_STATUS_COLUMNS[code]
+            count = sum(getattr(row, column) for row in (buyer, seller) if row)
+            if count:
+                distribution.append({"status": name, "count": count})
         
-        # 获取支付信息
-        payment = db.query(Payment).filter(Payment.order_id == order.id).first()
-        
-        # 获取物流信息
-        logistics = db.query(Logistics).filter(Logistics.order_id == order.id).first()
-        
-        return OrderResponse(
-            id=order.id,
-            order_number=order.order_number,
-            buyer_id=order.buyer_id,
-            seller_id=order.seller_id,
-            product_id=order.product_id,
-            quantity=order.quantity,
-            unit_price=order.unit_price,
-            total_amount=order.total_amount,
-            order_type=order.order_type,
-            payment_method=order.payment_method,
-            status=order.status,
-            shipping_address=order.shipping_address,
-            buyer_note=order.buyer_note,
-            seller_note=order.seller_note,
-            created_at=order.created_at,
-            updated_at=order.updated_at,
-            paid_at=order.paid_at,
-            shipped_at=order.shipped_at,
-            completed_at=order.completed_at,
-            cancelled_at=order.cancelled_at,
-            items=[
-                {
-                    "product_id": item.product_id,
-                    "product_title": item.product_title,
-                    "product_image": item.product_image,
-                    "quantity": item.quantity,
-                    "unit_price": item.unit_price,
-                    "total_price": item.total_price
-                }
-                for item in order_items
-            ],
-            buyer_info={
-                "id": buyer.id,
-                "username": buyer.username,
-                "avatar": buyer.avatar
-            } if buyer else None,
-            seller_info={
-                "id": seller.id,
-                "username": seller.username,
-                "avatar": seller.avatar
-            } if seller else None,
-            payment_info={
-                "payment_id": payment.id,
-                "status": payment.status,
-                "transaction_id": payment.transaction_id
-            } if payment else None,
-            logistics_info={
-                "tracking_number": logistics.tracking_number,
-                "logistics_company": logistics.logistics_company,
-                "status": logistics.status
-            } if logistics else None
-        )
\ No newline at end of file
+        return {
+            "period": period,
+            "buyer_stats": {
+                "total_orders": buyer_total,
+                "total_amount": float(buyer.total_amount if buyer else 0),
+                "completed_orders": buyer_completed,
+                "completion_rate": buyer_completed / max(buyer_total, 1)
+            },
+            "seller_stats": {
+                "total_sales": seller_total,
+                "total_revenue": float(seller.total_amount if seller else 0),
+                "completed_sales": seller_completed,
+                "completion_rate": seller_completed / max(seller_total, 1)
+            },
+            "status_distribution": distribution
+        }
+    
+    def _to_order_response(self, order: Order, db: Session) -> OrderResponse:
+        """转换为响应格式（加载全部关联信息）"""
+        return order_response_assembler.build_response(db, order, ORDER_INCLUDES)
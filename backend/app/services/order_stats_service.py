@@ -0,0 +1,231 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, Any, Optional
+from datetime import datetime
+from decimal import Decimal
+import logging
+
+from ..models.order import Order, UserOrderStats
+from .order_response_service import ORDER_STATUS_NAMES
+
+logger = logging.getLogger(__name__)
+
+# 订单状态 -> 投影表字段
+ORDER_STATUS_COLUMNS = {code: f"{name}_orders" for code, name in ORDER_STATUS_NAMES.items()}
+COMPLETED_ORDER_STATUS = 5
+
+# 角色 -> 订单表中的用户字段
+ROLE_COLUMNS = {"buyer": Order.buyer_id, "seller": Order.seller_id}
+
+
+class OrderStatsService:
+    """用户订单统计投影服务
+
+    每个用户每种角色（买家/卖家）一行 UserOrderStats，订单创建和状态变更时按增量更新，
+    统计接口只需按主键读取；reconcile_all 按用户分批聚合订单表修正漂移，适合定时执行。
+    """
+
+    # 增量钩子：只 flush，不 commit，随调用方事务一起提交
+    def record_order_created(self, db: Session, order: Order):
+        """订单创建钩子"""
+        amount = Decimal(str(order.total_amount or 0))
+        delta = {"total_orders": 1, "total_amount": amount}
+        column = ORDER_STATUS_COLUMNS.get(order.order_status)
+        if column:
+            delta[column] = 1
+        if order.order_status == COMPLETED_ORDER_STATUS:
+            delta["completed_amount"] = amount
+        self._apply_order_delta(db, order, delta)
+
+    def record_status_change(self, db: Session, order: Order, old_status: Optional[int], new_status: Optional[int]):
+        """订单状态变更钩子"""
+        if old_status == new_status:
+            return
+        amount = Decimal(str(order.total_amount or 0))
+        delta: Dict[str, Any] = {}
+        if old_status in ORDER_STATUS_COLUMNS:
+            delta[ORDER_STATUS_COLUMNS[old_status]] = -1
+        if new_status in ORDER_STATUS_COLUMNS:
+            delta[ORDER_STATUS_COLUMNS[new_status]] = 1
+        if old_status == COMPLETED_ORDER_STATUS:
+            delta["completed_amount"] = -amount
+        if new_status == COMPLETED_ORDER_STATUS:
+            delta["completed_amount"] = amount
+        if not delta:
+            return
+        self._apply_order_delta(db, order, delta)
+
+    # 读取
+    def get_user_stats(self, db: Session, user_id: int) -> Dict[str, UserOrderStats]:
+        """按主键读取用户的买家、卖家统计行，从未统计过的用户先回填"""
+        rows = db.query(UserOrderStats).filter(UserOrderStats.user_id == user_id).all()
+        if not rows:
+            rows = self.rebuild_user(db, user_id)
+            db.commit()
+        return {row.role: row for row in rows}
+
+    # 回填与对账
+    def rebuild_user(self, db: Session, user_id: int) -> list:
+        """根据订单明细重建单个用户的统计行（不提交）"""
+        rows = []
+        for role, user_column in ROLE_COLUMNS.items():
+            aggregates = db.query(
+                Order.order_status,
+                func.count(Order.id).label("count"),
+                func.sum(Order.total_amount).label("amount")
+            ).filter(user_column == user_id).group_by(Order.order_status).all()
+            values = self._totals_from_aggregates(
+                (row.order_status, row.count, row.amount) for row in aggregates
+            )
+            rows.append(self._write_row(db, user_id, role, values))
+        return rows
+
+    def reconcile_all(self, db: Session, batch_size: int = 500) -> Dict[str, int]:
+        """按用户ID分批（键集分页）聚合订单表，修正所有用户的统计行，返回检查和修正的行数"""
+        checked = corrected = 0
+        for role, user_column in ROLE_COLUMNS.items():
+            seen = set()
+            last_user_id = None
+            while True:
+                # 下一批有订单的用户
+                id_query = db.query(user_column.label("user_id")).distinct()
+                if last_user_id is not None:
+                    id_query = id_query.filter(user_column > last_user_id)
+                user_ids = [row.user_id for row in id_query.order_by(user_column).limit(batch_size)]
+                if not user_ids:
+                    break
+
+                aggregates: Dict[int, list] = {user_id: [] for user_id in user_ids}
+                for row in db.query(
+                    user_column.label("user_id"),
+                    Order.order_status,
+                    func.count(Order.id).label("count"),
+                    func.sum(Order.total_amount).label("amount")
+                ).filter(user_column.in_(user_ids)).group_by(user_column, Order.order_status):
+                    aggregates[row.user_id].append((row.order_status, row.count, row.amount))
+
+                batch = [(user_id, self._totals_from_aggregates(rows)) for user_id, rows in aggregates.items()]
+                corrected += self._reconcile_batch(db, role, batch)
+                db.commit()
+                seen.update(user_ids)
+                last_user_id = user_ids[-1]
+            checked += len(seen)
+
+            # 订单已全部删除的用户清零
+            stale = db.query(UserOrderStats).filter(
+                and_(UserOrderStats.role == role, UserOrderStats.total_orders != 0)
+            ).all()
+            for row in stale:
+                if row.user_id not in seen:
+                    self._write_row(db, row.user_id, role, self._totals_from_aggregates([]), row)
+                    corrected += 1
+            db.commit()
+
+        logger.info(f"订单统计对账完成，检查 {checked} 行，修正 {corrected} 行")
+        return {"checked": checked, "corrected": corrected}
+
+    # 私有方法
+    def _reconcile_batch(self, db: Session, role: str, batch) -> int:
+        """对比一批用户的聚合结果与投影行，不一致时覆盖"""
+        if not batch:
+            return 0
+        existing = {
+            row.user_id: row for row in db.query(UserOrderStats).filter(
+                and_(UserOrderStats.role == role, UserOrderStats.user_id.in_([user_id for user_id, _ in batch]))
+            )
+        }
+        corrected = 0
+        for user_id, values in batch:
+            row = existing.get(user_id)
+            if row is None or any(self._differs(getattr(row, column), value) for column, value in values.items()):
+                if row is not None:
+                    logger.warning(f"订单统计漂移已修正，用户ID: {user_id}, 角色: {role}")
+                self._write_row(db, user_id, role, values, row)
+                corrected += 1
+        return corrected
+
+    def _totals_from_aggregates(self, aggregates) -> Dict[str, Any]:
+        """由 (状态, 订单数, 金额) 聚合结果计算投影行各字段"""
+        values = self._empty_counters()
+        for status, count, amount in aggregates:
+            amount = Decimal(str(amount or 0))
+            values["total_orders"] += count
+            values["total_amount"] += amount
+            column = ORDER_STATUS_COLUMNS.get(status)
+            if column:
+                values[column] += count
+            if status == COMPLETED_ORDER_STATUS:
+                values["completed_amount"] += amount
+        return values
+
+    def _write_row(self, db: Session, user_id: int, role: str, values: Dict[str, Any],
+                   row: Optional[UserOrderStats] = None) -> UserOrderStats:
+        if row is None:
+            row = db.get(UserOrderStats, (user_id, role))
+        if row is None:
+            row = UserOrderStats(user_id=user_id, role=role)
+            db.add(row)
+        for column, value in values.items():
+            setattr(row, column, value)
+        row.reconciled_at = datetime.now()
+        db.flush()
+        return row
+
+    def _apply_order_delta(self, db: Session, order: Order, delta: Dict[str, Any]):
+        """把同一增量应用到订单买家和卖家的统计行"""
+        rebuilt = set()
+        for role in ROLE_COLUMNS:
+            user_id = self._role_user_id(order, role)
+            # 买卖双方为同一用户且刚回填过时，回填结果已包含本次变更
+            if user_id in rebuilt:
+                continue
+            if not self._apply_delta(db, user_id, role, delta):
+                rebuilt.add(user_id)
+
+    def _apply_delta(self, db: Session, user_id: int, role: str, delta: Dict[str, Any]) -> bool:
+        """对用户某角色的统计行做原子增量更新，行不存在时从订单明细回填（返回 False）"""
+        values = {
+            getattr(UserOrderStats, column): getattr(UserOrderStats, column) + amount
+            for column, amount in delta.items()
+        }
+        updated = db.query(UserOrderStats).filter(
+            and_(UserOrderStats.user_id == user_id, UserOrderStats.role == role)
+        ).update(values, synchronize_session=False)
+        if updated:
+            return True
+
+        # 首次统计：回填结果已包含本次变更（调用方的订单改动会先 flush）
+        db.flush()
+        try:
+            with db.begin_nested():
+                self.rebuild_user(db, user_id)
+        except IntegrityError:
+            # 并发回填了同一用户，改为增量更新
+            db.query(UserOrderStats).filter(
+                and_(UserOrderStats.user_id == user_id, UserOrderStats.role == role)
+            ).update(values, synchronize_session=False)
+            return True
+        return False
+
+    def _role_user_id(self, order: Order, role: str) -> int:
+        return order.buyer_id if role == "buyer" else order.seller_id
+
+    def _differs(self, current, expected) -> bool:
+        if isinstance(expected, Decimal):
+            return Decimal(str(current or 0)) != expected
+        return (current or 0) != expected
+
+    def _empty_counters(self) -> Dict[str, Any]:
+        """投影行的初始计数"""
+        counters = {
+            "total_orders": 0,
+            "total_amount": Decimal("0.00"),
+            "completed_amount": Decimal("0.00"),
+        }
+        for column in ORDER_STATUS_COLUMNS.values():
+            counters[column] = 0
+        return counters
+
+
+order_stats_service = OrderStatsService()
@@ -8,6 +8,7 @@ from ..models.order import Payment, Order
 from ..models.user import User
 from ..schemas.order import PaymentCreate, PaymentResponse
 from ..core.config import settings
+from .order_service import OrderService
 
 class PaymentService:
 
@@ -86,8 +87,7 @@ class PaymentService:
                 # 更新订单状态
                 order = db.query(Order).filter(Order.id == payment.order_id).first()
                 if order:
-                    order.payment_status = 2  # 已支付
-                    order.paid_at = datetime.now()
+                    await OrderService().mark_order_paid(db, order)
 
                 db.commit()
 
@@ -0,0 +1,82 @@
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable
+
+from ..core.cache import TTLCache
+from ..models.product import Product
+
+
+def _money(value, default="0"):
+    return str(value) if value else default
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+class ProductCardCache:
+    """商品卡片缓存
+
+    按商品ID缓存已序列化的商品卡片（金额转为字符串、时间转为 ISO 格式），多个列表共享同一份卡片；
+    未命中的卡片用一条 IN 查询补齐。出价只更新卡片中的实时字段（当前价、出价次数、更新时间），
+    商品编辑、删除和拍卖结束时失效，TTL 兜底多进程间的一致性。
+    """
+
+    def __init__(self, ttl: float = 300.0, maxsize: int = 20000):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get_cards(self, db: Session, product_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """批量获取商品卡片，已删除的商品不在结果中"""
+        product_ids = list(product_ids)
+        cards = self.cache.get_many(product_ids)
+        missing = [product_id for product_id in product_ids if product_id not in cards]
+        if missing:
+            for product in db.query(Product).filter(Product.id.in_(missing)):
+                card = self._to_card(product)
+                self.cache.set(product.id, card)
+                cards[product.id] = card
+        return cards
+
+    def record_bid(self, product: Product):
+        """出价后更新卡片实时字段（未缓存的卡片不处理，下次读取时加载）"""
+        live_fields = {
+            "current_price": _money(product.current_price),
+            "bid_count": product.bid_count,
+            "updated_at": _isoformat(product.updated_at),
+        }
+        # 复制后替换，读取方拿到的卡片不会被修改
+        self.cache.update(product.id, lambda card: {**card, **live_fields})
+
+    def invalidate(self, product_id: int):
+        """商品信息变更时失效卡片"""
+        self.cache.delete(product_id)
+
+    def _to_card(self, product: Product) -> Dict[str, Any]:
+        return {
+            "id": product.id,
+            "seller_id": product.seller_id,
+            "title": product.title,
+            "description": product.description,
+            "category_id": product.category_id,
+            "images": product.images or [],
+            "starting_price": _money(product.starting_price),
+            "current_price": _money(product.current_price),
+            "buy_now_price": _money(product.buy_now_price, None),
+            "auction_type": product.auction_type,
+            "auction_start_time": _isoformat(product.auction_start_time),
+            "auction_end_time": _isoformat(product.auction_end_time),
+            "location": product.location,
+            "shipping_fee": _money(product.shipping_fee),
+            "is_free_shipping": product.is_free_shipping,
+            "condition_type": product.condition_type,
+            "stock_quantity": product.stock_quantity,
+            "view_count": product.view_count,
+            "bid_count": product.bid_count,
+            "favorite_count": product.favorite_count,
+            "status": product.status,
+            "is_featured": product.is_featured,
+            "created_at": _isoformat(product.created_at),
+            "updated_at": _isoformat(product.updated_at),
+        }
+
+
+product_card_cache = ProductCardCache()
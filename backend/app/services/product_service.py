@@ -1,13 +1,25 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc, func
+from sqlalchemy import and_, or_, desc, asc, func, update
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import os
 
-from ..models.product import Product, ProductImage, Category, ProductFavorite
+from ..models.product import Product, ProductImage, Category, ProductFavorite, Bid, AutoBid, AuctionResult
+from ..models.order import Order
 from ..models.user import User
 from ..schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductDetailResponse
 from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.read_replica import WriteMarker
+from ..core.http_cache import VersionStamp
+from .store_stats_service import store_stats_service
+from .store_card_service import store_card_assembler
+from .product_card_service import product_card_cache
+from .event_catalog_service import event_catalog
+from .trending_service import trending_service
+from .recommendation_service import recommendation_service
+from .proxy_bid_service import proxy_bid_resolver
+from .order_response_service import ORDER_STATUS_CODES
 
 class ProductService:
     
@@ -110,24 +122,24 @@ class ProductService:
         user_id: Optional[int] = None
     ) -> Optional[ProductDetailResponse]:
         """获取商品详情"""
-        product = db.query(Product).filter(Product.id == product_id).first()
+        product = self.load_product_detail(db, product_id)
         if not product:
             return None
         
         # 增加浏览量
+        self.record_views(db, product)
         product.view_count += 1
-        db.commit()
         
         # 检查是否收藏
-        is_favorited = False
         if user_id:
-            favorite = db.query(ProductFavorite).filter(
-                and_(
-                    ProductFavorite.product_id == product_id,
-                    ProductFavorite.user_id == user_id
-                )
-            ).first()
-            is_favorited = favorite is not None
+            product.is_favorited = self.is_favorited(db, product_id, user_id)
+        return product
+    
+    def load_product_detail(self, db: Session, product_id: int) -> Optional[ProductDetailResponse]:
+        """商品详情中与用户无关的部分（不计浏览量，热点商品的并发请求可共享结果）"""
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            return None
         
         # 获取商品图片
         images = db.query(ProductImage).filter(
@@ -143,7 +155,7 @@ class ProductService:
         return ProductDetailResponse(
             **product_dict,
             images=[img.image_url for img in images],
-            is_favorited=is_favorited,
+            is_favorited=False,
             seller_info={
                 "id": seller.id,
                 "username": seller.username,
@@ -151,6 +163,45 @@ class ProductService:
             } if seller else None
         )
     
+    def record_views(self, db: Session, product, count: int = 1):
+        """计入浏览量（合并的请求一次累加）并更新热度"""
+        # 计数写入不触发读写分离的写后粘滞
+        db.execute(
+            update(Product).where(Product.id == product.id).values(view_count=Product.view_count + count)
+            .execution_options(sticky=False, synchronize_session=False)
+        )
+        db.commit()
+        trending_service.record_view(product, count)
+    
+    def load_shared_product_detail(
+        self, product_id: int, write_marker: Optional[WriteMarker] = None
+    ) -> Optional[ProductDetailResponse]:
+        """在独立会话中加载商品详情，供合并的请求共享（不依赖发起计算的请求的会话）"""
+        db = SessionLocal(info={"write_marker": write_marker})
+        try:
+            return self.load_product_detail(db, product_id)
+        finally:
+            db.close()
+    
+    def record_detail_views(self, product: Optional[ProductDetailResponse], count: int):
+        """商品详情合并计算完成后按请求数计入浏览量（独立会话）"""
+        if product is None:
+            return
+        db = SessionLocal()
+        try:
+            self.record_views(db, product, count)
+        finally:
+            db.close()
+    
+    def is_favorited(self, db: Session, product_id: int, user_id: int) -> bool:
+        """用户是否收藏了商品"""
+        return db.query(ProductFavorite.id).filter(
+            and_(
+                ProductFavorite.product_id == product_id,
+                ProductFavorite.user_id == user_id
+            )
+        ).first() is not None
+    
     async def create_product(
         self, 
         db: Session, 
@@ -167,6 +218,8 @@ class ProductService:
         )
         
         db.add(product)
+        db.flush()
+        store_stats_service.record_product_status_change(db, seller_id, None, product.status)
         db.commit()
         db.refresh(product)
         
@@ -181,6 +234,7 @@ class ProductService:
                 db.add(image)
         
         db.commit()
+        store_card_assembler.invalidate_owner(seller_id)
         return self._to_product_response(product, db)
     
     async def update_product(
@@ -199,12 +253,74 @@ class ProductService:
             return None
         
         # 更新商品信息
+        old_status = product.status
         update_data = product_data.dict(exclude_unset=True, exclude={"images"})
         for field, value in update_data.items():
             setattr(product, field, value)
         
+        store_stats_service.record_product_status_change(db, product.seller_id, old_status, product.status)
         product.updated_at = datetime.now()
         db.commit()
+        store_card_assembler.invalidate_owner(product.seller_id)
+        product_card_cache.invalidate(product.id)
+        if product.status != 2:
+            trending_service.remove_product(product.id)
+        
+        return self._to_product_response(product, db)
+    
+    async def relist_auction(
+        self,
+        db: Session,
+        product_id: int,
+        user_id: int,
+        auction_end_time: datetime
+    ) -> Optional[ProductResponse]:
+        """卖家重新上架已结束的拍品（流拍或中标订单取消后），按新的结束时间开始新一轮拍卖
+
+        上一轮的出价和代理出价作废，当前价恢复为起拍价，成交记录删除；拍品有未取消的订单时不允许重新上架。
+        """
+        product = db.query(Product).filter(
+            and_(Product.id == product_id, Product.seller_id == user_id)
+        ).first()
+        
+        if not product:
+            return None
+        
+        if product.status != 3:
+            raise ValueError("只有已结束的拍品可以重新上架")
+        
+        now = datetime.now()
+        if auction_end_time <= now:
+            raise ValueError("结束时间必须晚于当前时间")
+        
+        open_order = db.query(Order.id).filter(
+            and_(Order.product_id == product_id, Order.order_status != ORDER_STATUS_CODES["cancelled"])
+        ).first()
+        if open_order:
+            raise ValueError("拍品已有未取消的订单，不能重新上架")
+        
+        # 上一轮出价作废
+        db.query(Bid).filter(
+            and_(Bid.product_id == product_id, Bid.status.in_([1, 2]))
+        ).update({Bid.status: 3}, synchronize_session=False)
+        db.query(AutoBid).filter(
+            and_(AutoBid.product_id == product_id, AutoBid.status == "active")
+        ).update({AutoBid.status: "cancelled"}, synchronize_session=False)
+        db.query(AuctionResult).filter(AuctionResult.product_id == product_id).delete(synchronize_session=False)
+        
+        old_status = product.status
+        product.status = 2
+        product.current_price = product.starting_price
+        product.bid_count = 0
+        product.auction_start_time = now
+        product.auction_end_time = auction_end_time
+        product.updated_at = now
+        store_stats_service.record_product_status_change(db, product.seller_id, old_status, product.status)
+        db.commit()
+        
+        store_card_assembler.invalidate_owner(product.seller_id)
+        product_card_cache.invalidate(product.id)
+        proxy_bid_resolver.forget_product(product.id)
         
         return self._to_product_response(product, db)
     
@@ -229,8 +345,13 @@ class ProductService:
                 pass
         
         # 删除数据库记录
+        store_stats_service.record_product_status_change(db, product.seller_id, product.status, None)
+        seller_id = product.seller_id
         db.delete(product)
         db.commit()
+        store_card_assembler.invalidate_owner(seller_id)
+        event_catalog.remove_product(product_id)
+        trending_service.remove_product(product_id)
         return True
     
     async def add_product_image(
@@ -315,10 +436,14 @@ class ProductService:
             )
         ).first()
         
+        product = db.query(Product).filter(Product.id == product_id).first()
+        
         if existing_favorite:
             # 取消收藏
             db.delete(existing_favorite)
             db.commit()
+            if product:
+                trending_service.record_favorite(product, favorited=False)
             return {"is_favorited": False}
         else:
             # 添加收藏
@@ -328,11 +453,21 @@ class ProductService:
             )
             db.add(favorite)
             db.commit()
+            if product:
+                trending_service.record_favorite(product)
+            recommendation_service.record_interaction(user_id, product_id, "favorite")
             return {"is_favorited": True}
     
     async def get_categories(self, db: Session) -> List[Category]:
         """获取商品分类"""
         return db.query(Category).filter(Category.is_active == True).order_by(Category.sort_order).all()
+
+    def get_categories_version(self, db: Session) -> VersionStamp:
+        """商品分类的版本戳：分类数量与最近更新时间"""
+        count, last_updated = db.query(func.count(Category.id), func.max(Category.updated_at)).filter(
+            Category.is_active == True
+        ).one()
+        return VersionStamp(tag=f"{count}:{last_updated}", last_modified=last_updated)
     
     async def get_user_products(
         self, 
@@ -370,7 +505,7 @@ class ProductService:
         page_size: int = 20
     ) -> ProductListResponse:
         """获取用户收藏的商品"""
-        query = db.query(Product).join(ProductFavorite).filter(
+        query = db.query(Product).join(ProductFavorite, ProductFavorite.product_id == Product.id).filter(
             ProductFavorite.user_id == user_id
         ).order_by(desc(ProductFavorite.created_at))
         
@@ -390,19 +525,45 @@ class ProductService:
         self, 
         db: Session, 
         page: int = 1, 
-        page_size: int = 20
+        page_size: int = 20,
+        category_id: Optional[int] = None
     ) -> ProductListResponse:
         """获取热门商品"""
-        # 基于浏览量和收藏量的热门算法
-        query = db.query(Product).filter(
-            Product.status == "active"
-        ).order_by(
-            desc(Product.view_count + Product.favorite_count * 5)
-        )
-        
-        total = query.count()
+        # 基于时间衰减热度分的预计算榜单（浏览、出价、收藏）
         offset = (page - 1) * page_size
-        products = query.offset(offset).limit(page_size).all()
+        if not trending_service.ensure_loaded():
+            # 榜单在后台构建完成前按浏览量和出价数排序
+            query = db.query(Product).filter(Product.status == 2)
+            if category_id:
+                query = query.filter(Product.category_id == category_id)
+            total = query.count()
+            products = query.order_by(
+                Product.view_count.desc(), Product.bid_count.desc(), Product.id.desc()
+            ).offset(offset).limit(page_size).all()
+            return ProductListResponse(
+                items=[self._to_product_response(product, db) for product in products],
+                total=total,
+                page=page,
+                page_size=page_size,
+                total_pages=(total + page_size - 1) // page_size
+            )
+        while True:
+            product_ids = trending_service.top_ids(db, page_size, offset, category_id)
+            products_by_id = {
+                product.id: product for product in db.query(Product).filter(
+                    and_(Product.id.in_(product_ids), Product.status == 2)
+                ).all()
+            } if product_ids else {}
+            
+            # 榜单中已不在拍卖中的商品顺带移出，然后补足本页
+            stale_ids = [product_id for product_id in product_ids if product_id not in products_by_id]
+            if not stale_ids:
+                break
+            for product_id in stale_ids:
+                trending_service.remove_product(product_id)
+        
+        products = [products_by_id[product_id] for product_id in product_ids]
+        total = trending_service.count(db, category_id)
         
         return ProductListResponse(
             items=[self._to_product_response(product, db) for product in products],
@@ -452,6 +613,7 @@ class ProductService:
             auction_type=product.auction_type,
             auction_end_time=product.auction_end_time,
             status=product.status,
+            is_featured=product.is_featured or False,
             seller_id=product.seller_id,
             view_count=product.view_count,
             bid_count=product.bid_count,
@@ -0,0 +1,244 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, event
+from typing import List, Optional, Dict, Tuple
+from decimal import Decimal
+import heapq
+import logging
+import threading
+import time
+
+from ..core.read_replica import RoutingSession
+from ..models.product import Product, Bid, AutoBid
+
+logger = logging.getLogger(__name__)
+
+# 最小加价幅度，与手动出价一致
+MIN_BID_INCREMENT = Decimal("1.00")
+
+# 会话中待提交的已完成代理：[(商品ID, [自动出价ID])]，提交后移出堆
+_EXHAUSTED_KEY = "proxy_bid.exhausted"
+
+
+class _ProxyEntry:
+    __slots__ = ("auto_bid_id", "user_id", "max_amount", "increment")
+
+    def __init__(self, auto_bid: AutoBid):
+        self.auto_bid_id = auto_bid.id
+        self.user_id = auto_bid.user_id
+        self.max_amount = Decimal(auto_bid.max_amount)
+        self.increment = max(Decimal(auto_bid.increment_amount or MIN_BID_INCREMENT), MIN_BID_INCREMENT)
+
+
+class _ProductProxies:
+    """单个商品的活跃代理出价：按上限金额的最大堆（同额先设置者优先），惰性删除"""
+
+    def __init__(self):
+        self.heap: List[Tuple[Decimal, int]] = []
+        self.entries: Dict[int, _ProxyEntry] = {}
+        self.loaded_at = time.monotonic()
+
+    def push(self, entry: _ProxyEntry):
+        self.entries[entry.auto_bid_id] = entry
+        heapq.heappush(self.heap, (-entry.max_amount, entry.auto_bid_id))
+
+    def remove(self, auto_bid_id: int):
+        self.entries.pop(auto_bid_id, None)
+
+    def top_two(self) -> Tuple[Optional[_ProxyEntry], Optional[_ProxyEntry]]:
+        """取上限最高的两个代理出价"""
+        first = self._pop_valid()
+        if first is None:
+            return None, None
+        second = self._peek_valid()
+        heapq.heappush(self.heap, (-first.max_amount, first.auto_bid_id))
+        return first, second
+
+    def _pop_valid(self) -> Optional[_ProxyEntry]:
+        while self.heap:
+            neg_amount, auto_bid_id = heapq.heappop(self.heap)
+            entry = self.entries.get(auto_bid_id)
+            if entry is not None and entry.max_amount == -neg_amount:
+                return entry
+        return None
+
+    def _peek_valid(self) -> Optional[_ProxyEntry]:
+        while self.heap:
+            neg_amount, auto_bid_id = self.heap[0]
+            entry = self.entries.get(auto_bid_id)
+            if entry is not None and entry.max_amount == -neg_amount:
+                return entry
+            heapq.heappop(self.heap)
+        return None
+
+
+class ProxyBidResolver:
+    """代理（自动）出价结算
+
+    每个商品的活跃自动出价按上限金额放在最大堆中。有新出价或新代理时，
+    按次高价规则一步算出最终价格和领先者：最高代理以 min(自身上限, 对手最高价 + 加价幅度) 领先，
+    只写入对手代理的最终出价和领先者的出价两条记录，不再逐级互相加价。
+    堆在首次使用时从数据库加载，自动出价的增删改直接更新堆，TTL 兜底多进程间的一致性。
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._products: Dict[int, _ProductProxies] = {}
+        self._lock = threading.RLock()
+
+    def on_auto_bid_saved(self, auto_bid: AutoBid):
+        """自动出价创建/恢复/修改"""
+        with self._lock:
+            proxies = self._products.get(auto_bid.product_id)
+            if proxies is None:
+                return
+            proxies.remove(auto_bid.id)
+            if auto_bid.status == "active":
+                proxies.push(_ProxyEntry(auto_bid))
+
+    def on_auto_bid_removed(self, auto_bid: AutoBid):
+        """自动出价暂停/取消/完成"""
+        with self._lock:
+            proxies = self._products.get(auto_bid.product_id)
+            if proxies is not None:
+                proxies.remove(auto_bid.id)
+
+    def forget_product(self, product_id: int):
+        """拍卖结束后释放该商品的堆"""
+        with self._lock:
+            self._products.pop(product_id, None)
+
+    def resolve(self, db: Session, product: Product, leader_id: Optional[int]) -> List[Bid]:
+        """根据活跃代理出价结算当前价格
+
+        leader_id 为当前领先者（没有出价时为空），product.current_price 为当前价格。
+        返回新增的出价记录（已加入会话，未提交），并更新商品当前价格；不需要代理出价时返回空列表。
+        锁内只做内存计算，数据库读写在锁外；上限不足的代理在会话提交后才移出堆，回滚时丢弃该商品的堆重新加载。
+        """
+        proxies = self._get_proxies(db, product.id)
+        price = Decimal(product.current_price)
+        with self._lock:
+            top, runner_up = proxies.top_two()
+            if top is None:
+                return []
+
+            final_price = None
+            if top.user_id == leader_id:
+                # 领先者自己的代理只需应对次高代理
+                if runner_up is not None and runner_up.max_amount > price:
+                    final_price = min(top.max_amount, runner_up.max_amount + top.increment)
+                keep_auto_bid_id = top.auto_bid_id
+            else:
+                required = price + top.increment
+                if top.max_amount < required:
+                    # 最高代理也无法超过当前价，所有代理均已无效
+                    keep_auto_bid_id = None
+                else:
+                    contender = runner_up.max_amount if runner_up is not None else None
+                    if contender is not None and contender > price:
+                        final_price = max(required, min(top.max_amount, contender + top.increment))
+                    else:
+                        final_price = required
+                    keep_auto_bid_id = top.auto_bid_id
+
+            # 无需加价时，上限已追不上当前价的其他代理仍需标记为完成，否则一直占据次高位置
+            exhausted_ids = self._exhausted_ids(
+                proxies, price if final_price is None else final_price, keep_auto_bid_id
+            )
+
+        new_bids: List[Bid] = []
+        if final_price is not None:
+            if runner_up is not None and runner_up.max_amount > price:
+                new_bids.append(Bid(
+                    product_id=product.id,
+                    bidder_id=runner_up.user_id,
+                    bid_amount=runner_up.max_amount,
+                    is_auto_bid=True,
+                    max_bid_amount=runner_up.max_amount,
+                    status=2  # 被超越
+                ))
+            new_bids.append(Bid(
+                product_id=product.id,
+                bidder_id=top.user_id,
+                bid_amount=final_price,
+                is_auto_bid=True,
+                max_bid_amount=top.max_amount,
+                status=1  # 领先
+            ))
+
+            # 之前的领先出价改为被超越，再一次性写入本次产生的出价
+            db.query(Bid).filter(
+                and_(Bid.product_id == product.id, Bid.status == 1)
+            ).update({"status": 2}, synchronize_session=False)
+            db.add_all(new_bids)
+            product.current_price = final_price
+
+        self._exhaust(db, product.id, exhausted_ids)
+        return new_bids
+
+    def apply_exhausted(self, entries: List[Tuple[int, List[int]]]):
+        """会话提交后把已标记完成的代理移出堆"""
+        with self._lock:
+            for product_id, auto_bid_ids in entries:
+                proxies = self._products.get(product_id)
+                if proxies is None:
+                    continue
+                for auto_bid_id in auto_bid_ids:
+                    proxies.remove(auto_bid_id)
+
+    def _exhausted_ids(
+        self,
+        proxies: _ProductProxies,
+        price: Decimal,
+        keep_auto_bid_id: Optional[int]
+    ) -> List[int]:
+        """上限已不足以继续加价的代理（调用方持有锁）"""
+        return [
+            auto_bid_id for auto_bid_id, entry in proxies.entries.items()
+            if auto_bid_id != keep_auto_bid_id and entry.max_amount < price + MIN_BID_INCREMENT
+        ]
+
+    def _exhaust(self, db: Session, product_id: int, exhausted_ids: List[int]):
+        """代理出价标记为完成（随调用方事务提交），提交后再移出堆"""
+        if not exhausted_ids:
+            return
+        db.query(AutoBid).filter(
+            and_(AutoBid.id.in_(exhausted_ids), AutoBid.status == "active")
+        ).update({"status": "completed"}, synchronize_session=False)
+        db.info.setdefault(_EXHAUSTED_KEY, []).append((product_id, exhausted_ids))
+
+    def _get_proxies(self, db: Session, product_id: int) -> _ProductProxies:
+        with self._lock:
+            proxies = self._products.get(product_id)
+            if proxies is not None and time.monotonic() - proxies.loaded_at < self.ttl:
+                return proxies
+
+        # 在锁外查询，并发加载时保留先装入的堆
+        loaded = _ProductProxies()
+        auto_bids = db.query(AutoBid).filter(
+            and_(AutoBid.product_id == product_id, AutoBid.status == "active")
+        ).order_by(AutoBid.id).all()
+        for auto_bid in auto_bids:
+            loaded.push(_ProxyEntry(auto_bid))
+        with self._lock:
+            proxies = self._products.get(product_id)
+            if proxies is None or proxies.loaded_at < loaded.loaded_at:
+                proxies = self._products[product_id] = loaded
+            return proxies
+
+
+proxy_bid_resolver = ProxyBidResolver()
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _apply_exhausted_proxies(session):
+    entries = session.info.pop(_EXHAUSTED_KEY, None)
+    if entries:
+        proxy_bid_resolver.apply_exhausted(entries)
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _discard_exhausted_proxies(session, previous_transaction):
+    # 外层事务回滚（SAVEPOINT 回滚不处理）：标记完成的更新已撤销，丢弃该商品的堆，下次从数据表重新加载
+    if previous_transaction.parent is None:
+        for product_id, _ in session.info.pop(_EXHAUSTED_KEY, ()):
+            proxy_bid_resolver.forget_product(product_id)
@@ -0,0 +1,210 @@
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Tuple, Iterable, Set
+from collections import Counter, defaultdict
+import heapq
+import logging
+import math
+import threading
+import time
+
+from ..core.database import SessionLocal
+from ..models.product import Product, Bid, ProductFavorite
+
+logger = logging.getLogger(__name__)
+
+# 交互类型权重
+INTERACTION_WEIGHTS = {
+    "bid": 1.0,
+    "favorite": 2.0,
+}
+
+# 每个用户参与相似度计算的最近交互数（限制热门用户带来的平方级开销）
+MAX_ITEMS_PER_USER = 50
+# 每个用户保留用于推荐的最近交互数
+PROFILE_SIZE = 20
+# 每个商品保留的相似商品数
+NEIGHBOR_COUNT = 30
+# 构建失败后重试的最短间隔（秒）
+RETRY_INTERVAL = 60.0
+
+# (用户ID, 商品ID, 交互类型, 时间戳)
+Interaction = Tuple[int, int, str, float]
+
+
+class RecommendationService:
+    """商品协同过滤推荐
+
+    以出价和收藏为用户-商品交互，按稀疏共现计算商品间余弦相似度（等价于二值矩阵 X^T X 再按列范数归一化），
+    每个商品只保留前N个相似商品。用户画像（最近交互）与相似表都常驻内存，
+    推荐时合并用户最近交互商品的相似列表，请求期间不扫描数据库。
+    新交互实时写入用户画像；相似表在应用启动时和过期后都在后台线程构建，请求不等待构建，
+    构建完成前返回空列表（首页使用热度榜单补足）。
+    """
+
+    def __init__(self, rebuild_interval: float = 1800.0):
+        self.rebuild_interval = rebuild_interval
+        self._neighbors: Dict[int, List[Tuple[int, float]]] = {}
+        # 用户ID -> [(商品ID, 权重)]，按时间从旧到新
+        self._profiles: Dict[int, List[Tuple[int, float]]] = {}
+        self._loaded = False
+        self._last_rebuild = 0.0
+        self._last_attempt = 0.0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def record_interaction(self, user_id: int, product_id: int, kind: str):
+        """记录一次新交互，立即影响该用户的推荐"""
+        if not self._loaded:
+            return
+        with self._lock:
+            profile = [item for item in self._profiles.get(user_id, []) if item[0] != product_id]
+            profile.append((product_id, INTERACTION_WEIGHTS[kind]))
+            self._profiles[user_id] = profile[-PROFILE_SIZE:]
+
+    def recommend(
+        self,
+        db: Session,
+        user_id: Optional[int],
+        limit: int = 10,
+        exclude_ids: Optional[Iterable[int]] = None
+    ) -> List[int]:
+        """为用户推荐商品ID（按得分降序），匿名用户、没有交互记录或相似表尚未构建时返回空列表"""
+        if not user_id:
+            return []
+        if not self.ensure_loaded():
+            return []
+
+        with self._lock:
+            profile = list(self._profiles.get(user_id, []))
+            neighbors = self._neighbors
+
+        seen = {product_id for product_id, _ in profile}
+        if exclude_ids:
+            seen.update(exclude_ids)
+
+        # 越新的交互权重越高
+        scores: Dict[int, float] = defaultdict(float)
+        for position, (product_id, weight) in enumerate(reversed(profile)):
+            recency = 0.9 ** position
+            for neighbor_id, similarity in neighbors.get(product_id, ()):
+                if neighbor_id not in seen:
+                    scores[neighbor_id] += similarity * weight * recency
+
+        return [product_id for product_id, _ in heapq.nlargest(limit, scores.items(), key=lambda item: item[1])]
+
+    def similar_products(self, db: Session, product_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        """相似商品（相似表尚未构建时返回空列表）"""
+        if not self.ensure_loaded():
+            return []
+        return self._neighbors.get(product_id, [])[:limit]
+
+    def ensure_loaded(self) -> bool:
+        """相似表未构建或已过期时触发后台重建，返回当前是否已有可用的相似表（不阻塞请求）"""
+        now = time.monotonic()
+        if self._loaded:
+            due = now - self._last_rebuild >= self.rebuild_interval
+        else:
+            due = not self._last_attempt or now - self._last_attempt >= RETRY_INTERVAL
+        if due:
+            self.start_rebuild()
+        return self._loaded
+
+    def start_rebuild(self) -> bool:
+        """在后台线程重建相似表（应用启动时调用），已有重建在进行时不重复启动"""
+        with self._lock:
+            if self._rebuilding:
+                return False
+            self._rebuilding = True
+            self._last_attempt = time.monotonic()
+        threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+        return True
+
+    def rebuild(self, db: Session):
+        """从出价和收藏记录重建相似表和用户画像"""
+        started_at = time.monotonic()
+        interactions: List[Interaction] = []
+        for row in db.query(Bid.bidder_id, Bid.product_id, Bid.created_at).filter(Bid.status != 3).yield_per(10000):
+            interactions.append((row.bidder_id, row.product_id, "bid", row.created_at.timestamp() if row.created_at else 0.0))
+        for row in db.query(ProductFavorite.user_id, ProductFavorite.product_id, ProductFavorite.created_at).yield_per(10000):
+            interactions.append((row.user_id, row.product_id, "favorite", row.created_at.timestamp() if row.created_at else 0.0))
+        candidate_ids = {row.id for row in db.query(Product.id).filter(Product.status == 2).yield_per(10000)}
+
+        neighbors, profiles = self.build(interactions, candidate_ids)
+        with self._lock:
+            self._neighbors = neighbors
+            self._profiles = profiles
+            self._loaded = True
+            self._last_rebuild = time.monotonic()
+
+        logger.info(
+            f"推荐相似表已重建，交互 {len(interactions)} 条，商品 {len(neighbors)} 个，"
+            f"耗时 {time.monotonic() - started_at:.2f}s"
+        )
+
+    def build(
+        self,
+        interactions: Iterable[Interaction],
+        candidate_ids: Optional[Set[int]] = None
+    ) -> Tuple[Dict[int, List[Tuple[int, float]]], Dict[int, List[Tuple[int, float]]]]:
+        """由交互数据计算相似表和用户画像
+
+        candidate_ids 限定可被推荐的商品（如拍卖中），为空表示不限。
+        """
+        # 用户 -> {商品: (权重, 最近时间)}，同一商品多次交互取最大权重
+        user_items: Dict[int, Dict[int, Tuple[float, float]]] = defaultdict(dict)
+        for user_id, product_id, kind, timestamp in interactions:
+            weight = INTERACTION_WEIGHTS[kind]
+            current = user_items[user_id].get(product_id)
+            if current is None:
+                user_items[user_id][product_id] = (weight, timestamp)
+            else:
+                user_items[user_id][product_id] = (max(weight, current[0]), max(timestamp, current[1]))
+
+        # 相似度按二值共现计算（Counter.update 在C层计数），交互权重只在推荐合并时使用
+        norms: Counter = Counter()
+        co_counts: Dict[int, Counter] = defaultdict(Counter)
+        profiles: Dict[int, List[Tuple[int, float]]] = {}
+
+        for user_id, items in user_items.items():
+            recent = sorted(items.items(), key=lambda item: item[1][1])[-MAX_ITEMS_PER_USER:]
+            profiles[user_id] = [(product_id, weight) for product_id, (weight, _) in recent[-PROFILE_SIZE:]]
+
+            vector = [product_id for product_id, _ in recent]
+            norms.update(vector)
+            if len(vector) > 1:
+                for product_id in vector:
+                    co_counts[product_id].update(vector)
+
+        inverse_norms = {product_id: 1 / math.sqrt(count) for product_id, count in norms.items()}
+        neighbors: Dict[int, List[Tuple[int, float]]] = {}
+        for product_id, row in co_counts.items():
+            # 同一行内排序只取决于 共现值 / 对方范数，本商品的范数最后再乘
+            scored = [
+                (value * inverse_norms[other_id], other_id)
+                for other_id, value in row.items()
+                if other_id != product_id and (candidate_ids is None or other_id in candidate_ids)
+            ]
+            if len(scored) > NEIGHBOR_COUNT:
+                scored = heapq.nlargest(NEIGHBOR_COUNT, scored)
+            else:
+                scored.sort(reverse=True)
+            if scored:
+                inverse_norm = inverse_norms[product_id]
+                neighbors[product_id] = [
+                    (other_id, round(score * inverse_norm, 6)) for score, other_id in scored
+                ]
+
+        return neighbors, profiles
+
+    def _rebuild_in_background(self):
+        db = SessionLocal()
+        try:
+            self.rebuild(db)
+        except Exception as e:
+            logger.error(f"推荐相似表后台重建失败: {e}")
+        finally:
+            self._rebuilding = False
+            db.close()
+
+
+recommendation_service = RecommendationService()
@@ -1,10 +1,6 @@
-from alibabacloud_dysmsapi20170525.client import Client as Dysmsapi20170525Client
-from alibabacloud_tea_openapi import models as open_api_models
-from alibabacloud_dysmsapi20170525 import models as dysmsapi_20170525_models
-from alibabacloud_tea_util import models as util_models
 import random
 import time
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.core.config import settings
@@ -12,14 +8,27 @@ from app.core.database import get_db
 from app.models.sms_code import SMSCode
 import logging
 
+if TYPE_CHECKING:
+    from alibabacloud_dysmsapi20170525.client import Client as Dysmsapi20170525Client
+
 logger = logging.getLogger(__name__)
 
 class SMSService:
     def __init__(self):
-        self.client = self._create_client()
+        # 阿里云SDK导入较慢，首次发送短信时再创建客户端
+        self._client: Optional["Dysmsapi20170525Client"] = None
+    
+    @property
+    def client(self) -> "Dysmsapi20170525Client":
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
     
-    def _create_client(self) -> Dysmsapi20170525Client:
+    def _create_client(self) -> "Dysmsapi20170525Client":
         """创建阿里云短信客户端"""
+        from alibabacloud_dysmsapi20170525.client import Client as Dysmsapi20170525Client
+        from alibabacloud_tea_openapi import models as open_api_models
+        
         config = open_api_models.Config(
             access_key_id=settings.SMS_ACCESS_KEY,
             access_key_secret=settings.SMS_SECRET_KEY,
@@ -29,6 +38,9 @@ class SMSService:
     
     async def send_verification_code(self, phone: str, db: Session) -> dict:
         """发送验证码短信"""
+        from alibabacloud_dysmsapi20170525 import models as dysmsapi_20170525_models
+        from alibabacloud_tea_util import models as util_models
+        
         try:
             # 生成6位数字验证码
             code = str(random.randint(100000, 999999))
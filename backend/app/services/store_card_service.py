@@ -0,0 +1,155 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, desc, func
+from typing import List, Optional, Dict, Any
+
+from ..core.cache import TTLCache
+from ..models.store import Store, StoreFollow
+from ..models.product import Product
+from ..models.user import User
+from ..schemas.store import StoreResponse
+
+# 店铺卡片中展示的最近商品数量
+RECENT_PRODUCT_LIMIT = 6
+
+
+class StoreCardAssembler:
+    """店铺卡片组装器
+
+    一次性为一批店铺批量加载店主信息、关注状态和最近商品（每类一条查询），
+    并缓存卡片中与用户无关的部分（除 is_following 外的所有字段）。
+    缓存为进程内缓存，在店铺、商品更新时主动失效，TTL 兜底多进程间的一致性。
+    """
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 2048):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # 店主ID -> 店铺ID，用于按店主失效卡片；与卡片同容量、同TTL，每次组装时刷新，不会早于卡片过期或淘汰
+        self._owner_store_ids = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def build_responses(
+        self,
+        db: Session,
+        stores: List[Store],
+        user_id: Optional[int] = None
+    ) -> List[StoreResponse]:
+        """批量组装店铺响应，顺序与传入的 stores 一致"""
+        if not stores:
+            return []
+
+        store_ids = [store.id for store in stores]
+        cards = self.cache.get_many(store_ids)
+
+        missing = [store for store in stores if store.id not in cards]
+        if missing:
+            for store_id, card in self._load_cards(db, missing).items():
+                self.cache.set(store_id, card)
+                cards[store_id] = card
+        for store in stores:
+            self._owner_store_ids.set(store.owner_id, store.id)
+
+        following_ids = self._load_following_ids(db, store_ids, user_id)
+
+        return [
+            StoreResponse(**cards[store.id], is_following=store.id in following_ids)
+            for store in stores
+        ]
+
+    def build_response(self, db: Session, store: Store, user_id: Optional[int] = None) -> StoreResponse:
+        """组装单个店铺响应"""
+        return self.build_responses(db, [store], user_id)[0]
+
+    def invalidate_store(self, store_id: int):
+        """店铺信息变更时失效卡片缓存"""
+        self.cache.delete(store_id)
+
+    def invalidate_owner(self, owner_id: int):
+        """店主的商品变更时失效其店铺卡片缓存"""
+        store_id = self._owner_store_ids.get(owner_id)
+        if store_id is not None:
+            self.cache.delete(store_id)
+            self._owner_store_ids.delete(owner_id)
+
+    def _load_cards(self, db: Session, stores: List[Store]) -> Dict[int, Dict[str, Any]]:
+        """为未命中缓存的店铺构建共享卡片数据"""
+        owner_ids = list({store.owner_id for store in stores})
+
+        # 店主信息
+        owners = {
+            row.id: row for row in db.query(User.id, User.nickname, User.avatar_url).filter(
+                User.id.in_(owner_ids)
+            ).all()
+        }
+
+        # 最近商品：按店主分区取前N条
+        recent_products: Dict[int, List[Dict[str, Any]]] = {owner_id: [] for owner_id in owner_ids}
+        row_number = func.row_number().over(
+            partition_by=Product.seller_id,
+            order_by=(desc(Product.created_at), desc(Product.id))
+        ).label("row_number")
+        ranked = db.query(
+            Product.id,
+            Product.seller_id,
+            Product.title,
+            Product.images,
+            Product.current_price,
+            Product.status,
+            row_number
+        ).filter(
+            and_(Product.seller_id.in_(owner_ids), Product.status.in_([1, 2, 3]))
+        ).subquery()
+        rows = db.query(ranked).filter(
+            ranked.c.row_number <= RECENT_PRODUCT_LIMIT
+        ).order_by(ranked.c.seller_id, ranked.c.row_number).all()
+
+        for row in rows:
+            recent_products[row.seller_id].append({
+                "id": row.id,
+                "title": row.title,
+                "images": row.images or [],
+                "current_price": str(row.current_price),
+                "status": row.status
+            })
+
+        cards = {}
+        for store in stores:
+            owner = owners.get(store.owner_id)
+            cards[store.id] = {
+                "id": store.id,
+                "owner_id": store.owner_id,
+                "name": store.name,
+                "description": store.description,
+                "avatar": store.avatar,
+                "banner": store.banner,
+                "location": store.location,
+                "phone": store.phone,
+                "is_open": store.is_open,
+                "business_hours": store.business_hours,
+                "announcement": store.announcement,
+                "total_products": store.total_products,
+                "total_sales": store.total_sales,
+                "total_revenue": store.total_revenue,
+                "rating": store.rating,
+                "rating_count": store.rating_count,
+                "follower_count": store.follower_count,
+                "status": store.status,
+                "verified": store.verified,
+                "created_at": store.created_at,
+                "updated_at": store.updated_at,
+                "owner_info": {
+                    "nickname": owner.nickname if owner else "店主",
+                    "avatar": owner.avatar_url if owner else None
+                } if owner else None,
+                "recent_products": recent_products.get(store.owner_id, [])
+            }
+        return cards
+
+    def _load_following_ids(self, db: Session, store_ids: List[int], user_id: Optional[int]) -> set:
+        """一次查询出用户关注了这批店铺中的哪些"""
+        if not user_id:
+            return set()
+        rows = db.query(StoreFollow.store_id).filter(
+            and_(StoreFollow.user_id == user_id, StoreFollow.store_id.in_(store_ids))
+        ).all()
+        return {row.store_id for row in rows}
+
+
+store_card_assembler = StoreCardAssembler()
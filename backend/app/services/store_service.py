@@ -7,20 +7,23 @@ from decimal import Decimal
 from ..models.store import Store, StoreFollow, StoreReview
 from ..models.product import Product
 from ..models.user import User
+from ..models.order import Order
 from ..schemas.store import (
     StoreCreate, StoreUpdate, StoreResponse, StoreListResponse,
     StoreReviewCreate, StoreReviewResponse, StoreReviewListResponse,
     StoreStatsResponse
 )
+from .store_stats_service import store_stats_service
+from .store_card_service import store_card_assembler
 
 class StoreService:
     
-    async def get_store_by_owner(self, db: Session, owner_id: int) -> Optional[StoreResponse]:
+    async def get_store_by_owner(self, db: Session, owner_id: int, user_id: Optional[int] = None) -> Optional[StoreResponse]:
         """通过店主ID获取店铺"""
         store = db.query(Store).filter(Store.owner_id == owner_id).first()
         if not store:
             return None
-        return self._to_store_response(store, db)
+        return self._to_store_response(store, db, user_id)
     
     async def get_store_by_id(self, db: Session, store_id: int, user_id: Optional[int] = None) -> Optional[StoreResponse]:
         """通过店铺ID获取店铺"""
@@ -29,6 +32,35 @@ class StoreService:
             return None
         return self._to_store_response(store, db, user_id)
     
+    async def get_stores(
+        self,
+        db: Session,
+        page: int = 1,
+        page_size: int = 20,
+        keyword: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> StoreListResponse:
+        """获取店铺列表"""
+        query = db.query(Store).filter(Store.status == 1)
+        
+        if keyword:
+            query = query.filter(Store.name.contains(keyword))
+        
+        query = query.order_by(desc(Store.follower_count), desc(Store.id))
+        
+        # 分页
+        total = query.count()
+        offset = (page - 1) * page_size
+        stores = query.offset(offset).limit(page_size).all()
+        
+        return StoreListResponse(
+            items=store_card_assembler.build_responses(db, stores, user_id),
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=(total + page_size - 1) // page_size
+        )
+    
     async def create_store(self, db: Session, store_data: StoreCreate, owner_id: int) -> StoreResponse:
         """创建店铺"""
         # 检查用户是否已有店铺
@@ -71,6 +103,7 @@ class StoreService:
         
         db.commit()
         db.refresh(store)
+        store_card_assembler.invalidate_store(store.id)
         
         return self._to_store_response(store, db)
     
@@ -157,6 +190,7 @@ class StoreService:
         store.follower_count += 1
         
         db.commit()
+        store_card_assembler.invalidate_store(store_id)
         return True
     
     async def unfollow_store(self, db: Session, store_id: int, user_id: int) -> bool:
@@ -180,8 +214,64 @@ class StoreService:
             store.follower_count -= 1
         
         db.commit()
+        store_card_assembler.invalidate_store(store_id)
         return True
     
+    async def create_store_review(self, db: Session, review_data: StoreReviewCreate, user_id: int) -> Dict[str, Any]:
+        """创建店铺评价"""
+        if review_data.rating < 1 or review_data.rating > 5:
+            raise ValueError("评分必须在1-5之间")
+        
+        store = db.query(Store).filter(Store.id == review_data.store_id).first()
+        if not store:
+            raise ValueError("店铺不存在")
+        
+        # 只能评价自己在该店铺的订单
+        order = db.query(Order).filter(
+            and_(
+                Order.id == review_data.order_id,
+                Order.buyer_id == user_id,
+                Order.seller_id == store.owner_id
+            )
+        ).first()
+        if not order:
+            raise ValueError("订单不存在或无权限评价")
+        
+        existing_review = db.query(StoreReview).filter(
+            and_(StoreReview.order_id == review_data.order_id, StoreReview.user_id == user_id)
+        ).first()
+        if existing_review:
+            raise ValueError("该订单已评价")
+        
+        review = StoreReview(
+            user_id=user_id,
+            store_id=review_data.store_id,
+            order_id=review_data.order_id,
+            rating=review_data.rating,
+            comment=review_data.comment,
+            images=review_data.images
+        )
+        db.add(review)
+        db.flush()
+        
+        # 更新店铺评分
+        rating_count = (store.rating_count or 0) + 1
+        store.rating = (Decimal(str(store.rating or 0)) * (rating_count - 1) + review.rating) / rating_count
+        store.rating_count = rating_count
+        
+        store_stats_service.record_review_created(db, review)
+        
+        db.commit()
+        db.refresh(review)
+        store_card_assembler.invalidate_store(store.id)
+        
+        return {
+            "id": review.id,
+            "store_id": review.store_id,
+            "order_id": review.order_id,
+            "rating": review.rating
+        }
+    
     async def get_store_reviews(
         self, 
         db: Session, 
@@ -267,95 +357,25 @@ class StoreService:
         if not store:
             raise ValueError("店铺不存在或无权限")
         
-        # 基础统计
-        total_products = db.query(Product).filter(Product.seller_id == owner_id).count()
-        active_products = db.query(Product).filter(
-            and_(Product.seller_id == owner_id, Product.status == 2)
-        ).count()
-        
-        # 评价统计
-        total_reviews = db.query(StoreReview).filter(StoreReview.store_id == store_id).count()
-        avg_rating = db.query(func.avg(StoreReview.rating)).filter(
-            StoreReview.store_id == store_id
-        ).scalar() or 0.0
-        
-        # 最近30天统计
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_reviews = db.query(StoreReview).filter(
-            and_(
-                StoreReview.store_id == store_id,
-                StoreReview.created_at >= thirty_days_ago
-            )
-        ).count()
+        # 从每日汇总表读取统计
+        summary = store_stats_service.get_store_summary(db, store)
         
         return StoreStatsResponse(
-            total_products=total_products,
-            active_products=active_products,
-            total_orders=store.total_sales,
-            total_revenue=store.total_revenue,
-            total_reviews=total_reviews,
-            average_rating=float(avg_rating),
+            total_products=summary["total_products"],
+            active_products=summary["products_by_status"][2],
+            total_orders=summary["total_orders"],
+            total_revenue=summary["total_revenue"],
+            total_reviews=summary["total_reviews"],
+            average_rating=float(summary["average_rating"]),
             follower_count=store.follower_count,
-            recent_orders=0,  # 需要订单表支持
-            recent_revenue=Decimal("0.00"),  # 需要订单表支持
-            recent_reviews=recent_reviews
+            recent_orders=summary["recent_30d"]["orders"],
+            recent_revenue=summary["recent_30d"]["revenue"],
+            recent_reviews=summary["recent_30d"]["reviews"],
+            recent_orders_7d=summary["recent_7d"]["orders"],
+            recent_revenue_7d=summary["recent_7d"]["revenue"],
+            recent_reviews_7d=summary["recent_7d"]["reviews"]
         )
     
     def _to_store_response(self, store: Store, db: Session, user_id: Optional[int] = None) -> StoreResponse:
         """转换为响应格式"""
-        # 获取店主信息
-        owner = db.query(User).filter(User.id == store.owner_id).first()
-        
-        # 检查是否关注
-        is_following = False
-        if user_id:
-            follow = db.query(StoreFollow).filter(
-                and_(StoreFollow.store_id == store.id, StoreFollow.user_id == user_id)
-            ).first()
-            is_following = bool(follow)
-        
-        # 获取最近商品
-        recent_products_query = db.query(Product).filter(
-            and_(Product.seller_id == store.owner_id, Product.status.in_([1, 2, 3]))
-        ).order_by(desc(Product.created_at)).limit(6)
-        
-        recent_products = []
-        for product in recent_products_query:
-            product_dict = {
-                "id": product.id,
-                "title": product.title,
-                "images": product.images or [],
-                "current_price": str(product.current_price),
-                "status": product.status
-            }
-            recent_products.append(product_dict)
-        
-        return StoreResponse(
-            id=store.id,
-            owner_id=store.owner_id,
-            name=store.name,
-            description=store.description,
-            avatar=store.avatar,
-            banner=store.banner,
-            location=store.location,
-            phone=store.phone,
-            is_open=store.is_open,
-            business_hours=store.business_hours,
-            announcement=store.announcement,
-            total_products=store.total_products,
-            total_sales=store.total_sales,
-            total_revenue=store.total_revenue,
-            rating=store.rating,
-            rating_count=store.rating_count,
-            follower_count=store.follower_count,
-            status=store.status,
-            verified=store.verified,
-            created_at=store.created_at,
-            updated_at=store.updated_at,
-            owner_info={
-                "nickname": owner.nickname if owner else "店主",
-                "avatar": owner.avatar_url if owner else None
-            } if owner else None,
-            is_following=is_following,
-            recent_products=recent_products
-        )
\ No newline at end of file
+        return store_card_assembler.build_response(db, store, user_id)
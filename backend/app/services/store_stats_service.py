@@ -0,0 +1,297 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, exists
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Dict, Any
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+import logging
+
+from ..models.store import Store, StoreReview, StoreDailyStats
+from ..models.product import Product
+from ..models.order import Order
+
+logger = logging.getLogger(__name__)
+
+# 商品状态 -> 汇总表字段
+PRODUCT_STATUS_COLUMNS = {
+    1: "pending_products",
+    2: "active_products",
+    3: "ended_products",
+    4: "offline_products",
+}
+
+# 已取消订单不计入统计
+CANCELLED_ORDER_STATUS = 6
+
+# 回填标记行的日期：回填时写入一行计数全为 0 的标记行，汇总时不影响结果
+BACKFILL_MARKER_DATE = date(1970, 1, 1)
+
+
+class StoreStatsService:
+    """店铺统计汇总服务
+
+    每个店铺每天一行 StoreDailyStats，业务写入时按增量更新当天的行，
+    统计接口只需读取该店铺的汇总行（O(天数)），不再扫描商品、订单和评价表。
+    回填只在后台任务中执行（backfill_pending / backfill_all），统计接口只读不写。
+    回填和增量钩子都先锁定店铺行（SELECT ... FOR UPDATE）再读写汇总行，二者串行执行：
+    钩子所在事务提交前回填等待，回填提交前钩子等待，明细不会被重复计入或丢失。
+    """
+
+    # 增量钩子：只 flush，不 commit，随调用方事务一起提交
+    def record_order_created(self, db: Session, order: Order):
+        """订单创建钩子"""
+        store_id = self._get_store_id_by_owner(db, order.seller_id)
+        if store_id is None:
+            return
+        self._apply_delta(db, store_id, self._to_date(order.created_at), {
+            "order_count": 1,
+            "order_revenue": Decimal(str(order.total_amount or 0)),
+        })
+
+    def record_order_cancelled(self, db: Session, order: Order):
+        """订单取消钩子（冲减下单当天的统计）"""
+        store_id = self._get_store_id_by_owner(db, order.seller_id)
+        if store_id is None:
+            return
+        self._apply_delta(db, store_id, self._to_date(order.created_at), {
+            "order_count": -1,
+            "order_revenue": -Decimal(str(order.total_amount or 0)),
+        })
+
+    def record_review_created(self, db: Session, review: StoreReview):
+        """评价创建钩子"""
+        self._lock_store(db, review.store_id)
+        self._apply_delta(db, review.store_id, self._to_date(review.created_at), {
+            "review_count": 1,
+            "rating_sum": int(review.rating),
+        })
+
+    def record_product_status_change(
+        self,
+        db: Session,
+        seller_id: int,
+        old_status: Optional[int],
+        new_status: Optional[int]
+    ):
+        """商品状态变更钩子（新建商品 old_status 为 None，删除商品 new_status 为 None）"""
+        if old_status == new_status:
+            return
+
+        delta = {}
+        if old_status in PRODUCT_STATUS_COLUMNS:
+            delta[PRODUCT_STATUS_COLUMNS[old_status]] = -1
+        if new_status in PRODUCT_STATUS_COLUMNS:
+            delta[PRODUCT_STATUS_COLUMNS[new_status]] = 1
+        if not delta:
+            return
+
+        store_id = self._get_store_id_by_owner(db, seller_id)
+        if store_id is None:
+            return
+        self._apply_delta(db, store_id, date.today(), delta)
+
+    # 读取
+    def get_store_summary(self, db: Session, store: Store) -> Dict[str, Any]:
+        """汇总店铺统计（含最近7天、30天窗口）
+
+        尚未回填的店铺只包含增量钩子写入的行，由主进程后台循环回填后补齐历史数据。
+        """
+        rows = db.query(StoreDailyStats).filter(
+            StoreDailyStats.store_id == store.id
+        ).all()
+
+        today = date.today()
+        windows = {7: today - timedelta(days=6), 30: today - timedelta(days=29)}
+
+        summary = {
+            "total_orders": 0,
+            "total_revenue": Decimal("0.00"),
+            "total_reviews": 0,
+            "rating_sum": 0,
+            "products_by_status": {status: 0 for status in PRODUCT_STATUS_COLUMNS},
+        }
+        recent = {days: {"orders": 0, "revenue": Decimal("0.00"), "reviews": 0} for days in windows}
+
+        for row in rows:
+            summary["total_orders"] += row.order_count or 0
+            summary["total_revenue"] += row.order_revenue or Decimal("0.00")
+            summary["total_reviews"] += row.review_count or 0
+            summary["rating_sum"] += row.rating_sum or 0
+            for status, column in PRODUCT_STATUS_COLUMNS.items():
+                summary["products_by_status"][status] += getattr(row, column) or 0
+
+            for days, start_date in windows.items():
+                if row.stat_date >= start_date:
+                    recent[days]["orders"] += row.order_count or 0
+                    recent[days]["revenue"] += row.order_revenue or Decimal("0.00")
+                    recent[days]["reviews"] += row.review_count or 0
+
+        summary["total_products"] = sum(summary["products_by_status"].values())
+        summary["average_rating"] = (
+            summary["rating_sum"] / summary["total_reviews"] if summary["total_reviews"] > 0 else 0.0
+        )
+        summary["recent_7d"] = recent[7]
+        summary["recent_30d"] = recent[30]
+        return summary
+
+    # 回填
+    def backfill_store(self, db: Session, store: Store) -> List[StoreDailyStats]:
+        """根据订单、评价、商品明细重建单个店铺的汇总行"""
+        # 先锁定店铺行再读取明细：进行中的增量钩子提交后才开始读取，之后的钩子等待本次回填提交
+        self._lock_store(db, store.id)
+        buckets: Dict[date, Dict[str, Any]] = {}
+
+        def bucket(day) -> Dict[str, Any]:
+            day = self._to_date(day)
+            if day not in buckets:
+                buckets[day] = {}
+            return buckets[day]
+
+        order_rows = db.query(
+            func.date(Order.created_at).label("day"),
+            func.count(Order.id).label("count"),
+            func.sum(Order.total_amount).label("revenue")
+        ).filter(
+            and_(
+                Order.seller_id == store.owner_id,
+                Order.order_status != CANCELLED_ORDER_STATUS
+            )
+        ).group_by(func.date(Order.created_at)).all()
+        for row in order_rows:
+            values = bucket(row.day)
+            values["order_count"] = row.count
+            values["order_revenue"] = Decimal(str(row.revenue or 0))
+
+        review_rows = db.query(
+            func.date(StoreReview.created_at).label("day"),
+            func.count(StoreReview.id).label("count"),
+            func.sum(StoreReview.rating).label("rating_sum")
+        ).filter(
+            StoreReview.store_id == store.id
+        ).group_by(func.date(StoreReview.created_at)).all()
+        for row in review_rows:
+            values = bucket(row.day)
+            values["review_count"] = row.count
+            values["rating_sum"] = int(row.rating_sum or 0)
+
+        # 商品按创建日期记入当前状态，累加后即为各状态当前数量
+        product_rows = db.query(
+            func.date(Product.created_at).label("day"),
+            Product.status,
+            func.count(Product.id).label("count")
+        ).filter(
+            Product.seller_id == store.owner_id
+        ).group_by(func.date(Product.created_at), Product.status).all()
+        for row in product_rows:
+            column = PRODUCT_STATUS_COLUMNS.get(row.status)
+            if column:
+                values = bucket(row.day)
+                values[column] = values.get(column, 0) + row.count
+
+        # 标记行记录该店铺已回填（即使没有任何明细数据）
+        buckets.setdefault(BACKFILL_MARKER_DATE, {})
+
+        db.query(StoreDailyStats).filter(StoreDailyStats.store_id == store.id).delete(
+            synchronize_session=False
+        )
+        rows = []
+        for day, values in sorted(buckets.items()):
+            row = StoreDailyStats(store_id=store.id, stat_date=day, **self._empty_counters())
+            for column, value in values.items():
+                setattr(row, column, value)
+            db.add(row)
+            rows.append(row)
+
+        db.commit()
+        return rows
+
+    def backfill_all(self, db: Session) -> int:
+        """重建所有店铺的汇总行"""
+        return self._backfill_stores(db, db.query(Store).all())
+
+    def backfill_pending(self, db: Session) -> int:
+        """回填尚无标记行的店铺（新开店铺和上线前已有的店铺）"""
+        stores = db.query(Store).filter(
+            ~exists().where(
+                and_(
+                    StoreDailyStats.store_id == Store.id,
+                    StoreDailyStats.stat_date == BACKFILL_MARKER_DATE
+                )
+            )
+        ).all()
+        return self._backfill_stores(db, stores)
+
+    # 私有方法
+    def _backfill_stores(self, db: Session, stores: List[Store]) -> int:
+        for store in stores:
+            try:
+                self.backfill_store(db, store)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"回填店铺统计失败，店铺ID: {store.id}, 错误: {e}")
+        return len(stores)
+
+    def _apply_delta(self, db: Session, store_id: int, stat_date: date, delta: Dict[str, Any]):
+        """对某店铺某天的汇总行做原子增量更新，行不存在时插入"""
+        values = {
+            getattr(StoreDailyStats, column): getattr(StoreDailyStats, column) + amount
+            for column, amount in delta.items()
+        }
+        updated = db.query(StoreDailyStats).filter(
+            and_(
+                StoreDailyStats.store_id == store_id,
+                StoreDailyStats.stat_date == stat_date
+            )
+        ).update(values, synchronize_session=False)
+
+        if updated:
+            return
+
+        row = StoreDailyStats(store_id=store_id, stat_date=stat_date, **self._empty_counters())
+        for column, amount in delta.items():
+            setattr(row, column, amount)
+        try:
+            with db.begin_nested():
+                db.add(row)
+        except IntegrityError:
+            # 并发插入了同一天的行，改为增量更新
+            db.query(StoreDailyStats).filter(
+                and_(
+                    StoreDailyStats.store_id == store_id,
+                    StoreDailyStats.stat_date == stat_date
+                )
+            ).update(values, synchronize_session=False)
+
+    def _get_store_id_by_owner(self, db: Session, owner_id: int) -> Optional[int]:
+        """根据店主ID获取并锁定店铺（增量钩子使用，与回填串行）"""
+        row = db.query(Store.id).filter(Store.owner_id == owner_id).with_for_update().first()
+        return row.id if row else None
+
+    def _lock_store(self, db: Session, store_id: int):
+        """锁定店铺行直到事务结束（SQLite 不支持行锁，写事务本身已串行）"""
+        db.query(Store.id).filter(Store.id == store_id).with_for_update().first()
+
+    def _empty_counters(self) -> Dict[str, Any]:
+        """汇总行的初始计数"""
+        counters = {
+            "order_count": 0,
+            "order_revenue": Decimal("0.00"),
+            "review_count": 0,
+            "rating_sum": 0,
+        }
+        for column in PRODUCT_STATUS_COLUMNS.values():
+            counters[column] = 0
+        return counters
+
+    def _to_date(self, value) -> date:
+        """统一转换为日期（SQLite 的 date() 返回字符串）"""
+        if value is None:
+            return date.today()
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value)[:10])
+
+
+store_stats_service = StoreStatsService()
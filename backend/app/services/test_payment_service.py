@@ -8,6 +8,7 @@ import time
 import uuid
 
 from ..models.order import Order, Payment
+from .order_service import OrderService
 
 class TestPaymentService:
     def __init__(self):
@@ -81,9 +82,7 @@ class TestPaymentService:
             # 更新订单状态
             order = db.query(Order).filter(Order.id == payment.order_id).first()
             if order:
-                order.payment_status = 2  # 已支付
-                order.order_status = 2  # 待发货
-                order.paid_at = time.time()
+                await OrderService().mark_order_paid(db, order)
             
             db.commit()
             return True
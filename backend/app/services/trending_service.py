@@ -0,0 +1,257 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import List, Optional, Dict, Tuple
+from datetime import datetime, timedelta
+import bisect
+import logging
+import threading
+import time
+
+from ..core.database import SessionLocal
+from ..models.product import Product, ProductFavorite, Bid
+
+logger = logging.getLogger(__name__)
+
+# 各类事件的权重
+EVENT_WEIGHTS = {
+    "view": 1.0,
+    "bid": 3.0,
+    "favorite": 5.0,
+}
+
+# 全站榜单使用的分类键
+ALL_CATEGORIES = None
+
+# 重建失败后重试的最短间隔（秒）
+RETRY_INTERVAL = 60.0
+
+
+class TrendingService:
+    """热门商品引擎
+
+    每个商品维护一个按指数半衰期衰减的热度分（浏览、出价、收藏），事件到达时增量更新。
+    分数以固定基准时间存储：事件权重乘以 2^((事件时间-基准时间)/半衰期)，
+    所有商品随时间等比例衰减，排序不变，因此无需定时重算；指数过大时整体平移基准时间。
+    每个分类和全站各维护一个有序列表，读取前K名为 O(K)。
+    事件只在处理请求的进程内计入，定期从数据库重建以合并其他进程的变化。
+    重建在后台线程进行（应用启动时和过期后触发），数据库读取和计分都不持有锁，完成后在锁内整体替换；
+    重建期间到达的事件同时记入缓冲，替换前在锁内重放到新榜单上，不会因替换而丢失。
+    首次构建完成前 top_ids 返回空列表，调用方按浏览量回退。
+    """
+
+    def __init__(self, half_life_hours: float = 24.0, rebuild_interval: float = 600.0):
+        self.half_life_hours = half_life_hours
+        self.half_life_seconds = half_life_hours * 3600
+        self.rebuild_interval = rebuild_interval
+        self._epoch = time.time()
+        self._scores: Dict[int, float] = {}
+        self._product_categories: Dict[int, Optional[int]] = {}
+        # 分类ID（None 为全站） -> [(-分数, 商品ID)] 升序
+        self._rankings: Dict[Optional[int], List[Tuple[float, int]]] = {}
+        self._loaded = False
+        self._last_rebuild = 0.0
+        self._last_attempt = 0.0
+        self._rebuilding = False
+        # 重建期间到达的事件：(商品ID, 分类ID, 分数增量, 时间戳)，分数增量为 None 表示移出榜单
+        self._pending: Optional[List[Tuple[int, Optional[int], Optional[float], float]]] = None
+        self._lock = threading.RLock()
+
+    def record_event(self, product: Product, event: str, weight: float = 1.0, at: Optional[datetime] = None):
+        """记录一次热度事件，weight 为负时用于撤销（如取消收藏）"""
+        timestamp = at.timestamp() if at else time.time()
+        delta = EVENT_WEIGHTS[event] * weight
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((product.id, product.category_id, delta, timestamp))
+            if self._loaded:
+                self._add_score(product.id, product.category_id, delta, timestamp)
+
+    def record_view(self, product: Product, count: int = 1):
+        """浏览事件（count 为合并计入的浏览次数）"""
+        self.record_event(product, "view", count)
+
+    def record_bid(self, product: Product):
+        """出价事件"""
+        self.record_event(product, "bid")
+
+    def record_favorite(self, product: Product, favorited: bool = True):
+        """收藏/取消收藏事件"""
+        self.record_event(product, "favorite", 1.0 if favorited else -1.0)
+
+    def remove_product(self, product_id: int):
+        """商品下架或拍卖结束时移出榜单"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((product_id, None, None, time.time()))
+            self._remove(product_id)
+
+    def top_ids(
+        self,
+        db: Session,
+        limit: int,
+        offset: int = 0,
+        category_id: Optional[int] = None
+    ) -> List[int]:
+        """按热度取商品ID（榜单尚未构建时返回空列表）"""
+        self.ensure_loaded()
+        with self._lock:
+            ranking = self._rankings.get(category_id, [])
+            return [product_id for _, product_id in ranking[offset:offset + limit]]
+
+    def count(self, db: Session, category_id: Optional[int] = None) -> int:
+        """榜单中的商品数"""
+        self.ensure_loaded()
+        with self._lock:
+            return len(self._rankings.get(category_id, []))
+
+    def current_score(self, product_id: int) -> float:
+        """商品当前时刻的热度分"""
+        with self._lock:
+            stored = self._scores.get(product_id, 0.0)
+            return stored * 2 ** ((self._epoch - time.time()) / self.half_life_seconds)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def ensure_loaded(self) -> bool:
+        """榜单未构建或已过期时触发后台重建（不阻塞请求），返回当前是否已有可用的榜单"""
+        now = time.monotonic()
+        stale = not self._loaded or now - self._last_rebuild >= self.rebuild_interval
+        if stale and (not self._last_attempt or now - self._last_attempt >= RETRY_INTERVAL):
+            self.start_rebuild()
+        return self._loaded
+
+    def start_rebuild(self) -> bool:
+        """在后台线程重建榜单（应用启动时调用），已有重建在进行时不重复启动"""
+        with self._lock:
+            if self._rebuilding:
+                return False
+            self._rebuilding = True
+            self._last_attempt = time.monotonic()
+        threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+        return True
+
+    def rebuild(self, db: Session, lookback_half_lives: int = 10):
+        """从数据库重建热度分
+
+        出价和收藏按实际发生时间计分；浏览只有累计数，按商品最近更新时间近似计分。
+        早于 lookback_half_lives 个半衰期的事件贡献可以忽略，不再加载。
+        """
+        started_at = time.monotonic()
+        since = datetime.now() - timedelta(seconds=self.half_life_seconds * lookback_half_lives)
+        with self._lock:
+            # 从读取数据库前开始缓冲事件，替换前重放（快照前刚提交的事件可能重复计入一次，影响可忽略）
+            self._pending = []
+        try:
+            fresh = self._score_snapshot(db, since)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            for product_id, category_id, delta, timestamp in self._pending:
+                if delta is None:
+                    fresh._remove(product_id)
+                else:
+                    fresh._add_score(product_id, category_id, delta, timestamp)
+            self._pending = None
+            self._epoch = fresh._epoch
+            self._scores = fresh._scores
+            self._product_categories = fresh._product_categories
+            self._rankings = fresh._rankings
+            self._loaded = True
+            self._last_rebuild = time.monotonic()
+
+        logger.info(f"热门商品榜单已重建，共 {len(fresh._scores)} 个商品，耗时 {time.monotonic() - started_at:.3f}s")
+
+    def _score_snapshot(self, db: Session, since: datetime) -> "TrendingService":
+        """读取数据库快照，在新实例上计分（不持有锁，不阻塞读取和事件计入）"""
+        products = {
+            row.id: row for row in db.query(
+                Product.id, Product.category_id, Product.view_count, Product.created_at, Product.updated_at
+            ).filter(Product.status == 2).all()
+        }
+
+        events = []
+        if products:
+            for model, created_column, event in (
+                (Bid, Bid.created_at, "bid"),
+                (ProductFavorite, ProductFavorite.created_at, "favorite"),
+            ):
+                rows = db.query(model.product_id, created_column).join(
+                    Product, Product.id == model.product_id
+                ).filter(
+                    and_(Product.status == 2, created_column >= since)
+                ).all()
+                events.extend((product_id, created_at, event) for product_id, created_at in rows)
+
+        fresh = TrendingService(self.half_life_hours, self.rebuild_interval)
+        for row in products.values():
+            if row.view_count:
+                viewed_at = row.updated_at or row.created_at or datetime.now()
+                fresh._add_score(
+                    row.id, row.category_id,
+                    EVENT_WEIGHTS["view"] * row.view_count, viewed_at.timestamp()
+                )
+
+        for product_id, created_at, event in events:
+            row = products.get(product_id)
+            if row is not None and created_at is not None:
+                fresh._add_score(product_id, row.category_id, EVENT_WEIGHTS[event], created_at.timestamp())
+        return fresh
+
+    def _rebuild_in_background(self):
+        db = SessionLocal()
+        try:
+            self.rebuild(db)
+        except Exception as e:
+            logger.error(f"热门商品榜单后台重建失败: {e}")
+        finally:
+            self._rebuilding = False
+            db.close()
+
+    def _add_score(self, product_id: int, category_id: Optional[int], delta: float, timestamp: float):
+        exponent = (timestamp - self._epoch) / self.half_life_seconds
+        if exponent > 60:
+            self._rebase(timestamp)
+            exponent = (timestamp - self._epoch) / self.half_life_seconds
+
+        old_score = self._scores.get(product_id)
+        new_score = max(0.0, (old_score or 0.0) + delta * 2 ** exponent)
+
+        if old_score is not None:
+            self._remove(product_id)
+        if new_score <= 0:
+            return
+
+        self._scores[product_id] = new_score
+        self._product_categories[product_id] = category_id
+        for key in {ALL_CATEGORIES, category_id}:
+            bisect.insort(self._rankings.setdefault(key, []), (-new_score, product_id))
+
+    def _remove(self, product_id: int):
+        score = self._scores.pop(product_id, None)
+        if score is None:
+            return
+        category_id = self._product_categories.pop(product_id, None)
+        for key in {ALL_CATEGORIES, category_id}:
+            ranking = self._rankings.get(key)
+            if not ranking:
+                continue
+            position = bisect.bisect_left(ranking, (-score, product_id))
+            if position < len(ranking) and ranking[position] == (-score, product_id):
+                del ranking[position]
+
+    def _rebase(self, timestamp: float):
+        """平移基准时间，避免分数溢出（等比缩放不改变排序）"""
+        factor = 2 ** ((self._epoch - timestamp) / self.half_life_seconds)
+        self._epoch = timestamp
+        for product_id in self._scores:
+            self._scores[product_id] *= factor
+        for key, ranking in self._rankings.items():
+            self._rankings[key] = [(score * factor, product_id) for score, product_id in ranking]
+
+
+trending_service = TrendingService()
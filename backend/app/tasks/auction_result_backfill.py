@@ -0,0 +1,22 @@
+import logging
+
+from ..core.database import SessionLocal
+from ..services.auction_result_service import auction_result_service
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_auction_results(batch_size: int = 500) -> int:
+    """为历史拍卖补写成交记录（可重复执行，已有记录的拍品会跳过）"""
+    db = SessionLocal()
+    try:
+        return auction_result_service.backfill(db, batch_size=batch_size)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # 用法: python -m app.tasks.auction_result_backfill [batch_size]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    backfill_auction_results(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
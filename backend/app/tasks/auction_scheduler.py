@@ -6,6 +6,7 @@ from typing import List
 from sqlalchemy.orm import Session
 from ..core.database import SessionLocal, get_db
 from ..services.auction_service import AuctionService
+from ..services.leader_election_service import LeadershipLost
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +17,17 @@ class AuctionScheduler:
         self.auction_service = AuctionService()
         self.is_running = False
     
-    async def start_scheduler(self, interval_minutes: int = 5):
-        """启动定时任务，每隔指定分钟检查一次过期拍卖"""
+    async def start_scheduler(self, interval_minutes: float = 5, fence=None):
+        """启动定时任务，每隔指定分钟检查一次过期拍卖；多进程部署时传入主进程选举的 fence"""
         self.is_running = True
         logger.info(f"拍卖定时任务启动，检查间隔: {interval_minutes} 分钟")
         
         while self.is_running:
             try:
-                await self._check_expired_auctions()
+                await self._check_expired_auctions(fence)
                 await asyncio.sleep(interval_minutes * 60)  # 转换为秒
+            except LeadershipLost:
+                raise
             except Exception as e:
                 logger.error(f"定时任务执行失败: {e}")
                 await asyncio.sleep(60)  # 出错时等待1分钟后重试
@@ -34,11 +37,11 @@ class AuctionScheduler:
         self.is_running = False
         logger.info("拍卖定时任务已停止")
     
-    async def _check_expired_auctions(self):
+    async def _check_expired_auctions(self, fence=None):
         """检查并处理过期拍卖"""
         db = SessionLocal()
         try:
-            results = await self.auction_service.check_and_end_auctions(db)
+            results = await self.auction_service.check_and_end_auctions(db, fence)
             
             if results:
                 success_count = sum(1 for r in results if r.get("success"))
@@ -59,6 +62,8 @@ class AuctionScheduler:
             else:
                 logger.debug("当前没有需要处理的过期拍卖")
                 
+        except LeadershipLost:
+            raise
         except Exception as e:
             logger.error(f"检查过期拍卖时发生错误: {e}")
         finally:
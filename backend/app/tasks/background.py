@@ -0,0 +1,40 @@
+import asyncio
+import logging
+
+from ..core.config import settings
+from ..services.leader_election_service import leader_elector
+from .auction_scheduler import auction_scheduler
+from .idempotency_purge import purge_periodically
+from .order_stats_reconcile import reconcile_periodically
+from .store_stats_backfill import backfill_periodically
+
+logger = logging.getLogger(__name__)
+
+# 只在主进程上运行的后台循环（多 worker 部署时由租约选举保证同一时刻只有一个进程运行）
+leader_elector.add_task(
+    "auction_closing",
+    lambda: auction_scheduler.start_scheduler(settings.AUCTION_CHECK_INTERVAL_MINUTES, fence=leader_elector.fence)
+)
+leader_elector.add_task(
+    "order_stats_reconcile",
+    lambda: reconcile_periodically(settings.ORDER_STATS_RECONCILE_HOURS)
+)
+leader_elector.add_task("idempotency_purge", lambda: purge_periodically(1))
+leader_elector.add_task("store_stats_backfill", lambda: backfill_periodically(10))
+
+
+def start_background_tasks():
+    """参与主进程选举，成为主进程后启动后台循环（应用启动时调用）"""
+    leader_elector.start()
+
+
+async def stop_background_tasks():
+    """停止后台循环并释放租约（应用关闭时调用）"""
+    await leader_elector.stop()
+
+
+if __name__ == "__main__":
+    # 用法: python -m app.tasks.background
+    # 作为独立进程参与选举（API 进程设置 BACKGROUND_TASKS_ENABLED=false 时使用）
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(leader_elector.run_forever())
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from ..services.delayed_job_service import (
+    delayed_job_service, ORDER_PAYMENT_TIMEOUT, ORDER_AUTO_CONFIRM, AUCTION_DEPOSIT_REFUND
+)
+from ..services.deposit_service import deposit_service
+from ..services.order_service import OrderService
+
+logger = logging.getLogger(__name__)
+
+order_service = OrderService()
+
+
+# 任务类型处理函数（需幂等，业务状态已变化时直接跳过）
+@delayed_job_service.handler(ORDER_PAYMENT_TIMEOUT)
+async def expire_unpaid_order(db: Session, payload: Dict[str, Any]):
+    if await order_service.expire_unpaid_order(db, payload["order_id"]):
+        logger.info(f"订单支付超时已自动取消，订单ID: {payload['order_id']}")
+
+
+@delayed_job_service.handler(ORDER_AUTO_CONFIRM)
+async def auto_confirm_order(db: Session, payload: Dict[str, Any]):
+    if await order_service.auto_confirm_order(db, payload["order_id"]):
+        logger.info(f"订单已自动确认收货，订单ID: {payload['order_id']}")
+
+
+@delayed_job_service.handler(AUCTION_DEPOSIT_REFUND)
+async def settle_auction_deposits(db: Session, payload: Dict[str, Any]):
+    result = await deposit_service.settle_auction_deposits(db, payload["auction_id"], payload.get("winner_id"))
+    if result["refunded"] or result["frozen"]:
+        logger.info(
+            f"拍卖结束结算保证金，拍卖ID: {payload['auction_id']}，退还 {result['refunded']} 笔"
+            f"（{result['users']} 人，{result['amount']}元），冻结 {result['frozen']} 笔"
+        )
+
+
+def start_delayed_jobs():
+    """在当前事件循环中启动延时任务执行循环（应用启动时调用）"""
+    delayed_job_service.start()
+
+
+async def stop_delayed_jobs():
+    """停止延时任务执行循环（应用关闭时调用）"""
+    await delayed_job_service.stop()
+
+
+if __name__ == "__main__":
+    # 用法: python -m app.tasks.delayed_jobs [--once]
+    # --once 执行完当前已到期的任务后退出（可由 cron 调用），否则作为独立进程持续运行
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    if "--once" in sys.argv[1:]:
+        logger.info(f"延时任务执行完成: {asyncio.run(delayed_job_service.run_pending())}")
+    else:
+        asyncio.run(delayed_job_service.run_forever())
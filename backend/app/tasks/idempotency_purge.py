@@ -0,0 +1,30 @@
+import asyncio
+import logging
+
+from ..core.idempotency import idempotency_store
+
+logger = logging.getLogger(__name__)
+
+
+def purge_expired_idempotency_keys() -> int:
+    """删除已过期的幂等记录（Redis 和进程内存储按 TTL 自动清理）"""
+    deleted = idempotency_store.purge_expired()
+    if deleted:
+        logger.info(f"已清理过期幂等记录 {deleted} 条")
+    return deleted
+
+
+async def purge_periodically(interval_hours: float = 1):
+    """按间隔定时清理（作为主进程后台循环运行，在线程中执行避免阻塞事件循环）"""
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            await asyncio.to_thread(purge_expired_idempotency_keys)
+        except Exception as e:
+            logger.error(f"清理过期幂等记录失败: {e}")
+
+
+if __name__ == "__main__":
+    # 用法: python -m app.tasks.idempotency_purge
+    logging.basicConfig(level=logging.INFO)
+    purge_expired_idempotency_keys()
@@ -0,0 +1,27 @@
+import logging
+
+from ..core.database import SessionLocal
+from ..services.message_search_service import message_search_index
+
+logger = logging.getLogger(__name__)
+
+
+def reindex_messages(rebuild: bool = False, batch_size: int = 2000) -> int:
+    """增量同步消息搜索索引（补齐未写入的消息，建议定时执行）；rebuild=True 时清空后全量重建"""
+    if not message_search_index.enabled:
+        logger.warning("未配置 MESSAGE_SEARCH_INDEX_PATH，跳过消息索引同步")
+        return 0
+    db = SessionLocal()
+    try:
+        if rebuild:
+            return message_search_index.rebuild(db, batch_size=batch_size)
+        return message_search_index.sync_from_db(db, batch_size=batch_size)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # 用法: python -m app.tasks.message_search_reindex [--rebuild]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    reindex_messages(rebuild="--rebuild" in sys.argv[1:])
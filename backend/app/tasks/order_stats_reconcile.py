@@ -0,0 +1,39 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from ..core.database import SessionLocal
+from ..services.order_stats_service import order_stats_service
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_order_stats(user_id: Optional[int] = None, batch_size: int = 500) -> Dict[str, int]:
+    """对账用户订单统计投影，不传 user_id 时分批对账全部用户（建议每天定时执行）"""
+    db = SessionLocal()
+    try:
+        if user_id is None:
+            return order_stats_service.reconcile_all(db, batch_size=batch_size)
+        order_stats_service.rebuild_user(db, user_id)
+        db.commit()
+        logger.info(f"用户 {user_id} 订单统计已重建")
+        return {"checked": 1, "corrected": 1}
+    finally:
+        db.close()
+
+
+async def reconcile_periodically(interval_hours: float = 24):
+    """按间隔定时对账（作为主进程后台循环运行，在线程中执行避免阻塞事件循环）"""
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            await asyncio.to_thread(reconcile_order_stats)
+        except Exception as e:
+            logger.error(f"订单统计定时对账失败: {e}")
+
+
+if __name__ == "__main__":
+    # 用法: python -m app.tasks.order_stats_reconcile [user_id]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    reconcile_order_stats(int(sys.argv[1]) if len(sys.argv) > 1 else None)
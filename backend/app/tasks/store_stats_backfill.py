@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Optional
+
+from ..core.database import SessionLocal
+from ..models.store import Store
+from ..services.store_stats_service import store_stats_service
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_store_stats(store_id: Optional[int] = None) -> int:
+    """根据明细数据重建店铺每日统计汇总，不传 store_id 时重建全部店铺"""
+    db = SessionLocal()
+    try:
+        if store_id is None:
+            count = store_stats_service.backfill_all(db)
+        else:
+            store = db.query(Store).filter(Store.id == store_id).first()
+            if not store:
+                raise ValueError("店铺不存在")
+            store_stats_service.backfill_store(db, store)
+            count = 1
+        logger.info(f"店铺统计回填完成，共处理 {count} 个店铺")
+        return count
+    finally:
+        db.close()
+
+
+def backfill_pending_store_stats() -> int:
+    """回填尚未回填过的店铺（有标记行的店铺跳过）"""
+    db = SessionLocal()
+    try:
+        count = store_stats_service.backfill_pending(db)
+        if count:
+            logger.info(f"店铺统计回填完成，共处理 {count} 个新店铺")
+        return count
+    finally:
+        db.close()
+
+
+async def backfill_periodically(interval_minutes: float = 10):
+    """定时回填新店铺（作为主进程后台循环运行，启动后先执行一次，在线程中执行避免阻塞事件循环）"""
+    while True:
+        try:
+            await asyncio.to_thread(backfill_pending_store_stats)
+        except Exception as e:
+            logger.error(f"店铺统计定时回填失败: {e}")
+        await asyncio.sleep(interval_minutes * 60)
+
+
+if __name__ == "__main__":
+    # 用法: python -m app.tasks.store_stats_backfill [store_id]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    backfill_store_stats(int(sys.argv[1]) if len(sys.argv) > 1 else None)
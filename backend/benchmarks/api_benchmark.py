@@ -0,0 +1,301 @@
+"""
+API 基准测试
+在进程内通过 httpx ASGI transport 驱动 FastAPI 应用，使用按规模生成数据的 SQLite 数据库，
+按场景（浏览首页→商品详情→出价、聊天连发、搜索输入）压测，
+输出各接口的吞吐、p50/p95/p99 延迟和每请求SQL条数，结果保存为 JSON 便于跨提交对比。
+
+用法:
+    python benchmarks/api_benchmark.py [--users 200] [--products 1000] [--iterations 50] [--concurrency 8]
+    python benchmarks/api_benchmark.py --compare benchmarks/results/api_<旧提交>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BREEDS, SUPPLIES, BulkDataGenerator
+
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+def seed_database(engine, session_factory, args):
+    """用批量数据生成器按规模写入基准数据，返回用户ID、拍卖中商品ID和对话列表"""
+    from app.models.product import Product
+    from app.models.message import Conversation
+
+    BulkDataGenerator(
+        engine,
+        counts={
+            "users": args.users,
+            "products": args.products,
+            "bids": args.products * 5,
+            "conversations": args.conversations,
+            "messages": args.conversations * args.messages,
+            "posts": args.products // 10,
+        },
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    db = session_factory()
+    try:
+        product_ids = [row.id for row in db.query(Product.id).filter(Product.status == 2).order_by(Product.id)]
+        conversations = [
+            {"id": row.id, "user1_id": row.user1_id, "user2_id": row.user2_id}
+            for row in db.query(Conversation.id, Conversation.user1_id, Conversation.user2_id).order_by(Conversation.id)
+        ]
+        return list(range(1, args.users + 1)), product_ids, conversations
+    finally:
+        db.close()
+
+
+class Recorder:
+    """按接口记录耗时、状态码和SQL条数"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, endpoint: str, duration: float, response):
+        self.samples[endpoint].append((
+            duration,
+            response.status_code,
+            int(response.headers.get("x-db-query-count", 0))
+        ))
+
+    def summary(self, wall_seconds: float):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            durations = [sample[0] for sample in samples]
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": sum(1 for sample in samples if sample[1] >= 500),
+                "client_errors": sum(1 for sample in samples if 400 <= sample[1] < 500),
+                "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+                "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+                "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+                "avg_queries": round(sum(sample[2] for sample in samples) / len(samples), 2),
+                "max_queries": max(sample[2] for sample in samples),
+            }
+        return endpoints
+
+
+async def timed_request(client, recorder: Recorder, endpoint: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    recorder.add(endpoint, time.perf_counter() - started, response)
+    return response
+
+
+async def scenario_browse(client, recorder, rng, user_id, headers, product_ids):
+    """浏览首页 → 商品详情 → 出价"""
+    await timed_request(client, recorder, "GET /home/", "GET", "/api/v1/home/", headers=headers)
+    await timed_request(client, recorder, "GET /products/trending/", "GET", "/api/v1/products/trending/")
+    product_id = rng.choice(product_ids)
+    response = await timed_request(
+        client, recorder, "GET /products/{id}", "GET", f"/api/v1/products/{product_id}", headers=headers
+    )
+    if response.status_code == 200:
+        amount = Decimal(str(response.json()["current_price"])) + Decimal(rng.randint(1, 20))
+        await timed_request(
+            client, recorder, "POST /bids/", "POST", "/api/v1/bids/",
+            headers=headers, json={"product_id": product_id, "amount": str(amount)}
+        )
+
+
+async def scenario_chat_burst(client, recorder, rng, user_id, headers, conversations, burst: int = 5):
+    """聊天连发：连续发送多条消息后拉取消息列表和会话列表"""
+    own = [row for row in conversations if user_id in (row["user1_id"], row["user2_id"])]
+    if not own:
+        return
+    conversation_id = rng.choice(own)["id"]
+    for index in range(burst):
+        await timed_request(
+            client, recorder, "POST /chat/conversations/{id}/messages", "POST",
+            f"/api/v1/chat/conversations/{conversation_id}/messages",
+            headers=headers, json={"content": f"连发消息 {index}", "message_type": "text"}
+        )
+    await timed_request(
+        client, recorder, "GET /chat/conversations/{id}/messages", "GET",
+        f"/api/v1/chat/conversations/{conversation_id}/messages", headers=headers
+    )
+    await timed_request(client, recorder, "GET /chat/conversations", "GET", "/api/v1/chat/conversations", headers=headers)
+
+
+async def scenario_search_typing(client, recorder, rng, user_id, headers):
+    """搜索输入：按前缀逐字搜索商品，再搜索聊天记录"""
+    word = rng.choice(BREEDS + SUPPLIES)
+    for length in range(1, len(word) + 1):
+        await timed_request(
+            client, recorder, "GET /products/?keyword=", "GET", "/api/v1/products/",
+            params={"keyword": word[:length], "page_size": 20}
+        )
+    await timed_request(
+        client, recorder, "GET /chat/search", "GET", "/api/v1/chat/search",
+        headers=headers, params={"keyword": word}
+    )
+
+
+async def run(args):
+    import httpx
+    import main
+    from app.core.database import SessionLocal, engine
+    from app.core.security import create_access_token
+
+    started = time.perf_counter()
+    user_ids, product_ids, conversations = seed_database(engine, SessionLocal, args)
+    seed_seconds = time.perf_counter() - started
+    print(f"数据准备: 用户 {len(user_ids)}，拍卖中商品 {len(product_ids)}，对话 {len(conversations)}，耗时 {seed_seconds:.2f}s")
+
+    tokens = {user_id: create_access_token({"sub": str(user_id)}) for user_id in user_ids}
+    scenarios = {
+        "browse": lambda client, recorder, rng, user_id, headers: scenario_browse(
+            client, recorder, rng, user_id, headers, product_ids
+        ),
+        "chat_burst": lambda client, recorder, rng, user_id, headers: scenario_chat_burst(
+            client, recorder, rng, user_id, headers, conversations
+        ),
+        "search_typing": scenario_search_typing,
+    }
+    chat_users = sorted({row["user1_id"] for row in conversations} | {row["user2_id"] for row in conversations})
+
+    recorder = Recorder()
+    scenario_results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # 预热：触发各类进程内索引/缓存的首次加载
+        await client.get("/api/v1/home/")
+        await client.get("/api/v1/products/trending/")
+
+        for name, scenario in scenarios.items():
+            if args.scenario and name not in args.scenario:
+                continue
+            scenario_recorder = Recorder()
+
+            async def virtual_user(worker: int):
+                rng = random.Random(args.seed * 1000 + worker)
+                for _ in range(args.iterations):
+                    user_id = rng.choice(chat_users if name == "chat_burst" and chat_users else user_ids)
+                    headers = {"Authorization": f"Bearer {tokens[user_id]}"}
+                    await scenario(client, scenario_recorder, rng, user_id, headers)
+
+            scenario_started = time.perf_counter()
+            await asyncio.gather(*(virtual_user(worker) for worker in range(args.concurrency)))
+            wall = time.perf_counter() - scenario_started
+
+            runs = args.iterations * args.concurrency
+            scenario_results[name] = {
+                "runs": runs,
+                "wall_seconds": round(wall, 3),
+                "runs_per_second": round(runs / wall, 2),
+                "endpoints": scenario_recorder.summary(wall),
+            }
+            for endpoint, samples in scenario_recorder.samples.items():
+                recorder.samples[endpoint].extend(samples)
+            print(f"场景 {name}: {runs} 轮，{wall:.2f}s，{runs / wall:.1f} 轮/秒")
+
+    total_wall = sum(result["wall_seconds"] for result in scenario_results.values())
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "users": args.users,
+            "products": args.products,
+            "conversations": len(conversations),
+            "messages_per_conversation": args.messages,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "scenarios": scenario_results,
+        "endpoints": recorder.summary(total_wall),
+    }
+
+
+def print_table(endpoints, baseline=None):
+    header = f"{'接口':44} {'请求':>6} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'SQL':>6} {'5xx':>4}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, stats in endpoints.items():
+        line = (
+            f"{endpoint:44} {stats['requests']:>6} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+            f"{stats['p99_ms']:>9.2f} {stats['avg_queries']:>6.1f} {stats['errors']:>4}"
+        )
+        if baseline and endpoint in baseline:
+            old = baseline[endpoint]
+            p95_change = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+            line += f"   p95 {p95_change:+.1f}%  SQL {stats['avg_queries'] - old['avg_queries']:+.1f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 基准测试（进程内 ASGI）")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--messages", type=int, default=20, help="每个对话的初始消息数")
+    parser.add_argument("--iterations", type=int, default=50, help="每个虚拟用户执行场景的轮数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发虚拟用户数")
+    parser.add_argument("--scenario", action="append", choices=["browse", "chat_burst", "search_typing"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="结果 JSON 路径，默认 benchmarks/results/api_<提交>.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    # 应用在导入时根据环境变量创建数据库引擎，必须先指向临时 SQLite 库
+    workdir = tempfile.mkdtemp(prefix="petshop_bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    os.environ["DEBUG"] = "false"
+    os.environ["METRICS_RESPONSE_HEADERS"] = "true"
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    results = asyncio.run(run(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["endpoints"]
+    print()
+    print_table(results["endpoints"], baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"api_{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+拍卖成交记录回归检查
+生成历史拍卖数据后：
+  1. 回填成交记录，与数据生成器记录的成交结果（获胜者、成交价）逐条比对，重复回填不再写入；
+  2. 对比“我中标的拍卖”改造前（按出价分页 + 每条出价各查一次拍品和订单）与成交记录 JOIN 的 SQL 条数和耗时；
+  3. 结算一场新拍卖，验证成交记录随结算写入并出现在获胜者列表首位，获胜者可补充收货地址。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/auction_results_check.py [--products 5000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def legacy_winning_page(db, user_id, page, page_size):
+    """改造前 get_my_winning_auctions 的查询方式"""
+    from sqlalchemy import and_, desc
+    from app.models.order import Order
+    from app.models.product import Bid, Product
+
+    query = db.query(Bid).filter(and_(Bid.bidder_id == user_id, Bid.status == 1)).order_by(desc(Bid.created_at))
+    total = query.count()
+    items = []
+    for bid in query.offset((page - 1) * page_size).limit(page_size).all():
+        product = db.query(Product).filter(Product.id == bid.product_id).first()
+        order = db.query(Order).filter(and_(Order.product_id == bid.product_id, Order.buyer_id == user_id)).first()
+        items.append({"product_id": product.id, "order_id": order.id if order else None})
+    return {"items": items, "total": total}
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_auction_results_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    import httpx
+    from sqlalchemy import event, func
+    import main
+    from app.core.database import SessionLocal, engine
+    from app.core.security import create_access_token
+    from app.models.product import AuctionResult, Bid, Product
+    from app.services.auction_result_service import auction_result_service
+    from app.services.auction_service import AuctionService
+
+    generator = BulkDataGenerator(
+        engine,
+        counts={"users": 300, "products": args.products, "bids": args.products * 5, "conversations": 10,
+                "messages": 20, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    )
+    generator.generate()
+
+    passed = True
+
+    def report(ok, message):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {message}")
+
+    db = SessionLocal()
+
+    # 1. 回填
+    started = time.perf_counter()
+    created = auction_result_service.backfill(db, batch_size=200)
+    elapsed = time.perf_counter() - started
+    expected = generator.auction_results
+    mismatched = [
+        row.product_id for row in db.query(AuctionResult)
+        if expected.get(row.product_id, (None,))[0] != row.winner_id
+        or expected[row.product_id][2] != row.amount or row.order_id is None
+    ]
+    report(created == len(expected) and not mismatched,
+           f"回填 {created} 条（期望 {len(expected)}），{elapsed * 1000:.0f}ms，获胜者/成交价/订单不一致 {len(mismatched)} 条")
+    report(auction_result_service.backfill(db) == 0, "重复回填写入 0 条")
+
+    # 2. 改造前后对比
+    winner_id, wins = db.query(AuctionResult.winner_id, func.count()).group_by(
+        AuctionResult.winner_id
+    ).order_by(func.count().desc()).first()
+    statements = []
+    listener = lambda *a: statements.append(a[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    timings = {}
+    for name, fetch in (("旧实现", legacy_winning_page), ("成交记录", None)):
+        statements.clear()
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            db.expunge_all()
+            if fetch:
+                result = fetch(db, winner_id, 1, args.page_size)
+            else:
+                result = await auction_result_service.get_winning_page(db, winner_id, 1, args.page_size)
+        timings[name] = ((time.perf_counter() - started) / args.rounds, len(statements) // args.rounds)
+        print(f"  {name:8} {timings[name][0] * 1000:7.2f}ms/次  SQL {timings[name][1]} 条/次  共 {result['total']} 条")
+    report(timings["成交记录"][1] <= 2 and result["total"] == wins,
+           f"中标列表 SQL {timings['成交记录'][1]} 条（旧实现 {timings['旧实现'][1]} 条），加速 "
+           f"{timings['旧实现'][0] / timings['成交记录'][0]:.1f}x")
+
+    small_winner = db.query(AuctionResult.winner_id).group_by(AuctionResult.winner_id).having(
+        func.count() < args.page_size
+    ).first()[0]
+    statements.clear()
+    small = await auction_result_service.get_winning_page(db, small_winner, 1, args.page_size)
+    report(len(statements) == 1, f"不足一页的用户（{small['total']} 条）只执行 {len(statements)} 条 SQL")
+    event.remove(engine, "before_cursor_execute", listener)
+
+    # 3. 结算写入
+    product = db.query(Product).join(Bid, Bid.product_id == Product.id).filter(Product.status == 2).order_by(Product.id).first()
+    product.auction_end_time = datetime.now() - timedelta(seconds=1)
+    db.commit()
+    settled = await AuctionService().manual_end_auction(db, product.id, product.seller_id)
+    result = auction_result_service.get_result(db, product.id)
+    report(result is not None and result.winner_id == settled["winner_id"] and result.order_id == settled["order_id"],
+           f"结算拍品 {product.id} 写入成交记录，获胜者 {settled['winner_id']}，订单 {settled['order_id']}")
+    page = await auction_result_service.get_winning_page(db, settled["winner_id"], 1, args.page_size)
+    report(page["items"][0]["product_id"] == product.id and page["items"][0]["order_no"] == settled["order_no"],
+           "新成交的拍卖位于获胜者中标列表首位")
+    db.close()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://auctions") as client:
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(settled['winner_id'])})}"}
+        response = await client.get("/api/v1/auctions/my/winning", headers=headers)
+        report(response.status_code == 200 and response.json()["items"][0]["product_id"] == product.id,
+               f"接口 /auctions/my/winning: {response.status_code}")
+        address = {"name": "张三", "phone": "13800138000", "address": "上海市示例路1号"}
+        response = await client.post(f"/api/v1/auctions/{product.id}/winner-order", json=address, headers=headers)
+        report(response.status_code == 200 and response.json()["data"]["order_id"] == settled["order_id"],
+               f"获胜者补充收货地址: {response.status_code}")
+        other = {"Authorization": f"Bearer {create_access_token({'sub': str(product.seller_id)})}"}
+        response = await client.post(f"/api/v1/auctions/{product.id}/winner-order", json=address, headers=other)
+        report(response.status_code == 403, f"非获胜者补充收货地址: {response.status_code}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="拍卖成交记录回归检查")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 拍卖成交记录检查通过" if passed else "\n❌ 拍卖成交记录检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
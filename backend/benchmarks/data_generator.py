@@ -0,0 +1,524 @@
+"""
+批量测试数据生成
+按指定规模生成用户、商品、出价、订单、对话、消息和同城服务帖子，用于性能测试：
+- 商品/用户活跃度服从 Zipf 分布（少数热门商品承担大部分出价，少数活跃用户发起大部分聊天）
+- 出价时间集中在 auction_end_time 之前的最后阶段，金额随时间递增
+- 标题和内容为中文，可用于搜索测试
+- 通过 Core 批量插入，按块提交事务；相同种子和基准时间生成的数据完全一致
+
+用法:
+    python benchmarks/data_generator.py --database-url sqlite:////tmp/petshop_bulk.db --reset
+    python benchmarks/data_generator.py --users 1000000 --products 2000000 --bids 20000000 --seed 7
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORIES = ["宠物", "水族", "用品", "鸟类", "爬宠", "观赏鱼", "饲料", "器材"]
+ADJECTIVES = ["纯种", "精品", "赛级", "健康", "活泼", "温顺", "罕见", "高品质", "家养", "国产"]
+BREEDS = [
+    "金鱼", "锦鲤", "龙鱼", "孔雀鱼", "斗鱼", "布偶猫", "英短", "美短", "暹罗猫", "柯基",
+    "柴犬", "泰迪", "金毛", "边牧", "鹦鹉", "八哥", "仓鼠", "龙猫", "兔子", "乌龟",
+]
+SUFFIXES = ["幼崽", "成体", "一对", "包邮", "疫苗已打", "可视频看货", "支持验货", "现货"]
+SUPPLIES = ["水族箱", "过滤器", "猫砂", "狗粮", "鸟笼", "加热棒", "猫爬架", "饮水机"]
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN_NAMES = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂"
+CHAT_PHRASES = [
+    "还在吗？", "这个{breed}多大了？", "能便宜点吗", "可以发个视频看看吗", "{breed}打过疫苗吗",
+    "包邮吗？", "今天能发货吗", "已经拍下了", "谢谢老板", "{breed}很健康，放心",
+]
+CITIES = [
+    ("北京", 39.9042, 116.4074), ("上海", 31.2304, 121.4737), ("广州", 23.1291, 113.2644),
+    ("深圳", 22.5431, 114.0579), ("杭州", 30.2741, 120.1551), ("成都", 30.5728, 104.0668),
+    ("武汉", 30.5928, 114.3055), ("南京", 32.0603, 118.7969),
+]
+SERVICE_TYPES = ["pet_social", "local_store", "aquarium_design", "door_service"]
+# 所有用户共用的密码哈希（密码 123456）；bcrypt 每次加盐结果不同，固定哈希保证数据可复现
+DEMO_PASSWORD_HASH = "$2b$12$NqjmGWdM/Mfns6KJ453K..vbI.gLZHkbO8yNPR7PRxRozbcda/mjW"
+
+DEFAULT_COUNTS = {
+    "users": 100_000,
+    "products": 200_000,
+    "bids": 2_000_000,
+    "conversations": 200_000,
+    "messages": 2_000_000,
+    "posts": 50_000,
+}
+
+
+class ZipfSampler:
+    """按 Zipf 分布抽取ID，排名到ID的映射经过打乱，热门对象不集中在小ID"""
+
+    def __init__(self, rng: random.Random, ids: Sequence[int], exponent: float = 1.0):
+        self.rng = rng
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, len(self.ids) + 1)))
+
+    def sample(self, k: int = 1) -> List[int]:
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+    def one(self) -> int:
+        # 单次抽样直接二分，避免 choices 的列表开销
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.ids[min(bisect.bisect_left(self.cum_weights, point), len(self.ids) - 1)]
+
+
+def chunked(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkDataGenerator:
+    """批量数据生成器
+
+    各表使用独立的随机数流（种子 + 表名），调整某一张表的规模不会改变其它表的数据。
+    所有ID显式分配，表之间的引用在生成阶段即可确定，不需要插入后回查。
+    """
+
+    def __init__(
+        self,
+        engine,
+        counts: Optional[Dict[str, int]] = None,
+        seed: int = 42,
+        chunk_size: int = 10_000,
+        base_time: Optional[datetime] = None,
+        password_hash: str = DEMO_PASSWORD_HASH,
+    ):
+        self.engine = engine
+        self.counts = {**DEFAULT_COUNTS, **(counts or {})}
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.base_time = base_time or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.password_hash = password_hash
+        self.seller_count = max(1, self.counts["users"] // 20)
+        # 已结束且有出价的商品ID -> (买家ID, 卖家ID, 成交价, 结束时间)，用于生成订单
+        self.auction_results: Dict[int, Tuple[int, int, Decimal, datetime]] = {}
+        self.stats: Dict[str, int] = {}
+
+    def _rng(self, name: str) -> random.Random:
+        return random.Random(f"{self.seed}:{name}")
+
+    def generate(self):
+        """按依赖顺序生成全部数据"""
+        for name, step in [
+            ("categories", self._categories),
+            ("users", self._users),
+            ("products+bids", self._products_and_bids),
+            ("orders", self._orders),
+            ("conversations+messages", self._conversations_and_messages),
+            ("local_service_posts", self._posts),
+        ]:
+            started = time.perf_counter()
+            step()
+            print(f"  {name}: {time.perf_counter() - started:.1f}s")
+        return self.stats
+
+    def _insert(self, model, rows: Iterable[dict]) -> int:
+        """按块批量插入，每块一个事务"""
+        table = model.__table__
+        total = 0
+        for chunk in chunked(rows, self.chunk_size):
+            with self.engine.begin() as conn:
+                if conn.dialect.name == "sqlite":
+                    conn.exec_driver_sql("PRAGMA synchronous=OFF")
+                conn.execute(table.insert(), chunk)
+            total += len(chunk)
+        self.stats[table.name] = self.stats.get(table.name, 0) + total
+        return total
+
+    def _categories(self):
+        from app.models.product import Category
+
+        self._insert(Category, [
+            {"id": index, "name": name, "parent_id": 0, "sort_order": index, "is_active": True,
+             "created_at": self.base_time, "updated_at": self.base_time}
+            for index, name in enumerate(CATEGORIES, start=1)
+        ])
+
+    def _users(self):
+        from app.models.user import User
+
+        rng = self._rng("users")
+
+        def rows():
+            for user_id in range(1, self.counts["users"] + 1):
+                created_at = self.base_time - timedelta(days=rng.randint(1, 720), seconds=rng.randint(0, 86399))
+                yield {
+                    "id": user_id,
+                    "username": f"user_{user_id}",
+                    "phone": f"1{user_id:010d}",
+                    "password_hash": self.password_hash,
+                    "nickname": rng.choice(SURNAMES) + "".join(rng.choices(GIVEN_NAMES, k=rng.randint(1, 2))),
+                    "gender": rng.randint(0, 2),
+                    "location": rng.choice(CITIES)[0],
+                    "is_seller": user_id <= self.seller_count,
+                    "is_verified": rng.random() < 0.3,
+                    "balance": Decimal(rng.randint(100, 1_000_000)),
+                    "credit_score": rng.randint(60, 100),
+                    "status": 1,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+
+        self._insert(User, rows())
+
+    def _product_title(self, rng: random.Random) -> str:
+        if rng.random() < 0.15:
+            return f"{rng.choice(ADJECTIVES)}{rng.choice(SUPPLIES)} {rng.choice(SUFFIXES)}"
+        return f"{rng.choice(ADJECTIVES)}{rng.choice(BREEDS)} {rng.choice(SUFFIXES)}"
+
+    def _products_and_bids(self):
+        from app.models.product import Product, Bid
+
+        rng = self._rng("products")
+        bid_rng = self._rng("bids")
+        product_count = self.counts["products"]
+        bidders = ZipfSampler(self._rng("bidders"), range(1, self.counts["users"] + 1), 0.8)
+
+        # 先确定每个商品的状态，再按 Zipf 把出价分配给已开拍的商品
+        statuses = []
+        for _ in range(product_count):
+            roll = rng.random()
+            statuses.append(2 if roll < 0.6 else 3 if roll < 0.9 else 1 if roll < 0.97 else 4)
+        popularity = ZipfSampler(
+            self._rng("popularity"),
+            [product_id for product_id in range(1, product_count + 1) if statuses[product_id - 1] in (2, 3)],
+            1.0
+        )
+        bid_counts: Counter = Counter()
+        if popularity.ids:
+            for offset in range(0, self.counts["bids"], 1_000_000):
+                bid_counts.update(popularity.sample(min(1_000_000, self.counts["bids"] - offset)))
+
+        product_rows: List[dict] = []
+        bid_rows: List[dict] = []
+        bid_id = 0
+        for product_id in range(1, product_count + 1):
+            status = statuses[product_id - 1]
+            duration = timedelta(hours=rng.choice([24, 48, 72, 120, 168]))
+            if status == 2:
+                end_time = self.base_time + timedelta(seconds=rng.randint(600, int(duration.total_seconds())))
+            elif status == 1:
+                end_time = self.base_time + duration + timedelta(days=rng.randint(1, 7))
+            else:
+                end_time = self.base_time - timedelta(seconds=rng.randint(600, 90 * 86400))
+            start_time = end_time - duration
+            seller_id = rng.randint(1, self.seller_count)
+            starting_price = Decimal(rng.choice([1, 5, 10, 20, 50, 100, 200, 500, 1000, 3000]))
+            price = starting_price
+
+            bid_count = bid_counts.get(product_id, 0)
+            if bid_count:
+                # 出价集中在结束前：距结束的时间服从指数分布，均值为拍卖时长的 8%
+                horizon = min(end_time, self.base_time)
+                span = (horizon - start_time).total_seconds()
+                mean_offset = duration.total_seconds() * 0.08
+                times = []
+                for _ in range(bid_count):
+                    offset = bid_rng.expovariate(1 / mean_offset)
+                    moment = end_time - timedelta(seconds=offset)
+                    if moment > horizon or moment < start_time:
+                        moment = start_time + timedelta(seconds=bid_rng.random() * span)
+                    times.append(moment)
+                times.sort()
+                step = max(1, int(starting_price) // 20)
+                last_bidder = None
+                for index, moment in enumerate(times):
+                    price += bid_rng.randint(1, step)
+                    bidder_id = bidders.one()
+                    while bidder_id == last_bidder or bidder_id == seller_id:
+                        bidder_id = bidders.one()
+                    last_bidder = bidder_id
+                    bid_id += 1
+                    bid_rows.append({
+                        "id": bid_id,
+                        "product_id": product_id,
+                        "bidder_id": bidder_id,
+                        "bid_amount": price,
+                        "is_auto_bid": bid_rng.random() < 0.1,
+                        "status": 1 if index == bid_count - 1 else 2,
+                        "created_at": moment,
+                    })
+                if status == 3:
+                    self.auction_results[product_id] = (last_bidder, seller_id, price, end_time)
+
+            created_at = start_time - timedelta(hours=rng.randint(1, 72))
+            product_rows.append({
+                "id": product_id,
+                "seller_id": seller_id,
+                "category_id": rng.randint(1, len(CATEGORIES)),
+                "title": self._product_title(rng),
+                "description": f"{rng.choice(ADJECTIVES)}{rng.choice(BREEDS)}，{rng.choice(SUFFIXES)}，{rng.choice(CITIES)[0]}发货",
+                "images": [f"https://picsum.photos/400/400?random={product_id}_{index}" for index in range(rng.randint(1, 3))],
+                "starting_price": starting_price,
+                "current_price": price,
+                "auction_type": 1,
+                "auction_start_time": start_time,
+                "auction_end_time": end_time,
+                "location": rng.choice(CITIES)[0],
+                "is_free_shipping": rng.random() < 0.4,
+                "view_count": bid_count * rng.randint(3, 20) + rng.randint(0, 50),
+                "bid_count": bid_count,
+                "favorite_count": bid_count // 3,
+                "status": status,
+                "is_featured": rng.random() < 0.02,
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+
+            if len(product_rows) >= self.chunk_size:
+                self._insert(Product, product_rows)
+                product_rows = []
+            if len(bid_rows) >= self.chunk_size:
+                self._insert(Bid, bid_rows)
+                bid_rows = []
+
+        self._insert(Product, product_rows)
+        self._insert(Bid, bid_rows)
+
+    def _orders(self):
+        from app.models.order import Order
+
+        rng = self._rng("orders")
+
+        def rows():
+            results = sorted(self.auction_results.items())
+            for order_id, (product_id, (buyer_id, seller_id, price, end_time)) in enumerate(results, start=1):
+                shipping_fee = Decimal(rng.choice([0, 0, 8, 12]))
+                age = (self.base_time - end_time).total_seconds()
+                # 越早结束的拍卖订单越可能已完成
+                order_status = min(6, 1 + int(age / (86400 * 3))) if rng.random() > 0.05 else 6
+                paid = order_status in (2, 3, 4, 5)
+                created_at = end_time + timedelta(minutes=1)
+                yield {
+                    "id": order_id,
+                    "order_no": f"BK{product_id:012d}",
+                    "buyer_id": buyer_id,
+                    "seller_id": seller_id,
+                    "product_id": product_id,
+                    "final_price": price,
+                    "shipping_fee": shipping_fee,
+                    "total_amount": price + shipping_fee,
+                    "payment_method": rng.randint(1, 3) if paid else None,
+                    "payment_status": 2 if paid else 1,
+                    "order_status": order_status,
+                    "shipping_address": {
+                        "name": rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES),
+                        "phone": f"1{buyer_id:010d}",
+                        "address": f"{rng.choice(CITIES)[0]}市示例路{rng.randint(1, 999)}号",
+                    },
+                    "tracking_number": f"SF{order_id:012d}" if order_status >= 3 and order_status != 6 else None,
+                    "shipped_at": created_at + timedelta(days=1) if 3 <= order_status <= 5 else None,
+                    "completed_at": created_at + timedelta(days=5) if order_status == 5 else None,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+
+        self._insert(Order, rows())
+
+    def _conversations_and_messages(self):
+        from sqlalchemy import bindparam, update
+        from app.models.message import Conversation, Message
+
+        rng = self._rng("conversations")
+        message_rng = self._rng("messages")
+        users = self.counts["users"]
+        if users < 2:
+            return
+        talkers = ZipfSampler(self._rng("talkers"), range(1, users + 1), 0.9)
+        target = min(self.counts["conversations"], users * (users - 1) // 2)
+        # 对话内消息数同样是长尾：按 Zipf 分配消息到对话
+        message_counts = Counter(ZipfSampler(self._rng("chattiness"), range(1, target + 1), 0.7).sample(self.counts["messages"]))
+
+        seen = set()
+        conversation_rows: List[dict] = []
+        message_rows: List[dict] = []
+        last_messages: List[dict] = []
+        message_id = 0
+        conversation_id = 0
+        while conversation_id < target:
+            first = talkers.one()
+            second = rng.randint(1, users)
+            if first == second:
+                continue
+            user1_id, user2_id = min(first, second), max(first, second)
+            key = user1_id * (users + 1) + user2_id
+            if key in seen:
+                continue
+            seen.add(key)
+            conversation_id += 1
+
+            count = message_counts.get(conversation_id, 0)
+            started_at = self.base_time - timedelta(seconds=rng.randint(3600, 180 * 86400))
+            moment = started_at
+            breed = rng.choice(BREEDS)
+            unread = [0, 0]
+            for index in range(count):
+                moment += timedelta(seconds=int(message_rng.expovariate(1 / 600)) + 1)
+                from_first = message_rng.random() < 0.5
+                message_id += 1
+                is_read = index < count - 3 or message_rng.random() < 0.5
+                if not is_read:
+                    unread[0 if not from_first else 1] += 1
+                message_rows.append({
+                    "id": message_id,
+                    "conversation_id": conversation_id,
+                    "sender_id": user1_id if from_first else user2_id,
+                    "receiver_id": user2_id if from_first else user1_id,
+                    "message_type": "text",
+                    "content": message_rng.choice(CHAT_PHRASES).format(breed=breed),
+                    "is_read": is_read,
+                    "is_deleted": False,
+                    "created_at": moment,
+                    "updated_at": moment,
+                })
+            conversation_rows.append({
+                "id": conversation_id,
+                "user1_id": user1_id,
+                "user2_id": user2_id,
+                "last_message_time": moment if count else None,
+                "user1_unread_count": unread[0],
+                "user2_unread_count": unread[1],
+                "user1_deleted": False,
+                "user2_deleted": False,
+                "created_at": started_at,
+                "updated_at": moment,
+            })
+            if count:
+                last_messages.append({
+                    "conversation_key": conversation_id, "last_message_key": message_id, "updated_key": moment
+                })
+
+            if len(conversation_rows) >= self.chunk_size:
+                self._insert(Conversation, conversation_rows)
+                conversation_rows = []
+            if len(message_rows) >= self.chunk_size:
+                # 消息引用对话，先写出当前块内的对话
+                self._insert(Conversation, conversation_rows)
+                conversation_rows = []
+                self._insert(Message, message_rows)
+                message_rows = []
+
+        self._insert(Conversation, conversation_rows)
+        self._insert(Message, message_rows)
+
+        # conversations.last_message_id 与 messages 互相引用，消息写完后再回填
+        statement = update(Conversation).where(
+            Conversation.id == bindparam("conversation_key")
+        ).values(last_message_id=bindparam("last_message_key"), updated_at=bindparam("updated_key"))
+        for chunk in chunked(last_messages, self.chunk_size):
+            with self.engine.begin() as conn:
+                conn.execute(statement, chunk)
+
+    def _posts(self):
+        from app.models.local_service import LocalServicePost
+
+        rng = self._rng("posts")
+        authors = ZipfSampler(self._rng("authors"), range(1, self.counts["users"] + 1), 1.0)
+        city_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(CITIES) + 1)))
+        titles = {
+            "pet_social": ["我家{breed}的日常", "{breed}新手求助", "晒晒我的{breed}", "{breed}喂养经验分享"],
+            "local_store": ["{city}{breed}专卖店", "{city}水族馆开业", "{city}宠物用品店"],
+            "aquarium_design": ["{city}鱼缸造景设计", "草缸造景上门", "{breed}缸定制"],
+            "door_service": ["{city}上门喂猫", "上门遛狗", "{city}宠物上门洗护"],
+        }
+
+        def rows():
+            for post_id in range(1, self.counts["posts"] + 1):
+                service_type = rng.choices(SERVICE_TYPES, weights=[5, 2, 1, 2])[0]
+                city, latitude, longitude = rng.choices(CITIES, cum_weights=city_weights)[0]
+                breed = rng.choice(BREEDS)
+                created_at = self.base_time - timedelta(seconds=rng.randint(60, 365 * 86400))
+                views = int(rng.paretovariate(1.2) * 10)
+                yield {
+                    "id": post_id,
+                    "user_id": authors.one(),
+                    "service_type": service_type,
+                    "title": rng.choice(titles[service_type]).format(breed=breed, city=city),
+                    "description": f"{city}{breed}相关服务，{rng.choice(SUFFIXES)}",
+                    "content": f"{rng.choice(ADJECTIVES)}{breed}，欢迎私信咨询。",
+                    "city": city,
+                    "district": f"{city}{rng.randint(1, 12)}区",
+                    "latitude": Decimal(f"{latitude + rng.gauss(0, 0.08):.7f}"),
+                    "longitude": Decimal(f"{longitude + rng.gauss(0, 0.08):.7f}"),
+                    "price": Decimal(rng.randint(20, 2000)) if service_type != "pet_social" else None,
+                    "contact_phone": f"1{post_id:010d}",
+                    "images": [f"https://picsum.photos/400/300?random=post{post_id}"],
+                    "tags": [breed, city],
+                    "status": 1 if rng.random() < 0.95 else 2,
+                    "is_featured": rng.random() < 0.02,
+                    "view_count": views,
+                    "like_count": views // rng.randint(5, 20),
+                    "comment_count": views // rng.randint(20, 60),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+
+        self._insert(LocalServicePost, rows())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量测试数据生成")
+    parser.add_argument("--database-url", help="目标数据库，默认使用应用配置的 DATABASE_URL")
+    for name, default in DEFAULT_COUNTS.items():
+        parser.add_argument(f"--{name}", type=int, default=default)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="每个事务插入的行数")
+    parser.add_argument("--base-time", help="基准时间（ISO格式），默认当天零点；同一种子和基准时间生成的数据一致")
+    parser.add_argument("--reset", action="store_true", help="生成前删除并重建所有表")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    # 关闭 SQL 回显，否则批量插入会输出全部语句
+    os.environ["DEBUG"] = "false"
+    sys.path.insert(0, BACKEND_DIR)
+
+    from app.core.database import Base, engine
+    from app.models import user, product, order, message, local_service  # noqa: F401 注册全部模型
+    from app.models.user import User
+
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        if conn.execute(User.__table__.select().limit(1)).first() is not None:
+            print("❌ 目标数据库已有用户数据，请使用 --reset 或指定空库")
+            sys.exit(1)
+
+    counts = {name: getattr(args, name) for name in DEFAULT_COUNTS}
+    generator = BulkDataGenerator(
+        engine,
+        counts=counts,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        base_time=datetime.fromisoformat(args.base_time) if args.base_time else None,
+    )
+    print(f"🚀 开始生成数据: {counts}，种子 {args.seed}")
+    started = time.perf_counter()
+    stats = generator.generate()
+    elapsed = time.perf_counter() - started
+    total = sum(stats.values())
+    print(f"✅ 共写入 {total} 行，耗时 {elapsed:.1f}s（{total / elapsed:.0f} 行/秒）")
+    for table, rows in stats.items():
+        print(f"  - {table}: {rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+延时任务调度回归检查
+生成基准数据后：
+  1. 拍卖结算登记支付超时和保证金结算任务，执行后订单自动取消、中标者保证金没收、其余竞拍者保证金退回余额；
+  2. 中标者取消未付款订单：拍品保持已结束、保证金没收、支付超时任务撤销，结算轮询不再结算；
+     卖家重新上架后开始新一轮拍卖，只按新一轮的出价结算；
+  3. 卖家发货登记自动确认收货任务，执行后订单改为已完成，订单统计投影与订单表一致；
+  4. 两个执行进程（独立线程、独立事件循环）同时执行同一批任务，每个任务恰好执行一次；
+  5. 失败任务按退避改回待执行，重新到期后执行成功；超过最多执行次数标记为失败；
+  6. 执行循环运行中提交新任务，无需等待轮询即在到期后执行；没有执行循环的进程登记任务不进入定时堆。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/delayed_jobs_check.py [--jobs 5000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def report(passed, ok, message):
+    print(f"  {'✅' if ok else '❌'} {message}")
+    return passed and ok
+
+
+def job_statuses(db, job_type):
+    from app.models.job import DelayedJob
+    return Counter(row.status for row in db.query(DelayedJob.status).filter(DelayedJob.job_type == job_type))
+
+
+async def check_auction_settlement(db, passed):
+    """拍卖结算 -> 支付超时取消订单 + 没收中标者保证金 + 退还其他竞拍者保证金"""
+    from sqlalchemy import func
+    from app.models.deposit import Deposit
+    from app.models.order import Order
+    from app.models.product import Bid, Product
+    from app.models.user import User
+    from app.services.auction_service import AuctionService
+    from app.services.delayed_job_service import delayed_job_service, ORDER_PAYMENT_TIMEOUT, AUCTION_DEPOSIT_REFUND
+    from app.services.deposit_service import deposit_service
+    from app.services.order_service import OrderService
+    from app.services.order_stats_service import order_stats_service
+
+    product_id = db.query(Bid.product_id).join(Product, Product.id == Bid.product_id).filter(
+        Product.status == 2
+    ).group_by(Bid.product_id).having(func.count(func.distinct(Bid.bidder_id)) >= 3).first()[0]
+    product = db.get(Product, product_id)
+    bidder_ids = [row[0] for row in db.query(Bid.bidder_id).filter(Bid.product_id == product_id).distinct()]
+    for user_id in bidder_ids:
+        db.add(Deposit(user_id=user_id, auction_id=product_id, amount=Decimal("200.00"), type="auction",
+                       status="active", description="拍卖保证金"))
+    db.commit()
+    balances = {user.id: user.balance for user in db.query(User).filter(User.id.in_(bidder_ids))}
+
+    result = await AuctionService()._process_auction_end(db, product)
+    winner_id = result["winner_id"]
+    db.expire_all()
+    scheduled = job_statuses(db, ORDER_PAYMENT_TIMEOUT)[1] == 1 and job_statuses(db, AUCTION_DEPOSIT_REFUND)[1] == 1
+    passed = report(passed, scheduled, f"拍卖 {product_id} 结算后登记支付超时与退还保证金任务")
+
+    totals = await delayed_job_service.run_pending()
+    db.expire_all()
+    order = db.get(Order, result["order_id"])
+    deposits = {row.user_id: row for row in db.query(Deposit).filter(Deposit.auction_id == product_id)}
+    refunded_ok = all(
+        deposits[user_id].status == "refunded" and db.get(User, user_id).balance == balances[user_id] + Decimal("200.00")
+        for user_id in bidder_ids if user_id != winner_id
+    )
+    passed = report(passed, totals["done"] == 2, f"执行任务: {totals}")
+    passed = report(passed, order.order_status == 6, f"超时未支付订单已取消（状态 {order.order_status}）")
+    passed = report(passed, deposits[winner_id].status == "forfeited",
+                    f"中标者保证金已没收（{deposits[winner_id].status}）")
+    passed = report(passed, refunded_ok, f"其余 {len(bidder_ids) - 1} 名竞拍者保证金已退回余额")
+
+    # 幂等：同一去重键不重复登记，重复执行对已处理的订单和保证金不做改动
+    refund_key = f"{AUCTION_DEPOSIT_REFUND}:{product_id}:{db.get(Product, product_id).auction_end_time:%Y%m%d%H%M%S}"
+    duplicate = delayed_job_service.schedule(db, AUCTION_DEPOSIT_REFUND, datetime.now(), {"auction_id": product_id},
+                                             dedupe_key=refund_key)
+    settled_again = await deposit_service.settle_auction_deposits(db, product_id, winner_id)
+    expired_again = await OrderService().expire_unpaid_order(db, order.id)
+    db.commit()
+    passed = report(passed, duplicate is None and not settled_again["refunded"] and not expired_again,
+                    "重复登记被去重，重复执行不产生变更")
+
+    stats = order_stats_service.get_user_stats(db, winner_id)["buyer"]
+    expected = dict(db.query(Order.order_status, func.count(Order.id)).filter(
+        Order.buyer_id == winner_id
+    ).group_by(Order.order_status).all())
+    passed = report(
+        passed, stats.pending_orders == expected.get(1, 0) and stats.cancelled_orders == expected.get(6, 0),
+        f"订单统计投影已随取消更新（待支付 {stats.pending_orders}，已取消 {stats.cancelled_orders}）"
+    )
+    return passed
+
+
+async def check_cancel_and_relist(db, passed):
+    """中标后取消订单 -> 拍品保持已结束 + 没收保证金 + 撤销支付超时；卖家重新上架 -> 新一轮结算"""
+    from sqlalchemy import func
+    from app.models.deposit import Deposit
+    from app.models.order import Order
+    from app.models.product import Bid, Product
+    from app.services.auction_service import AuctionService
+    from app.models.job import DelayedJob
+    from app.services.delayed_job_service import delayed_job_service, ORDER_PAYMENT_TIMEOUT
+    from app.services.order_service import OrderService
+    from app.services.product_service import ProductService
+
+    product_id = db.query(Bid.product_id).join(Product, Product.id == Bid.product_id).filter(
+        Product.status == 2, Product.auction_type != "fixed_price"
+    ).group_by(Bid.product_id).having(func.count(func.distinct(Bid.bidder_id)) >= 2).order_by(
+        Bid.product_id.desc()
+    ).first()[0]
+    product = db.get(Product, product_id)
+    result = await AuctionService()._process_auction_end(db, product)
+    winner_id, order_id = result["winner_id"], result["order_id"]
+    db.add(Deposit(user_id=winner_id, auction_id=product_id, amount=Decimal("200.00"), type="auction",
+                   status="active", description="拍卖保证金"))
+    db.commit()
+
+    cancelled = await OrderService().cancel_order(db, order_id, winner_id, reason="不想要了")
+    db.expire_all()
+    product = db.get(Product, product_id)
+    deposit = db.query(Deposit).filter(Deposit.auction_id == product_id, Deposit.user_id == winner_id).first()
+    timeout_job = db.query(DelayedJob).filter(DelayedJob.dedupe_key == f"{ORDER_PAYMENT_TIMEOUT}:{order_id}").first()
+    passed = report(passed, cancelled and product.status == 3, f"取消订单后拍品 {product_id} 保持已结束（状态 {product.status}）")
+    passed = report(passed, deposit.status == "forfeited", f"取消未付款订单没收保证金（{deposit.status}）")
+    passed = report(passed, timeout_job.status != 1, "支付超时任务已撤销")
+
+    orders_before = db.query(Order).filter(Order.product_id == product_id).count()
+    await AuctionService().check_and_end_auctions(db)
+    db.expire_all()
+    passed = report(passed, db.query(Order).filter(Order.product_id == product_id).count() == orders_before,
+                    "结算轮询不再结算已取消订单的拍品")
+
+    end_time = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    relisted = await ProductService().relist_auction(db, product_id, product.seller_id, end_time)
+    db.expire_all()
+    product = db.get(Product, product_id)
+    passed = report(
+        passed,
+        relisted is not None and product.status == 2 and product.auction_end_time == end_time
+        and product.current_price == product.starting_price
+        and db.query(Bid).filter(Bid.product_id == product_id, Bid.status != 3).count() == 0,
+        f"卖家重新上架后开始新一轮拍卖（结束时间 {product.auction_end_time}），上一轮出价作废"
+    )
+
+    new_bidder_id = db.query(Bid.bidder_id).filter(Bid.bidder_id != winner_id).first()[0]
+    db.add(Bid(product_id=product_id, bidder_id=new_bidder_id, bid_amount=product.starting_price, status=1))
+    db.commit()
+    await asyncio.sleep(1)  # 拍卖订单号精确到秒，同一拍品两轮结算间隔至少一秒
+    result = await AuctionService()._process_auction_end(db, product)
+    db.expire_all()
+    passed = report(passed, result["winner_id"] == new_bidder_id and db.get(Order, result["order_id"]).order_status == 1,
+                    f"新一轮只按新出价结算（中标者 {result['winner_id']}）")
+    await delayed_job_service.run_pending()  # 执行新一轮已到期的结算任务，不影响后续检查的计数
+    return passed
+
+
+async def check_auto_confirm(db, passed):
+    """卖家发货 -> 自动确认收货"""
+    from app.models.order import Order
+    from app.services.delayed_job_service import delayed_job_service, ORDER_AUTO_CONFIRM
+    from app.services.order_service import OrderService
+
+    order = db.query(Order).filter(Order.order_status == 2).order_by(Order.id).first()
+    await OrderService().update_order_status(db, order.id, "shipped", order.seller_id)
+    passed = report(passed, job_statuses(db, ORDER_AUTO_CONFIRM)[1] == 1, f"订单 {order.id} 发货后登记自动确认收货任务")
+
+    totals = await delayed_job_service.run_pending()
+    db.expire_all()
+    order = db.get(Order, order.id)
+    passed = report(passed, totals["done"] == 1 and order.order_status == 5 and order.completed_at is not None,
+                    f"自动确认收货后订单已完成（状态 {order.order_status}）")
+    return passed
+
+
+def check_workers(db, passed, job_count):
+    """两个执行进程同时领取同一批任务，每个任务恰好执行一次"""
+    from app.services.delayed_job_service import DelayedJobService, delayed_job_service
+
+    executed = Counter()
+    lock = threading.Lock()
+
+    async def noop(db, payload):
+        await asyncio.sleep(0)
+        with lock:
+            executed[payload["n"]] += 1
+
+    run_at = datetime.now() - timedelta(seconds=1)
+    for n in range(job_count):
+        delayed_job_service.schedule(db, "check_noop", run_at, {"n": n})
+    db.commit()
+
+    workers = [DelayedJobService(batch_size=200, lease_seconds=60, poll_seconds=30) for _ in range(2)]
+    results = [None, None]
+
+    def work(index):
+        workers[index].handler("check_noop")(noop)
+        results[index] = asyncio.run(workers[index].run_pending())
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db.expire_all()
+    statuses = job_statuses(db, "check_noop")
+    ok = len(executed) == job_count and max(executed.values()) == 1 and statuses == Counter({3: job_count})
+    passed = report(
+        passed, ok,
+        f"两个进程执行 {job_count} 个任务：各自完成 {results[0]['done']} / {results[1]['done']}，"
+        f"重复执行 {sum(count - 1 for count in executed.values())} 次，{job_count / elapsed:,.0f} 个/秒"
+    )
+    return passed
+
+
+async def check_retries(db, passed):
+    """失败重试与最终失败"""
+    from app.models.job import DelayedJob
+    from app.services.delayed_job_service import DelayedJobService
+
+    worker = DelayedJobService(batch_size=100, lease_seconds=60, poll_seconds=30, max_attempts=3)
+    calls = Counter()
+
+    @worker.handler("check_flaky")
+    async def flaky(db, payload):
+        calls[payload["name"]] += 1
+        if payload["name"] == "broken" or calls[payload["name"]] < 2:
+            raise RuntimeError("模拟失败")
+
+    now = datetime.now() - timedelta(seconds=1)
+    flaky_job = worker.schedule(db, "check_flaky", now, {"name": "flaky"})
+    broken_job = worker.schedule(db, "check_flaky", now, {"name": "broken"}, max_attempts=1)
+    db.commit()
+
+    totals = await worker.run_pending()
+    db.expire_all()
+    flaky_row, broken_row = db.get(DelayedJob, flaky_job.id), db.get(DelayedJob, broken_job.id)
+    passed = report(
+        passed,
+        totals == {"done": 0, "retried": 1, "failed": 1} and flaky_row.status == 1 and flaky_row.run_at > datetime.now()
+        and broken_row.status == 4 and broken_row.last_error,
+        f"首次执行: {totals}，待重试任务 {(flaky_row.run_at - datetime.now()).total_seconds():.0f} 秒后到期"
+    )
+
+    # 模拟退避时间已过
+    flaky_row.run_at = datetime.now() - timedelta(seconds=1)
+    db.commit()
+    totals = await worker.run_pending()
+    db.expire_all()
+    flaky_row = db.get(DelayedJob, flaky_job.id)
+    passed = report(passed, totals["done"] == 1 and flaky_row.status == 3 and flaky_row.attempts == 2,
+                    f"重试后执行成功（共执行 {flaky_row.attempts} 次）")
+    return passed
+
+
+async def check_wakeup(db, passed):
+    """执行循环运行中提交的任务按到期时间执行，无需等待下一次轮询"""
+    from app.core.database import SessionLocal
+    from app.services.delayed_job_service import delayed_job_service
+
+    executed = asyncio.Event()
+
+    @delayed_job_service.handler("check_wakeup")
+    async def wakeup(db, payload):
+        executed.set()
+
+    delayed_job_service.poll_seconds = 3600
+    delayed_job_service.start()
+    await asyncio.sleep(0.1)
+
+    session = SessionLocal()
+    delayed_job_service.schedule(session, "check_wakeup", datetime.now() + timedelta(seconds=0.3))
+    session.commit()
+    session.close()
+
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(executed.wait(), 5)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+    await delayed_job_service.stop()
+    passed = report(passed, executed.is_set() and elapsed < 2,
+                    f"运行中登记 0.3 秒后到期的任务，{elapsed:.2f} 秒后执行（轮询间隔 3600 秒）")
+
+    # 没有执行循环的进程（纯接口进程）登记任务不进入定时堆
+    session = SessionLocal()
+    for _ in range(3):
+        delayed_job_service.schedule(session, "check_wakeup", datetime.now() + timedelta(hours=1))
+    session.commit()
+    session.close()
+    queued = len(delayed_job_service._heap)
+    return report(passed, queued == 0, f"未运行执行循环时登记任务，定时堆中 {queued} 个任务")
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_jobs_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'jobs.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+        # 时限设为 0，登记后立即到期
+        "ORDER_PAYMENT_TIMEOUT_MINUTES": "0",
+        "ORDER_AUTO_CONFIRM_DAYS": "0",
+        "DEPOSIT_REFUND_DELAY_MINUTES": "0",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    import main  # noqa: F401  创建数据表
+    import app.tasks.delayed_jobs  # noqa: F401  注册任务类型
+    from app.core.database import SessionLocal, engine
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 200, "products": args.products, "bids": args.products * 6, "conversations": 10,
+                "messages": 20, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    passed = True
+    db = SessionLocal()
+    try:
+        print("业务任务:")
+        passed = await check_auction_settlement(db, passed)
+        passed = await check_cancel_and_relist(db, passed)
+        passed = await check_auto_confirm(db, passed)
+        print("\n调度:")
+        passed = check_workers(db, passed, args.jobs)
+        passed = await check_retries(db, passed)
+        passed = await check_wakeup(db, passed)
+    finally:
+        db.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="延时任务调度回归检查")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 延时任务检查通过" if passed else "\n❌ 延时任务检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+拍卖保证金批量结算基准
+为两个结构相同的拍卖各生成一批竞拍者保证金（部分用户两笔、部分为冻结状态，含中标者），分别用
+  - 逐笔方式: 对每笔未中标保证金调用 refund_deposit（每笔一次提交，冻结的先 unfreeze_deposit）
+  - 批量方式: settle_auction_deposits 一个事务结算
+对比耗时、SQL 条数和提交次数，并校验两种方式的余额变化、保证金状态、日志和钱包流水金额一致；
+另检查批量方式的 SQL 条数与竞拍人数无关，以及中标订单付款后（订单状态接口和支付回调两条路径）冻结的中标者保证金被退还。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/deposit_settlement_benchmark.py [--bidders 300]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def report(passed, ok, message):
+    print(f"  {'✅' if ok else '❌'} {message}")
+    return passed and ok
+
+
+def seed_deposits(db, auction_id, user_ids):
+    """每个用户一笔保证金，每 5 个用户多一笔，每 7 个用户的保证金为冻结状态"""
+    from app.models.deposit import Deposit
+
+    deposits = []
+    for index, user_id in enumerate(user_ids):
+        for extra in range(2 if index % 5 == 0 else 1):
+            deposits.append(Deposit(
+                user_id=user_id, auction_id=auction_id, type="auction",
+                amount=Decimal("100.00") + index % 3 * 50 + extra * 20,
+                status="frozen" if index % 7 == 0 else "active", description="拍卖保证金"
+            ))
+    db.add_all(deposits)
+    db.commit()
+
+
+def snapshot(db, auction_id, user_ids):
+    """结算结果：各用户余额、保证金状态计数、日志和流水金额"""
+    from collections import Counter
+    from sqlalchemy import func
+    from app.models.deposit import Deposit, DepositLog
+    from app.models.user import User
+    from app.models.wallet import WalletTransaction
+
+    db.expire_all()
+    deposit_ids = [row.id for row in db.query(Deposit.id).filter(Deposit.auction_id == auction_id)]
+    return {
+        "balances": dict(db.query(User.id, User.balance).filter(User.id.in_(user_ids)).all()),
+        "statuses": Counter(row.status for row in db.query(Deposit.status).filter(Deposit.auction_id == auction_id)),
+        "refund_logs": db.query(func.sum(DepositLog.amount)).filter(
+            DepositLog.deposit_id.in_(deposit_ids), DepositLog.action == "refund"
+        ).scalar() or Decimal("0"),
+        "wallet": db.query(func.sum(WalletTransaction.amount)).filter(
+            WalletTransaction.user_id.in_(user_ids), WalletTransaction.description.like("退还保证金%")
+        ).scalar() or Decimal("0"),
+    }
+
+
+async def settle_one_by_one(db, auction_id, winner_id):
+    """逐笔结算（原有单笔接口，每笔一次提交）"""
+    from app.models.deposit import Deposit
+    from app.schemas.deposit import RefundDepositRequest
+    from app.services.deposit_service import deposit_service
+
+    rows = db.query(Deposit.id, Deposit.user_id, Deposit.status).filter(
+        Deposit.auction_id == auction_id, Deposit.status.in_(["active", "frozen"])
+    ).all()
+    for row in rows:
+        if row.user_id == winner_id:
+            if row.status == "active":
+                await deposit_service.freeze_deposit(row.id, db, reason="拍卖中标，保证金冻结至付款完成")
+            continue
+        if row.status == "frozen":
+            await deposit_service.unfreeze_deposit(row.id, db)
+        await deposit_service.refund_deposit(
+            row.user_id, RefundDepositRequest(deposit_id=row.id, reason="拍卖结束，退还未中标保证金"), db
+        )
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_deposits_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'deposits.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    from sqlalchemy import event
+    import main  # noqa: F401  创建数据表
+    from app.core.database import SessionLocal, engine
+    from app.models.deposit import Deposit
+    from app.models.order import Order, Payment
+    from app.models.product import Product
+    from app.models.user import User
+    from app.services.deposit_service import deposit_service
+    from app.services.order_service import OrderService
+    from app.services.payment_service import PaymentService
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": args.bidders * 2 + 20, "products": 50, "bids": 100, "conversations": 10,
+                "messages": 20, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    statements = []
+    commits = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    db = SessionLocal()
+    user_ids = [row.id for row in db.query(User.id).order_by(User.id).limit(args.bidders * 2)]
+    groups = {"逐笔": user_ids[:args.bidders], "批量": user_ids[args.bidders:]}
+    auctions = dict(zip(groups, [row.id for row in db.query(Product.id).order_by(Product.id).limit(2)]))
+    for name, users in groups.items():
+        seed_deposits(db, auctions[name], users)
+
+    passed = True
+    results = {}
+    for name, users in groups.items():
+        auction_id, winner_id = auctions[name], users[1]
+        before = snapshot(db, auction_id, users)
+        statements.clear()
+        commits.clear()
+        started = time.perf_counter()
+        if name == "逐笔":
+            await settle_one_by_one(db, auction_id, winner_id)
+        else:
+            await deposit_service.settle_auction_deposits(db, auction_id, winner_id)
+            db.commit()
+        elapsed = time.perf_counter() - started
+        results[name] = {"seconds": elapsed, "statements": len(statements), "commits": len(commits)}
+        after = snapshot(db, auction_id, users)
+        results[name]["outcome"] = {
+            # 按用户在分组中的位置比较余额变化
+            "credits": [after["balances"][user_id] - before["balances"][user_id] for user_id in users],
+            "statuses": dict(after["statuses"]),
+            "refund_logs": after["refund_logs"],
+            "wallet": after["wallet"],
+        }
+        print(
+            f"  {name}: {len(users)} 名竞拍者，{elapsed * 1000:8.1f}ms，"
+            f"SQL {results[name]['statements']:5d} 条，提交 {results[name]['commits']:4d} 次"
+        )
+
+    one_by_one, bulk = results["逐笔"], results["批量"]
+    print(f"\n  批量结算快 {one_by_one['seconds'] / bulk['seconds']:.1f} 倍\n")
+    passed = report(passed, one_by_one["outcome"] == bulk["outcome"],
+                    f"两种方式结果一致：保证金状态 {bulk['outcome']['statuses']}，退还 {bulk['outcome']['wallet']}元")
+    passed = report(passed, bulk["commits"] == 1, f"批量结算只提交 1 次（{bulk['commits']}）")
+
+    # SQL 条数与竞拍人数无关
+    small_users = [row.id for row in db.query(User.id).order_by(User.id.desc()).limit(10)]
+    small_auction = db.query(Product.id).order_by(Product.id).offset(2).first()[0]
+    seed_deposits(db, small_auction, small_users)
+    statements.clear()
+    await deposit_service.settle_auction_deposits(db, small_auction, small_users[1])
+    db.commit()
+    passed = report(passed, len(statements) == bulk["statements"],
+                    f"SQL 条数与竞拍人数无关（10 人 {len(statements)} 条，{args.bidders} 人 {bulk['statements']} 条）")
+
+    # 中标订单付款后退还冻结的中标者保证金
+    winner_id = groups["批量"][1]
+    order = Order(
+        order_no=f"AUCTION_{auctions['批量']}_CHECK", buyer_id=winner_id, seller_id=groups["批量"][0],
+        product_id=auctions["批量"], final_price=Decimal("500.00"), total_amount=Decimal("500.00"),
+        payment_status=1, order_status=1
+    )
+    db.add(order)
+    db.commit()
+    await OrderService().update_order_status(db, order.id, "paid", winner_id)
+    db.expire_all()
+    statuses = {row.status for row in db.query(Deposit.status).filter(
+        Deposit.auction_id == auctions["批量"], Deposit.user_id == winner_id
+    )}
+    passed = report(passed, statuses == {"refunded"}, f"中标订单付款后中标者保证金状态 {statuses}")
+
+    # 支付回调同样退还（逐笔方式只退还了未中标者，中标者的保证金仍在）
+    winner_id = groups["逐笔"][1]
+    order = Order(
+        order_no=f"AUCTION_{auctions['逐笔']}_CHECK", buyer_id=winner_id, seller_id=groups["逐笔"][0],
+        product_id=auctions["逐笔"], final_price=Decimal("500.00"), total_amount=Decimal("500.00"),
+        payment_status=1, order_status=1
+    )
+    db.add(order)
+    db.flush()
+    payment = Payment(order_id=order.id, user_id=winner_id, payment_method=1, amount=order.total_amount,
+                      transaction_id=f"CHECK_{order.id}")
+    db.add(payment)
+    db.commit()
+    handled = await PaymentService().handle_payment_notify(db, payment.id, {"status": "success"})
+    db.expire_all()
+    statuses = {row.status for row in db.query(Deposit.status).filter(
+        Deposit.auction_id == auctions["逐笔"], Deposit.user_id == winner_id
+    )}
+    order = db.get(Order, order.id)
+    passed = report(
+        passed, handled and statuses == {"refunded"} and (order.payment_status, order.order_status) == (2, 2),
+        f"支付回调后中标者保证金状态 {statuses}，订单支付/订单状态 ({order.payment_status}, {order.order_status})"
+    )
+    db.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="拍卖保证金批量结算基准")
+    parser.add_argument("--bidders", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 保证金批量结算检查通过" if passed else "\n❌ 保证金批量结算检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+专场商品目录基准
+生成一个包含大量商品的专场，模拟专场上线时对前几页的突发访问：
+  - 旧实现: JOIN + COUNT + OFFSET 分页，逐个商品手工构建响应字典
+  - 物化目录: 商品ID列表切片 + 共享商品卡片缓存批量读取
+校验两种实现输出一致、缓存命中时不执行 SQL，以及出价后卡片的当前价在不重建目录的情况下更新；
+通过 ORM 增删专场商品提交后目录自动失效，目录失效后商品到专场的反向索引随之清理。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/event_catalog_benchmark.py [--event-products 2000] [--requests 2000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def legacy_event_page(db, event_id, page, page_size):
+    """改造前 get_event_products 的查询和组装方式"""
+    from app.models.product import EventProduct, Product, SpecialEvent
+
+    event = db.query(SpecialEvent).filter(SpecialEvent.id == event_id).first()
+    query = db.query(Product).join(
+        EventProduct, Product.id == EventProduct.product_id
+    ).filter(EventProduct.event_id == event_id)
+    total = query.count()
+    products = query.order_by(EventProduct.sort_order, Product.created_at.desc()).offset(
+        (page - 1) * page_size
+    ).limit(page_size).all()
+    items = [
+        {
+            "id": product.id,
+            "seller_id": product.seller_id,
+            "title": product.title,
+            "description": product.description,
+            "category_id": product.category_id,
+            "images": product.images or [],
+            "starting_price": str(product.starting_price) if product.starting_price else "0",
+            "current_price": str(product.current_price) if product.current_price else "0",
+            "buy_now_price": str(product.buy_now_price) if product.buy_now_price else None,
+            "auction_type": product.auction_type,
+            "auction_start_time": product.auction_start_time.isoformat() if product.auction_start_time else None,
+            "auction_end_time": product.auction_end_time.isoformat() if product.auction_end_time else None,
+            "location": product.location,
+            "shipping_fee": str(product.shipping_fee) if product.shipping_fee else "0",
+            "is_free_shipping": product.is_free_shipping,
+            "condition_type": product.condition_type,
+            "stock_quantity": product.stock_quantity,
+            "view_count": product.view_count,
+            "bid_count": product.bid_count,
+            "favorite_count": product.favorite_count,
+            "status": product.status,
+            "is_featured": product.is_featured,
+            "created_at": product.created_at.isoformat() if product.created_at else None,
+            "updated_at": product.updated_at.isoformat() if product.updated_at else None,
+        }
+        for product in products
+    ]
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": (total + page_size - 1) // page_size,
+        "event": {
+            "id": event.id,
+            "title": event.title,
+            "description": event.description,
+            "banner_image": event.banner_image,
+        },
+    }
+
+
+def burst_pages(count, rng):
+    """专场上线时的访问分布：大部分请求集中在前几页"""
+    return [min(1 + int(rng.expovariate(0.8)), 20) for _ in range(count)]
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_event_catalog_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    from sqlalchemy import event as sa_event
+    import main  # noqa: F401  创建数据表
+    from app.core.database import SessionLocal, engine
+    from app.core.serialization import dumps
+    from app.models.product import EventProduct, Product, SpecialEvent
+    from app.models.user import User
+    from app.schemas.bid import BidCreate
+    from app.services.bid_service import BidService
+    from app.services.event_catalog_service import event_catalog
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 300, "products": args.event_products + 500, "bids": args.event_products * 3,
+                "conversations": 10, "messages": 20, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    db = SessionLocal()
+    now = datetime.now()
+    special = SpecialEvent(title="开学季萌宠专场", description="精选品种，限时竞拍", banner_image="/static/banners/1.jpg",
+                           start_time=now - timedelta(hours=1), end_time=now + timedelta(days=3), is_active=True)
+    db.add(special)
+    db.flush()
+    product_ids = [row.id for row in db.query(Product.id).order_by(Product.id).limit(args.event_products)]
+    db.add_all(EventProduct(event_id=special.id, product_id=product_id, sort_order=i % 10)
+               for i, product_id in enumerate(product_ids))
+    db.commit()
+    event_id = special.id
+    print(f"专场 {event_id}: {len(product_ids)} 个商品，模拟 {args.requests} 次请求（每页 {args.page_size} 条）\n")
+
+    statements = []
+    sa_event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    pages = burst_pages(args.requests, random.Random(args.seed))
+    passed = True
+
+    def report(ok, message):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {message}")
+
+    timings = {}
+    for name, fetch in (("旧实现", legacy_event_page), ("物化目录", event_catalog.get_page)):
+        db.expunge_all()
+        statements.clear()
+        started = time.perf_counter()
+        for page in pages:
+            dumps(fetch(db, event_id, page, args.page_size))
+        timings[name] = (time.perf_counter() - started, len(statements))
+
+    for name, (seconds, sql) in timings.items():
+        print(f"  {name:8} {seconds * 1000:8.1f}ms  {seconds / len(pages) * 1e6:8.1f}µs/次  SQL {sql} 条")
+    print(f"  加速 {timings['旧实现'][0] / timings['物化目录'][0]:.1f}x\n")
+
+    same = all(
+        legacy_event_page(db, event_id, page, args.page_size) == event_catalog.get_page(db, event_id, page, args.page_size)
+        for page in range(1, (len(product_ids) + args.page_size - 1) // args.page_size + 2)
+    )
+    report(same, "物化目录与旧实现输出一致（含越界页）")
+
+    statements.clear()
+    event_catalog.get_page(db, event_id, 1, args.page_size)
+    report(not statements, f"缓存命中时执行 SQL {len(statements)} 条")
+
+    # 出价后只更新卡片实时字段，目录不重建
+    first_page = event_catalog.get_page(db, event_id, 1, args.page_size)
+    target = next(
+        (item for item in first_page["items"] if item["status"] == 2
+         and datetime.fromisoformat(item["auction_end_time"]) > datetime.now()),
+        None
+    )
+    if target is None:
+        report(False, "首页没有拍卖中的商品，无法检查出价更新")
+    else:
+        bidder = db.query(User).filter(User.id != target["seller_id"]).order_by(User.id).first()
+        bidder.balance = Decimal("10000000")
+        db.commit()
+        amount = Decimal(target["current_price"]) + 10
+        await BidService().place_bid(db, BidCreate(product_id=target["id"], amount=amount), bidder.id)
+        statements.clear()
+        page = event_catalog.get_page(db, event_id, 1, args.page_size)
+        card = next(item for item in page["items"] if item["id"] == target["id"])
+        report(Decimal(card["current_price"]) == amount and not statements,
+               f"出价后卡片当前价 {target['current_price']} -> {card['current_price']}，读取执行 SQL {len(statements)} 条")
+        db.expunge_all()
+        report(legacy_event_page(db, event_id, 1, args.page_size) == page, "出价后与旧实现输出一致")
+
+    # 专场商品变更提交后目录自动失效
+    extra_id = db.query(Product.id).filter(~Product.id.in_(product_ids)).order_by(Product.id).first()[0]
+    db.add(EventProduct(event_id=special.id, product_id=extra_id, sort_order=-1))
+    db.commit()
+    page = event_catalog.get_page(db, event_id, 1, args.page_size)
+    report(page["total"] == len(product_ids) + 1 and page["items"][0]["id"] == extra_id,
+           f"新增专场商品提交后目录已更新（共 {page['total']} 个，首个 {page['items'][0]['id']}）")
+    db.delete(db.query(EventProduct).filter(EventProduct.product_id == extra_id).first())
+    db.commit()
+    page = event_catalog.get_page(db, event_id, 1, args.page_size)
+    report(page["total"] == len(product_ids) and extra_id not in event_catalog._product_event_ids,
+           f"移除专场商品提交后目录已更新（共 {page['total']} 个）")
+
+    event_catalog.invalidate_event(event_id)
+    report(not event_catalog._product_event_ids and not event_catalog._event_product_ids,
+           f"目录失效后反向索引已清理（剩余 {len(event_catalog._product_event_ids)} 个商品）")
+
+    db.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="专场商品目录基准")
+    parser.add_argument("--event-products", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 专场商品目录检查通过" if passed else "\n❌ 专场商品目录检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
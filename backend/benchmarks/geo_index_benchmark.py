@@ -0,0 +1,121 @@
+"""
+同城服务地理索引基准测试
+生成指定数量的随机点（默认100万，集中分布在若干城市周围），
+测量建索引、半径查询和K近邻查询的耗时，并与全量扫描对比。
+
+用法: python benchmarks/geo_index_benchmark.py [--points 1000000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.geo_service import GeoGridIndex, haversine_km
+
+# 城市中心点（纬度, 经度）
+CITY_CENTERS = [
+    (39.9042, 116.4074),  # 北京
+    (31.2304, 121.4737),  # 上海
+    (23.1291, 113.2644),  # 广州
+    (22.5431, 114.0579),  # 深圳
+    (30.5728, 104.0668),  # 成都
+    (30.2741, 120.1551),  # 杭州
+    (34.3416, 108.9398),  # 西安
+    (29.5630, 106.5516),  # 重庆
+]
+SERVICE_TYPES = ["pet_social", "local_store", "aquarium_design", "door_service", "breeding", "pickup"]
+
+
+def generate_points(count: int, seed: int):
+    rng = random.Random(seed)
+    points = []
+    for item_id in range(1, count + 1):
+        center_lat, center_lng = rng.choice(CITY_CENTERS)
+        # 城市内约 ±30 公里的正态分布
+        lat = center_lat + rng.gauss(0, 0.12)
+        lng = center_lng + rng.gauss(0, 0.14)
+        points.append((item_id, lat, lng, rng.choice(SERVICE_TYPES)))
+    return points
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同城服务地理索引基准测试")
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=3.0, help="半径查询的半径（公里）")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--cell", type=float, default=0.05, help="网格大小（度）")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    points, gen_seconds = timed(generate_points, args.points, args.seed)
+    print(f"生成 {args.points} 个点: {gen_seconds:.2f}s")
+
+    index = GeoGridIndex(cell_degrees=args.cell)
+
+    def build():
+        for item_id, lat, lng, service_type in points:
+            index.upsert(item_id, lat, lng, service_type)
+
+    _, build_seconds = timed(build)
+    print(f"建立索引: {build_seconds:.2f}s ({args.points / build_seconds:,.0f} 点/秒)")
+
+    rng = random.Random(args.seed + 1)
+    query_points = []
+    for _ in range(args.queries):
+        center_lat, center_lng = rng.choice(CITY_CENTERS)
+        query_points.append((center_lat + rng.gauss(0, 0.08), center_lng + rng.gauss(0, 0.08)))
+
+    radius_times, radius_hits = [], []
+    for lat, lng in query_points:
+        hits, seconds = timed(index.within_radius, lat, lng, args.radius)
+        radius_times.append(seconds)
+        radius_hits.append(len(hits))
+
+    knn_times = []
+    for lat, lng in query_points:
+        _, seconds = timed(index.nearest, lat, lng, args.k)
+        knn_times.append(seconds)
+
+    knn_type_times = []
+    for lat, lng in query_points:
+        _, seconds = timed(index.nearest, lat, lng, args.k, ["aquarium_design"])
+        knn_type_times.append(seconds)
+
+    def report(name, values):
+        print(
+            f"{name}: p50 {percentile(values, 0.5) * 1000:.2f}ms, "
+            f"p95 {percentile(values, 0.95) * 1000:.2f}ms, "
+            f"p99 {percentile(values, 0.99) * 1000:.2f}ms"
+        )
+
+    report(f"半径 {args.radius}km 查询 (平均命中 {sum(radius_hits) / len(radius_hits):.0f})", radius_times)
+    report(f"K={args.k} 近邻查询", knn_times)
+    report(f"K={args.k} 近邻查询 (按服务类型过滤)", knn_type_times)
+
+    # 正确性抽查 + 全量扫描对比
+    lat, lng = query_points[0]
+    (scan, scan_seconds) = timed(
+        lambda: sorted((haversine_km(lat, lng, p_lat, p_lng), item_id) for item_id, p_lat, p_lng, _ in points)[:args.k]
+    )
+    knn = index.nearest(lat, lng, args.k)
+    assert [item_id for _, item_id in knn] == [item_id for _, item_id in scan], "K近邻结果与全量扫描不一致"
+    print(f"全量扫描 K 近邻: {scan_seconds * 1000:.0f}ms（结果与索引一致）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+条件请求与压缩的带宽/延迟基准
+回放录制的移动端会话（benchmarks/sessions/mobile_session.json），分别以两种客户端请求同一批接口：
+  - 原始客户端: Accept-Encoding: identity，不保存 ETag
+  - 缓存客户端: 接受 gzip/br，按 URL 保存 ETag 并携带 If-None-Match
+统计传输字节数、304 次数，并按模拟移动网络（往返时延 + 带宽）估算每个请求的端到端耗时。
+
+用法:
+    python benchmarks/http_cache_benchmark.py [--rtt-ms 120] [--bandwidth-kbps 1600]
+    python benchmarks/http_cache_benchmark.py --session benchmarks/sessions/mobile_session.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SESSION = os.path.join(BACKEND_DIR, "benchmarks", "sessions", "mobile_session.json")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def seed(engine, session_factory, args):
+    """生成基准数据并补充店铺和专场活动，返回路径占位符取值"""
+    from app.models.product import EventProduct, Product, SpecialEvent
+    from app.models.store import Store
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 100, "products": 500, "bids": 2500, "conversations": 200, "messages": 2000, "posts": 60},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    db = session_factory()
+    try:
+        product = db.query(Product).filter(Product.status == 2).order_by(Product.id).first()
+        sellers = [row.seller_id for row in db.query(Product.seller_id).distinct().order_by(Product.seller_id).limit(20)]
+        stores = [
+            Store(owner_id=seller_id, name=f"萌宠小店{seller_id}", description="专注健康幼宠，支持视频看宠", location="上海")
+            for seller_id in sellers
+        ]
+        db.add_all(stores)
+        now = datetime.now()
+        events = [
+            SpecialEvent(
+                title=f"周末专场{i}", description="精选品种，限时竞拍", banner_image=f"/static/banners/{i}.jpg",
+                start_time=now - timedelta(days=1), end_time=now + timedelta(days=2), is_active=True,
+            )
+            for i in range(1, 4)
+        ]
+        db.add_all(events)
+        db.flush()
+        product_ids = [row.id for row in db.query(Product.id).filter(Product.status == 2).order_by(Product.id).limit(10)]
+        db.add_all(EventProduct(event_id=events[0].id, product_id=product_id, sort_order=i) for i, product_id in enumerate(product_ids))
+        db.commit()
+        return {
+            "product_id": product.id,
+            "seller_id": product.seller_id,
+            "store_id": next(store.id for store in stores if store.owner_id == product.seller_id),
+            "event_id": events[0].id,
+        }
+    finally:
+        db.close()
+
+
+async def replay(client, session, values, headers, conditional, link):
+    """回放会话，返回每个请求的记录"""
+    etags = {}
+    records = []
+    for entry in session["requests"]:
+        url = entry["path"].format(**values)
+        request_headers = dict(headers["auth"] if entry.get("auth") else headers["anonymous"])
+        if conditional and url in etags:
+            request_headers["If-None-Match"] = etags[url]
+        started = time.perf_counter()
+        response = await client.get(url, headers=request_headers)
+        server_seconds = time.perf_counter() - started
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"{url} 返回 {response.status_code}: {response.text[:200]}")
+        if conditional and response.headers.get("etag"):
+            etags[url] = response.headers["etag"]
+        wire_bytes = response.num_bytes_downloaded + sum(len(k) + len(v) + 4 for k, v in response.headers.raw)
+        records.append({
+            "path": entry["path"],
+            "status": response.status_code,
+            "bytes": wire_bytes,
+            "seconds": server_seconds + link["rtt"] + wire_bytes * 8 / link["bandwidth"],
+        })
+    return records
+
+
+def summarize(records):
+    return {
+        "requests": len(records),
+        "not_modified": sum(1 for record in records if record["status"] == 304),
+        "bytes": sum(record["bytes"] for record in records),
+        "seconds": sum(record["seconds"] for record in records),
+    }
+
+
+async def run(args):
+    workdir = tempfile.mkdtemp(prefix="petshop_http_cache_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    import httpx
+    import main
+    from app.core.database import SessionLocal, engine
+    from app.core.security import create_access_token
+
+    with open(args.session, encoding="utf-8") as f:
+        session = json.load(f)
+    values = seed(engine, SessionLocal, args)
+    token = create_access_token({"sub": "1"})
+    link = {"rtt": args.rtt_ms / 1000, "bandwidth": args.bandwidth_kbps * 1000}
+    transport = httpx.ASGITransport(app=main.app)
+
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://mobile") as client:
+        for name, encoding, conditional in (("原始客户端", "identity", False), ("缓存客户端", "br, gzip", True)):
+            headers = {
+                "anonymous": {"Accept-Encoding": encoding},
+                "auth": {"Accept-Encoding": encoding, "Authorization": f"Bearer {token}"},
+            }
+            results[name] = await replay(client, session, values, headers, conditional, link)
+    return session, results, args
+
+
+def main():
+    parser = argparse.ArgumentParser(description="条件请求与压缩的带宽/延迟基准")
+    parser.add_argument("--session", default=DEFAULT_SESSION, help="录制的会话 JSON")
+    parser.add_argument("--rtt-ms", type=float, default=120, help="模拟网络往返时延")
+    parser.add_argument("--bandwidth-kbps", type=float, default=1600, help="模拟下行带宽")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    session, results, args = asyncio.run(run(args))
+    baseline, optimized = (summarize(records) for records in results.values())
+
+    print(f"会话: {session['description']}")
+    print(f"模拟网络: RTT {args.rtt_ms:.0f}ms，带宽 {args.bandwidth_kbps:.0f}kbps\n")
+    print(f"  {'':12} {'请求':>6} {'304':>5} {'传输':>10} {'总耗时':>9}")
+    for name, summary in zip(results, (baseline, optimized)):
+        print(
+            f"  {name:12} {summary['requests']:6d} {summary['not_modified']:5d} "
+            f"{summary['bytes'] / 1024:9.1f}K {summary['seconds']:8.2f}s"
+        )
+    print(
+        f"\n节省带宽 {1 - optimized['bytes'] / baseline['bytes']:.1%}，"
+        f"节省耗时 {1 - optimized['seconds'] / baseline['seconds']:.1%}\n"
+    )
+
+    per_path = defaultdict(lambda: [0, 0])
+    for index, (name, records) in enumerate(results.items()):
+        for record in records:
+            per_path[record["path"]][index] += record["bytes"]
+    print(f"  {'接口':48} {'原始':>9} {'缓存':>9}")
+    for path, (before, after) in sorted(per_path.items(), key=lambda item: item[1][0], reverse=True):
+        print(f"  {path:48} {before / 1024:8.1f}K {after / 1024:8.1f}K")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+写请求幂等回归检查
+  1. 接口：携带 Idempotency-Key 重复缴纳保证金，重试返回首次响应（Idempotent-Replayed），只扣一次余额、只有一笔保证金；
+     同一幂等键内容不同返回 422；其他用户使用相同幂等键互不影响；重放的响应按本次请求的 Origin 返回 CORS 头；
+  2. 并发：同一请求并发发送 20 次，只执行一次，其余请求等待首次请求完成后拿到同一响应；
+  3. 存储（进程内 / 数据库）：两个 worker 共享存储时跨进程等待并重放；首次请求 5xx 或异常不保存，重试重新执行；
+     首次请求超过等待时间返回 409；处理中断的幂等键在占用到期后可重新执行。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/idempotency_check.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def report(passed, ok, message):
+    print(f"  {'✅' if ok else '❌'} {message}")
+    return passed and ok
+
+
+class CountingApp:
+    """最小 ASGI 应用：记录执行次数，按配置延迟、返回 5xx 或抛出异常"""
+
+    def __init__(self, delay=0.0, fail_times=0, raise_times=0):
+        self.calls = 0
+        self.delay = delay
+        self.fail_times = fail_times
+        self.raise_times = raise_times
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        message = await receive()
+        await asyncio.sleep(self.delay)
+        if self.raise_times:
+            self.raise_times -= 1
+            raise RuntimeError("处理失败")
+        status = 200
+        if self.fail_times:
+            self.fail_times -= 1
+            status = 503
+        body = f'{{"call": {self.calls}, "echo": "{message["body"].decode()}"}}'.encode()
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def post(app, key, body=b"{}", authorization="Bearer check"):
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        return await client.post(
+            "/api/v1/check", content=body, headers={"Idempotency-Key": key, "Authorization": authorization}
+        )
+
+
+async def check_api(passed):
+    import httpx
+    import main
+    from app.core.database import SessionLocal
+    from app.core.security import create_access_token
+    from app.models.deposit import Deposit
+    from app.models.user import User
+
+    db = SessionLocal()
+    user_ids = [row.id for row in db.query(User.id).order_by(User.id).limit(2)]
+    db.query(User).filter(User.id.in_(user_ids)).update({User.balance: Decimal("1000.00")}, synchronize_session=False)
+    db.commit()
+
+    def state(user_id):
+        db.expire_all()
+        return (
+            db.query(User.balance).filter(User.id == user_id).scalar(),
+            db.query(Deposit).filter(Deposit.user_id == user_id).count()
+        )
+
+    headers = [{"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"} for user_id in user_ids]
+    payload = {"amount": "100.00", "type": "general", "payment_method": "balance"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://deposits") as client:
+        async def pay(index, key, body=payload):
+            return await client.post("/api/v1/deposits/pay", json=body, headers={**headers[index], "Idempotency-Key": key})
+
+        first = await pay(0, "pay-1")
+        retry = await pay(0, "pay-1")
+        passed = report(
+            passed,
+            first.status_code == 200 and retry.content == first.content
+            and retry.headers.get("idempotent-replayed") == "true" and "idempotent-replayed" not in first.headers,
+            f"重试返回首次响应：{first.status_code} / {retry.status_code}，Idempotent-Replayed: "
+            f"{retry.headers.get('idempotent-replayed')}"
+        )
+        passed = report(passed, state(user_ids[0]) == (Decimal("900.00"), 1),
+                        f"只扣一次余额、只有一笔保证金：{state(user_ids[0])}")
+
+        mismatch = await pay(0, "pay-1", {**payload, "amount": "200.00"})
+        passed = report(passed, mismatch.status_code == 422 and state(user_ids[0]) == (Decimal("900.00"), 1),
+                        f"同一幂等键内容不同：{mismatch.status_code}，{mismatch.json()['detail']}")
+
+        other = await pay(1, "pay-1")
+        passed = report(
+            passed,
+            other.status_code == 200 and "idempotent-replayed" not in other.headers and other.content != first.content
+            and state(user_ids[1]) == (Decimal("900.00"), 1),
+            "其他用户使用相同幂等键独立执行"
+        )
+
+        plain = [await pay(1, key) for key in ("pay-2", "pay-3")]
+        passed = report(passed, all(r.status_code == 200 for r in plain) and state(user_ids[1])[1] == 3,
+                        "不同幂等键各自执行")
+
+        responses = await asyncio.gather(*[pay(0, "pay-concurrent") for _ in range(20)])
+        bodies = {response.content for response in responses}
+        replayed = sum(response.headers.get("idempotent-replayed") == "true" for response in responses)
+        passed = report(
+            passed,
+            all(r.status_code == 200 for r in responses) and len(bodies) == 1 and replayed == 19
+            and state(user_ids[0]) == (Decimal("800.00"), 2),
+            f"并发 20 次只执行一次：{len(bodies)} 种响应，重放 {replayed} 次，余额/保证金 {state(user_ids[0])}"
+        )
+
+        # CORS 头由最外层中间件按本次请求生成，不从保存的响应中重放（带 Cookie 时按请求的 Origin 返回）
+        cors = {**headers[0], "Idempotency-Key": "pay-cors", "Cookie": "session=check"}
+        first = await client.post("/api/v1/deposits/pay", json=payload, headers={**cors, "Origin": "https://a.example"})
+        retry = await client.post("/api/v1/deposits/pay", json=payload, headers={**cors, "Origin": "https://b.example"})
+        origins = retry.headers.get_list("access-control-allow-origin")
+        passed = report(
+            passed,
+            retry.headers.get("idempotent-replayed") == "true" and origins == ["https://b.example"]
+            and first.headers.get("access-control-allow-origin") == "https://a.example",
+            f"重放响应按本次 Origin 返回 CORS 头：{origins}"
+        )
+
+        response = await client.post("/api/v1/deposits/pay", json=payload, headers={**headers[0], "Idempotency-Key": ""})
+        passed = report(passed, response.status_code == 400, f"空幂等键：{response.status_code}")
+    db.close()
+    return passed
+
+
+async def check_store(passed, name, store_factory):
+    from app.core.idempotency import CLAIMED, IdempotencyMiddleware
+
+    # 两个 worker 共享存储，第二个 worker 的重复请求轮询等待首次请求完成
+    app_a, app_b = CountingApp(delay=0.3), CountingApp(delay=0.3)
+    store = store_factory()
+    worker_a = IdempotencyMiddleware(app_a, store, wait_seconds=5, poll_interval=0.02)
+    worker_b = IdempotencyMiddleware(app_b, store, wait_seconds=5, poll_interval=0.02)
+    first, second = await asyncio.gather(post(worker_a, "cross"), post(worker_b, "cross"))
+    passed = report(
+        passed,
+        app_a.calls + app_b.calls == 1 and first.content == second.content
+        and sorted([first.headers.get("idempotent-replayed"), second.headers.get("idempotent-replayed")], key=str)
+        == [None, "true"],
+        f"{name}：两个 worker 的重复请求只执行一次并返回同一响应"
+    )
+
+    app = CountingApp(fail_times=1, raise_times=1)
+    middleware = IdempotencyMiddleware(app, store_factory())
+    try:
+        await post(middleware, "retry")
+        raised = False
+    except RuntimeError:
+        raised = True
+    failed = await post(middleware, "retry")
+    succeeded = await post(middleware, "retry")
+    replayed = await post(middleware, "retry")
+    passed = report(
+        passed,
+        raised and failed.status_code == 503 and succeeded.status_code == 200 and app.calls == 3
+        and replayed.headers.get("idempotent-replayed") == "true" and replayed.content == succeeded.content,
+        f"{name}：异常和 5xx 不保存，重试重新执行（执行 {app.calls} 次），成功后重放"
+    )
+
+    slow = CountingApp(delay=0.5)
+    middleware = IdempotencyMiddleware(slow, store_factory(), wait_seconds=0.1)
+    responses = await asyncio.gather(post(middleware, "slow"), post(middleware, "slow"))
+    codes = sorted(response.status_code for response in responses)
+    passed = report(passed, codes == [200, 409] and slow.calls == 1, f"{name}：超过等待时间返回 {codes}")
+
+    store = store_factory()
+    store.claim("crashed", "fingerprint", 0)
+    state, _ = store.claim("crashed", "fingerprint", 60)
+    passed = report(passed, state == CLAIMED, f"{name}：占用到期的幂等键可重新执行（{state}）")
+    return passed
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_idempotency_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'idempotency.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+        "IDEMPOTENCY_BACKEND": "database",
+        "JOB_RUNNER_ENABLED": "false",
+        "BACKGROUND_TASKS_ENABLED": "false",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    import main  # noqa: F401  创建数据表
+    from app.core.database import engine
+    from app.core.idempotency import DatabaseIdempotencyStore, MemoryIdempotencyStore
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 20, "products": 10, "bids": 20, "conversations": 5, "messages": 10, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    passed = True
+    print("接口（数据库存储）:")
+    passed = await check_api(passed)
+    print("\n存储:")
+    passed = await check_store(passed, "进程内", MemoryIdempotencyStore)
+    passed = await check_store(passed, "数据库", DatabaseIdempotencyStore)
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="写请求幂等回归检查")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 写请求幂等检查通过" if passed else "\n❌ 写请求幂等检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
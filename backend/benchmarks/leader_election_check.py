@@ -0,0 +1,247 @@
+"""
+主进程选举回归检查
+  1. 进程内租约（模拟时钟）：抢占、续约、到期接管时令牌递增、释放；
+  2. 数据库租约：三个选举者同时运行，每 20ms 采样一次，任意时刻至多一个进程在运行后台循环；
+     主进程断连（续约失败）后在本地有效期内停止后台循环，其他进程在租约到期后接管；
+     主进程正常退出释放租约，其他进程在一个续约间隔内接管；
+  3. 防护令牌：被接管后旧令牌校验失败，旧主进程结算拍卖时被拒绝且不产生订单；
+  4. 三个 worker 同时运行拍卖结束检查，到期拍卖只由主进程结算，每个拍卖恰好一个订单。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/leader_election_check.py [--lease 1.2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def report(passed, ok, message):
+    print(f"  {'✅' if ok else '❌'} {message}")
+    return passed and ok
+
+
+class UnreachableBackend:
+    """模拟与租约存储断连的进程"""
+
+    def acquire(self, name, holder, ttl):
+        raise ConnectionError("租约存储不可达")
+
+    def release(self, name, holder, token):
+        raise ConnectionError("租约存储不可达")
+
+    def check(self, name, holder, token, db=None):
+        raise ConnectionError("租约存储不可达")
+
+
+def check_memory_backend(passed):
+    from app.services.leader_election_service import MemoryLeaseBackend
+
+    now = [0.0]
+    backend = MemoryLeaseBackend(clock=lambda: now[0])
+    steps = [backend.acquire("bg", "a", 10), backend.acquire("bg", "b", 10)]
+    now[0] = 5
+    steps.append(backend.acquire("bg", "a", 10))  # 续约
+    now[0] = 14
+    steps.append(backend.acquire("bg", "b", 10))  # a 的租约 15 秒到期，b 仍抢不到
+    now[0] = 16
+    steps.append(backend.acquire("bg", "b", 10))  # 接管
+    stale = backend.check("bg", "a", 1)
+    backend.release("bg", "b", 2)
+    steps.append(backend.acquire("bg", "a", 10))
+    ok = steps == [1, None, 1, None, 2, 3] and not stale
+    return report(passed, ok, f"进程内租约：抢占/续约/接管/释放后的令牌 {steps}，旧令牌校验 {stale}")
+
+
+async def check_database_failover(passed, lease):
+    from app.services.leader_election_service import DatabaseLeaseBackend, LeaderElector
+
+    backend = DatabaseLeaseBackend()
+    electors = [LeaderElector("check", backend, lease_seconds=lease) for _ in range(3)]
+    running = set()
+
+    def probe(index):
+        async def loop():
+            running.add(index)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                running.discard(index)
+        return loop
+
+    for index, elector in enumerate(electors):
+        elector.add_task("probe", probe(index))
+        elector.start()
+
+    overlaps = []
+
+    async def wait_for_leader(exclude, limit):
+        started = time.perf_counter()
+        while time.perf_counter() - started < limit:
+            if len(running) > 1:
+                overlaps.append(sorted(running))
+            leaders = [index for index in running if index not in exclude]
+            if leaders:
+                return leaders[0], time.perf_counter() - started
+            await asyncio.sleep(0.02)
+        return None, limit
+
+    leader, elapsed = await wait_for_leader(set(), lease * 3)
+    passed = report(passed, leader is not None, f"三个进程选出主进程 {leader}，耗时 {elapsed:.2f}s")
+    first_token = electors[leader].token
+
+    # 断连：旧主进程续约失败，到本地有效期后停止；其他进程在数据库租约到期后接管
+    electors[leader].backend = UnreachableBackend()
+    partitioned = leader
+    leader, elapsed = await wait_for_leader({partitioned}, lease * 4)
+    new_token = electors[leader].token if leader is not None else None
+    passed = report(
+        passed, leader is not None and elapsed <= lease + electors[0].renew_seconds + 0.5 and new_token == first_token + 1,
+        f"主进程断连后 {elapsed:.2f}s 由进程 {leader} 接管（租约 {lease}s），令牌 {first_token} -> {new_token}"
+    )
+    passed = report(passed, partitioned not in running and not electors[partitioned].is_leader,
+                    "断连的旧主进程已停止后台循环")
+    stale_ok = not backend.check("check", electors[partitioned].holder_id, first_token)
+    passed = report(passed, stale_ok, "旧令牌校验失败")
+
+    # 正常退出：释放租约，剩余进程在一个续约间隔内接管
+    graceful = leader
+    await electors[graceful].stop()
+    leader, elapsed = await wait_for_leader({partitioned, graceful}, lease * 3)
+    passed = report(
+        passed, leader is not None and elapsed <= electors[0].renew_seconds + 0.5,
+        f"主进程正常退出后 {elapsed:.2f}s 由进程 {leader} 接管"
+    )
+    passed = report(passed, not overlaps, f"采样期间同时运行后台循环的进程: {overlaps or '无'}")
+
+    for index, elector in enumerate(electors):
+        if index != graceful:
+            elector.backend = backend
+            await elector.stop()
+    return passed
+
+
+async def check_auction_closing(passed, lease):
+    from sqlalchemy import func
+    from app.core.database import SessionLocal
+    from app.models.order import Order
+    from app.models.product import Bid, Product
+    from app.services.auction_service import AuctionService
+    from app.services.leader_election_service import DatabaseLeaseBackend, LeaderElector, LeadershipLost
+    from app.tasks.auction_scheduler import AuctionScheduler
+
+    db = SessionLocal()
+    product_ids = [
+        row.product_id for row in db.query(Bid.product_id).join(Product, Product.id == Bid.product_id).filter(
+            Product.status == 2
+        ).distinct().order_by(Bid.product_id).limit(60)
+    ]
+    db.query(Product).filter(Product.id.in_(product_ids)).update(
+        {Product.auction_end_time: datetime.now() - timedelta(minutes=1)}, synchronize_session=False
+    )
+    orders_before = db.query(func.count(Order.id)).scalar()
+    db.commit()
+
+    # 旧主进程（令牌已失效）结算被拒绝
+    backend = DatabaseLeaseBackend()
+    stale = LeaderElector("auction", backend, lease_seconds=lease)
+    stale.token, stale._valid_until = 1, time.monotonic() + lease
+    try:
+        await AuctionService().check_and_end_auctions(db, fence=stale.fence)
+        rejected = False
+    except LeadershipLost:
+        rejected = True
+    db.rollback()
+    passed = report(passed, rejected and db.query(func.count(Order.id)).scalar() == orders_before,
+                    "令牌失效的进程结算拍卖被拒绝，未产生订单")
+
+    electors = []
+    for _ in range(3):
+        elector = LeaderElector("auction", backend, lease_seconds=lease)
+        scheduler = AuctionScheduler()
+        elector.add_task(
+            "auction_closing",
+            lambda scheduler=scheduler, elector=elector: scheduler.start_scheduler(0.005, fence=elector.fence)
+        )
+        elector.start()
+        electors.append(elector)
+
+    started = time.perf_counter()
+    remaining = len(product_ids)
+    while remaining and time.perf_counter() - started < 30:
+        await asyncio.sleep(0.1)
+        db.expire_all()
+        remaining = db.query(func.count(Product.id)).filter(
+            Product.id.in_(product_ids), Product.status == 2
+        ).scalar()
+    elapsed = time.perf_counter() - started
+    for elector in electors:
+        await elector.stop()
+
+    per_product = dict(db.query(Order.product_id, func.count(Order.id)).filter(
+        Order.product_id.in_(product_ids), Order.order_no.like("AUCTION_%")
+    ).group_by(Order.product_id).all())
+    ok = not remaining and len(per_product) == len(product_ids) and max(per_product.values()) == 1
+    passed = report(
+        passed, ok,
+        f"三个 worker 运行拍卖结束检查：{len(product_ids)} 个到期拍卖 {elapsed:.2f}s 内结算完成，"
+        f"每个拍卖订单数 {sorted(set(per_product.values()))}"
+    )
+    db.close()
+    return passed
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_leader_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'leader.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    import main  # noqa: F401  创建数据表
+    from app.core.database import engine
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 200, "products": args.products, "bids": args.products * 4, "conversations": 10,
+                "messages": 20, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    passed = True
+    print("租约:")
+    passed = check_memory_backend(passed)
+    print("\n故障转移:")
+    passed = await check_database_failover(passed, args.lease)
+    print("\n拍卖结束检查:")
+    passed = await check_auction_closing(passed, args.lease)
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主进程选举回归检查")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--lease", type=float, default=1.2, help="租约秒数（检查时缩短以加快故障转移）")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 主进程选举检查通过" if passed else "\n❌ 主进程选举检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+消息搜索基准
+生成聊天数据后，对消息最多的用户分别用两种方式搜索一组关键词：
+  - 数据库 LIKE（索引首次同步之前的回退路径，即改造前的查询方式）
+  - 消息搜索索引（SQLite FTS5 二元组倒排，按用户求交后按消息ID批量加载）
+校验两种方式命中的消息集合一致，并验证发送、删除消息后索引经后台线程异步更新；
+字母数字按子串命中（phone 可搜到 iphone）；索引中残留已删除消息时总数按实际结果扣除，增量同步将其移出索引。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/message_search_benchmark.py [--messages 200000] [--rounds 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+KEYWORDS = ["疫苗", "柯基打过", "能便宜", "视频看看", "发货", "猫", "金毛很健康", "包邮吗？", "谢谢"]
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_message_search_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "MESSAGE_SEARCH_INDEX_PATH": os.path.join(workdir, "message_search.db"),
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    from sqlalchemy import event, func, or_
+    import main  # noqa: F401  创建数据表
+    from app.core.database import SessionLocal, engine
+    from app.models.message import Conversation, Message
+    from app.services.chat_service import ChatService
+    from app.services.message_search_service import message_search_index
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 2000, "products": 100, "bids": 100, "conversations": args.messages // 50,
+                "messages": args.messages, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    passed = True
+
+    def report(ok, message):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {message}")
+
+    service = ChatService()
+    db = SessionLocal()
+    user_id, visible = max(
+        (
+            (user_id, db.query(func.count(Message.id)).join(Conversation, Conversation.id == Message.conversation_id).filter(
+                or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id)
+            ).scalar())
+            for user_id in [row[0] for row in db.query(Conversation.user1_id).distinct().limit(200)]
+        ),
+        key=lambda item: item[1]
+    )
+    print(f"消息 {args.messages} 条，检查用户 {user_id}（可见消息 {visible} 条）\n")
+
+    statements = []
+    listener = lambda *a: statements.append(a[2])
+
+    async def measure(keyword):
+        db.expunge_all()
+        statements.clear()
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            result = await service.search_messages(db, user_id, keyword, page_size=args.page_size)
+        return (time.perf_counter() - started) / args.rounds, len(statements) // args.rounds, result.total
+
+    async def all_ids(keyword):
+        result = await service.search_messages(db, user_id, keyword, page_size=10 ** 6)
+        return {item.id for item in result.items}
+
+    # 同步前：回退到数据库 LIKE
+    event.listen(engine, "before_cursor_execute", listener)
+    like = {keyword: await measure(keyword) for keyword in KEYWORDS}
+    event.remove(engine, "before_cursor_execute", listener)
+    like_ids = {keyword: await all_ids(keyword) for keyword in KEYWORDS}
+
+    started = time.perf_counter()
+    written = message_search_index.sync_from_db(db)
+    print(f"  索引同步 {written} 条，{time.perf_counter() - started:.2f}s，"
+          f"索引文件 {os.path.getsize(message_search_index.path) / 1024 / 1024:.1f}MB\n")
+
+    event.listen(engine, "before_cursor_execute", listener)
+    indexed = {keyword: await measure(keyword) for keyword in KEYWORDS}
+    event.remove(engine, "before_cursor_execute", listener)
+
+    print(f"  {'关键词':12} {'命中':>6} {'LIKE':>10} {'索引':>10} {'加速':>7}  SQL(LIKE/索引)")
+    for keyword in KEYWORDS:
+        (like_seconds, like_sql, total), (index_seconds, index_sql, index_total) = like[keyword], indexed[keyword]
+        print(f"  {keyword:12} {total:6d} {like_seconds * 1000:8.2f}ms {index_seconds * 1000:8.2f}ms "
+              f"{like_seconds / index_seconds:6.1f}x  {like_sql}/{index_sql}")
+    print()
+
+    mismatched = [keyword for keyword in KEYWORDS if await all_ids(keyword) != like_ids[keyword]]
+    report(not mismatched, f"索引与 LIKE 命中集合一致（不一致: {', '.join(mismatched) or '无'}）")
+    report(all(indexed[keyword][1] <= 2 for keyword in KEYWORDS),
+           f"索引路径每次搜索 SQL {max(indexed[keyword][1] for keyword in KEYWORDS)} 条（消息 + 发送者各一条）")
+
+    # 异步更新
+    conversation = db.query(Conversation).filter(Conversation.user1_id == user_id).first()
+    sent = await service.send_message(db, user_id, conversation.user2_id, "这只布偶猫的ID是 RAGDOLL2024，周末发顺丰",
+                                      conversation_id=conversation.id)
+    message_search_index.flush()
+    hits = await service.search_messages(db, conversation.user2_id, "ragdoll")
+    report(any(item.id == sent.id for item in hits.items), f"发送后对方可搜到（ragdoll 命中 {hits.total} 条）")
+    hits = await service.search_messages(db, user_id, "布偶", conversation_id=conversation.id)
+    report(any(item.id == sent.id for item in hits.items), "按对话过滤可搜到")
+    substrings = {keyword: (await service.search_messages(db, user_id, keyword)).items for keyword in ("doll", "2024", "gdoll20")}
+    report(all(any(item.id == sent.id for item in items) for items in substrings.values()),
+           f"字母数字按子串命中（{', '.join(substrings)}）")
+    await service.delete_message(db, sent.id, user_id)
+    message_search_index.flush()
+    hits = await service.search_messages(db, user_id, "ragdoll")
+    report(hits.total == 0, f"删除后搜不到（命中 {hits.total} 条）")
+
+    # 删除未写入索引（如写入线程失败）：搜索时总数扣除残留并移出索引；增量同步同样会移除
+    async def lose_delete(content):
+        message = await service.send_message(db, user_id, conversation.user2_id, content, conversation_id=conversation.id)
+        message_search_index.flush()
+        db.query(Message).filter(Message.id == message.id).update({Message.is_deleted: True}, synchronize_session=False)
+        db.commit()
+        return message.id
+
+    await lose_delete("IPHONE15 的宠物监控也能用")
+    hits = await service.search_messages(db, user_id, "phone")
+    message_search_index.flush()
+    report(hits.total == len(hits.items) == 0 and message_search_index.search(user_id, "phone") == ([], 0),
+           f"残留的已删除消息不计入总数并移出索引（命中 {hits.total} 条）")
+    await lose_delete("SAMOYED 萨摩耶已经预订")
+    removed = message_search_index.sync_from_db(db)
+    report(removed >= 1 and message_search_index.search(user_id, "samoyed") == ([], 0),
+           f"增量同步移除已删除消息（{removed} 条）")
+    db.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="消息搜索基准")
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 消息搜索检查通过" if passed else "\n❌ 消息搜索检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+订单列表查询条数回归检查
+生成订单数据（含订单项、支付、物流），对不同每页条数和 include 组合调用订单列表，
+断言 SQL 条数固定为 2（总数 + 订单）+ 每个加载项 1 条，与每页订单数无关；
+并通过接口验证 include 参数（未知加载项返回 400）。任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/order_query_count_check.py [--products 3000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+PAGE_SIZES = (1, 10, 50, 100)
+INCLUDE_CASES = (
+    (),
+    ("items", "parties"),
+    ("items", "parties", "payment", "logistics"),
+)
+
+
+def seed_order_relations(engine):
+    """为每个订单补充订单项、支付和物流记录"""
+    from sqlalchemy import select
+    from app.models.order import Logistics, Order, OrderItem, Payment
+
+    with engine.begin() as conn:
+        orders = conn.execute(select(Order.id, Order.buyer_id, Order.product_id, Order.final_price,
+                                     Order.payment_status, Order.tracking_number)).all()
+        conn.execute(OrderItem.__table__.insert(), [
+            {"order_id": order.id, "product_id": order.product_id, "product_title": f"拍品{order.product_id}",
+             "product_image": f"/static/uploads/products/{order.product_id}_0.jpg", "quantity": 1,
+             "unit_price": order.final_price, "total_price": order.final_price}
+            for order in orders
+        ])
+        conn.execute(Payment.__table__.insert(), [
+            {"order_id": order.id, "user_id": order.buyer_id, "payment_method": 1, "amount": order.final_price,
+             "transaction_id": f"T{order.id:012d}", "status": "paid" if order.payment_status == 2 else "pending"}
+            for order in orders
+        ])
+        conn.execute(Logistics.__table__.insert(), [
+            {"order_id": order.id, "tracking_number": order.tracking_number, "logistics_company": "顺丰速运",
+             "status": "shipped"}
+            for order in orders if order.tracking_number
+        ])
+    return len(orders)
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_orders_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'orders.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    import httpx
+    from sqlalchemy import event, func
+    import main
+    from app.core.database import SessionLocal, engine
+    from app.core.security import create_access_token
+    from app.models.order import Order
+    from app.services.order_service import OrderService
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 200, "products": args.products, "bids": args.products * 4, "conversations": 10,
+                "messages": 20, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+    order_count = seed_order_relations(engine)
+
+    db = SessionLocal()
+    seller_id, seller_orders = db.query(Order.seller_id, func.count(Order.id)).group_by(
+        Order.seller_id
+    ).order_by(func.count(Order.id).desc()).first()
+    print(f"订单 {order_count} 条，检查卖家 {seller_id}（{seller_orders} 条订单）\n")
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    passed = True
+    service = OrderService()
+    for includes in INCLUDE_CASES:
+        expected = 2 + len(includes)
+        for page_size in PAGE_SIZES:
+            db.expunge_all()
+            statements.clear()
+            started = time.perf_counter()
+            result = await service.get_user_orders(db, seller_id, 1, page_size, order_type="sell", includes=includes)
+            elapsed = time.perf_counter() - started
+            ok = len(statements) == expected and len(result.items) == min(page_size, seller_orders)
+            if "payment" in includes:
+                ok = ok and all(item.payment_info for item in result.items)
+            passed = passed and ok
+            print(
+                f"  {'✅' if ok else '❌'} include={','.join(includes) or '-':32} 每页 {page_size:3d}: "
+                f"SQL {len(statements)} 条（期望 {expected}），{elapsed * 1000:6.1f}ms"
+            )
+    db.close()
+
+    token = create_access_token({"sub": str(seller_id)})
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://orders") as client:
+        response = await client.get(
+            "/api/v1/orders/", params={"order_type": "sell", "page_size": 20, "include": "payment,logistics"},
+            headers=headers
+        )
+        items = response.json().get("items", []) if response.status_code == 200 else []
+        ok = response.status_code == 200 and bool(items) and items[0]["payment_info"] and items[0]["buyer_info"]
+        passed = passed and bool(ok)
+        print(f"\n  {'✅' if ok else '❌'} 接口 include=payment,logistics: {response.status_code}，{len(items)} 条")
+
+        response = await client.get("/api/v1/orders/", params={"include": "reviews"}, headers=headers)
+        ok = response.status_code == 400
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} 接口 include=reviews: {response.status_code}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="订单列表查询条数回归检查")
+    parser.add_argument("--products", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 订单列表查询条数检查通过" if passed else "\n❌ 订单列表查询条数检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
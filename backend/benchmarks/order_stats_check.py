@@ -0,0 +1,197 @@
+"""
+用户订单统计投影回归检查
+生成订单数据后：
+  1. 对账回填统计投影，逐个用户比对投影与订单表实时聚合结果；
+  2. 通过订单服务执行支付、发货、确认收货、取消以及拍卖结算下单，验证增量更新后仍与聚合一致；
+  3. 人为篡改投影行，验证 reconcile_all 能发现并修正；
+  4. 统计接口（period=all）只执行 1 条 SQL，并与按时间窗口实时聚合的耗时对比。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/order_stats_check.py [--products 3000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def aggregate_stats(db, user_id):
+    """直接聚合订单表，得到与投影同格式的期望值"""
+    from decimal import Decimal
+    from sqlalchemy import func
+    from app.models.order import Order
+    from app.services.order_stats_service import ROLE_COLUMNS, order_stats_service
+
+    expected = {}
+    for role, user_column in ROLE_COLUMNS.items():
+        rows = db.query(
+            Order.order_status, func.count(Order.id), func.sum(Order.total_amount)
+        ).filter(user_column == user_id).group_by(Order.order_status).all()
+        expected[role] = order_stats_service._totals_from_aggregates(
+            (status, count, Decimal(str(amount or 0))) for status, count, amount in rows
+        )
+    return expected
+
+
+def projection_mismatches(db, user_ids):
+    """返回投影与聚合结果不一致的用户列表"""
+    from app.services.order_stats_service import order_stats_service
+
+    mismatched = []
+    for user_id in user_ids:
+        db.expire_all()
+        stats = order_stats_service.get_user_stats(db, user_id)
+        for role, values in aggregate_stats(db, user_id).items():
+            # 没有某角色的统计行等同于该角色各项为 0
+            row = stats.get(role)
+            if any(order_stats_service._differs(getattr(row, key, 0), value) for key, value in values.items()):
+                mismatched.append((user_id, role))
+    return mismatched
+
+
+def report(passed, ok, message):
+    print(f"  {'✅' if ok else '❌'} {message}")
+    return passed and ok
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_order_stats_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'orders.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    from sqlalchemy import event, func
+    import main  # noqa: F401  创建数据表
+    from app.core.database import SessionLocal, engine
+    from app.models.order import Order, UserOrderStats
+    from app.models.product import Bid, Product
+    from app.services.auction_service import AuctionService
+    from app.services.order_service import OrderService
+    from app.services.order_stats_service import order_stats_service
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 200, "products": args.products, "bids": args.products * 4, "conversations": 10,
+                "messages": 20, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    passed = True
+    db = SessionLocal()
+    service = OrderService()
+    order_count = db.query(func.count(Order.id)).scalar()
+    user_ids = sorted(
+        {row[0] for row in db.query(Order.buyer_id).distinct()} | {row[0] for row in db.query(Order.seller_id).distinct()}
+    )
+    print(f"订单 {order_count} 条，涉及用户 {len(user_ids)} 个\n")
+
+    # 1. 对账回填
+    started = time.perf_counter()
+    result = order_stats_service.reconcile_all(db, batch_size=50)
+    elapsed = time.perf_counter() - started
+    mismatched = projection_mismatches(db, user_ids)
+    passed = report(passed, not mismatched and result["corrected"] > 0,
+                    f"对账回填: 修正 {result['corrected']} 行，{elapsed * 1000:.1f}ms，不一致 {len(mismatched)} 个")
+
+    result = order_stats_service.reconcile_all(db, batch_size=50)
+    passed = report(passed, result["corrected"] == 0, f"重复对账: 修正 {result['corrected']} 行（期望 0）")
+
+    # 2. 增量更新
+    touched = set()
+
+    def first_order(status):
+        order = db.query(Order).filter(Order.order_status == status).order_by(Order.id).first()
+        touched.update((order.buyer_id, order.seller_id))
+        return order
+
+    order = first_order(1)
+    await service.update_order_status(db, order.id, "paid", order.seller_id)
+    order = first_order(2)
+    await service.update_order_status(db, order.id, "shipped", order.seller_id)
+    order = first_order(3)
+    await service.confirm_order(db, order.id, order.buyer_id)
+    order = first_order(1)
+    await service.cancel_order(db, order.id, order.buyer_id, "不想要了")
+
+    product = db.query(Product).filter(Product.status == 2).order_by(Product.id).first()
+    bid = db.query(Bid).filter(Bid.product_id == product.id).order_by(Bid.bid_amount.desc()).first()
+    settled = await AuctionService()._create_auction_winner_order(db, product, bid)
+    db.commit()
+    touched.update((settled.buyer_id, settled.seller_id))
+
+    # 首次出现的用户走回填路径
+    newcomer = db.query(func.max(Order.buyer_id)).scalar() + 1000
+    db.add(Order(order_no="CHECK_NEW_USER", buyer_id=newcomer, seller_id=newcomer, product_id=product.id,
+                 final_price=10, total_amount=10, order_status=1, payment_status=1))
+    db.flush()
+    order_stats_service.record_order_created(db, db.query(Order).filter(Order.order_no == "CHECK_NEW_USER").one())
+    db.commit()
+    touched.add(newcomer)
+
+    mismatched = projection_mismatches(db, sorted(touched))
+    passed = report(passed, not mismatched,
+                    f"增量更新: 状态变更 4 次、结算下单 1 笔、新用户下单 1 笔，涉及 {len(touched)} 个用户，不一致 {len(mismatched)} 个")
+
+    # 3. 漂移修正
+    victim = user_ids[len(user_ids) // 2]
+    db.query(UserOrderStats).filter(UserOrderStats.user_id == victim).update(
+        {UserOrderStats.total_orders: UserOrderStats.total_orders + 7, UserOrderStats.completed_orders: 0},
+        synchronize_session=False
+    )
+    db.commit()
+    result = order_stats_service.reconcile_all(db, batch_size=50)
+    mismatched = projection_mismatches(db, [victim])
+    passed = report(passed, result["corrected"] >= 1 and not mismatched,
+                    f"漂移修正: 篡改用户 {victim}，对账修正 {result['corrected']} 行")
+
+    # 4. 统计接口查询条数与耗时
+    seller_id = db.query(Order.seller_id).group_by(Order.seller_id).order_by(func.count(Order.id).desc()).first()[0]
+    statements = []
+    listener = lambda *a: statements.append(a[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    timings = {}
+    for period in ("all", "year"):
+        statements.clear()
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            db.expunge_all()
+            stats = await service.get_user_order_statistics(db, seller_id, period)
+        timings[period] = (time.perf_counter() - started) / args.rounds
+        timings[f"{period}_sql"] = len(statements) // args.rounds
+    event.remove(engine, "before_cursor_execute", listener)
+    passed = report(passed, timings["all_sql"] == 1,
+                    f"统计接口 period=all: SQL {timings['all_sql']} 条，{timings['all'] * 1000:.2f}ms/次"
+                    f"（period=year 实时聚合 SQL {timings['year_sql']} 条，{timings['year'] * 1000:.2f}ms/次）")
+    passed = report(passed, stats["seller_stats"]["total_sales"] > 0, f"卖家 {seller_id} 统计: {stats['seller_stats']}")
+    db.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户订单统计投影回归检查")
+    parser.add_argument("--products", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 订单统计投影检查通过" if passed else "\n❌ 订单统计投影检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
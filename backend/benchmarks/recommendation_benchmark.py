@@ -0,0 +1,84 @@
+"""
+商品推荐相似表基准测试
+生成指定数量的出价/收藏交互（默认100万，商品热度近似长尾分布），
+测量相似表批量构建耗时和单次推荐耗时。
+
+用法: python benchmarks/recommendation_benchmark.py [--interactions 1000000] [--users 100000] [--products 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.recommendation_service import RecommendationService
+
+
+def generate_interactions(count: int, users: int, products: int, seed: int):
+    rng = random.Random(seed)
+    # 商品热度按 1/rank^0.8 的长尾分布抽样
+    weights = [1 / (rank ** 0.8) for rank in range(1, products + 1)]
+    product_ids = rng.choices(range(1, products + 1), weights=weights, k=count)
+    now = time.time()
+    return [
+        (
+            rng.randint(1, users),
+            product_id,
+            "favorite" if rng.random() < 0.3 else "bid",
+            now - rng.random() * 30 * 86400
+        )
+        for product_id in product_ids
+    ]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="商品推荐相似表基准测试")
+    parser.add_argument("--interactions", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    interactions = generate_interactions(args.interactions, args.users, args.products, args.seed)
+    print(f"生成 {len(interactions)} 条交互: {time.perf_counter() - started:.2f}s")
+
+    service = RecommendationService()
+    started = time.perf_counter()
+    neighbors, profiles = service.build(interactions)
+    build_seconds = time.perf_counter() - started
+    print(f"构建相似表: {build_seconds:.2f}s（有相似商品的商品 {len(neighbors)} 个，用户 {len(profiles)} 个）")
+
+    service._neighbors = neighbors
+    service._profiles = profiles
+    service._loaded = True
+    service._last_rebuild = time.monotonic()
+
+    rng = random.Random(args.seed + 1)
+    user_ids = list(profiles)
+    timings = []
+    empty = 0
+    for _ in range(args.queries):
+        user_id = rng.choice(user_ids)
+        started = time.perf_counter()
+        result = service.recommend(None, user_id, 10)
+        timings.append(time.perf_counter() - started)
+        empty += not result
+
+    print(
+        f"单次推荐: p50 {percentile(timings, 0.5) * 1000:.3f}ms, "
+        f"p95 {percentile(timings, 0.95) * 1000:.3f}ms, "
+        f"p99 {percentile(timings, 0.99) * 1000:.3f}ms（无结果 {empty}/{args.queries}）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+读写分离检查
+用两个 SQLite 文件模拟主库和只读副本，后台线程按固定延迟把主库整体复制到副本（模拟主从复制延迟），
+在进程内驱动 FastAPI 应用验证：
+  1. 未登录用户的只读接口查询全部发往副本；
+  2. 写接口（出价）走主库；
+  3. 用户写入后的粘滞窗口内，其读请求走主库并能读到自己刚写入的数据；写入时间由客户端带回
+     （Cookie 或 X-Last-Write 请求头），不依赖处理写入的进程；令牌绑定用户，其他用户带上也无效；
+  4. 浏览商品详情（只累加浏览量）不触发粘滞；未登录用户（按客户端地址区分）不粘滞；
+  5. 粘滞窗口过后，该用户的读请求回到副本，且副本已追上主库。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/replica_check.py [--lag 1.0] [--sticky 2.0]
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+class Replicator(threading.Thread):
+    """每隔 lag 秒把主库文件复制到副本，副本数据最多落后 lag 秒"""
+
+    def __init__(self, primary_path: str, replica_path: str, lag: float):
+        super().__init__(daemon=True)
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.lag = lag
+        self._stop_event = threading.Event()
+
+    def sync(self):
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def run(self):
+        while not self._stop_event.wait(self.lag):
+            self.sync()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+async def run_checks(args, primary_path: str, replica_path: str) -> bool:
+    import httpx
+    from sqlalchemy import event
+
+    import main
+    from app.core.database import SessionLocal, engine, replica_engines
+    from app.core.security import create_access_token
+    from app.models.product import Product
+    from app.models.user import User
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 20, "products": 50, "bids": 100, "conversations": 10, "messages": 50, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    db = SessionLocal()
+    try:
+        product = db.query(Product).filter(
+            Product.status == 2, Product.auction_end_time > datetime.now()
+        ).order_by(Product.id).first()
+        bidder = db.query(User).filter(User.id != product.seller_id).order_by(User.id).first()
+        bidder.balance = Decimal("10000000")
+        db.commit()
+        product_id, seller_id, bidder_id = product.id, product.seller_id, bidder.id
+        bid_amount = float(product.current_price) + 10
+    finally:
+        db.close()
+
+    replicator = Replicator(primary_path, replica_path, args.lag)
+    replicator.sync()
+    replicator.start()
+
+    # 按引擎统计每个请求执行的SQL条数
+    executed = Counter()
+
+    def track(name):
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            executed[name] += 1
+        return before_cursor_execute
+
+    event.listen(engine, "before_cursor_execute", track("primary"))
+    for replica in replica_engines:
+        event.listen(replica, "before_cursor_execute", track("replica"))
+
+    token = create_access_token({"sub": str(bidder_id)})
+    auth = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+
+    def record(name, passed, detail):
+        results.append(passed)
+        print(f"  {'✅' if passed else '❌'} {name}: {detail}")
+
+    async def request(client, method, url, **kwargs):
+        executed.clear()
+        response = await client.request(method, url, **kwargs)
+        response.raise_for_status()
+        request.headers = response.headers
+        return response.json(), dict(executed)
+
+    def seller_price(payload):
+        for item in payload["items"]:
+            if item["id"] == product_id:
+                return float(item["current_price"])
+        return None
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://replica-check") as client:
+            print(f"主库: {primary_path}\n副本: {replica_path}（复制延迟 {args.lag}s，粘滞窗口 {args.sticky}s）\n")
+
+            _, counts = await request(client, "GET", "/api/v1/products/")
+            record("未登录读商品列表走副本", counts.get("replica", 0) > 0 and not counts.get("primary"), counts)
+
+            _, counts = await request(client, "GET", "/api/v1/home/stats")
+            record("未登录读首页统计走副本", counts.get("replica", 0) > 0 and not counts.get("primary"), counts)
+
+            _, counts = await request(
+                client, "POST", "/api/v1/bids/", json={"product_id": product_id, "amount": bid_amount}, headers=auth
+            )
+            token = request.headers.get("x-last-write")
+            record("出价写入走主库并返回写入时间", counts.get("primary", 0) > 0 and not counts.get("replica") and token,
+                   f"{counts} X-Last-Write: {token}")
+
+            payload, counts = await request(client, "GET", f"/api/v1/products/user/{seller_id}", headers=auth)
+            price = seller_price(payload)
+            record(
+                "出价用户随后的读取走主库（读己之写，Cookie 带回写入时间）",
+                counts.get("primary", 0) > 0 and not counts.get("replica") and price == bid_amount,
+                f"{counts} 当前价 {price}",
+            )
+
+            # 新客户端（相当于请求落到其他 worker，进程内没有任何写入记录）
+            async with httpx.AsyncClient(transport=transport, base_url="http://replica-check") as other:
+                payload, counts = await request(
+                    other, "GET", f"/api/v1/products/user/{seller_id}", headers={**auth, "X-Last-Write": token}
+                )
+                record("请求头带回写入时间时同样走主库",
+                       counts.get("primary", 0) > 0 and not counts.get("replica") and seller_price(payload) == bid_amount,
+                       counts)
+
+                other_auth = {"Authorization": f"Bearer {create_access_token({'sub': str(seller_id)})}"}
+                _, counts = await request(
+                    other, "GET", f"/api/v1/products/user/{seller_id}", headers={**other_auth, "X-Last-Write": token}
+                )
+                record("其他用户带上该令牌仍走副本", counts.get("replica", 0) > 0 and not counts.get("primary"), counts)
+
+                payload, counts = await request(other, "GET", f"/api/v1/products/user/{seller_id}")
+                print(f"  ℹ️  其他未登录用户此时读取副本: {counts} 当前价 {seller_price(payload)}（允许落后）")
+
+                await request(other, "GET", f"/api/v1/products/{product_id}")
+                anonymous_token = request.headers.get("x-last-write")
+                _, counts = await request(other, "GET", "/api/v1/products/")
+                record("未登录用户浏览后仍读副本",
+                       anonymous_token is None and counts.get("replica", 0) > 0 and not counts.get("primary"), counts)
+
+            await asyncio.sleep(max(args.sticky, args.lag) + args.lag + 0.2)
+            payload, counts = await request(client, "GET", f"/api/v1/products/user/{seller_id}", headers=auth)
+            price = seller_price(payload)
+            record(
+                "粘滞窗口过后回到副本且副本已追上",
+                counts.get("replica", 0) > 0 and not counts.get("primary") and price == bid_amount,
+                f"{counts} 当前价 {price}",
+            )
+
+            await request(client, "GET", f"/api/v1/products/{product_id}", headers=auth)
+            view_token = request.headers.get("x-last-write")
+            _, counts = await request(client, "GET", f"/api/v1/products/user/{seller_id}", headers=auth)
+            record("浏览商品详情（只累加浏览量）不触发粘滞",
+                   view_token is None and counts.get("replica", 0) > 0 and not counts.get("primary"), counts)
+    finally:
+        replicator.stop()
+
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读写分离检查")
+    parser.add_argument("--lag", type=float, default=1.0, help="副本复制间隔（秒）")
+    parser.add_argument("--sticky", type=float, default=2.0, help="写后粘滞窗口（秒）")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="petshop_replica_")
+    primary_path = os.path.join(workdir, "primary.db")
+    replica_path = os.path.join(workdir, "replica.db")
+    # 配置需在导入应用之前写入环境变量
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{primary_path}",
+        "DATABASE_REPLICA_URLS": f"sqlite:///{replica_path}",
+        "REPLICA_STICKY_SECONDS": str(args.sticky),
+        "DB_SCHEMA_MODE": "create",
+        "DEBUG": "false",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    passed = asyncio.run(run_checks(args, primary_path, replica_path))
+    print("\n✅ 读写分离检查通过" if passed else "\n❌ 读写分离检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+响应序列化微基准
+对 100 条一页的列表响应（商品、出价、消息、首页），比较每页序列化的 CPU 耗时：
+  - 原路径: FastAPI 按 response_model 再次校验并 jsonable 转换，标准库 json 渲染（首页无 response_model，走 jsonable_encoder）
+  - 快速路径: TrustedJSONResponse 直接用 Pydantic 预编译序列化器输出 JSON 字节
+同时校验两条路径输出的 JSON 内容一致。不依赖数据库。
+
+用法:
+    python benchmarks/serialization_benchmark.py [--items 100] [--rounds 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.serialization import TrustedJSONResponse
+from app.schemas.bid import BidListResponse, BidResponse
+from app.schemas.chat import MessageListResponse, MessageResponse
+from app.schemas.home import HomeDataResponse
+from app.schemas.product import CategoryResponse, ProductListResponse, ProductResponse
+
+BASE_TIME = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def product(i: int) -> ProductResponse:
+    return ProductResponse(
+        id=i, seller_id=i % 50 + 1, title=f"纯种布偶猫 {i} 号", description="疫苗齐全，性格亲人，可视频看猫" * 3,
+        category_id=i % 8 + 1, starting_price=Decimal("100.00"), current_price=Decimal(f"{100 + i}.50"),
+        buy_now_price=Decimal("5000.00"), auction_type=1,
+        auction_start_time=BASE_TIME, auction_end_time=BASE_TIME + timedelta(days=3),
+        location="上海", shipping_fee=Decimal("0.00"), view_count=i * 7, bid_count=i % 30,
+        favorite_count=i % 11, status=2, is_featured=i % 5 == 0,
+        images=[f"/static/uploads/products/{i}_{n}.jpg" for n in range(3)],
+        created_at=BASE_TIME - timedelta(hours=i), updated_at=BASE_TIME,
+    )
+
+
+def bid(i: int) -> BidResponse:
+    return BidResponse(
+        id=i, product_id=i % 20 + 1, amount=Decimal(f"{200 + i}.00"), user_id=i % 50 + 1, is_auto_bid=False,
+        status=1, created_at=BASE_TIME - timedelta(minutes=i),
+        user_info={"id": i % 50 + 1, "nickname": f"用户{i % 50 + 1}", "avatar": None},
+    )
+
+
+def message(i: int) -> MessageResponse:
+    return MessageResponse(
+        id=i, conversation_id=1, sender_id=1 + i % 2, receiver_id=2 - i % 2, message_type="text",
+        content=f"这只猫还在吗？可以便宜点吗 {i}", is_read=i % 3 == 0,
+        created_at=BASE_TIME - timedelta(seconds=i * 30), updated_at=BASE_TIME,
+        sender_info={"id": 1 + i % 2, "nickname": f"用户{1 + i % 2}", "avatar": None},
+    )
+
+
+def payloads(items: int):
+    categories = [
+        CategoryResponse(
+            id=i, name=f"分类{i}", parent_id=0, sort_order=i, is_active=True, created_at=BASE_TIME, updated_at=BASE_TIME
+        )
+        for i in range(1, 11)
+    ]
+    page = {"total": items * 10, "page": 1, "page_size": items, "total_pages": 10}
+    return [
+        ("商品列表", ProductListResponse, ProductListResponse(items=[product(i) for i in range(1, items + 1)], **page)),
+        ("出价记录", BidListResponse, BidListResponse(items=[bid(i) for i in range(1, items + 1)], **page)),
+        ("消息列表", MessageListResponse, MessageListResponse(items=[message(i) for i in range(1, items + 1)], **page)),
+        ("首页", None, HomeDataResponse(
+            hot_products=[product(i) for i in range(1, 11)],
+            recent_products=[product(i) for i in range(11, 21)],
+            recommended_products=[product(i) for i in range(21, 26)],
+            special_events=[],
+            categories=categories,
+        )),
+    ]
+
+
+async def fastapi_path(field, payload) -> bytes:
+    """原路径：response_model 校验 + 序列化 + 标准库 json 渲染"""
+    if field is None:
+        return JSONResponse(jsonable_encoder(payload)).body
+    content = await serialize_response(field=field, response_content=payload)
+    return JSONResponse(content).body
+
+
+def fast_path(payload) -> bytes:
+    return TrustedJSONResponse(payload).body
+
+
+async def measure(rounds: int, items: int):
+    results = []
+    for name, model, payload in payloads(items):
+        field = create_response_field(name="response", type_=model) if model else None
+        before_body = await fastapi_path(field, payload)
+        after_body = fast_path(payload)
+        if json.loads(before_body) != json.loads(after_body):
+            raise AssertionError(f"{name}: 快速路径输出与原路径不一致")
+
+        started = time.process_time()
+        for _ in range(rounds):
+            await fastapi_path(field, payload)
+        before = (time.process_time() - started) / rounds
+
+        started = time.process_time()
+        for _ in range(rounds):
+            fast_path(payload)
+        after = (time.process_time() - started) / rounds
+        results.append((name, len(after_body), before, after))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化微基准")
+    parser.add_argument("--items", type=int, default=100, help="每页条数")
+    parser.add_argument("--rounds", type=int, default=200, help="每种响应重复次数")
+    args = parser.parse_args()
+
+    results = asyncio.run(measure(args.rounds, args.items))
+    print(f"每页 {args.items} 条，重复 {args.rounds} 次，CPU 耗时/页:\n")
+    print(f"  {'响应':10} {'大小':>8} {'原路径':>10} {'快速路径':>10} {'加速':>7}")
+    for name, size, before, after in results:
+        print(f"  {name:10} {size / 1024:7.1f}K {before * 1000:8.3f}ms {after * 1000:8.3f}ms {before / after:6.1f}x")
+    print("\n✅ 两条路径输出的 JSON 内容一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+热点读请求合并基准
+模拟热门商品和专场上线瞬间的突发访问：同时发出 N 个相同的 GET /products/{id} 和 GET /events/{id}/products
+（专场目录和商品卡片缓存为冷启动），分别在关闭和开启 SINGLE_FLIGHT_ENABLED 时统计 SQL 条数、取连接次数和同时占用的最大连接数。
+校验开启后：
+  - SQL 条数和取连接次数不多于逐个处理（逐个处理时请求在事件循环中串行执行；合并后计算在线程中执行，
+    专场目录冷启动时并发请求也只物化一次）；
+  - 响应与逐个查询一致（浏览量除外），商品浏览量仍按请求数累加，执行计算的请求中途断开也不丢失；
+  - 登录用户的收藏状态单独计算，不会共享给其他请求；
+  - 不存在的商品所有请求都返回 404；
+  - /metrics 中记录了被合并的请求数。
+任一检查失败时以非零状态退出。
+
+用法:
+    python benchmarks/single_flight_benchmark.py [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import BulkDataGenerator
+
+
+def report(passed, ok, message):
+    print(f"  {'✅' if ok else '❌'} {message}")
+    return passed and ok
+
+
+def without_views(value):
+    """去掉浏览量和随浏览量更新的 updated_at，便于比较响应"""
+    if isinstance(value, bytes):
+        value = json.loads(value)
+    if isinstance(value, dict):
+        return {key: without_views(item) for key, item in value.items() if key not in ("view_count", "updated_at")}
+    if isinstance(value, list):
+        return [without_views(item) for item in value]
+    return value
+
+
+async def run(args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="petshop_single_flight_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'single_flight.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+        "JOB_RUNNER_ENABLED": "false",
+        "BACKGROUND_TASKS_ENABLED": "false",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    import httpx
+    from sqlalchemy import event as sa_event
+    import main
+    from app.core.database import SessionLocal, engine
+    from app.core.metrics import metrics_registry
+    from app.core.security import create_access_token
+    from app.core.single_flight import request_coalescer
+    from app.models.product import EventProduct, Product, ProductFavorite, SpecialEvent
+    from app.models.user import User
+    from app.services.event_catalog_service import event_catalog
+    from app.services.product_card_service import product_card_cache
+    from app.services.product_service import ProductService
+
+    BulkDataGenerator(
+        engine,
+        counts={"users": 100, "products": 600, "bids": 1000, "conversations": 5, "messages": 10, "posts": 5},
+        seed=args.seed,
+        base_time=datetime.now().replace(microsecond=0),
+    ).generate()
+
+    db = SessionLocal()
+    now = datetime.now()
+    special = SpecialEvent(title="开学季萌宠专场", description="精选品种，限时竞拍", banner_image="/static/banners/1.jpg",
+                           start_time=now - timedelta(hours=1), end_time=now + timedelta(days=3), is_active=True)
+    db.add(special)
+    db.flush()
+    product_ids = [row.id for row in db.query(Product.id).order_by(Product.id).limit(500)]
+    db.add_all(EventProduct(event_id=special.id, product_id=product_id, sort_order=i % 10)
+               for i, product_id in enumerate(product_ids))
+    hot_product_id = product_ids[0]
+    fan_id = db.query(User.id).order_by(User.id).first()[0]
+    if not db.query(ProductFavorite).filter(
+        ProductFavorite.product_id == hot_product_id, ProductFavorite.user_id == fan_id
+    ).first():
+        db.add(ProductFavorite(user_id=fan_id, product_id=hot_product_id))
+    db.commit()
+    event_id = special.id
+
+    statements, checkouts, connections = [], [], {"current": 0, "peak": 0}
+
+    def on_checkout(*_):
+        checkouts.append(1)
+        connections["current"] += 1
+        connections["peak"] = max(connections["peak"], connections["current"])
+
+    def on_checkin(*_):
+        connections["current"] -= 1
+
+    sa_event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    sa_event.listen(engine, "checkout", on_checkout)
+    sa_event.listen(engine, "checkin", on_checkin)
+
+    def view_count():
+        db.expire_all()
+        return db.query(Product.view_count).filter(Product.id == hot_product_id).scalar()
+
+    passed = True
+    results = {}
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://hot")
+    print(f"热门商品 {hot_product_id}、专场 {event_id}（{len(product_ids)} 个商品），每个接口并发 {args.requests} 个相同请求\n")
+    for enabled in (False, True):
+        request_coalescer.enabled = enabled
+        mode = "合并" if enabled else "逐个"
+        for name, path in (("商品详情", f"/api/v1/products/{hot_product_id}"),
+                           ("专场商品", f"/api/v1/events/{event_id}/products?page=1&page_size=20")):
+            event_catalog.cache.clear()
+            product_card_cache.cache.clear()
+            views_before = view_count()
+            statements.clear()
+            checkouts.clear()
+            connections["peak"] = connections["current"]
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[client.get(path) for _ in range(args.requests)])
+            elapsed = time.perf_counter() - started
+            results[(mode, name)] = {
+                "statements": len(statements), "checkouts": len(checkouts), "peak": connections["peak"],
+                "statuses": {response.status_code for response in responses},
+                "bodies": [without_views(response.content) for response in responses],
+                "views": view_count() - views_before,
+            }
+            result = results[(mode, name)]
+            print(
+                f"  {mode} {name}: {elapsed * 1000:7.1f}ms，SQL {result['statements']:5d} 条，"
+                f"取连接 {result['checkouts']:4d} 次，同时占用最多 {result['peak']:3d} 个连接"
+            )
+    print()
+
+    for name in ("商品详情", "专场商品"):
+        single, coalesced = results[("逐个", name)], results[("合并", name)]
+        passed = report(
+            passed,
+            single["statuses"] == coalesced["statuses"] == {200}
+            and all(body == single["bodies"][0] for body in single["bodies"] + coalesced["bodies"]),
+            f"{name}：合并后的响应与逐个查询一致"
+        )
+        # 逐个处理时请求在事件循环中串行执行，只有第一个请求查询；合并后计算在线程中执行，并发请求也只查询一次
+        passed = report(
+            passed,
+            coalesced["statements"] <= single["statements"] and coalesced["checkouts"] <= single["checkouts"],
+            f"{name}：SQL {single['statements']} -> {coalesced['statements']} 条，"
+            f"取连接 {single['checkouts']} -> {coalesced['checkouts']} 次"
+        )
+    views = (results[("逐个", "商品详情")]["views"], results[("合并", "商品详情")]["views"])
+    passed = report(passed, views == (args.requests, args.requests), f"浏览量按请求数累加：{views}")
+
+    # 执行计算的请求在计算中途断开，合并到它的请求和它自己的浏览量照常计入（放慢计算，确保其余请求都被合并）
+    load_product_detail = ProductService.load_product_detail
+
+    def slow_load_product_detail(self, *a):
+        time.sleep(0.5)
+        return load_product_detail(self, *a)
+
+    ProductService.load_product_detail = slow_load_product_detail
+    views_before = view_count()
+    path = f"/api/v1/products/{hot_product_id}"
+    tasks = [asyncio.create_task(client.get(path))]
+    while request_coalescer.in_flight == 0:
+        await asyncio.sleep(0.01)
+    tasks += [asyncio.create_task(client.get(path)) for _ in range(args.requests - 1)]
+    await asyncio.sleep(0.2)
+    tasks[0].cancel()
+    responses = await asyncio.gather(*tasks, return_exceptions=True)
+    while request_coalescer.in_flight:
+        await asyncio.sleep(0.01)
+    ProductService.load_product_detail = load_product_detail
+    cancelled = isinstance(responses[0], asyncio.CancelledError)
+    statuses = {response.status_code for response in responses[1:]}
+    views = view_count() - views_before
+    passed = report(passed, cancelled and statuses == {200} and views == args.requests,
+                    f"执行计算的请求断开后浏览量仍按请求数累加：{views}")
+
+    # 登录用户的收藏状态不共享
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(fan_id)})}"}
+    path = f"/api/v1/products/{hot_product_id}"
+    responses = await asyncio.gather(
+        *[client.get(path, headers=headers if index % 10 == 0 else None) for index in range(args.requests)]
+    )
+    favorited = [response.json()["is_favorited"] for response in responses]
+    expected = [index % 10 == 0 for index in range(args.requests)]
+    passed = report(passed, favorited == expected, f"收藏状态按用户计算：{sum(favorited)} 个登录请求为已收藏")
+
+    responses = await asyncio.gather(*[client.get("/api/v1/products/999999") for _ in range(args.requests)])
+    statuses = {response.status_code for response in responses}
+    passed = report(passed, statuses == {404}, f"不存在的商品：{statuses}")
+
+    metrics = metrics_registry.render()
+    followers = sum(
+        int(line.rsplit(" ", 1)[1]) for line in metrics.splitlines()
+        if line.startswith("single_flight_requests_total") and 'role="follower"' in line
+    )
+    passed = report(passed, followers > 0, f"/metrics 记录被合并的请求 {followers} 个")
+    passed = report(passed, request_coalescer.in_flight == 0, "计算完成后不保留合并记录")
+
+    await client.aclose()
+    db.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点读请求合并基准")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passed = asyncio.run(run(args))
+    print("\n✅ 热点读请求合并检查通过" if passed else "\n❌ 热点读请求合并检查未通过")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
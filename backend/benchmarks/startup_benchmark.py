@@ -0,0 +1,134 @@
+"""
+启动耗时基准测试
+多次在全新解释器中导入 main（模拟 uvicorn worker 冷启动），统计总耗时、各启动阶段耗时、常驻内存，
+并用 -X importtime 汇总导入最慢的顶层包，结果保存为 JSON 便于跨提交对比。
+
+用法:
+    python benchmarks/startup_benchmark.py [--runs 5] [--schema-mode check]
+    python benchmarks/startup_benchmark.py --compare benchmarks/results/startup_<旧提交>.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from statistics import median
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+PROBE = (
+    "import json, time; started = time.perf_counter(); import main; "
+    "report = main.startup_report.as_dict(); report['wall_seconds'] = time.perf_counter() - started; "
+    "print('STARTUP_REPORT ' + json.dumps(report))"
+)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def run_once(env: dict):
+    """启动一个新解释器导入 main，返回启动报告和按顶层包汇总的导入耗时（秒）"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    report_line = next(line for line in completed.stdout.splitlines() if line.startswith("STARTUP_REPORT "))
+    report = json.loads(report_line[len("STARTUP_REPORT "):])
+
+    # importtime 输出: "import time: self_us | cumulative_us | module"，按顶层包累加自身耗时
+    packages = defaultdict(float)
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[0].strip().isdigit():
+            continue
+        module = fields[2].strip()
+        package = module.split(".")[0] if not module.startswith("app.") else ".".join(module.split(".")[:3])
+        packages[package] += int(fields[0]) / 1_000_000
+    return report, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--schema-mode", default="check", choices=["create", "check"])
+    parser.add_argument("--top", type=int, default=15, help="输出导入最慢的前N个包")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 benchmarks/results/startup_<提交>.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="petshop_startup_")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "DEBUG": "false",
+        "DB_SCHEMA_MODE": "create",
+    }
+    # 先以 create 模式建表并记录版本，之后按指定模式测量
+    run_once(env)
+    env["DB_SCHEMA_MODE"] = args.schema_mode
+
+    reports, package_runs = [], []
+    for _ in range(args.runs):
+        report, packages = run_once(env)
+        reports.append(report)
+        package_runs.append(packages)
+
+    phases = defaultdict(list)
+    for report in reports:
+        for phase in report["phases"]:
+            phases[phase["name"]].append(phase["seconds"])
+    package_names = set().union(*package_runs)
+    packages = {
+        name: round(median(run.get(name, 0.0) for run in package_runs), 4) for name in package_names
+    }
+
+    results = {
+        "meta": {"commit": git_commit(), "runs": args.runs, "schema_mode": args.schema_mode, "python": sys.version.split()[0]},
+        "wall_seconds": round(median(report["wall_seconds"] for report in reports), 4),
+        "rss_mb": median(report["rss_mb"] for report in reports if report["rss_mb"] is not None),
+        "phases": {name: round(median(values), 4) for name, values in phases.items()},
+        "packages": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    def delta(key_path, value):
+        if not baseline:
+            return ""
+        old = baseline
+        for key in key_path:
+            old = old.get(key, {}) if isinstance(old, dict) else {}
+        return f"  ({value - old:+.3f})" if isinstance(old, (int, float)) else "  (新增)"
+
+    print(f"冷启动耗时(中位数): {results['wall_seconds']:.3f}s{delta(['wall_seconds'], results['wall_seconds'])}")
+    print(f"常驻内存(中位数): {results['rss_mb']}MB{delta(['rss_mb'], results['rss_mb'])}")
+    print("\n启动阶段:")
+    for name, seconds in sorted(results["phases"].items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:32} {seconds * 1000:8.1f}ms{delta(['phases', name], seconds)}")
+    print(f"\n导入最慢的包（前{args.top}）:")
+    for name, seconds in list(results["packages"].items())[:args.top]:
+        print(f"  {name:32} {seconds * 1000:8.1f}ms{delta(['packages', name], seconds)}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"startup_{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,60 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-import uvicorn
-import os
+from app.core.startup import startup_report
 
-from app.core.config import settings
-from app.core.database import engine, Base
-from app.api import auth
+with startup_report.phase("fastapi"):
+    from fastapi import FastAPI, HTTPException
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.staticfiles import StaticFiles
+    from fastapi.responses import JSONResponse, PlainTextResponse
+    import uvicorn
+    import os
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+with startup_report.phase("app.core"):
+    from app.core.config import settings
+    from app.core.database import engine, Base
+    from app.core.metrics import MetricsMiddleware, metrics_registry
+    from app.core.http_cache import HTTPCacheMiddleware, NotModified, not_modified_handler
+    from app.core.idempotency import IdempotencyMiddleware, idempotency_store
+    from app.core.read_replica import ReplicaStickyMiddleware
+    from app.core.schema import ensure_schema
+    from app.core.serialization import FastJSONResponse
+
+with startup_report.phase("app.models"):
+    from app import models  # noqa: F401 注册全部模型
+
+# 表结构：create 模式建表，check 模式只校验版本
+with startup_report.phase("schema"):
+    ensure_schema(engine, Base.metadata, settings.DB_SCHEMA_MODE)
 
 # 创建FastAPI应用
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=FastJSONResponse
 )
 
-# 配置CORS
+# 写请求幂等（携带 Idempotency-Key 的重试直接返回首次响应）
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_store,
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS
+)
+
+# 请求级SQL统计（METRICS_RESPONSE_HEADERS=true 时在响应头中返回）
+app.add_middleware(MetricsMiddleware, response_headers=settings.METRICS_RESPONSE_HEADERS)
+
+# JSON 响应的 ETag/304 与压缩
+app.add_middleware(
+    HTTPCacheMiddleware, minimum_size=settings.COMPRESS_MIN_SIZE, compress_level=settings.COMPRESS_LEVEL
+)
+app.add_exception_handler(NotModified, not_modified_handler)
+
+# 读写分离的写后粘滞：登录用户写入后返回签名的写入时间，之后的请求带回（未配置只读副本时不做处理）
+app.add_middleware(ReplicaStickyMiddleware)
+
+# 配置CORS（最后添加，位于最外层：预检请求直接返回，幂等重放的响应也按本次请求的 Origin 添加 CORS 头）
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_HOSTS,
@@ -34,23 +69,50 @@ os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 # 静态文件服务
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# 注册路由
-from app.api import auth, products, bids, orders, auctions, events, home, wallet, deposit, stores, store_applications, chat, local_services  # search
-
-app.include_router(auth.router, prefix="/api/v1/auth", tags=["认证"])
-app.include_router(products.router, prefix="/api/v1/products", tags=["商品"])
-app.include_router(bids.router, prefix="/api/v1/bids", tags=["竞拍"])
-app.include_router(orders.router, prefix="/api/v1/orders", tags=["订单"])
-app.include_router(auctions.router, prefix="/api/v1/auctions", tags=["拍卖"])
-app.include_router(events.router, prefix="/api/v1/events", tags=["专场活动"])
-app.include_router(home.router, prefix="/api/v1/home", tags=["首页"])
-app.include_router(wallet.router, prefix="/api/v1/wallet", tags=["钱包"])
-app.include_router(deposit.router, prefix="/api/v1/deposits", tags=["保证金"])
-app.include_router(stores.router, prefix="/api/v1/stores", tags=["店铺"])
-app.include_router(store_applications.router, prefix="/api/v1/store-applications", tags=["店铺申请"])
-app.include_router(local_services.router, prefix="/api/v1/local-services", tags=["同城服务"])
-app.include_router(chat.router, prefix="/api/v1/chat", tags=["聊天"])
-# app.include_router(search.router, prefix="/api/v1/search", tags=["搜索"])
+# 注册路由（逐个计时导入，第三方SDK在首次调用时才加载）
+ROUTERS = [
+    ("app.api.auth", "/api/v1/auth", "认证"),
+    ("app.api.products", "/api/v1/products", "商品"),
+    ("app.api.bids", "/api/v1/bids", "竞拍"),
+    ("app.api.orders", "/api/v1/orders", "订单"),
+    ("app.api.auctions", "/api/v1/auctions", "拍卖"),
+    ("app.api.events", "/api/v1/events", "专场活动"),
+    ("app.api.home", "/api/v1/home", "首页"),
+    ("app.api.wallet", "/api/v1/wallet", "钱包"),
+    ("app.api.deposit", "/api/v1/deposits", "保证金"),
+    ("app.api.stores", "/api/v1/stores", "店铺"),
+    ("app.api.store_applications", "/api/v1/store-applications", "店铺申请"),
+    ("app.api.local_services", "/api/v1/local-services", "同城服务"),
+    ("app.api.chat", "/api/v1/chat", "聊天"),
+    # ("app.api.search", "/api/v1/search", "搜索"),
+]
+
+for module_name, prefix, tag in ROUTERS:
+    module = startup_report.import_module(module_name)
+    app.include_router(module.router, prefix=prefix, tags=[tag])
+
+# 热门榜单、推荐相似表和同城服务地理索引在应用启动时由后台线程构建（每个 worker 各自常驻内存），不在请求中构建
+with startup_report.phase("warmup"):
+    from app.services.trending_service import trending_service
+    from app.services.recommendation_service import recommendation_service
+    from app.services.geo_service import local_service_geo_index
+app.add_event_handler("startup", trending_service.start_rebuild)
+app.add_event_handler("startup", recommendation_service.start_rebuild)
+app.add_event_handler("startup", local_service_geo_index.start_loading)
+
+# 延时任务执行循环（JOB_RUNNER_ENABLED=false 时由独立进程 python -m app.tasks.delayed_jobs 执行）
+if settings.JOB_RUNNER_ENABLED:
+    with startup_report.phase("delayed_jobs"):
+        from app.tasks.delayed_jobs import start_delayed_jobs, stop_delayed_jobs
+    app.add_event_handler("startup", start_delayed_jobs)
+    app.add_event_handler("shutdown", stop_delayed_jobs)
+
+# 后台循环（拍卖结束检查、统计对账）：多 worker 时按租约选举，只在主进程上运行
+if settings.BACKGROUND_TASKS_ENABLED:
+    with startup_report.phase("background"):
+        from app.tasks.background import start_background_tasks, stop_background_tasks
+    app.add_event_handler("startup", start_background_tasks)
+    app.add_event_handler("shutdown", stop_background_tasks)
 
 # 根路径
 @app.get("/")
@@ -62,6 +124,16 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "服务运行正常"}
 
+# 启动耗时报告（当前 worker）
+@app.get("/health/startup")
+async def startup_info():
+    return startup_report.as_dict()
+
+# 指标（Prometheus 文本格式）
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return metrics_registry.render()
+
 # 全局异常处理
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc: HTTPException):
@@ -70,6 +142,8 @@ async def http_exception_handler(request, exc: HTTPException):
         content={"detail": exc.detail, "status_code": exc.status_code}
     )
 
+startup_report.finish()
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",